@@ -2,86 +2,212 @@
 """
 Entity Checker for Hygger Light Home Automation
 This script helps identify common entity ID configuration issues.
+
+Every file under automations/, scripts/, helpers/ and dashboard/ is tokenized
+with a single compiled regex pass that picks out entity ID references (skipping
+YAML comments and service names). The resulting defined-vs-referenced index is
+persisted in .entity_index.json, so re-runs only re-index changed files.
+
+Reports:
+  • default placeholder entity IDs that must be changed for your installation
+  • references to scripts/automations/helpers that are not defined anywhere
+  • helpers that are defined but never used
 """
 
-import yaml
+import argparse
 import os
 import re
 
-def check_entity_ids():
+import yaml
+
+from config_tree import (CONFIG_DIRS, REPO_DOMAINS, FileCache, config_kind,
+                         defined_entities, file_digest, iter_yaml_files)
+
+INDEX_FILE = '.entity_index.json'
+
+DEFAULT_ENTITIES = {
+    'remote.rm4_pro_remote': 'Broadlink remote entity (MUST be updated)',
+    'weather.openweathermap': 'Weather entity (MUST be updated to match your integration)'
+}
+
+# Domains whose IDs are worth indexing (repo-defined plus the integrations we rely on)
+ENTITY_DOMAINS = REPO_DOMAINS + ('remote', 'weather', 'sun', 'sensor', 'binary_sensor',
+                                 'light', 'switch', 'zone', 'person')
+
+# Service names that share a domain prefix with entity IDs
+SERVICE_NAMES = {'turn_on', 'turn_off', 'toggle', 'reload', 'trigger', 'set_value',
+                 'send_command', 'learn_command', 'delete_command', 'get_forecasts',
+                 'increment', 'decrement', 'set_datetime', 'start', 'cancel', 'finish',
+                 'pause', 'change', 'select_option', 'write'}
+
+# One pass per file: a YAML comment swallows the rest of its line, so IDs mentioned
+# in comments are ignored; a quoted scalar is matched whole so a ` #` inside it does
+# not start a comment, and its IDs are picked out of it. Everything else that looks
+# like domain.object_id is a token.
+_ENTITY = r"\b(?:" + "|".join(ENTITY_DOMAINS) + r")\.[a-z0-9_]+\b"
+_TOKEN = re.compile(
+    r"(?P<comment>(?:^|(?<=\s))#[^\n]*)"
+    r"|(?P<quoted>(?:^|(?<=[\s\[{,]))(?:'(?:[^'\n]|'')*'|\"(?:[^\"\\\n]|\\.)*\"))"
+    r"|(?P<entity>" + _ENTITY + ")",
+    re.MULTILINE)
+_QUOTED_ENTITY = re.compile(_ENTITY)
+
+
+def tokenize(text):
+    """Return [(entity_id, line_number)] for every entity reference in a file's text."""
+    references = []
+    line = 1
+    position = 0
+    for match in _TOKEN.finditer(text):
+        if match.lastgroup == 'comment':
+            continue
+        if match.lastgroup == 'quoted':
+            found = _QUOTED_ENTITY.finditer(text, match.start(), match.end())
+        else:
+            found = (match,)
+        for entity in found:
+            entity_id = entity.group()
+            if entity_id.partition('.')[2] in SERVICE_NAMES:
+                continue  # e.g. script.turn_on, input_number.set_value
+            line += text.count('\n', position, entity.start())
+            position = entity.start()
+            references.append((entity_id, line))
+    return references
+
+
+def index_file(filepath, raw):
+    """Index one file's contents: the entities it defines and those it references."""
+    text = raw.decode('utf-8', errors='replace')
+    defines = []
+    if config_kind(filepath) in ('helper', 'automation', 'script'):
+        try:
+            defines = defined_entities(filepath, yaml.safe_load(text))
+        except yaml.YAMLError:
+            defines = []
+    return {'defines': defines, 'references': tokenize(text)}
+
+
+def build_index(root='.', index_path=INDEX_FILE):
+    """Return ({path: entry}, reindexed_count), re-indexing only changed files."""
+    # Keyed on the token pattern too, so a tokenizer change re-indexes every file
+    cache = FileCache(index_path, f"check_entities:{file_digest(_TOKEN.pattern.encode())[:16]}")
+    paths = [path for directory in CONFIG_DIRS
+             if os.path.isdir(os.path.join(root, directory))
+             for path in iter_yaml_files(os.path.join(root, directory))]
+    index = {}
+    reindexed = 0
+    for path in paths:
+        entry, stat = cache.lookup(path)
+        if entry is None:
+            # Touched or checked out again but unchanged: the content hash still matches
+            with open(path, 'rb') as file:
+                raw = file.read()
+            digest = file_digest(raw)
+            entry = cache.lookup_digest(path, digest, stat)
+            if entry is None:
+                entry = index_file(path, raw)
+                cache.store(path, digest, stat, entry)
+                reindexed += 1
+        index[path] = entry
+    cache.prune(paths)
+    cache.save()
+    return index, reindexed
+
+
+def analyze_index(index):
+    """Cross-reference the index into placeholder, undefined and unused findings."""
+    defined = {}
+    referenced = {}
+    for path, entry in index.items():
+        for entity_id in entry['defines']:
+            defined.setdefault(entity_id, path)
+        for entity_id, line in entry['references']:
+            referenced.setdefault(entity_id, []).append((path, line))
+
+    placeholders = {entity_id: referenced[entity_id]
+                    for entity_id in DEFAULT_ENTITIES if entity_id in referenced}
+    undefined = {entity_id: sites for entity_id, sites in referenced.items()
+                 if entity_id.partition('.')[0] in REPO_DOMAINS and entity_id not in defined}
+    used_outside = {entity_id for entity_id, sites in referenced.items()
+                    if any(path != defined.get(entity_id) for path, _ in sites)}
+    unused = sorted(entity_id for entity_id, path in defined.items()
+                    if config_kind(path) == 'helper' and entity_id not in used_outside)
+    required_helpers = sorted(entity_id for entity_id, sites in referenced.items()
+                              if entity_id.startswith('input_')
+                              and any(config_kind(path) in ('automation', 'script')
+                                      for path, _ in sites))
+    return {'placeholders': placeholders, 'undefined': undefined, 'unused': unused,
+            'required_helpers': required_helpers, 'defined': defined}
+
+
+def check_entity_ids(root='.', use_index=True):
     """Check for default entity IDs that need to be updated."""
     print("🔍 Checking for entity IDs that need to be updated...")
     print("=" * 60)
-    
-    default_entities = {
-        'remote.rm4_pro_remote': 'Broadlink remote entity (MUST be updated)',
-        'weather.openweathermap': 'Weather entity (MUST be updated to match your integration)'
-    }
-    
-    issues = []
-    
-    # Find all YAML files
-    for root, dirs, files in os.walk('.'):
-        # Skip hidden directories
-        dirs[:] = [d for d in dirs if not d.startswith('.')]
-        
-        for file in files:
-            if file.endswith('.yaml') or file.endswith('.yml'):
-                filepath = os.path.join(root, file)
-                
-                try:
-                    with open(filepath, 'r') as f:
-                        content = f.read()
-                    
-                    for entity_id, description in default_entities.items():
-                        if entity_id in content:
-                            issues.append({
-                                'file': filepath,
-                                'entity_id': entity_id,
-                                'description': description
-                            })
-                            
-                except Exception as e:
-                    print(f"⚠️  Could not read {filepath}: {e}")
-    
-    if issues:
+
+    index_path = os.path.join(root, INDEX_FILE) if use_index else None
+    index, reindexed = build_index(root, index_path)
+    findings = analyze_index(index)
+    print(f"🗂️  Indexed {len(index)} files ({reindexed} re-indexed, "
+          f"{len(index) - reindexed} unchanged)")
+    print()
+
+    if findings['placeholders']:
         print("❌ Found default entity IDs that need to be updated:")
         print()
-        
-        current_file = None
-        for issue in issues:
-            if issue['file'] != current_file:
-                print(f"📁 {issue['file']}:")
-                current_file = issue['file']
-            print(f"   • {issue['entity_id']} - {issue['description']}")
-        
+        by_file = {}
+        for entity_id, sites in findings['placeholders'].items():
+            for path, line in sites:
+                by_file.setdefault(path, {}).setdefault(entity_id, []).append(line)
+        for path in sorted(by_file):
+            print(f"📁 {path}:")
+            for entity_id, lines in sorted(by_file[path].items()):
+                line_list = ', '.join(str(line) for line in lines)
+                print(f"   • {entity_id} - {DEFAULT_ENTITIES[entity_id]} (line {line_list})")
+
         print("\n🔧 To fix these issues:")
         print("1. Find your actual entity IDs in Home Assistant:")
         print("   - Settings > Devices & Services")
         print("   - Look for your Broadlink and Weather integrations")
         print("2. Replace the default entity IDs with your actual ones")
         print("3. Run this script again to verify")
-        
+
     else:
         print("✅ No default entity IDs found - configuration looks good!")
-    
+
+    if findings['undefined']:
+        print("\n❌ References to entities that are not defined in this configuration:")
+        for entity_id, sites in sorted(findings['undefined'].items()):
+            locations = ', '.join(f"{path}:{line}" for path, line in sites[:3])
+            more = f" (+{len(sites) - 3} more)" if len(sites) > 3 else ""
+            print(f"   • {entity_id} ← {locations}{more}")
+    else:
+        print("\n✅ Every referenced script, automation and helper is defined")
+
+    if findings['unused']:
+        print("\n⚠️  Helpers defined but never referenced:")
+        for entity_id in findings['unused']:
+            print(f"   • {entity_id} ({findings['defined'][entity_id]})")
+
     print("\n" + "=" * 60)
-    
-    # Check for required helper entities
+
+    # Required helpers are derived from what the automations and scripts actually use
     print("📋 Required helper entities (create these in Home Assistant):")
-    required_helpers = [
-        'input_number.hygger_white_level',
-        'input_number.hygger_red_level', 
-        'input_number.hygger_green_level',
-        'input_number.hygger_blue_level',
-        'input_boolean.enable_aquarium_lightning',
-        'input_text.aquarium_forecast_cache'
-    ]
-    
-    for helper in required_helpers:
+    for helper in findings['required_helpers']:
         print(f"   • {helper}")
-    
+
     print("\nCreate these in: Settings > Devices & Services > Helpers")
+    return findings
+
+
+def main():
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Check Hygger light entity ID configuration")
+    parser.add_argument('root', nargs='?', default='.', help="Configuration tree to check")
+    parser.add_argument('--no-index', action='store_true',
+                        help="Re-index everything without reading or writing .entity_index.json")
+    args = parser.parse_args()
+    check_entity_ids(args.root, use_index=not args.no_index)
 
 if __name__ == "__main__":
-    check_entity_ids()
\ No newline at end of file
+    main()
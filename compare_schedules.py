@@ -2,72 +2,222 @@
 """
 Compare Old vs New Lighting Schedules
 Shows the difference between fixed 6am-6pm schedule and dynamic sunrise/sunset.
+
+With --years/--location/--locations/--output it instead computes daylight windows,
+light-on minutes and daily light integral for every day of one or more years across
+any number of locations, in one vectorized pass, and writes them to CSV or .npz.
 """
-import math
-
-def get_sunrise_sunset_for_day(day_of_year):
-    """Get sunrise/sunset times for a specific day of year."""
-    # Calculate sunrise/sunset for latitude 38.28°N (Jeffersonville, Indiana)
-    latitude = 38.28
-    
-    # Solar declination angle
-    declination = 23.45 * math.sin(math.radians((360 / 365) * (day_of_year - 81)))
-    
-    # Hour angle at sunrise/sunset
-    lat_rad = math.radians(latitude)
-    decl_rad = math.radians(declination)
-    
+import argparse
+import csv
+import time
+from collections import namedtuple
+from datetime import date
+
+from ephemeris import DEFAULT_LATITUDE, DEFAULT_SOLAR_NOON, get_sunrise_sunset_for_day
+
+# The old schedule ran the lights from 06:00 to 18:00 every day
+OLD_SCHEDULE_MINUTES = 12 * 60
+
+Location = namedtuple('Location', 'name latitude longitude solar_noon')
+
+HOME = Location('Jeffersonville, IN', DEFAULT_LATITUDE, -85.74, DEFAULT_SOLAR_NOON)
+
+
+def solar_noon_for(longitude, utc_offset=None):
+    """Clock hour of solar noon from longitude and UTC offset (nominal zone if omitted)."""
+    if utc_offset is None:
+        utc_offset = round(longitude / 15)
+    return 12 + utc_offset - longitude / 15
+
+
+def parse_location(spec):
+    """Parse 'Name:latitude:longitude[:utc_offset]' into a Location."""
+    parts = spec.split(':')
+    if len(parts) not in (3, 4):
+        raise argparse.ArgumentTypeError(f"expected NAME:LAT:LON[:UTC_OFFSET], got {spec!r}")
     try:
-        hour_angle = math.degrees(math.acos(-math.tan(lat_rad) * math.tan(decl_rad)))
-        
-        # Convert to time (solar noon is around 12:00, adjust for time zone)
-        sunrise_decimal = 12 - (hour_angle / 15) - 0.5  # Adjust for Eastern Time
-        sunset_decimal = 12 + (hour_angle / 15) - 0.5
-        
-        # Convert to hours and minutes
-        sunrise_hour = int(sunrise_decimal)
-        sunrise_min = int((sunrise_decimal - sunrise_hour) * 60)
-        sunset_hour = int(sunset_decimal)
-        sunset_min = int((sunset_decimal - sunset_hour) * 60)
-        
-        return f"{sunrise_hour:02d}:{sunrise_min:02d}", f"{sunset_hour:02d}:{sunset_min:02d}"
-    except:
-        # Fallback for extreme latitudes
-        return "06:30", "18:30"
+        latitude, longitude = float(parts[1]), float(parts[2])
+        utc_offset = float(parts[3]) if len(parts) == 4 else None
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid number in location {spec!r}")
+    return Location(parts[0], latitude, longitude, solar_noon_for(longitude, utc_offset))
+
+
+def load_locations(path):
+    """Load locations from a CSV with name, latitude, longitude and optional utc_offset/solar_noon."""
+    locations = []
+    with open(path, newline='') as file:
+        for row in csv.DictReader(file):
+            longitude = float(row['longitude'])
+            if row.get('solar_noon'):
+                solar_noon = float(row['solar_noon'])
+            else:
+                offset = row.get('utc_offset')
+                solar_noon = solar_noon_for(longitude, float(offset) if offset else None)
+            locations.append(Location(row['name'], float(row['latitude']), longitude, solar_noon))
+    return locations
+
+
+def compute_schedule_table(locations, years, condition='sunny', ppfd=None):
+    """Return a dict of (locations, days) arrays covering every day of `years`."""
+    import numpy as np
+    from lighting_vector import MAX_LEVEL, CHANNELS, daily_exposure, sunrise_sunset
+
+    dates = np.concatenate([np.arange(f"{year}-01-01", f"{year + 1}-01-01", dtype='datetime64[D]')
+                            for year in sorted(set(years))])
+    day_of_year = (dates - dates.astype('datetime64[Y]')).astype(np.int16) + 1
+
+    # Results depend only on day of year, so evaluate days 1-366 once and index into them
+    latitude = np.array([loc.latitude for loc in locations])[:, None]
+    solar_noon = np.array([loc.solar_noon for loc in locations])[:, None]
+    unique_days = np.arange(1, 367)
+    exposure = daily_exposure(unique_days[None, :], latitude, solar_noon, condition)
+    sunrise, sunset = sunrise_sunset(unique_days[None, :], latitude, solar_noon)
+    index = day_of_year - 1
+
+    level_minutes = exposure['level_minutes'][:, index]
+    full_output_hours = level_minutes.sum(axis=-1) / (len(CHANNELS) * MAX_LEVEL) / 60
+    table = {
+        'names': np.array([loc.name for loc in locations]),
+        'latitude': latitude[:, 0],
+        'longitude': np.array([loc.longitude for loc in locations]),
+        'solar_noon': solar_noon[:, 0],
+        'dates': dates,
+        'sunrise': sunrise[:, index],
+        'sunset': sunset[:, index],
+        'daylight_hours': exposure['daylight_minutes'][:, index] / 60,
+        'light_on_minutes': exposure['light_on_minutes'][:, index],
+        'level_minutes': level_minutes,
+        'full_output_hours': full_output_hours,
+    }
+    if ppfd is not None:
+        # mol/m²/day: µmol/m²/s at full output × seconds at full output / 1e6
+        table['dli'] = full_output_hours * 3600 * ppfd / 1e6
+    return table
+
+
+def write_csv(table, path):
+    """Write one row per location per day."""
+    import io
+
+    columns = ['daylight_hours', 'light_on_minutes', 'full_output_hours']
+    if 'dli' in table:
+        columns.append('dli')
+    header = (['location', 'latitude', 'longitude', 'date', 'sunrise', 'sunset'] + columns
+              + [f"{channel}_level_minutes" for channel in ('white', 'red', 'green', 'blue')])
+    row_format = ",".join(['%s', '%.3f', '%.3f', '%.4g', '%d', '%.4g']
+                          + ['%.4g'] * ('dli' in table) + ['%d'] * 4) + "\n"
+    dates = table['dates'].astype(str).tolist()
+    with open(path, 'w', newline='') as file:
+        csv.writer(file).writerow(header)
+        for row, name in enumerate(table['names']):
+            # Quote the site name once, then format each day with a single %-template
+            buffer = io.StringIO()
+            csv.writer(buffer).writerow([name, table['latitude'][row], table['longitude'][row]])
+            prefix = buffer.getvalue().rstrip('\r\n').replace('%', '%%')
+            levels = table['level_minutes'][row]
+            values = zip(dates, table['sunrise'][row].tolist(), table['sunset'][row].tolist(),
+                         *(table[column][row].tolist() for column in columns),
+                         *(levels[:, channel].tolist() for channel in range(levels.shape[1])))
+            line = prefix + "," + row_format
+            file.writelines(line % day for day in values)
+
+
+def write_npz(table, path):
+    """Write the table as a columnar .npz archive (arrays shaped locations × days)."""
+    import numpy as np
+
+    np.savez(path, **table)
+
+
+def export_schedules(locations, years, output=None, condition='sunny', ppfd=None):
+    """Compute and optionally export the full-year comparison; prints a per-location summary."""
+    started = time.perf_counter()
+    table = compute_schedule_table(locations, years, condition, ppfd)
+    elapsed = time.perf_counter() - started
+    days = len(table['dates'])
+
+    print(f"🌍 {len(locations)} location(s) × {days} days ({condition}) computed in {elapsed:.2f}s")
+    print("-" * 70)
+    print(f"{'Location':<24} {'Daylight (h)':>14} {'Lights on/yr':>13} {'vs 06-18':>10} {'Full-output h':>14}")
+    for row, location in enumerate(locations[:25]):
+        daylight = table['daylight_hours'][row]
+        on_hours = table['light_on_minutes'][row].sum() / 60
+        old_hours = OLD_SCHEDULE_MINUTES * days / 60
+        print(f"{location.name[:24]:<24} {daylight.min():>6.1f}–{daylight.max():<6.1f} "
+              f"{on_hours:>12.0f}h {on_hours - old_hours:>+9.0f}h "
+              f"{table['full_output_hours'][row].mean():>10.2f}/day")
+    if len(locations) > 25:
+        print(f"… and {len(locations) - 25} more locations")
+
+    if output:
+        started = time.perf_counter()
+        if output.endswith('.npz'):
+            write_npz(table, output)
+        else:
+            write_csv(table, output)
+        print(f"\n💾 Wrote {output} in {time.perf_counter() - started:.2f}s")
+    return table
+
+
+def parse_args():
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(description="Compare fixed and sunrise/sunset lighting schedules")
+    parser.add_argument('--years', type=int, nargs='+',
+                        help="Evaluate every day of these years (default: this year)")
+    parser.add_argument('--location', type=parse_location, action='append', default=[],
+                        metavar='NAME:LAT:LON[:UTC_OFFSET]', help="Add a location (repeatable)")
+    parser.add_argument('--locations', metavar='CSV',
+                        help="CSV of locations (name, latitude, longitude, utc_offset or solar_noon)")
+    parser.add_argument('--output', metavar='PATH', help="Write results to .csv or .npz")
+    parser.add_argument('--condition', default='sunny', help="Weather condition to assume")
+    parser.add_argument('--ppfd', type=float,
+                        help="Fixture PPFD at full output (µmol/m²/s) to report DLI in mol/m²/day")
+    return parser.parse_args()
+
 
 def main():
     """Compare old vs new lighting schedules."""
+    args = parse_args()
+    if args.years or args.location or args.locations or args.output:
+        locations = list(args.location)
+        if args.locations:
+            locations.extend(load_locations(args.locations))
+        export_schedules(locations or [HOME], args.years or [date.today().year],
+                         args.output, args.condition, args.ppfd)
+        return
+
     print("⚖️  OLD vs NEW LIGHTING SCHEDULE COMPARISON")
     print("=" * 70)
     print()
-    
+
     # Test key seasonal dates
     test_dates = [
         (21, "January 21 - Deep Winter"),
-        (80, "March 21 - Spring Equinox"), 
+        (80, "March 21 - Spring Equinox"),
         (172, "June 21 - Summer Solstice"),
         (266, "September 23 - Autumn Equinox"),
         (355, "December 21 - Winter Solstice")
     ]
-    
+
     print("📅 Season               | 🕰️ Old Schedule | 🌅 New Schedule | 📊 Difference")
     print("-" * 70)
-    
+
     for day_of_year, season in test_dates:
-        sunrise, sunset = get_sunrise_sunset_for_day(day_of_year)
-        
+        sunrise, sunset, _ = get_sunrise_sunset_for_day(day_of_year)
+
         # Old schedule: always 6:00 AM to 6:00 PM (12 hours)
         old_schedule = "06:00 - 18:00 (12.0h)"
-        
+
         # New schedule: actual sunrise/sunset
         sr_parts = sunrise.split(':')
         ss_parts = sunset.split(':')
         sunrise_decimal = int(sr_parts[0]) + int(sr_parts[1]) / 60
         sunset_decimal = int(ss_parts[0]) + int(ss_parts[1]) / 60
         daylight_hours = sunset_decimal - sunrise_decimal
-        
+
         new_schedule = f"{sunrise} - {sunset} ({daylight_hours:.1f}h)"
-        
+
         # Calculate difference from 12 hour baseline
         diff_hours = daylight_hours - 12.0
         if diff_hours > 0:
@@ -76,9 +226,9 @@ def main():
             difference = f"{diff_hours:.1f}h shorter"
         else:
             difference = "Same length"
-        
+
         print(f"{season:<22} | {old_schedule:<14} | {new_schedule:<14} | {difference}")
-    
+
     print()
     print("🔍 KEY INSIGHTS:")
     print("• ❄️  OLD SYSTEM: Fixed 12-hour days year-round - not realistic!")
@@ -87,7 +237,7 @@ def main():
     print("• 🌿 Plants receive proper photoperiod signals for growth cycles")
     print("• 💤 Winter's shorter days encourage natural hibernation/dormancy")
     print("• 🌞 Summer's longer days support active growth and breeding")
-    
+
     print()
     print("📈 BIOLOGICAL BENEFITS:")
     print("• Circadian rhythm regulation matches natural environment")
@@ -97,4 +247,4 @@ def main():
     print("• Reduced stress from artificial lighting schedules")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
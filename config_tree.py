@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Hygger Light Configuration Tree Helpers
+Shared file discovery, per-file cache and entity-definition rules used by
+validate_config.py and check_entities.py.
+"""
+import hashlib
+import json
+import os
+
+YAML_EXTENSIONS = ('.yaml', '.yml')
+
+# Directories that hold Home Assistant configuration, in the order the tools report them
+CONFIG_DIRS = ('automations', 'scripts', 'helpers', 'dashboard')
+
+# Entity domains whose entities are defined inside this repository (everything else,
+# e.g. remote.* or weather.*, comes from an integration and cannot be checked offline)
+REPO_DOMAINS = ('automation', 'script', 'input_number', 'input_boolean', 'input_text',
+                'input_datetime', 'input_select', 'timer', 'counter')
+
+
+def slugify(text):
+    """Convert an alias such as 'Aquarium Daily Reset' to 'aquarium_daily_reset'."""
+    slug = ''.join(ch if ch.isalnum() else '_' for ch in text.lower())
+    while '__' in slug:
+        slug = slug.replace('__', '_')
+    return slug.strip('_')
+
+
+def is_legacy_dir(name):
+    """Return True for the archived 'Old *' directories."""
+    return name.startswith('Old ')
+
+
+def iter_yaml_files(root='.', include_old=False):
+    """Yield YAML file paths under `root`, skipping hidden and (by default) 'Old *' dirs."""
+    for current, dirs, files in os.walk(root):
+        dirs[:] = sorted(d for d in dirs
+                         if not d.startswith('.') and d != '__pycache__'
+                         and (include_old or not is_legacy_dir(d)))
+        for file in sorted(files):
+            if file.endswith(YAML_EXTENSIONS):
+                yield os.path.join(current, file)
+
+
+def config_kind(filepath):
+    """Return 'automation', 'script', 'helper', 'dashboard' or None for a config path."""
+    parts = os.path.normpath(filepath).split(os.sep)
+    if len(parts) < 2:
+        return None
+    return {'automations': 'automation', 'scripts': 'script',
+            'helpers': 'helper', 'dashboard': 'dashboard'}.get(parts[-2])
+
+
+def defined_entities(filepath, data):
+    """Return the entity IDs a parsed config file defines."""
+    kind = config_kind(filepath)
+    if not isinstance(data, dict):
+        return []
+    if kind == 'script':
+        return [f"script.{os.path.splitext(os.path.basename(filepath))[0]}"]
+    if kind == 'automation':
+        name = data.get('alias') or os.path.splitext(os.path.basename(filepath))[0]
+        return [f"automation.{slugify(str(name))}"]
+    if kind == 'helper':
+        return [f"{domain}.{object_id}"
+                for domain, entities in data.items() if isinstance(entities, dict)
+                for object_id in entities]
+    return []
+
+
+def file_digest(data):
+    """Return the SHA-256 hex digest of file contents."""
+    return hashlib.sha256(data).hexdigest()
+
+
+class FileCache:
+    """Per-file result cache keyed by (mtime, size) with a content-hash fallback.
+
+    A file whose mtime and size are unchanged is trusted without reading it. If the
+    stat changed but the content hash did not (touch, checkout), the cached result
+    is still reused and the stat is refreshed.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path, namespace):
+        self.path = path
+        self.namespace = namespace
+        self.entries = {}
+        self.dirty = False
+        if path and os.path.exists(path):
+            try:
+                with open(path) as file:
+                    payload = json.load(file)
+                if payload.get('version') == self.VERSION and payload.get('namespace') == namespace:
+                    self.entries = payload.get('files', {})
+            except (OSError, ValueError):
+                self.entries = {}
+
+    def lookup(self, filepath):
+        """Return (result, stat) for a fresh cache hit, or (None, stat) on a miss."""
+        stat = os.stat(filepath)
+        entry = self.entries.get(filepath)
+        if entry and entry['mtime_ns'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+            return entry['result'], stat
+        return None, stat
+
+    def lookup_digest(self, filepath, digest, stat):
+        """Return a cached result if the content hash matches, refreshing its stat."""
+        entry = self.entries.get(filepath)
+        if entry and entry['digest'] == digest:
+            entry['mtime_ns'] = stat.st_mtime_ns
+            entry['size'] = stat.st_size
+            self.dirty = True
+            return entry['result']
+        return None
+
+    def store(self, filepath, digest, stat, result):
+        """Record the result for a file."""
+        self.entries[filepath] = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size,
+                                  'digest': digest, 'result': result}
+        self.dirty = True
+
+    def prune(self, live_paths):
+        """Forget files that no longer exist in the tree."""
+        for filepath in set(self.entries) - set(live_paths):
+            del self.entries[filepath]
+            self.dirty = True
+
+    def save(self):
+        """Atomically write the cache if anything changed."""
+        if not self.path or not self.dirty:
+            return
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w') as file:
+            json.dump({'version': self.VERSION, 'namespace': self.namespace,
+                       'files': self.entries}, file)
+        os.replace(temp_path, self.path)
+        self.dirty = False
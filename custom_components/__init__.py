@@ -0,0 +1 @@
+"""Home Assistant custom integrations; copy the folders below into <config>/custom_components."""
@@ -0,0 +1,175 @@
+"""
+Hygger aquarium lighting integration.
+
+Runs the circadian lighting engine in the event loop instead of the Jinja templates
+of automations/aquarium_dynamic_circadian_lighting.yaml: it evaluates when sun.sun or
+the weather entity changes, sends IR through one paced queue per remote and exposes
+the target levels and the transition in progress as sensors. With an OpenWeatherMap
+key it reads the forecast itself through one pooled client shared by every fixture
+(weather_client.py) and follows the cloud cover and rain minute by minute. With
+`lookahead: true` it also evaluates the next minute ahead of time and starts sending
+early, so the commands land by the minute instead of after it (lookahead_scheduler.py
+has the before/after estimate).
+
+`hygger:` takes one fixture or a list of them. Fixtures on the same remote share its
+queue and fixtures with the same key share the client, so tanks at one location
+make one forecast call between them. Each fixture after the first needs a name; its
+sensors and level helpers are named after it (input_number.shrimp_tank_white_level).
+
+    hygger:
+      - remote: remote.rm4_pro_remote
+        device: hygger_hg016
+        weather: weather.openweathermap
+        profile: planted_tropical
+        owm_api_key: !secret owm_api_key   # optional; latitude/longitude default to home
+        lookahead: true                    # optional; send the next minute's change early
+        profiles:
+          planted_tropical:        # a profiles/*.yaml file, indented under its name
+            photoperiod: {min_hours: 8, max_hours: 8}
+      - name: Shrimp tank
+        device: hygger_hg016_shrimp
+        owm_api_key: !secret owm_api_key
+"""
+import voluptuous as vol
+
+from homeassistant.const import (CONF_LATITUDE, CONF_LONGITUDE, CONF_NAME,
+                                 EVENT_HOMEASSISTANT_STOP, Platform)
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.discovery import async_load_platform
+from homeassistant.helpers.start import async_at_started
+from homeassistant.util import slugify
+
+from .const import (CONF_DEVICE, CONF_DWELL, CONF_IR_DELAY, CONF_LOOKAHEAD, CONF_OWM_API_KEY,
+                    CONF_OWM_INTERVAL, CONF_OWM_URL, CONF_PROFILE, CONF_PROFILES, CONF_REMOTE,
+                    CONF_WEATHER, DEFAULT_DEVICE, DEFAULT_DWELL_MINUTES, DEFAULT_IR_DELAY_MS,
+                    DEFAULT_NAME, DEFAULT_OWM_INTERVAL_S, DEFAULT_PROFILE_NAME, DEFAULT_REMOTE,
+                    DEFAULT_WEATHER, DOMAIN, SERVICE_SET_PROFILE, SERVICE_SYNC)
+from .coordinator import HyggerCoordinator
+from .engine import ProfileError, normalize_profile
+from .ir_queue import Fixture, IRQueue
+from .weather_client import OWM_URL, WeatherClient
+
+
+def _profiles(value):
+    """Validate the profiles mapping with the engine's own checks; adds hygger_default."""
+    value = vol.Schema({cv.slug: dict})(value or {})
+    profiles = {DEFAULT_PROFILE_NAME: normalize_profile({}, DEFAULT_PROFILE_NAME)}
+    for name, config in value.items():
+        try:
+            profiles[name] = normalize_profile(config, name)
+        except ProfileError as error:
+            raise vol.Invalid(f"profile {name}: {error}") from None
+    return profiles
+
+
+def _known_profile(config):
+    """The fixture's profile must be hygger_default or one of `profiles`."""
+    if config[CONF_PROFILE] not in config[CONF_PROFILES]:
+        raise vol.Invalid(f"unknown profile {config[CONF_PROFILE]!r}; add it under profiles")
+    return config
+
+
+def _unique_names(fixtures):
+    """Fixtures are told apart by name; the first one may keep the default, Hygger."""
+    names = [slugify(fixture[CONF_NAME]) for fixture in fixtures]
+    for name in names:
+        if names.count(name) > 1:
+            raise vol.Invalid(f"more than one fixture named {name!r}; give each one a name")
+    return fixtures
+
+
+FIXTURE_SCHEMA = vol.All(vol.Schema({
+    vol.Optional(CONF_NAME, default=DEFAULT_NAME): cv.string,
+    vol.Optional(CONF_REMOTE, default=DEFAULT_REMOTE): cv.entity_id,
+    vol.Optional(CONF_DEVICE, default=DEFAULT_DEVICE): cv.string,
+    vol.Optional(CONF_WEATHER, default=DEFAULT_WEATHER): cv.entity_id,
+    vol.Optional(CONF_IR_DELAY, default=DEFAULT_IR_DELAY_MS):
+        vol.All(vol.Coerce(int), vol.Range(min=0, max=2000)),
+    vol.Optional(CONF_DWELL, default=DEFAULT_DWELL_MINUTES):
+        vol.All(vol.Coerce(int), vol.Range(min=0, max=30)),
+    vol.Optional(CONF_LOOKAHEAD, default=False): cv.boolean,
+    vol.Optional(CONF_PROFILE, default=DEFAULT_PROFILE_NAME): cv.slug,
+    vol.Optional(CONF_PROFILES, default={}): _profiles,
+    vol.Optional(CONF_OWM_API_KEY): cv.string,
+    vol.Optional(CONF_OWM_URL, default=OWM_URL): cv.url,
+    vol.Optional(CONF_OWM_INTERVAL, default=DEFAULT_OWM_INTERVAL_S):
+        vol.All(vol.Coerce(int), vol.Range(min=60, max=3600)),
+    vol.Inclusive(CONF_LATITUDE, "location"): cv.latitude,
+    vol.Inclusive(CONF_LONGITUDE, "location"): cv.longitude,
+}), _known_profile)
+
+CONFIG_SCHEMA = vol.Schema({
+    DOMAIN: vol.All(cv.ensure_list, [FIXTURE_SCHEMA], _unique_names),
+}, extra=vol.ALLOW_EXTRA)
+
+
+def _setup_fixture(hass, data, conf):
+    """The fixture and coordinator of one list entry, on the shared queue and client."""
+    queues = data["queues"]
+    if conf[CONF_REMOTE] not in queues:
+        queues[conf[CONF_REMOTE]] = IRQueue(hass, conf[CONF_REMOTE])
+    fixture = Fixture(hass, queues[conf[CONF_REMOTE]], conf[CONF_DEVICE], conf[CONF_IR_DELAY],
+                      conf[CONF_NAME])
+    client = None
+    if CONF_OWM_API_KEY in conf:
+        # One client per key on Home Assistant's shared session: fixtures at the same
+        # location share each upstream call
+        clients = data["weather_clients"]
+        key = (conf[CONF_OWM_API_KEY], conf[CONF_OWM_URL])
+        if key not in clients:
+            clients[key] = WeatherClient(async_get_clientsession(hass), conf[CONF_OWM_API_KEY],
+                                         conf[CONF_OWM_URL], min_interval=conf[CONF_OWM_INTERVAL])
+        client = clients[key]
+    return HyggerCoordinator(hass, conf, fixture, client)
+
+
+async def async_setup(hass, config):
+    """Set up the engines, the IR queues and the sensors from configuration.yaml."""
+    data = hass.data.setdefault(DOMAIN, {"queues": {}, "weather_clients": {}})
+    coordinators = {}
+    for conf in config[DOMAIN]:
+        coordinator = _setup_fixture(hass, data, conf)
+        coordinators[coordinator.fixture.slug] = coordinator
+    data["coordinators"] = coordinators
+
+    def _targets(call):
+        """Coordinators named in the call (all of them without a name)."""
+        if CONF_NAME not in call.data:
+            return list(coordinators.values())
+        name = slugify(call.data[CONF_NAME])
+        if name not in coordinators:
+            raise HomeAssistantError(f"no Hygger fixture named {call.data[CONF_NAME]!r}")
+        return [coordinators[name]]
+
+    async def async_sync(call):
+        for coordinator in _targets(call):
+            await coordinator.async_sync()
+
+    async def async_set_profile(call):
+        targets = _targets(call)
+        for coordinator in targets:
+            if call.data[CONF_PROFILE] not in coordinator.profiles:
+                raise HomeAssistantError(f"{coordinator.fixture.name} has no profile "
+                                         f"{call.data[CONF_PROFILE]!r}")
+        for coordinator in targets:
+            await coordinator.async_set_profile(call.data[CONF_PROFILE])
+
+    async def async_started(hass):
+        for coordinator in coordinators.values():
+            await coordinator.async_start()
+
+    async def async_stop(event):
+        for coordinator in coordinators.values():
+            await coordinator.async_stop(event)
+
+    hass.services.async_register(DOMAIN, SERVICE_SYNC, async_sync,
+                                 vol.Schema({vol.Optional(CONF_NAME): cv.string}))
+    hass.services.async_register(DOMAIN, SERVICE_SET_PROFILE, async_set_profile,
+                                 vol.Schema({vol.Required(CONF_PROFILE): cv.slug,
+                                             vol.Optional(CONF_NAME): cv.string}))
+    async_at_started(hass, async_started)
+    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, async_stop)
+    hass.async_create_task(async_load_platform(hass, Platform.SENSOR, DOMAIN, {}, config))
+    return True
@@ -0,0 +1,50 @@
+"""Constants for the Hygger aquarium lighting integration."""
+DOMAIN = "hygger"
+
+CONF_REMOTE = "remote"
+CONF_DEVICE = "device"
+CONF_WEATHER = "weather"
+CONF_IR_DELAY = "ir_delay_ms"
+CONF_DWELL = "dwell_minutes"
+CONF_PROFILE = "profile"
+CONF_PROFILES = "profiles"
+CONF_OWM_API_KEY = "owm_api_key"
+CONF_OWM_URL = "owm_url"
+CONF_OWM_INTERVAL = "owm_interval_s"
+CONF_LOOKAHEAD = "lookahead"
+
+# Same entities and defaults as the YAML package
+DEFAULT_NAME = "Hygger"
+DEFAULT_REMOTE = "remote.rm4_pro_remote"
+DEFAULT_DEVICE = "hygger_hg016"
+DEFAULT_WEATHER = "weather.openweathermap"
+DEFAULT_IR_DELAY_MS = 500
+DEFAULT_DWELL_MINUTES = 10
+DEFAULT_PROFILE_NAME = "hygger_default"
+DEFAULT_OWM_INTERVAL_S = 600
+# With lookahead the next minute's target is sent early enough to land by the minute;
+# this covers the hub round trip and IR frame of the last command
+LOOKAHEAD_MARGIN_S = 1.0
+
+SUN_ENTITY = "sun.sun"
+# Level helpers are named after the fixture: input_number.hygger_white_level is the
+# package's fixture (named Hygger)
+LEVEL_HELPER = "input_number.{}_{}_level"
+# When these exist they override ir_delay_ms / dwell_minutes, like `| int(default)` in YAML
+IR_DELAY_HELPER = "input_number.hygger_ir_delay_ms"
+DWELL_HELPER = "input_number.hygger_dwell_minutes"
+FORECAST_CACHE = "input_text.aquarium_forecast_cache"
+LIGHTNING_SWITCH = "input_boolean.enable_aquarium_lightning"
+LIGHTNING_SCRIPT = "script.aquarium_lightning_effect"
+RESET_SCRIPT = "script.aquarium_reset_to_zero"
+# "owner priority until" of whoever holds the light; the integration only sends
+# while nobody above the circadian schedule does. Like the scripts, it belongs to
+# the package's fixture
+LEASE_HELPER = "input_text.aquarium_light_lease"
+
+# Scripts that send IR to the fixture themselves; the queue stops while one runs and
+# the levels are re-read from the helpers when it ends
+EXCLUSIVE_SCRIPTS = (RESET_SCRIPT, LIGHTNING_SCRIPT)
+
+SERVICE_SYNC = "sync"
+SERVICE_SET_PROFILE = "set_profile"
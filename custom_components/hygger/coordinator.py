@@ -0,0 +1,307 @@
+"""Event-driven evaluation of the lighting engine."""
+import copy
+import json
+import logging
+import time
+from datetime import timedelta
+
+from homeassistant.const import CONF_LATITUDE, CONF_LONGITUDE, STATE_UNAVAILABLE, STATE_UNKNOWN
+from homeassistant.core import callback
+from homeassistant.helpers.event import async_call_later, async_track_state_change_event
+from homeassistant.helpers.sun import get_astral_location
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util
+
+from .const import (CONF_DWELL, CONF_LOOKAHEAD, CONF_PROFILE, CONF_PROFILES, CONF_WEATHER,
+                    DOMAIN, DWELL_HELPER, EXCLUSIVE_SCRIPTS, FORECAST_CACHE, LEASE_HELPER,
+                    LIGHTNING_SCRIPT, LIGHTNING_SWITCH, LOOKAHEAD_MARGIN_S, SUN_ENTITY)
+from .engine import (LIGHTNING_CONDITIONS, CompiledProfile, DeadBand, interpolate, is_daylight,
+                     profile_base, profile_hash, transition_commands)
+from .ir_queue import number_state
+from .weather_client import WeatherClientError
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _timestamp(value):
+    """Epoch seconds of a sun.sun time attribute (datetime or ISO string), or None."""
+    if value is None:
+        return None
+    moment = value if hasattr(value, "timestamp") else dt_util.parse_datetime(str(value))
+    return moment.timestamp() if moment else None
+
+
+class HyggerCoordinator(DataUpdateCoordinator):
+    """Runs the engine when sun.sun or the weather entity changes.
+
+    There is no polling interval: the engine's inputs only change when one of those
+    states does, plus when a dead-band hold reaches its dwell time, for which a
+    one-off timer is set. Refresh requests are debounced, so a sun and a weather
+    update arriving together cause one evaluation. With a weather client the
+    forecast is interpolated to the minute instead, so it evaluates every minute.
+
+    With lookahead it also evaluates every minute, and each evaluation plans the
+    next minute too: that target is handed to the fixture early enough for its
+    commands to land by the minute, instead of starting to send once it begins.
+    """
+
+    def __init__(self, hass, config, fixture, weather_client=None):
+        self.lookahead = config.get(CONF_LOOKAHEAD, False)
+        every_minute = weather_client is not None or self.lookahead
+        super().__init__(hass, _LOGGER, name=fixture.slug,
+                         update_interval=timedelta(minutes=1) if every_minute else None)
+        self.fixture = fixture
+        self.weather_entity = config[CONF_WEATHER]
+        self.weather_client = weather_client
+        self.location = (config.get(CONF_LATITUDE, hass.config.latitude),
+                         config.get(CONF_LONGITUDE, hass.config.longitude))
+        self.dwell = config[CONF_DWELL]
+        self.deadband = DeadBand(dwell=self.dwell)
+        self.profiles = config[CONF_PROFILES]
+        self.profile = self.profiles[config[CONF_PROFILE]]
+        self.compiled = None
+        self._sync = True
+        self._cancel_dwell = None
+        self._cancel_lease = None
+        self._cancel_ahead = None
+        self._sent_ahead = None
+        self._forecast = None
+        self._leased = False
+        self._unsubscribe = []
+
+    async def async_start(self):
+        """Compile the profile, read the helpers, subscribe to the inputs and reconcile once."""
+        await self.async_set_profile(self.profile.name, refresh=False)
+        self.fixture.read_helpers()
+        self._unsubscribe.append(async_track_state_change_event(
+            self.hass, [SUN_ENTITY, self.weather_entity], self._async_input_changed))
+        self._unsubscribe.append(async_track_state_change_event(
+            self.hass, list(EXCLUSIVE_SCRIPTS), self._async_script_changed))
+        if self.fixture.package:
+            self._unsubscribe.append(async_track_state_change_event(
+                self.hass, [LEASE_HELPER], self._async_check_lease))
+            self._async_check_lease()
+        await self.async_sync()
+
+    async def async_stop(self, *_):
+        """Unsubscribe and stop sending."""
+        while self._unsubscribe:
+            self._unsubscribe.pop()()
+        for cancel in (self._cancel_dwell, self._cancel_lease, self._cancel_ahead):
+            if cancel:
+                cancel()
+        self._cancel_dwell = self._cancel_lease = self._cancel_ahead = None
+        await self.fixture.async_stop()
+
+    async def async_sync(self):
+        """Evaluate now and reconcile without the dead-band."""
+        self._sync = True
+        await self.async_refresh()
+
+    async def async_set_profile(self, name, refresh=True):
+        """Switch to another profile once its tables are ready, then re-evaluate."""
+        profile = self.profiles[name]
+        compiled = await self.hass.async_add_executor_job(self._compile, profile)
+        # Updates run in the event loop and read self.compiled once, so each one
+        # evaluates entirely with the old tables or entirely with the new ones
+        self.profile, self.compiled = profile, compiled
+        _LOGGER.debug("Using profile %s (%s)", name, compiled.hash)
+        if refresh:
+            await self.async_request_refresh()
+
+    def _compile(self, profile):
+        """Tables of a profile, compiled once per curve and latitude (in the executor)."""
+        latitude = self.hass.config.latitude
+        tables = self.hass.data[DOMAIN].setdefault("tables", {})
+        key = profile_hash(profile.curve, latitude)
+        compiled = tables.get(key)
+        if compiled is None:
+            compiled = tables.setdefault(key, CompiledProfile.compile(profile.curve, latitude))
+        return compiled
+
+    @callback
+    def _async_input_changed(self, event):
+        old, new = event.data.get("old_state"), event.data.get("new_state")
+        # Weather attributes (temperature, humidity, ...) change often; only the condition matters
+        if (event.data["entity_id"] == self.weather_entity and old is not None
+                and new is not None and old.state == new.state):
+            return
+        self.hass.async_create_task(self.async_request_refresh())
+
+    @callback
+    def _async_script_changed(self, event):
+        new = event.data.get("new_state")
+        if new is not None and new.state == "off" and not self.fixture.blocked:
+            # A reset or lightning effect moved the light; start again from its helpers
+            self.fixture.read_helpers()
+            self.hass.async_create_task(self.async_sync())
+
+    @callback
+    def _async_check_lease(self, *_):
+        """Follow input_text.aquarium_light_lease: hold off while someone else has the light."""
+        if self._cancel_lease:
+            self._cancel_lease()
+            self._cancel_lease = None
+        lease = self.fixture.lease()
+        if lease is not None:
+            # A manual hold just runs out, so look again when it does
+            self._leased = True
+            self._cancel_lease = async_call_later(
+                self.hass, timedelta(seconds=max(lease[2] - time.time(), 0) + 1),
+                self._async_check_lease)
+        elif self._leased and not self.fixture.blocked:
+            # The holder sent its own commands; start again from the helpers
+            self._leased = False
+            self.fixture.read_helpers()
+            self.hass.async_create_task(self.async_sync())
+
+    @callback
+    def _async_dwell_elapsed(self, _now):
+        self._cancel_dwell = None
+        self.hass.async_create_task(self.async_request_refresh())
+
+    def _condition(self):
+        """Current condition: the weather entity, else the forecast cache, else sunny."""
+        state = self.hass.states.get(self.weather_entity)
+        if state is not None and state.state not in (STATE_UNKNOWN, STATE_UNAVAILABLE):
+            return state.state
+        cache = self.hass.states.get(FORECAST_CACHE)
+        if cache is not None and len(cache.state) > 5:
+            try:
+                return json.loads(cache.state).get("condition", "sunny")
+            except (ValueError, AttributeError):
+                pass
+        return "sunny"
+
+    async def _async_weather(self, now):
+        """(engine weather, current condition) from the client's forecast, else the entity."""
+        self._forecast = None
+        if self.weather_client is not None:
+            try:
+                entries = await self.weather_client.forecast(*self.location)
+            except WeatherClientError as error:
+                _LOGGER.debug("Forecast unavailable, using %s: %s", self.weather_entity, error)
+            else:
+                if entries:
+                    self._forecast = entries
+                    return interpolate(entries, now), entries[0]["condition"]
+        condition = self._condition()
+        return condition, condition
+
+    async def _async_update_data(self):
+        sun = self.hass.states.get(SUN_ENTITY)
+        if sun is None:
+            raise UpdateFailed(f"{SUN_ENTITY} is not available")
+        compiled, profile = self.compiled, self.profile
+        if compiled is None:
+            raise UpdateFailed(f"profile {profile.name} is not compiled yet")
+        sync, self._sync = self._sync, False
+        now = dt_util.now()
+        daylight = is_daylight(_timestamp(sun.attributes.get("next_rising")),
+                               _timestamp(sun.attributes.get("next_setting")), sun.state)
+        day_of_year = now.timetuple().tm_yday
+        elevation = sun.attributes.get("elevation")
+        if not isinstance(elevation, (int, float)):
+            elevation = compiled.fallback_elevation(day_of_year, now.hour + now.minute / 60,
+                                                    daylight)
+        condition, current = await self._async_weather(now)
+        rising = bool(sun.attributes.get("rising"))
+        levels, values = compiled.evaluate(day_of_year, elevation, daylight, condition)
+        data = {
+            "elevation": elevation,
+            "daylight": daylight,
+            "condition": condition,
+            "profile": profile.name,
+            "base_brightness": profile_base(
+                profile.curve, *compiled.light_elevation(day_of_year, elevation, daylight)),
+            "engine": levels,
+            "values": values,
+            "target": self.fixture.target,
+            "lightning": False,
+        }
+
+        if (current in LIGHTNING_CONDITIONS and self.fixture.package
+                and self.hass.states.is_state(LIGHTNING_SWITCH, "on")):
+            data["lightning"] = True
+            if not self.hass.states.is_state(LIGHTNING_SCRIPT, "on"):
+                _LOGGER.info("Storm detected with lightning enabled - triggering lightning effect")
+                await self.hass.services.async_call("script", "turn_on",
+                                                    {"entity_id": LIGHTNING_SCRIPT})
+            return data
+
+        self.deadband.levels = list(self.fixture.target)
+        self.deadband.dwell = 0 if sync else number_state(self.hass, DWELL_HELPER, self.dwell)
+        minute = round(now.timestamp() / 60)
+        target = self.deadband.update(minute, values, levels, rising)
+        self._schedule_dwell(now)
+        if target != levels:
+            _LOGGER.debug("Dead-band holding %s (engine %s)", target, levels)
+        # Once the next minute's target went out early, this minute's would undo it
+        sent_ahead = self._sent_ahead is not None and self._sent_ahead > now
+        if not self.fixture.blocked and not sent_ahead:
+            self.fixture.set_target(target)
+        if self.lookahead:
+            self._schedule_ahead(now, sun, compiled, (elevation, daylight, condition), rising)
+        data["target"] = target
+        return data
+
+    def _schedule_ahead(self, now, sun, compiled, inputs, rising):
+        """Hand the fixture the next minute's target early enough to land by the minute.
+
+        The sun is moved on to the next minute and the forecast interpolated there;
+        the dead-band is tried on a copy, so the update at that minute finds the
+        levels already sent and only a surprise (a weather change) is reactive.
+        """
+        if self._cancel_ahead:
+            self._cancel_ahead()
+            self._cancel_ahead = None
+        ahead = now.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        elevation, daylight = self._sun_ahead(sun, compiled, inputs[:2], now, ahead)
+        condition = interpolate(self._forecast, ahead) if self._forecast else inputs[2]
+        levels, values = compiled.evaluate(ahead.timetuple().tm_yday, elevation, daylight,
+                                           condition)
+        probe = copy.copy(self.deadband)
+        probe.levels, probe.pending = list(self.deadband.levels), list(self.deadband.pending)
+        probe.dwell = number_state(self.hass, DWELL_HELPER, self.dwell)
+        target = probe.update(round(ahead.timestamp() / 60), values, levels, rising)
+        if target == self.fixture.target:
+            return
+        commands = transition_commands(self.fixture.levels, target)
+        lead = len(commands) * self.fixture.delay_s + LOOKAHEAD_MARGIN_S
+        delay = max((ahead - now).total_seconds() - lead, 0)
+
+        @callback
+        def _async_send_ahead(_now):
+            self._cancel_ahead = None
+            if not self.fixture.blocked:
+                _LOGGER.debug("Sending %s ahead of %s", target, ahead)
+                self._sent_ahead = ahead
+                self.fixture.set_target(target)
+
+        self._cancel_ahead = async_call_later(self.hass, timedelta(seconds=delay),
+                                              _async_send_ahead)
+
+    def _sun_ahead(self, sun, compiled, current, now, ahead):
+        """(elevation, daylight) at `ahead`: sun.sun's moved along the sun's path."""
+        elevation, daylight = current
+        for attribute in ("next_rising", "next_setting"):
+            moment = _timestamp(sun.attributes.get(attribute))
+            if moment is not None and now.timestamp() < moment <= ahead.timestamp():
+                daylight = attribute == "next_rising"
+        if not isinstance(sun.attributes.get("elevation"), (int, float)):
+            return compiled.fallback_elevation(ahead.timetuple().tm_yday,
+                                               ahead.hour + ahead.minute / 60, daylight), daylight
+        location, height = get_astral_location(self.hass)
+        return (elevation + location.solar_elevation(ahead, height)
+                - location.solar_elevation(now, height)), daylight
+
+    def _schedule_dwell(self, now):
+        """Re-evaluate when the earliest pending dead-band move may be sent."""
+        if self._cancel_dwell:
+            self._cancel_dwell()
+            self._cancel_dwell = None
+        due = self.deadband.next_due()
+        if due is not None:
+            delay = max(due * 60 - now.timestamp(), 0) + 1
+            self._cancel_dwell = async_call_later(self.hass, timedelta(seconds=delay),
+                                                  self._async_dwell_elapsed)
@@ -0,0 +1,604 @@
+"""
+Hygger lighting engine for the integration.
+
+The channel math of automations/aquarium_dynamic_circadian_lighting.yaml (Steps 2-8)
+and the command ordering of scripts/aquarium_reconcile_state.yaml, in plain Python
+with no Home Assistant imports. A custom component only sees its own folder, so this
+is a copy of lighting_engine.py, deadband.py, the forecast interpolation of
+weather_blend.py and the greedy order of reconcile_planner.py;
+test_hygger_integration.py checks that the copies agree.
+
+The photoperiod profiles of photoperiod.py are copied here as well: a profile's
+curve is compiled once into lookup tables, and an update is two lookups into them.
+"""
+import copy
+import hashlib
+import json
+import math
+from array import array
+from collections import namedtuple
+from datetime import datetime
+from functools import lru_cache
+
+CHANNELS = ('white', 'red', 'green', 'blue')
+MAX_LEVEL = 10
+
+LIGHTNING_CONDITIONS = ('lightning', 'lightning-rainy', 'thunderstorm')
+
+# Typical (cloud_coverage %, precipitation mm/h) of each condition; others count as clear
+NOMINAL_WEATHER = {
+    'sunny': (5, 0.0), 'clear-night': (5, 0.0), 'windy': (30, 0.0),
+    'partlycloudy': (45, 0.0), 'partly-cloudy': (45, 0.0), 'cloudy': (90, 0.0),
+    'fog': (100, 0.0), 'snowy': (90, 1.0), 'rainy': (95, 2.0), 'snowy-rainy': (95, 2.0),
+    'lightning': (95, 0.0), 'lightning-rainy': (100, 4.0), 'hail': (100, 4.0),
+    'pouring': (100, 8.0),
+}
+CLEAR_COVERAGE = 10
+FULL_RAIN_MM = 2.0
+
+# Dead-band defaults (Step 8): band past .5, bypass distance
+BAND = 0.2
+BYPASS = 2.5
+
+# CIE 1931 xy chromaticity and relative luminance of each channel at full level
+CHANNEL_CHROMATICITY = {
+    'white': (0.3127, 0.3290, 1.00),
+    'red': (0.6900, 0.3080, 0.22),
+    'green': (0.1700, 0.7000, 0.65),
+    'blue': (0.1360, 0.0500, 0.07),
+}
+
+
+def is_daylight(next_rising_ts, next_setting_ts, sun_state):
+    """Between sunrise and sunset: the sun sets before it next rises.
+
+    This is what lighting_engine.is_daylight computes. The YAML's `is_daylight_hours`
+    shifts next_rising back a day, which always puts now inside the window; that is
+    harmless there only because the sun is below the horizon whenever it differs.
+    """
+    if next_rising_ts is None or next_setting_ts is None:
+        return sun_state == 'above_horizon'
+    return next_setting_ts < next_rising_ts
+
+
+def fallback_elevation(day_of_year, hour_decimal, daylight):
+    """The YAML's seasonal estimate of sun elevation, used when sun.sun has none."""
+    if not daylight:
+        return 0
+    seasonal_offset = (day_of_year - 80) / 365 * 6.28
+    seasonal_factor = 28 + (75 - 28) * (1 + math.sin(seasonal_offset)) / 2
+    hours_from_noon = abs(hour_decimal - 12)
+    if hours_from_noon > 6:
+        return 0
+    return round(seasonal_factor * (1 - (hours_from_noon / 6) ** 2), 1)
+
+
+def base_brightness(elevation, daylight):
+    """Base brightness (0-10) from sun elevation."""
+    if not daylight:
+        return 0
+    if elevation > 60:
+        return 10
+    if elevation > 40:
+        return round(8 + (elevation - 40) / 10)
+    if elevation > 20:
+        return round(5 + (elevation - 20) / 6.7)
+    if elevation > 5:
+        return round(2 + (elevation - 5) / 5)
+    if elevation > 0:
+        return round(elevation / 2.5)
+    return 0
+
+
+def channel_values(elevation, daylight, base):
+    """Step 5 before each channel's final rounding (green uses rounded white and red)."""
+    if elevation > 10:
+        white = max(int(base), 1)
+    elif elevation > 0:
+        white = base * 0.6
+    else:
+        white = 0
+
+    if 0 < elevation < 20:
+        red = min(base * (1 - elevation / 20) * 1.5, MAX_LEVEL)
+    elif daylight and base > 2:
+        red = max(base * 0.15, 1)
+    else:
+        red = 0
+
+    if base > 1:
+        green = round(white) * 0.6 + round(red) * 0.2 + base * 0.3
+    else:
+        green = 0
+
+    if elevation > 20:
+        blue = min(base * 0.8, 8)
+    elif elevation > 5:
+        blue = min(base * 0.6, 6)
+    elif daylight and base > 0:
+        blue = max(base * 0.3, 1)
+    else:
+        blue = 0
+    return white, red, green, blue
+
+
+def weather_fractions(coverage, precipitation):
+    """Cloud and rain (0-1, to 3 decimals) from cloud_coverage % and precipitation mm/h."""
+    cloud = max(coverage - CLEAR_COVERAGE, 0) / (100 - CLEAR_COVERAGE)
+    rain = min(precipitation / FULL_RAIN_MM, 1.0)
+    return round(cloud, 3), round(rain, 3)
+
+
+def weather_inputs(weather):
+    """(cloud, rain) for a condition string, or a (cloud, rain) pair passed through."""
+    if weather is None or isinstance(weather, str):
+        return weather_fractions(*NOMINAL_WEATHER.get(weather, NOMINAL_WEATHER['sunny']))
+    return tuple(weather)
+
+
+def weather_factors(weather):
+    """Per-channel weather multipliers (Step 6); 1 means unchanged."""
+    cloud, rain = weather_inputs(weather)
+    white = 1 - 0.45 * cloud - 0.18 * rain
+    red = 1 + 0.225 * cloud
+    green = 1 - 0.225 * cloud - 0.19 * rain
+    blue = 1 - 0.1125 * cloud + 0.4 * rain
+    return white, red, green, blue
+
+
+def forecast_point(entry):
+    """(cloud, rain) of one forecast entry; missing numbers come from its condition."""
+    coverage, precipitation = NOMINAL_WEATHER.get(entry.get('condition'), NOMINAL_WEATHER['sunny'])
+    if isinstance(entry.get('cloud_coverage'), (int, float)):
+        coverage = entry['cloud_coverage']
+    if isinstance(entry.get('precipitation'), (int, float)):
+        precipitation = entry['precipitation']
+    return weather_fractions(coverage, precipitation)
+
+
+def _timestamp(value):
+    try:
+        return datetime.fromisoformat(str(value)).timestamp()
+    except ValueError:
+        return None
+
+
+def interpolate(entries, now):
+    """Cloud and rain at `now` between the forecast points around it (Step 2)."""
+    now_ts = now.timestamp()
+    point = None
+    for entry in entries:
+        cloud, rain = forecast_point(entry)
+        moment = _timestamp(entry.get('datetime'))
+        if point is None or moment is None or moment <= now_ts:
+            point = (moment, cloud, rain)
+            if moment is None or moment > now_ts:
+                break
+        else:
+            fraction = (now_ts - point[0]) / (moment - point[0])
+            return (round(point[1] + (cloud - point[1]) * fraction, 3),
+                    round(point[2] + (rain - point[2]) * fraction, 3))
+    return point[1:] if point else (0.0, 0.0)
+
+
+def evaluate(elevation, daylight, condition='sunny'):
+    """Return (levels, values): the Step 7 levels and the unrounded values they round from.
+
+    `condition` is a weather condition or a (cloud, rain) pair.
+    """
+    base = base_brightness(elevation, daylight)
+    levels, values = [], []
+    for value, factor in zip(channel_values(elevation, daylight, base),
+                             weather_factors(condition)):
+        if factor == 1:
+            level = round(value)
+        else:
+            value = round(value) * factor
+            level = round(value)
+        levels.append(max(0, min(MAX_LEVEL, level)))
+        values.append(max(0.0, min(float(MAX_LEVEL), value)))
+    return tuple(levels), tuple(values)
+
+
+class DeadBand:
+    """Held levels and pending moves for the four channels (Step 8)."""
+
+    def __init__(self, levels=(0, 0, 0, 0), band=BAND, dwell=10, bypass=BYPASS):
+        self.levels = list(levels)
+        # Signed minute each pending move started (sign = direction, 0 = none)
+        self.pending = [0] * len(CHANNELS)
+        self.band = band
+        self.dwell = dwell
+        self.bypass = bypass
+
+    def update(self, minute, values, targets, rising):
+        """Return the levels to send at `minute` and hold them."""
+        trend = 1 if rising else -1
+        for index, (value, target) in enumerate(zip(values, targets)):
+            held = self.levels[index]
+            direction = 1 if target > held else -1
+            distance = abs(value - held)
+            level = target
+            waiting = 0
+            if self.dwell and target != held and direction != trend and distance < self.bypass:
+                previous = self.pending[index]
+                since = abs(previous) if previous * direction > 0 else minute
+                if distance < 0.5 + self.band:
+                    level = held
+                elif minute - since < self.dwell:
+                    level = held
+                    waiting = direction * since
+            self.levels[index] = level
+            self.pending[index] = waiting
+        return tuple(self.levels)
+
+    def next_due(self):
+        """Minute the earliest pending move may be sent, or None."""
+        starts = [abs(start) for start in self.pending if start]
+        return min(starts) + self.dwell if starts else None
+
+
+def _xyz(levels):
+    x_total = y_total = z_total = 0.0
+    for channel, level in zip(CHANNELS, levels):
+        x, y, luminance = CHANNEL_CHROMATICITY[channel]
+        scale = luminance * level / MAX_LEVEL
+        x_total += scale * x / y
+        y_total += scale
+        z_total += scale * (1 - x - y) / y
+    return x_total, y_total, z_total
+
+
+_REFERENCE_WHITE = _xyz((MAX_LEVEL,) * len(CHANNELS))
+
+
+def _lab_component(ratio):
+    return ratio ** (1 / 3) if ratio > 216 / 24389 else (24389 / 27 * ratio + 16) / 116
+
+
+@lru_cache(maxsize=None)
+def to_lab(levels):
+    """CIELAB of a light state, relative to full output on every channel."""
+    fx, fy, fz = (_lab_component(value / white) for value, white in zip(_xyz(levels),
+                                                                        _REFERENCE_WHITE))
+    return 116 * fy - 16, 500 * (fx - fy), 200 * (fy - fz)
+
+
+def transition_commands(current, target):
+    """IR commands from `current` to `target`, each next one leaving the smallest ΔE."""
+    goal = to_lab(tuple(target))
+    levels = list(current)
+    commands = []
+    while levels != list(target):
+        best = None
+        for channel, (have, want) in enumerate(zip(levels, target)):
+            if have == want:
+                continue
+            step = 1 if want > have else -1
+            trial = tuple(levels[:channel] + [have + step] + levels[channel + 1:])
+            error = sum((a - b) ** 2 for a, b in zip(to_lab(trial), goal))
+            if best is None or error < best[0]:
+                best = (error, channel, step)
+        _, channel, step = best
+        levels[channel] += step
+        commands.append(f"{CHANNELS[channel]}_{'up' if step > 0 else 'down'}")
+    return commands
+
+
+def apply_command(levels, command):
+    """Return `levels` after one `<channel>_up` / `<channel>_down` command."""
+    channel, direction = command.rsplit('_', 1)
+    index = CHANNELS.index(channel)
+    levels = list(levels)
+    levels[index] = max(0, min(MAX_LEVEL, levels[index] + (1 if direction == 'up' else -1)))
+    return levels
+
+
+# Light lease (input_text.aquarium_light_lease, see simulate_contention.py)
+LEASE_PRIORITIES = {'circadian': 1, 'lightning': 2, 'manual': 3, 'reset': 4}
+
+
+def lease_holder(value, now_ts):
+    """(owner, priority, until) of the lease "owner priority until", or None when free.
+
+    Reads it like the YAML does (`| int(0)`, `| float(0)`), so a malformed or
+    expired lease leaves the light free.
+    """
+    parts = (value or '').split()
+    if len(parts) != 3:
+        return None
+    try:
+        priority = int(parts[1])
+    except ValueError:
+        priority = 0
+    try:
+        until = float(parts[2])
+    except ValueError:
+        return None
+    return (parts[0], priority, until) if until > now_ts else None
+
+
+# Photoperiod profiles (photoperiod.py)
+FORMAT = 1  # Bump when the table layout or the curve math changes
+
+ELEVATION_MIN = -6        # Lowest elevation a profile may light at (civil twilight)
+ELEVATION_MAX = 90
+STEPS_PER_DEGREE = 100    # sun.sun's elevation attribute has two decimals
+ELEVATION_STEPS = (ELEVATION_MAX - ELEVATION_MIN) * STEPS_PER_DEGREE + 1
+DAYS = 366
+
+# The automation's curve; other profiles override parts of it
+DEFAULT_PROFILE = {
+    # Base brightness by sun elevation: the first band the sun is above gives
+    # level + (elevation - above) / degrees_per_level, rounded (0 = constant level)
+    'brightness': [
+        {'above': 60, 'level': 10, 'degrees_per_level': 0},
+        {'above': 40, 'level': 8, 'degrees_per_level': 10},
+        {'above': 20, 'level': 5, 'degrees_per_level': 6.7},
+        {'above': 5, 'level': 2, 'degrees_per_level': 5},
+        {'above': 0, 'level': 0, 'degrees_per_level': 2.5},
+    ],
+    'white': {'full_above': 10, 'min': 1, 'twilight': 0.6},
+    'red': {'warm_below': 20, 'warm': 1.5, 'day': 0.15, 'min': 1, 'day_above_base': 2},
+    'green': {'white': 0.6, 'red': 0.2, 'base': 0.3, 'above_base': 1},
+    'blue': {
+        'bands': [{'above': 20, 'weight': 0.8, 'max': 8}, {'above': 5, 'weight': 0.6, 'max': 6}],
+        'day': 0.3,
+        'min': 1,
+    },
+    'max_levels': {'white': 10, 'red': 10, 'green': 10, 'blue': 10},
+    # Hours the light may be on; outside the natural day length the light's horizon
+    # moves (up for max_hours, below the real one for min_hours) to fit
+    'photoperiod': {'min_hours': 0, 'max_hours': 24},
+    # Noon elevation of the fallback estimate when sun.sun has no elevation
+    'fallback_peaks': {'winter': 28, 'summer': 75},
+}
+
+BAND_KEYS = {'brightness': ('above', 'level', 'degrees_per_level'),
+             'blue.bands': ('above', 'weight', 'max')}
+
+Profile = namedtuple('Profile', 'name description curve')
+
+
+class ProfileError(ValueError):
+    """Raised for a profile that cannot be compiled as written."""
+
+
+def _number(value, where, low=None, high=None):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ProfileError(f"{where}: expected a number, got {value!r}")
+    if (low is not None and value < low) or (high is not None and value > high):
+        raise ProfileError(f"{where}: {value} is outside {low}-{high}")
+    return value
+
+
+def _bands(value, key):
+    """Validate a list of bands, highest `above` first."""
+    if not isinstance(value, list) or not value:
+        raise ProfileError(f"{key}: expected a list of bands")
+    bands = []
+    for index, band in enumerate(value, 1):
+        where = f"{key}[{index}]"
+        required = BAND_KEYS[key]
+        if not isinstance(band, dict) or set(band) - set(required):
+            raise ProfileError(f"{where}: a band has {', '.join(required)}")
+        band = {name: _number(band.get(name, 0), f"{where}.{name}") for name in required}
+        _number(band['above'], f"{where}.above", ELEVATION_MIN, ELEVATION_MAX)
+        bands.append(band)
+    if [band['above'] for band in bands] != sorted((band['above'] for band in bands),
+                                                   reverse=True):
+        raise ProfileError(f"{key}: list the bands from the highest `above` down")
+    return bands
+
+
+def normalize_profile(config, name='profile'):
+    """Validate a profile mapping; returns a Profile with every curve key filled in."""
+    if not isinstance(config, dict):
+        raise ProfileError("a profile is a mapping")
+    unknown = set(config) - set(DEFAULT_PROFILE) - {'description'}
+    if unknown:
+        raise ProfileError(f"unknown keys: {', '.join(sorted(unknown))}")
+    curve = copy.deepcopy(DEFAULT_PROFILE)
+    for key, value in config.items():
+        if key == 'description':
+            continue
+        if key == 'brightness':
+            curve[key] = _bands(value, key)
+            continue
+        if not isinstance(value, dict) or set(value) - set(curve[key]):
+            raise ProfileError(f"{key}: expected a mapping of {', '.join(curve[key])}")
+        for field, number in value.items():
+            curve[key][field] = (_bands(number, f"{key}.{field}") if field == 'bands'
+                                 else _number(number, f"{key}.{field}"))
+    for channel, level in curve['max_levels'].items():
+        _number(level, f"max_levels.{channel}", 0, MAX_LEVEL)
+    hours = curve['photoperiod']
+    _number(hours['min_hours'], 'photoperiod.min_hours', 0, 24)
+    _number(hours['max_hours'], 'photoperiod.max_hours', hours['min_hours'], 24)
+    return Profile(name, str(config.get('description') or ''), curve)
+
+
+def profile_hash(curve, latitude):
+    """Key of a compiled table: the curve and the latitude, not the name or description."""
+    key = json.dumps({'format': FORMAT, 'latitude': round(latitude, 4), 'curve': curve},
+                     sort_keys=True)
+    return hashlib.sha256(key.encode()).hexdigest()[:16]
+
+
+def profile_base(curve, elevation, daylight):
+    """Base brightness (0-10) of a curve; the YAML's base_brightness for hygger_default."""
+    if not daylight:
+        return 0
+    for band in curve['brightness']:
+        if elevation > band['above']:
+            if not band['degrees_per_level']:
+                return band['level']
+            return round(band['level'] + (elevation - band['above']) / band['degrees_per_level'])
+    return 0
+
+
+def profile_values(curve, elevation, daylight):
+    """Unrounded (white, red, green, blue) of a curve before weather; Step 5 for the default."""
+    base = profile_base(curve, elevation, daylight)
+    white_curve, red_curve = curve['white'], curve['red']
+    green_curve, blue_curve = curve['green'], curve['blue']
+    if elevation > white_curve['full_above']:
+        white = max(int(base), white_curve['min'])
+    elif elevation > 0:
+        white = base * white_curve['twilight']
+    else:
+        white = 0
+
+    if 0 < elevation < red_curve['warm_below']:
+        red = min(base * (1 - elevation / red_curve['warm_below']) * red_curve['warm'], MAX_LEVEL)
+    elif daylight and base > red_curve['day_above_base']:
+        red = max(base * red_curve['day'], red_curve['min'])
+    else:
+        red = 0
+
+    if base > green_curve['above_base']:
+        green = (round(white) * green_curve['white'] + round(red) * green_curve['red']
+                 + base * green_curve['base'])
+    else:
+        green = 0
+
+    for band in blue_curve['bands']:
+        if elevation > band['above']:
+            blue = min(base * band['weight'], band['max'])
+            break
+    else:
+        blue = max(base * blue_curve['day'], blue_curve['min']) if daylight and base > 0 else 0
+    return white, red, green, blue
+
+
+def photoperiod_horizon(curve, day_of_year, latitude):
+    """(offset, scale) of the light's horizon on a day: elevation e lights as (e - offset) * scale.
+
+    Zero offset (and scale 1) while the natural day length is within the clamps. A
+    longer day raises the horizon to the elevation the sun passes max_hours/2 from
+    noon, a shorter one lowers it (to -6° at most) for min_hours; the scale keeps
+    the noon elevation, so the midday levels stay as they were.
+    """
+    hours = curve['photoperiod']
+    phi = math.radians(latitude)
+    delta = math.radians(solar_declination(day_of_year))
+
+    def elevation_at(hour_angle_hours):
+        hour_angle = math.radians(15 * hour_angle_hours)
+        sine = (math.sin(phi) * math.sin(delta)
+                + math.cos(phi) * math.cos(delta) * math.cos(hour_angle))
+        return math.degrees(math.asin(max(-1.0, min(1.0, sine))))
+
+    cos_hour_angle = -math.tan(phi) * math.tan(delta)
+    length = 24.0 if cos_hour_angle < -1 else 0.0 if cos_hour_angle > 1 else \
+        2 * math.degrees(math.acos(cos_hour_angle)) / 15
+    if length > hours['max_hours']:
+        offset = elevation_at(hours['max_hours'] / 2)
+    elif length < hours['min_hours']:
+        offset = max(elevation_at(hours['min_hours'] / 2), ELEVATION_MIN)
+    else:
+        return 0.0, 1.0
+    offset = round(offset, 2)
+    noon = elevation_at(0)
+    return offset, (noon / (noon - offset) if noon > offset else 1.0)
+
+
+def seasonal_peak(curve, day_of_year):
+    """Noon elevation of the fallback estimate on a day (the YAML's seasonal_factor)."""
+    peaks = curve['fallback_peaks']
+    seasonal_offset = (day_of_year - 80) / 365 * 6.28
+    return peaks['winter'] + (peaks['summer'] - peaks['winter']) * \
+        (1 + math.sin(seasonal_offset)) / 2
+
+
+@lru_cache(maxsize=512)
+def _weather_factors(condition):
+    """Weather multipliers of a condition or (cloud, rain) pair; None when all are 1."""
+    factors = weather_factors(condition)
+    return None if all(factor == 1 for factor in factors) else factors
+
+def solar_declination(day_of_year):
+    """Solar declination in degrees (ephemeris.py)."""
+    return 23.45 * math.sin(math.radians((360 / 365) * (day_of_year - 81)))
+
+
+class CompiledProfile:
+    """A profile's lookup tables; never modified once built, so tanks and threads share it."""
+
+    def __init__(self, key, maxima, values, targets, days):
+        self.hash = key
+        self.maxima = maxima
+        # Per (daylight, elevation step), four channels each: the unrounded values
+        # clamped to the channel maxima, and the rounded values before clamping (what
+        # a weather factor multiplies)
+        self.values = values
+        self.targets = targets
+        self.levels = array('b', (max(0, min(maxima[index % len(CHANNELS)], target))
+                                  for index, target in enumerate(targets)))
+        self.days = days  # per day of year: horizon offset, scale, fallback peak
+
+    @classmethod
+    def compile(cls, curve, latitude):
+        """Evaluate a curve at every elevation step and every day of the year."""
+        maxima = tuple(curve['max_levels'][channel] for channel in CHANNELS)
+        values, targets = array('d'), array('b')
+        for daylight in (False, True):
+            for step in range(ELEVATION_STEPS):
+                elevation = (step + ELEVATION_MIN * STEPS_PER_DEGREE) / STEPS_PER_DEGREE
+                raw = profile_values(curve, elevation, daylight)
+                values.extend(max(0.0, min(float(maximum), value))
+                              for value, maximum in zip(raw, maxima))
+                targets.extend(round(value) for value in raw)
+        days = array('d')
+        for day_of_year in range(1, DAYS + 1):
+            days.extend(photoperiod_horizon(curve, day_of_year, latitude))
+            days.append(seasonal_peak(curve, day_of_year))
+        return cls(profile_hash(curve, latitude), maxima, values, targets, days)
+
+    def horizon(self, day_of_year):
+        """(offset, scale) of the photoperiod clamp on a day."""
+        row = (min(max(day_of_year, 1), DAYS) - 1) * 3
+        return self.days[row], self.days[row + 1]
+
+    def fallback_elevation(self, day_of_year, hour_decimal, daylight):
+        """The seasonal estimate of sun elevation, used when sun.sun has none."""
+        if not daylight:
+            return 0
+        hours_from_noon = abs(hour_decimal - 12)
+        if hours_from_noon > 6:
+            return 0
+        peak = self.days[(min(max(day_of_year, 1), DAYS) - 1) * 3 + 2]
+        return round(peak * (1 - (hours_from_noon / 6) ** 2), 1)
+
+    def light_elevation(self, day_of_year, elevation, daylight):
+        """(elevation, daylight) the curve sees after the day's photoperiod clamp."""
+        offset, scale = self.horizon(day_of_year)
+        if not offset:
+            return elevation, daylight
+        elevation = (elevation - offset) * scale
+        return elevation, elevation > 0
+
+    def row(self, day_of_year, elevation, daylight):
+        """Index of the first channel for an elevation (to the nearest 0.01°) on a day."""
+        elevation, daylight = self.light_elevation(day_of_year, elevation, daylight)
+        step = round(elevation * STEPS_PER_DEGREE) - ELEVATION_MIN * STEPS_PER_DEGREE
+        step = min(max(step, 0), ELEVATION_STEPS - 1)
+        return ((ELEVATION_STEPS if daylight else 0) + step) * len(CHANNELS)
+
+    def evaluate(self, day_of_year, elevation, daylight, condition='sunny'):
+        """Return (levels, values) like the engine, for this profile."""
+        start = self.row(day_of_year, elevation, daylight)
+        end = start + len(CHANNELS)
+        factors = _weather_factors(condition)
+        if factors is None:
+            return tuple(self.levels[start:end]), tuple(self.values[start:end])
+        levels, values = [], []
+        for index, factor, maximum in zip(range(start, end), factors, self.maxima):
+            if factor == 1:
+                levels.append(self.levels[index])
+                values.append(self.values[index])
+            else:
+                value = self.targets[index] * factor
+                levels.append(max(0, min(maximum, round(value))))
+                values.append(max(0.0, min(float(maximum), value)))
+        return tuple(levels), tuple(values)
@@ -0,0 +1,163 @@
+"""Paced IR queues (one per remote) and the fixture transitions that feed them."""
+import asyncio
+import logging
+import time
+
+from homeassistant.core import callback
+from homeassistant.util import slugify
+
+from .const import (DEFAULT_NAME, DOMAIN, EXCLUSIVE_SCRIPTS, IR_DELAY_HELPER, LEASE_HELPER,
+                    LEVEL_HELPER)
+from .engine import (CHANNELS, LEASE_PRIORITIES, MAX_LEVEL, apply_command, lease_holder,
+                     transition_commands)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def number_state(hass, entity_id, default):
+    """Integer state of a helper, or `default` when it is missing or not a number."""
+    state = hass.states.get(entity_id)
+    try:
+        return int(float(state.state))
+    except (AttributeError, ValueError):
+        return default
+
+
+class IRQueue:
+    """Serializes remote.send_command calls on one remote and keeps them paced.
+
+    Every fixture on the remote sends through the same queue, so two transitions
+    never interleave on the IR link and the gap between any two codes is at least
+    the fixture's delay.
+    """
+
+    def __init__(self, hass, entity_id):
+        self.hass = hass
+        self.entity_id = entity_id
+        self._lock = asyncio.Lock()
+        self._ready_at = 0.0
+
+    async def async_send(self, device, command, delay_s):
+        """Send one command, waiting until `delay_s` has passed since the previous one."""
+        async with self._lock:
+            wait = self._ready_at - self.hass.loop.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                await self.hass.services.async_call(
+                    "remote", "send_command",
+                    {"entity_id": self.entity_id, "device": device, "command": command},
+                    blocking=True)
+            finally:
+                self._ready_at = self.hass.loop.time() + delay_s
+
+
+class Fixture:
+    """The light's known levels, its target and the commands still to send.
+
+    The script sends a whole transition in one batched call; here each command is
+    its own queue item, so a new target replans the rest of a transition and a
+    reset or lightning effect can take over the remote between two commands. The
+    level helpers are updated after every command, as the dashboard and the reset
+    and sync scripts read them. Helpers are named after the fixture; the package's
+    scripts and lease drive the one named Hygger, and other fixtures only wait for
+    the scripts as they may share its remote.
+    """
+
+    def __init__(self, hass, queue, device, ir_delay_ms, name=DEFAULT_NAME):
+        self.hass = hass
+        self.queue = queue
+        self.device = device
+        self.ir_delay_ms = ir_delay_ms
+        self.name = name
+        self.slug = slugify(name)
+        self.helpers = tuple(LEVEL_HELPER.format(self.slug, channel) for channel in CHANNELS)
+        self.package = self.slug == DOMAIN
+        self.levels = [0] * len(CHANNELS)
+        self.target = tuple(self.levels)
+        self.plan = []
+        self._task = None
+        self._listeners = []
+
+    @property
+    def delay_s(self):
+        """Gap between commands in seconds."""
+        return number_state(self.hass, IR_DELAY_HELPER, self.ir_delay_ms) / 1000
+
+    @property
+    def blocked(self):
+        """Whether a script that drives the remote itself is running, or holds the light."""
+        return (any(self.hass.states.is_state(script, "on") for script in EXCLUSIVE_SCRIPTS)
+                or self.lease() is not None)
+
+    def lease(self):
+        """(owner, priority, until) of a lease that outranks the schedule, or None."""
+        if not self.package:
+            return None
+        state = self.hass.states.get(LEASE_HELPER)
+        holder = lease_holder(state.state if state else None, time.time())
+        if holder is None or holder[1] <= LEASE_PRIORITIES['circadian']:
+            return None
+        return holder
+
+    @callback
+    def async_add_listener(self, update_callback):
+        """Call `update_callback` whenever the levels or plan change; returns the remover."""
+        self._listeners.append(update_callback)
+        return lambda: self._listeners.remove(update_callback)
+
+    @callback
+    def _notify(self):
+        for update_callback in list(self._listeners):
+            update_callback()
+
+    @callback
+    def read_helpers(self):
+        """Take the levels (and target) from the helpers, e.g. after a reset."""
+        self.levels = [max(0, min(MAX_LEVEL, number_state(self.hass, helper, 0)))
+                       for helper in self.helpers]
+        self.target = tuple(self.levels)
+        self.plan = []
+        self._notify()
+
+    @callback
+    def set_target(self, target):
+        """Replan towards `target`; starts sending if idle."""
+        self.target = tuple(target)
+        self.plan = transition_commands(self.levels, self.target)
+        self._notify()
+        if self.plan and (self._task is None or self._task.done()):
+            self._task = self.hass.async_create_task(self._async_run())
+
+    async def _async_run(self):
+        while self.plan and not self.blocked:
+            command = self.plan[0]
+            try:
+                await self.queue.async_send(self.device, command, self.delay_s)
+            except Exception:  # pylint: disable=broad-except
+                # Levels stay where they were; the next evaluation replans from them
+                _LOGGER.exception("Sending %s to %s failed", command, self.queue.entity_id)
+                self.plan = []
+                break
+            before, self.levels = self.levels, apply_command(self.levels, command)
+            for helper, old, new in zip(self.helpers, before, self.levels):
+                if old != new and self.hass.states.get(helper) is not None:
+                    await self.hass.services.async_call(
+                        "input_number", "set_value", {"entity_id": helper, "value": new},
+                        blocking=True)
+            # The target may have changed while the command was in flight
+            self.plan = transition_commands(self.levels, self.target)
+            self._notify()
+        if self.plan:
+            _LOGGER.debug("Paused with %d commands left while the remote is in use",
+                          len(self.plan))
+
+    async def async_stop(self):
+        """Cancel the transition in progress."""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self.plan = []
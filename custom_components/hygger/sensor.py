@@ -0,0 +1,92 @@
+"""Sensors for the engine's target levels and the transition in progress."""
+from homeassistant.components.sensor import SensorEntity, SensorStateClass
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .const import DOMAIN
+from .engine import CHANNELS
+
+ICONS = {
+    'white': "mdi:white-balance-sunny",
+    'red': "mdi:weather-sunset",
+    'green': "mdi:leaf",
+    'blue': "mdi:water",
+}
+
+
+async def async_setup_platform(hass, config, async_add_entities, discovery_info=None):
+    """Add each fixture's sensors (loaded by the integration, not configured directly)."""
+    if discovery_info is None:
+        return
+    entities = []
+    for coordinator in hass.data[DOMAIN]["coordinators"].values():
+        entities += [HyggerTargetSensor(coordinator, index) for index in range(len(CHANNELS))]
+        entities.append(HyggerPlanSensor(coordinator.fixture))
+    async_add_entities(entities)
+
+
+class HyggerTargetSensor(CoordinatorEntity, SensorEntity):
+    """Level a channel is being driven to, with the engine's own value."""
+
+    _attr_state_class = SensorStateClass.MEASUREMENT
+
+    def __init__(self, coordinator, index):
+        super().__init__(coordinator)
+        self.index = index
+        channel = CHANNELS[index]
+        fixture = coordinator.fixture
+        self._attr_name = f"{fixture.name} {channel} target"
+        self._attr_unique_id = f"{fixture.slug}_{channel}_target"
+        self._attr_icon = ICONS[channel]
+
+    @property
+    def native_value(self):
+        if not self.coordinator.data:
+            return None
+        return self.coordinator.data["target"][self.index]
+
+    @property
+    def extra_state_attributes(self):
+        data = self.coordinator.data
+        if not data:
+            return None
+        return {
+            "engine_level": data["engine"][self.index],
+            "unrounded": round(data["values"][self.index], 3),
+            "held": data["target"][self.index] != data["engine"][self.index],
+            "elevation": data["elevation"],
+            "daylight": data["daylight"],
+            "condition": data["condition"],
+            "profile": data["profile"],
+            "lightning": data["lightning"],
+        }
+
+
+class HyggerPlanSensor(SensorEntity):
+    """Commands left in the transition being sent; the plan itself is in the attributes."""
+
+    _attr_icon = "mdi:remote"
+    _attr_native_unit_of_measurement = "commands"
+    _attr_should_poll = False
+
+    def __init__(self, fixture):
+        self.fixture = fixture
+        self._attr_name = f"{fixture.name} IR plan"
+        self._attr_unique_id = f"{fixture.slug}_ir_plan"
+
+    async def async_added_to_hass(self):
+        self.async_on_remove(self.fixture.async_add_listener(self.async_write_ha_state))
+
+    @property
+    def native_value(self):
+        return len(self.fixture.plan)
+
+    @property
+    def extra_state_attributes(self):
+        fixture = self.fixture
+        return {
+            "levels": dict(zip(CHANNELS, fixture.levels)),
+            "target": dict(zip(CHANNELS, fixture.target)),
+            "commands": fixture.plan,
+            "remote": fixture.queue.entity_id,
+            "eta_seconds": round(len(fixture.plan) * fixture.delay_s, 1),
+        }
@@ -0,0 +1,182 @@
+"""
+Pooled OpenWeatherMap client shared by every fixture.
+
+Fetches the One Call 3.0 forecast directly instead of through a weather entity and
+returns it in the shape of `weather.get_forecasts` entries (datetime, condition,
+cloud_coverage, precipitation, temperature). Requests for one location are shared:
+
+- all calls go through one aiohttp session, so connections are kept alive and reused;
+- a request that arrives while a call for the same location is in flight waits for
+  that call instead of making its own (hourly and daily come from the same response);
+- a location is fetched at most once per `min_interval` seconds; requests in between
+  get the last response, and after a failure the next attempt waits `retry_interval`.
+
+Like engine.py this has no Home Assistant imports; test_weather_client.py runs it
+against owm_standin.py, a local stand-in of the API.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+
+import aiohttp
+
+_LOGGER = logging.getLogger(__name__)
+
+OWM_URL = "https://api.openweathermap.org/data/3.0/onecall"
+FORECAST_TYPES = ("hourly", "daily")
+DEFAULT_MIN_INTERVAL = 600.0   # OpenWeatherMap updates its model about every 10 minutes
+DEFAULT_RETRY_INTERVAL = 60.0
+DEFAULT_MAX_AGE = 3 * 3600.0   # Serve a stale forecast this long while the API fails
+DEFAULT_TIMEOUT = 10.0
+LOCATION_DECIMALS = 2          # About 1 km: tanks in one house share a location
+
+# OpenWeatherMap condition codes to Home Assistant conditions (as its own integration)
+_CONDITIONS = (
+    (range(200, 233), "lightning-rainy"),
+    (range(300, 322), "rainy"),
+    (range(500, 502), "rainy"),
+    (range(502, 505), "pouring"),
+    (range(511, 512), "snowy-rainy"),
+    (range(520, 532), "rainy"),
+    (range(600, 611), "snowy"),
+    (range(611, 617), "snowy-rainy"),
+    (range(617, 623), "snowy"),
+    (range(701, 772), "fog"),
+    (range(781, 782), "exceptional"),
+    (range(800, 801), "sunny"),
+    (range(801, 803), "partlycloudy"),
+    (range(803, 805), "cloudy"),
+)
+
+
+class WeatherClientError(Exception):
+    """Raised when a forecast is neither available from the API nor recent enough in cache."""
+
+
+def owm_condition(code):
+    """Home Assistant condition for an OpenWeatherMap weather code."""
+    for codes, condition in _CONDITIONS:
+        if code in codes:
+            return condition
+    return "exceptional"
+
+
+def _precipitation(value):
+    """mm of rain or snow; hourly entries nest it as {"1h": mm}, daily ones give a number."""
+    if isinstance(value, dict):
+        return float(value.get("1h", 0.0))
+    return float(value or 0.0)
+
+
+def forecast_entries(data, forecast_type="hourly"):
+    """Convert a One Call response to `weather.get_forecasts` entries."""
+    entries = []
+    for item in data.get(forecast_type) or []:
+        weather = (item.get("weather") or [{}])[0]
+        temperature = item.get("temp")
+        if isinstance(temperature, dict):
+            temperature = temperature.get("day")
+        entries.append({
+            "datetime": datetime.fromtimestamp(item["dt"], timezone.utc).isoformat(),
+            "condition": owm_condition(weather.get("id", 800)),
+            "cloud_coverage": item.get("clouds", 0),
+            "precipitation": round(_precipitation(item.get("rain"))
+                                   + _precipitation(item.get("snow")), 2),
+            "temperature": temperature,
+        })
+    return entries
+
+
+class WeatherClient:
+    """Rate-limited, coalescing One Call client for any number of locations."""
+
+    def __init__(self, session, api_key, url=OWM_URL, min_interval=DEFAULT_MIN_INTERVAL,
+                 retry_interval=DEFAULT_RETRY_INTERVAL, max_age=DEFAULT_MAX_AGE,
+                 timeout=DEFAULT_TIMEOUT, clock=time.monotonic):
+        self.session = session
+        self.api_key = api_key
+        self.url = url
+        self.min_interval = min_interval
+        self.retry_interval = retry_interval
+        self.max_age = max_age
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.clock = clock
+        self.stats = dict.fromkeys(("requests", "upstream", "coalesced", "cached", "errors"), 0)
+        self._owns_session = False
+        self._responses = {}   # location -> (fetched at, One Call response)
+        self._attempted = {}   # location -> time of the last failed call
+        self._inflight = {}    # location -> task of the call in flight
+
+    @classmethod
+    def create(cls, api_key, limit_per_host=4, **options):
+        """A client with its own pooled session (Home Assistant passes its shared one)."""
+        connector = aiohttp.TCPConnector(limit_per_host=limit_per_host, keepalive_timeout=60)
+        client = cls(aiohttp.ClientSession(connector=connector), api_key, **options)
+        client._owns_session = True
+        return client
+
+    async def close(self):
+        """Close the session if this client created it."""
+        if self._owns_session:
+            await self.session.close()
+
+    async def forecast(self, latitude, longitude, forecast_type="hourly"):
+        """Forecast entries for a location, calling the API only when the cache is due."""
+        if forecast_type not in FORECAST_TYPES:
+            raise ValueError(f"Unknown forecast type: {forecast_type}")
+        self.stats["requests"] += 1
+        location = (round(latitude, LOCATION_DECIMALS), round(longitude, LOCATION_DECIMALS))
+        now = self.clock()
+        cached = self._responses.get(location)
+        if cached is not None and now - cached[0] < self.min_interval:
+            self.stats["cached"] += 1
+            return forecast_entries(cached[1], forecast_type)
+        failed = self._attempted.get(location)
+        if failed is not None and now - failed < self.retry_interval:
+            return self._stale(location, now, forecast_type, "waiting to retry")
+
+        task = self._inflight.get(location)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(location))
+            self._inflight[location] = task
+            task.add_done_callback(lambda done: self._fetched(location, done))
+        else:
+            self.stats["coalesced"] += 1
+        try:
+            # shield: one caller being cancelled must not cancel the others' call
+            data = await asyncio.shield(task)
+        except WeatherClientError as error:
+            return self._stale(location, self.clock(), forecast_type, error)
+        return forecast_entries(data, forecast_type)
+
+    def _fetched(self, location, task):
+        """Forget a finished call, retrieving its error in case every caller was cancelled."""
+        self._inflight.pop(location, None)
+        if not task.cancelled():
+            task.exception()
+
+    def _stale(self, location, now, forecast_type, reason):
+        """The last response while it is younger than max_age, else WeatherClientError."""
+        cached = self._responses.get(location)
+        if cached is None or now - cached[0] > self.max_age:
+            raise WeatherClientError(f"No forecast for {location}: {reason}")
+        return forecast_entries(cached[1], forecast_type)
+
+    async def _fetch(self, location):
+        """One upstream call; stores the response or records the failure."""
+        self.stats["upstream"] += 1
+        params = {"lat": location[0], "lon": location[1], "appid": self.api_key,
+                  "units": "metric", "exclude": "current,minutely,alerts"}
+        try:
+            async with self.session.get(self.url, params=params, timeout=self.timeout) as reply:
+                reply.raise_for_status()
+                data = await reply.json()
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as error:
+            self.stats["errors"] += 1
+            self._attempted[location] = self.clock()
+            _LOGGER.warning("OpenWeatherMap request for %s failed: %s", location, error)
+            raise WeatherClientError(str(error) or type(error).__name__) from None
+        self._attempted.pop(location, None)
+        self._responses[location] = (self.clock(), data)
+        return data
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Hygger Dead-band Controller
+Stops channels toggling between two levels on consecutive minutes.
+
+The engine rounds continuous values, so wherever one hovers near .5 - or where a
+channel's formula changes, like red when base brightness steps up while the sun
+climbs, or red's switch of branch at 20° - a channel steps up and back down a few
+minutes later. Each reversal costs IR time and shows as flicker. The dead-band
+sits between the engine and the reconcile (Step 8 of
+automations/aquarium_dynamic_circadian_lighting.yaml) and keeps one held level
+per channel:
+  - moves with the daily trend (up while the sun rises, down after solar noon)
+    are sent at once, so the schedule is followed as before
+  - a move against the trend is sent only once the unrounded level has been more
+    than 0.5 + BAND past the held level for DWELL_MINUTES minutes in a row
+  - anything BYPASS levels or more away (weather changes) is sent at once
+
+This tool replays a date range minute by minute with and without the dead-band
+and reports flip-flops (a change reversed within --window minutes), IR commands,
+reconciles and how far the sent levels stray from the engine. --verify runs the
+real YAML for the first day in the HA stand-in and compares the helper levels
+with this controller minute by minute.
+"""
+import argparse
+import time
+from datetime import date, datetime, timedelta
+
+from ephemeris import DEFAULT_SOLAR_NOON, sun_rising
+from lighting_engine import CHANNELS, compute_levels, continuous_levels
+
+BAND = 0.2
+DWELL_MINUTES = 10
+BYPASS = 2.5
+FLIP_WINDOW = 15
+
+
+class DeadBand:
+    """Held levels and pending moves for the four channels (mirror of Step 8)."""
+
+    def __init__(self, levels=(0, 0, 0, 0), band=BAND, dwell=DWELL_MINUTES, bypass=BYPASS):
+        self.levels = list(levels)
+        # Signed minute each pending move started (sign = direction, 0 = none),
+        # as stored in input_text.aquarium_deadband_state
+        self.pending = [0] * len(CHANNELS)
+        self.band = band
+        self.dwell = dwell
+        self.bypass = bypass
+
+    def update(self, minute, values, targets, rising):
+        """Return the levels to send at `minute` (a nonzero minute count) and hold them.
+
+        `values` are the engine's unrounded levels, `targets` the rounded ones.
+        """
+        trend = 1 if rising else -1
+        for index, (value, target) in enumerate(zip(values, targets)):
+            held = self.levels[index]
+            direction = 1 if target > held else -1
+            distance = abs(value - held)
+            level = target
+            waiting = 0
+            if self.dwell and target != held and direction != trend and distance < self.bypass:
+                previous = self.pending[index]
+                since = abs(previous) if previous * direction > 0 else minute
+                if distance < 0.5 + self.band:
+                    level = held
+                elif minute - since < self.dwell:
+                    level = held
+                    waiting = direction * since
+            self.levels[index] = level
+            self.pending[index] = waiting
+        return tuple(self.levels)
+
+
+def minute_inputs(start, days, condition='sunny', seed=0):
+    """Return (first minute number, elevations, daylight, conditions, hours) for each minute."""
+    from lighting_vector import evaluate_range
+
+    if condition == 'random':
+        import numpy as np
+        from drift_montecarlo import weather_timeline
+
+        condition = weather_timeline(days, np.random.default_rng(seed))
+    result = evaluate_range(start, start + timedelta(days=days - 1), condition)
+    return (start.toordinal() * 1440, result['elevation'].tolist(), result['daylight'].tolist(),
+            [str(c) for c in result['conditions']], result['hour'].tolist())
+
+
+def replay(inputs, controller=None, solar_noon=DEFAULT_SOLAR_NOON):
+    """Return (engine levels, sent levels): one (w, r, g, b) tuple per minute."""
+    first, elevations, daylight, conditions, hours = inputs
+    engine, sent = [], []
+    for index, (elevation, day, condition, hour) in enumerate(
+            zip(elevations, daylight, conditions, hours)):
+        targets = compute_levels(elevation, day, condition)
+        engine.append(targets)
+        if controller is not None:
+            values = continuous_levels(elevation, day, condition)
+            sent.append(controller.update(first + index, values, targets,
+                                          sun_rising(hour, solar_noon)))
+    return engine, sent or engine
+
+
+def flap_stats(levels, window=FLIP_WINDOW):
+    """Return (flip-flops, IR commands, reconciles) for a per-minute level sequence."""
+    flips = commands = runs = 0
+    last = [None] * len(CHANNELS)  # (minute, direction) of each channel's last change
+    for minute in range(1, len(levels)):
+        before, after = levels[minute - 1], levels[minute]
+        if before == after:
+            continue
+        runs += 1
+        for index, (old, new) in enumerate(zip(before, after)):
+            if old == new:
+                continue
+            commands += abs(new - old)
+            direction = 1 if new > old else -1
+            if last[index] and last[index][1] != direction and minute - last[index][0] <= window:
+                flips += 1
+            last[index] = (minute, direction)
+    return flips, commands, runs
+
+
+def tracking_stats(engine, sent):
+    """Return (level-minutes off the engine, largest gap, longest hold in minutes)."""
+    off = largest = longest = 0
+    held = [0] * len(CHANNELS)
+    for target, level in zip(engine, sent):
+        for index, (want, have) in enumerate(zip(target, level)):
+            gap = abs(want - have)
+            off += gap
+            largest = max(largest, gap)
+            held[index] = held[index] + 1 if gap else 0
+            longest = max(longest, held[index])
+    return off, largest, longest
+
+
+def verify_with_runtime(day, condition='sunny', root='.', seed=0, dwell=DWELL_MINUTES):
+    """Run the circadian YAML for one day; return (minutes compared, mismatching minutes).
+
+    Compares the helper levels after each minute's reconcile with DeadBand fed the
+    same inputs (the stand-in publishes the sun's elevation to 0.01°) and the cloud
+    and rain the YAML blended from the forecast (weather_blend.py checks that blend).
+    """
+    from ha_runtime import SunStub, WeatherStub, build_runtime
+    from lighting_engine import is_daylight
+
+    start = datetime(day.year, day.month, day.day)
+    inputs = minute_inputs(day, 1, condition, seed)
+    conditions = inputs[3]
+    timeline = lambda moment: conditions[int((moment - start).total_seconds() // 60) % 1440]
+    hass = build_runtime(start, root, weather=WeatherStub(timeline))
+    hass.set_state('input_number.hygger_dwell_minutes', float(dwell))
+    sun = SunStub()
+    controller = DeadBand(dwell=dwell)
+    compared = mismatched = 0
+    for index in range(1440):
+        moment = start + timedelta(minutes=index)
+        hass.run_until(moment + timedelta(seconds=59))
+        if not hass.automation_runs.get('aquarium_dynamic_circadian_lighting'):
+            continue
+        attributes = sun.state(moment).attributes
+        hour = index / 60
+        elevation = attributes['elevation']
+        daylight = is_daylight(moment.timetuple().tm_yday, hour)
+        weather = hass.states['input_text.aquarium_weather_state'].state.split()
+        weather = tuple(float(value) for value in weather[:2]) or conditions[index]
+        targets = compute_levels(elevation, daylight, weather)
+        values = continuous_levels(elevation, daylight, weather)
+        expected = controller.update(inputs[0] + index, values, targets, attributes['rising'])
+        actual = tuple(int(float(hass.states[f'input_number.hygger_{c}_level'].state))
+                       for c in CHANNELS)
+        compared += 1
+        mismatched += actual != expected
+        controller.levels = list(actual)  # Follow the YAML so one difference is counted once
+    if hass.errors:
+        raise RuntimeError(hass.errors[0][3])
+    return compared, mismatched
+
+
+def parse_args():
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(description="Measure per-minute level flapping with and "
+                                                 "without the dead-band")
+    parser.add_argument('--date', type=date.fromisoformat, default=date.today(),
+                        help="First simulated day (YYYY-MM-DD)")
+    parser.add_argument('--days', type=int, default=30, help="Number of days to simulate")
+    parser.add_argument('--condition', default='random',
+                        help="Weather condition to assume, or 'random' for hourly changes")
+    parser.add_argument('--seed', type=int, default=0, help="Seed for --condition random")
+    parser.add_argument('--band', type=float, default=BAND,
+                        help="Extra distance past .5 a move against the trend must reach")
+    parser.add_argument('--dwell', type=int, default=DWELL_MINUTES,
+                        help="Minutes a move against the trend must persist "
+                             "(input_number.hygger_dwell_minutes)")
+    parser.add_argument('--window', type=int, default=FLIP_WINDOW,
+                        help="A change reversed within this many minutes is a flip-flop")
+    parser.add_argument('--verify', action='store_true',
+                        help="Also run the first day through the YAML in the HA stand-in")
+    return parser.parse_args()
+
+
+def main():
+    """Compare the engine's per-minute levels with the dead-banded ones."""
+    args = parse_args()
+    started = time.perf_counter()
+    inputs = minute_inputs(args.date, args.days, args.condition, args.seed)
+    engine, sent = replay(inputs, DeadBand(band=args.band, dwell=args.dwell))
+    results = {
+        'engine': flap_stats(engine, args.window) + tracking_stats(engine, engine),
+        'dead-band': flap_stats(sent, args.window) + tracking_stats(engine, sent),
+    }
+    elapsed = time.perf_counter() - started
+
+    print("🎚️  Hygger Dead-band Controller")
+    print("=" * 82)
+    print(f"📅 {args.days} day(s) from {args.date} ({args.condition}), band {args.band:g}, "
+          f"dwell {args.dwell} min, simulated in {elapsed:.2f}s")
+    print(f"🔁 Flip-flop: a channel change reversed within {args.window} minutes")
+    print()
+    print(f"{'Levels sent':<12} {'Flip-flops':>11} {'IR cmds':>8} {'Reconciles':>11} "
+          f"{'Off target':>11} {'Max off':>8} {'Longest hold':>13}")
+    print(f"{'':<12} {'per day':>11} {'per day':>8} {'per day':>11} {'lvl·min/day':>11}")
+    print("-" * 82)
+    for name, (flips, commands, runs, off, largest, longest) in results.items():
+        print(f"{name:<12} {flips / args.days:>11.2f} {commands / args.days:>8.1f} "
+              f"{runs / args.days:>11.1f} {off / args.days:>11.1f} {largest:>8} "
+              f"{longest:>9} min")
+
+    before, after = results['engine'], results['dead-band']
+    print(f"\n📉 Removed per day: {(before[0] - after[0]) / args.days:.2f} flip-flops "
+          f"({1 - after[0] / max(before[0], 1):.0%}), "
+          f"{(before[1] - after[1]) / args.days:.1f} IR commands "
+          f"({1 - after[1] / max(before[1], 1):.0%}), "
+          f"{(before[2] - after[2]) / args.days:.1f} reconciles")
+
+    if args.verify:
+        compared, mismatched = verify_with_runtime(args.date, args.condition, seed=args.seed,
+                                                   dwell=args.dwell)
+        status = "✅" if not mismatched else "❌"
+        print(f"{status} YAML (HA stand-in) vs controller on {args.date}: "
+              f"{mismatched} of {compared} minutes differ")
+
+
+if __name__ == "__main__":
+    main()
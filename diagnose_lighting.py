@@ -3,179 +3,50 @@
 Hygger Light Diagnostic Tool
 Helps diagnose why aquarium lights might not be turning on at expected times.
 """
-import math
-from datetime import datetime
+import argparse
+import csv
+import time
+from datetime import date, datetime
 
-def calculate_sun_elevation_fallback(hour):
-    """Calculate sun elevation for zip code 47124 (Jeffersonville, Indiana: 38.28°N, 85.74°W)"""
-    from datetime import datetime
-    
-    current_minute = datetime.now().minute
-    day_of_year = datetime.now().timetuple().tm_yday
-    
-    # Only calculate during daylight hours - now determined by sunrise/sunset
-    # This fallback is only used when Home Assistant sun integration is unavailable
-    if hour >= 6 and hour <= 18:  # Approximate fallback range
-        # Seasonal adjustment: max sun elevation varies from ~28° (winter) to ~75° (summer)
-        summer_peak = 75
-        winter_peak = 28
-        seasonal_range = summer_peak - winter_peak
-        import math
-        seasonal_offset = (day_of_year - 80) / 365 * 2 * math.pi
-        seasonal_factor = winter_peak + seasonal_range * (1 + math.sin(seasonal_offset)) / 2
-        
-        # Calculate elevation based on time from solar noon
-        hour_decimal = hour + (current_minute / 60.0)
-        hours_from_noon = abs(hour_decimal - 12)
-        if hours_from_noon <= 6:
-            elevation_factor = 1 - (hours_from_noon / 6) ** 2
-            return seasonal_factor * elevation_factor
-        else:
-            return 0
-    else:
-        return 0
-
-def get_sunrise_sunset_times():
-    """Get approximate sunrise/sunset times for the current date."""
-    from datetime import datetime, timedelta
-    import math
-    
-    # Get current date info
-    now = datetime.now()
-    day_of_year = now.timetuple().tm_yday
-    
-    # Calculate sunrise/sunset for latitude 38.28°N (Jeffersonville, Indiana)
-    # This is an approximation when Home Assistant data isn't available
-    latitude = 38.28
-    
-    # Solar declination angle
-    declination = 23.45 * math.sin(math.radians((360 / 365) * (day_of_year - 81)))
-    
-    # Hour angle at sunrise/sunset
-    lat_rad = math.radians(latitude)
-    decl_rad = math.radians(declination)
-    
-    try:
-        hour_angle = math.degrees(math.acos(-math.tan(lat_rad) * math.tan(decl_rad)))
-        
-        # Convert to time (solar noon is around 12:00, adjust for time zone)
-        sunrise_decimal = 12 - (hour_angle / 15) - 0.5  # Adjust for Eastern Time
-        sunset_decimal = 12 + (hour_angle / 15) - 0.5
-        
-        # Convert to hours and minutes
-        sunrise_hour = int(sunrise_decimal)
-        sunrise_min = int((sunrise_decimal - sunrise_hour) * 60)
-        sunset_hour = int(sunset_decimal)
-        sunset_min = int((sunset_decimal - sunset_hour) * 60)
-        
-        return f"{sunrise_hour:02d}:{sunrise_min:02d}", f"{sunset_hour:02d}:{sunset_min:02d}"
-    except:
-        # Fallback for extreme latitudes or calculation errors
-        return "06:30", "18:30"
+from ephemeris import get_sunrise_sunset_for_day
+from lighting_engine import levels_at
 
-def is_daylight_hours(hour, minute):
-    """Determine if current time is between sunrise and sunset."""
-    sunrise_str, sunset_str = get_sunrise_sunset_times()
-    
-    # Parse times
-    sunrise_parts = sunrise_str.split(':')
-    sunset_parts = sunset_str.split(':')
-    sunrise_decimal = int(sunrise_parts[0]) + int(sunrise_parts[1]) / 60
-    sunset_decimal = int(sunset_parts[0]) + int(sunset_parts[1]) / 60
-    current_decimal = hour + minute / 60
-    
-    return sunrise_decimal <= current_decimal <= sunset_decimal
-
-def diagnose_current_time():
-    """Diagnose lighting calculations for the current time."""
-    now = datetime.now()
+def diagnose_current_time(moment=None):
+    """Diagnose lighting calculations for the current time (or a given datetime)."""
+    now = moment or datetime.now()
     current_hour = now.hour
     current_minute = now.minute
-    
-    print(f"🕰️  Current time: {current_hour:02d}:{current_minute:02d}")
+
+    if moment is None:
+        print(f"🕰️  Current time: {current_hour:02d}:{current_minute:02d}")
+    else:
+        print(f"🕰️  Checking time: {now:%Y-%m-%d} {current_hour:02d}:{current_minute:02d}")
     print("=" * 50)
     
-    # Get sunrise/sunset information
-    sunrise_str, sunset_str = get_sunrise_sunset_times()
-    daylight_hours = is_daylight_hours(current_hour, current_minute)
+    # Sunrise/sunset and the engine's evaluation (the same model the HA stand-in publishes)
+    sunrise_str, sunset_str, _ = get_sunrise_sunset_for_day(now.timetuple().tm_yday)
+    evaluation = levels_at(now)
+    daylight_hours = evaluation['daylight']
     
     print(f"🌅 Today's sunrise: {sunrise_str}")
     print(f"🌇 Today's sunset: {sunset_str}")
     print(f"☀️  Daylight hours: {'Yes' if daylight_hours else 'No'}")
+    print(f"📐 Expected sun elevation: {max(evaluation['elevation'], 0):.1f}°")
     
-    # Calculate expected sun elevation - only during daylight hours
+    base_brightness = evaluation['base_brightness']
     if daylight_hours:
-        sun_elevation = calculate_sun_elevation_fallback(current_hour)
-    else:
-        sun_elevation = 0
-    
-    print(f"📐 Expected sun elevation: {sun_elevation:.1f}°")
-    
-    # Calculate base brightness (updated to use daylight hours instead of fixed time)
-    if daylight_hours:
-        # Scale brightness to match natural outdoor illumination levels
-        if sun_elevation > 60:
-            base_brightness = 10  # High sun - maximum brightness
-        elif sun_elevation > 40:
-            base_brightness = int(8 + (sun_elevation - 40) / 10)  # Mid-day sun
-        elif sun_elevation > 20:
-            base_brightness = int(5 + (sun_elevation - 20) / 6.7)  # Morning/afternoon sun
-        elif sun_elevation > 5:
-            base_brightness = int(2 + (sun_elevation - 5) / 5)  # Low sun
-        elif sun_elevation > 0:
-            base_brightness = int(sun_elevation / 2.5)  # Twilight
-        else:
-            base_brightness = 0
         print(f"📊 Base brightness: {base_brightness} (seasonal daylight hours)")
     else:
-        base_brightness = 0
         print(f"📊 Base brightness: {base_brightness} (outside daylight hours)")
     
-    # Calculate each channel (updated for sunrise/sunset logic)
-    
-    # White Channel - Primary illumination matching daylight
-    if sun_elevation > 10:
-        target_white = max(base_brightness, 1)
-    elif sun_elevation > 0:
-        target_white = int(base_brightness * 0.6)
-    else:
-        target_white = 0
-    target_white = max(0, min(10, target_white))
-    
-    # Red Channel - Warm light for sunrise/sunset
-    if sun_elevation < 20 and sun_elevation > 0:
-        target_red = min(int(base_brightness * (1 - sun_elevation/20) * 1.5), 10)
-    elif daylight_hours and base_brightness > 2:
-        target_red = int(max(base_brightness * 0.15, 1))
-    else:
-        target_red = 0
-    target_red = max(0, min(10, target_red))
-    
-    # Green Channel - Natural balance
-    if base_brightness > 1:
-        target_green = int(target_white * 0.6 + target_red * 0.2 + base_brightness * 0.3)
-    else:
-        target_green = 0
-    target_green = max(0, min(10, target_green))
-    
-    # Blue Channel - Peaks during high sun
-    if sun_elevation > 20:
-        target_blue = min(int(base_brightness * 0.8), 8)
-    elif sun_elevation > 5:
-        target_blue = min(int(base_brightness * 0.6), 6)
-    elif daylight_hours and base_brightness > 0:
-        target_blue = int(max(base_brightness * 0.3, 1))
-    else:
-        target_blue = 0
-    target_blue = max(0, min(10, target_blue))
-    
+    levels = evaluation['levels']
     print(f"🎯 Expected light levels:")
-    print(f"   ⚪ White: {target_white}/10")
-    print(f"   🔴 Red: {target_red}/10")
-    print(f"   🟢 Green: {target_green}/10") 
-    print(f"   🔵 Blue: {target_blue}/10")
+    print(f"   ⚪ White: {levels['white']}/10")
+    print(f"   🔴 Red: {levels['red']}/10")
+    print(f"   🟢 Green: {levels['green']}/10") 
+    print(f"   🔵 Blue: {levels['blue']}/10")
     
-    total_brightness = target_white + target_red + target_green + target_blue
+    total_brightness = sum(levels.values())
     print(f"💡 Total expected brightness: {total_brightness}/40")
     
     if total_brightness == 0:
@@ -232,15 +103,155 @@ def check_common_issues():
     print("   ➤ API key is valid and active")
     print("   ➤ Weather entity provides current conditions")
 
+def load_weather_timeline(path):
+    """Load a CSV of `timestamp,condition` rows (header optional), sorted by time."""
+    timeline = []
+    with open(path, newline='') as file:
+        for row in csv.reader(file):
+            if not row or row[0].startswith('#'):
+                continue
+            try:
+                timestamp = datetime.fromisoformat(row[0].strip())
+            except ValueError:
+                continue  # header row
+            timeline.append((timestamp.replace(tzinfo=None), row[1].strip()))
+    timeline.sort()
+    return timeline
+
+
+def expand_weather_timeline(timeline, start, minutes, default='sunny'):
+    """Forward-fill a weather timeline onto a per-minute array starting at `start`."""
+    import numpy as np
+
+    if not timeline:
+        return np.full(minutes, default)
+    origin = datetime.combine(start, datetime.min.time())
+    offsets = np.array([(timestamp - origin).total_seconds() // 60 for timestamp, _ in timeline])
+    labels = np.array([default] + [condition for _, condition in timeline])
+    # Index 0 (before the first entry) falls back to the automation's default condition
+    return labels[np.searchsorted(offsets, np.arange(minutes), side='right')]
+
+
+def find_anomalies(evaluation, max_jump=3, dark_elevation=2.0):
+    """Return {kind: bool mask per minute} for the evaluated range."""
+    import numpy as np
+
+    levels = evaluation['levels']
+    total = levels.sum(axis=1, dtype=np.int16)
+    daylight = evaluation['daylight']
+    jumps = np.zeros(len(levels), dtype=bool)
+    jumps[1:] = (np.abs(np.diff(levels.astype(np.int16), axis=0)) > max_jump).any(axis=1)
+    return {
+        'on_at_night': (total > 0) & ~daylight,
+        'dark_in_daylight': (total == 0) & daylight & (evaluation['elevation'] > dark_elevation),
+        'jump': jumps,
+    }
+
+
+ANOMALY_LABELS = {
+    'on_at_night': "Lights on outside daylight",
+    'dark_in_daylight': "Zero output during daylight",
+    'jump': "Channel jump",
+}
+
+
+def diagnose_range(start, end, weather_timeline=None, max_jump=3, dark_elevation=2.0,
+                   max_days=31):
+    """Evaluate every minute from `start` to `end` and report anomalies per day."""
+    import numpy as np
+    from lighting_vector import MINUTES_PER_DAY, evaluate_range
+
+    days = (end - start).days + 1
+    conditions = expand_weather_timeline(weather_timeline or [], start, days * MINUTES_PER_DAY)
+    started = time.perf_counter()
+    evaluation = evaluate_range(start, end, conditions)
+    anomalies = find_anomalies(evaluation, max_jump, dark_elevation)
+    elapsed = time.perf_counter() - started
+
+    print(f"📅 Range: {start} → {end} ({days} days, {days * MINUTES_PER_DAY:,} minutes)")
+    print(f"⏱️  Evaluated in {elapsed:.2f}s")
+    print("=" * 50)
+
+    per_day = {kind: mask.reshape(days, MINUTES_PER_DAY) for kind, mask in anomalies.items()}
+    counts = {kind: grid.sum(axis=1) for kind, grid in per_day.items()}
+    for kind, label in ANOMALY_LABELS.items():
+        flagged = int(np.count_nonzero(counts[kind]))
+        print(f"{'⚠️ ' if flagged else '✅'} {label}: {int(counts[kind].sum())} minutes on {flagged} days")
+
+    bad_days = np.flatnonzero(sum(counts.values()))
+    if len(bad_days):
+        print("\n📋 Days with anomalies (episode start times, minutes flagged):")
+        for day_index in bad_days[:max_days]:
+            details = []
+            for kind, grid in per_day.items():
+                if counts[kind][day_index]:
+                    row = grid[day_index]
+                    starts = np.flatnonzero(row & ~np.concatenate(([False], row[:-1])))
+                    times = ", ".join(f"{int(m) // 60:02d}:{int(m) % 60:02d}" for m in starts[:3])
+                    more = "…" if len(starts) > 3 else ""
+                    details.append(f"{ANOMALY_LABELS[kind].lower()} at {times}{more} "
+                                   f"({int(counts[kind][day_index])} min)")
+            print(f"   • {evaluation['dates'][day_index]}: " + "; ".join(details))
+        if len(bad_days) > max_days:
+            print(f"   … and {len(bad_days) - max_days} more days")
+    else:
+        print("\n🎉 No anomalies found in this range")
+
+    levels = evaluation['levels']
+    on_minutes = int(np.count_nonzero(levels.sum(axis=1)))
+    print(f"\n💡 Lights on for {on_minutes / 60:.1f} hours "
+          f"({on_minutes / days / 60:.1f} h/day on average)")
+    return counts
+
+
+def parse_args():
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(description="Diagnose Hygger aquarium light calculations")
+    parser.add_argument('when', nargs='?', default='now', metavar='now|"YYYY-MM-DD HH:MM"',
+                        help="Moment to diagnose (default now; same as --at)")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--at', metavar='"YYYY-MM-DD HH:MM"', type=datetime.fromisoformat,
+                      help="Diagnose a specific moment instead of now")
+    mode.add_argument('--range', nargs=2, metavar=('START', 'END'), type=date.fromisoformat,
+                      help="Scan every minute between two dates (inclusive)")
+    mode.add_argument('--year', type=int, help="Scan every minute of a calendar year")
+    parser.add_argument('--weather', metavar='FILE',
+                        help="CSV weather timeline (timestamp,condition) for range scans")
+    parser.add_argument('--max-jump', type=int, default=3,
+                        help="Flag channel changes larger than this many levels per minute")
+    parser.add_argument('--dark-elevation', type=float, default=2.0,
+                        help="Sun elevation above which zero output is flagged")
+    args = parser.parse_args()
+    if args.when != 'now':
+        if args.at or args.range or args.year:
+            parser.error("give the moment either positionally or with --at/--range/--year")
+        try:
+            args.at = datetime.fromisoformat(args.when)
+        except ValueError:
+            parser.error(f"invalid moment: {args.when!r}")
+    return args
+
+
 def main():
     """Main diagnostic routine."""
+    args = parse_args()
     print("🔧 Hygger Aquarium Light Diagnostic Tool")
     print("=" * 50)
+
+    if args.range or args.year:
+        start, end = args.range if args.range else (date(args.year, 1, 1), date(args.year, 12, 31))
+        if end < start:
+            print("❌ END must not be before START")
+            return
+        timeline = load_weather_timeline(args.weather) if args.weather else None
+        diagnose_range(start, end, timeline, args.max_jump, args.dark_elevation)
+        return
+
     print("This tool helps diagnose why your lights might not be working.")
     print()
-    
+
     # Diagnose current time
-    lights_should_be_on = diagnose_current_time()
+    lights_should_be_on = diagnose_current_time(args.at)
     
     # Check common issues
     check_common_issues()
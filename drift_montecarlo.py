@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+Hygger Light Drift Estimator
+Monte Carlo estimate of how far the physical light drifts from the helpers when IR
+commands are occasionally dropped or received twice.
+
+The system is open loop: input_number.hygger_*_level records what was *sent*, and
+only a reset-to-zero resync brings the light back in line. This tool replays a
+year of reconcile traffic from the lighting engine through thousands of lossy
+trials at once, for several resync intervals side by side, and recommends the
+interval that keeps drift within a budget for the least IR traffic.
+
+Drops and duplicates are sampled sparsely: for each command the number of affected
+trials is drawn from a binomial and only those trials are touched, so the cost grows
+with the number of loss events rather than commands × trials.
+"""
+import argparse
+import time
+from datetime import date
+
+import numpy as np
+
+import metrics
+from lighting_engine import CHANNELS, MAX_LEVEL
+from lighting_vector import MINUTES_PER_DAY, evaluate_range
+from metrics import DRIFT_CORRECTIONS
+
+# The current automation resets at 02:00 every night
+RESET_MINUTE = 2 * 60
+RESET_STEPS = 12
+# A resync blacks the tank out while it rebuilds, so extra resyncs only run in the
+# hours the schedule is dark all year (at midsummer it is lit from about 04:15 to 18:45)
+NIGHT_START = 20 * 60
+NIGHT_END = 4 * 60
+
+WEATHER_STATES = ('sunny', 'partlycloudy', 'cloudy', 'rainy')
+# Hourly transition matrix for the synthetic weather timeline (rows sum to 1)
+WEATHER_TRANSITIONS = np.array([
+    [0.90, 0.07, 0.02, 0.01],
+    [0.10, 0.80, 0.08, 0.02],
+    [0.03, 0.10, 0.80, 0.07],
+    [0.02, 0.03, 0.15, 0.80],
+])
+
+
+def weather_timeline(days, rng):
+    """Return a per-minute condition array from an hourly Markov chain."""
+    hours = days * 24
+    states = np.empty(hours, dtype=np.int8)
+    states[0] = 0
+    draws = rng.random(hours)
+    cumulative = WEATHER_TRANSITIONS.cumsum(axis=1)
+    for hour in range(1, hours):
+        states[hour] = np.searchsorted(cumulative[states[hour - 1]], draws[hour])
+    return np.repeat(np.array(WEATHER_STATES)[states], 60)
+
+
+def build_traffic(start, days, weather='random', bursts=0, seed=0):
+    """Return (targets, ticks) for the reconcile traffic.
+
+    `targets` is the (minutes, 4) helper state after each minute's reconcile and
+    `ticks` the minutes at which at least one command is sent. `bursts` adds that
+    many random jumps per day (manual slider moves) which the next minute undoes.
+    """
+    rng = np.random.default_rng(seed)
+    end = date.fromordinal(start.toordinal() + days - 1)
+    conditions = weather_timeline(days, rng) if weather == 'random' else weather
+    targets = evaluate_range(start, end, conditions)['levels'].astype(np.int16)
+    if bursts:
+        minutes = rng.choice(len(targets), size=bursts * days, replace=False)
+        targets[minutes] = rng.integers(0, MAX_LEVEL + 1, size=(len(minutes), len(CHANNELS)))
+    previous = np.vstack([np.zeros((1, len(CHANNELS)), dtype=np.int16), targets[:-1]])
+    ticks = np.flatnonzero(np.any(targets != previous, axis=1))
+    return targets, ticks
+
+
+def _event_counts(rng, commands, lanes, probability):
+    """Per-lane event counts for `commands` commands sent to every lane (sparse sampling)."""
+    if probability <= 0 or commands <= 0:
+        return 0
+    total = commands * lanes
+    events = rng.binomial(total, probability)
+    if not events:
+        return 0
+    hits = rng.choice(total, size=events, replace=False) % lanes
+    return np.bincount(hits, minlength=lanes)
+
+
+def send(level, steps, rng, drop, dup):
+    """Send `steps` commands (signed) to every lane of one channel's `level` row, in place."""
+    count = abs(int(steps))
+    moved = count - _event_counts(rng, count, len(level), drop) \
+        + _event_counts(rng, count, len(level), dup)
+    # All commands in a batch go the same way, so clamping once equals clamping per command
+    np.clip(level + np.sign(steps) * moved, 0, MAX_LEVEL, out=level, casting='unsafe')
+
+
+def resync(physical, target, rng, drop, dup):
+    """Reset-to-zero (12 downs per channel) and rebuild to `target`; returns commands sent.
+
+    `physical` is a (4, lanes) view of the lanes being resynced.
+    """
+    for channel, level in enumerate(target):
+        send(physical[channel], -RESET_STEPS, rng, drop, dup)
+        if level:
+            send(physical[channel], int(level), rng, drop, dup)
+    return RESET_STEPS * len(CHANNELS) + int(target.sum())
+
+
+def resync_minutes(interval_hours, minutes):
+    """Minutes at which a policy resyncs: every interval from the 02:00 reset, at night only."""
+    if not interval_hours:
+        return np.array([], dtype=np.int64)
+    step = int(round(interval_hours * 60))
+    first = RESET_MINUTE % step if step < MINUTES_PER_DAY else RESET_MINUTE
+    times = np.arange(first, minutes, step)
+    of_day = times % MINUTES_PER_DAY
+    return times[(of_day >= NIGHT_START) | (of_day < NIGHT_END)]
+
+
+def night_times(interval_hours):
+    """Times of day ("HH:MM:SS") a sub-daily policy resyncs, from 20:00 to 04:00.
+
+    None when the interval does not divide the day, so the times move from night to night.
+    """
+    if not interval_hours or interval_hours >= 24 or MINUTES_PER_DAY % round(interval_hours * 60):
+        return None
+    minutes = sorted(resync_minutes(interval_hours, MINUTES_PER_DAY),
+                     key=lambda minute: (minute - NIGHT_START) % MINUTES_PER_DAY)
+    return [f"{minute // 60:02d}:{minute % 60:02d}:00" for minute in minutes]
+
+
+def simulate(targets, ticks, intervals, trials=2000, drop=0.01, dup=0.002, seed=0):
+    """Run every policy over the same traffic; returns per-policy arrays.
+
+    `daily_error[p]` is (trials, days): each trial's mean over the day of the summed
+    |physical - helper| across the four channels.
+    """
+    rng = np.random.default_rng(seed)
+    minutes = len(targets)
+    days = minutes // MINUTES_PER_DAY
+    policies = len(intervals)
+    lanes = policies * trials
+    # Channel-major so every per-channel update touches one contiguous row
+    physical = np.zeros((len(CHANNELS), lanes), dtype=np.int16)
+    deviation = np.zeros((len(CHANNELS), lanes), dtype=np.int16)
+    error = np.zeros(lanes, dtype=np.int32)
+    error_minutes = np.zeros((days, lanes), dtype=np.float64)
+    resync_commands = np.zeros(policies, dtype=np.int64)
+
+    schedule = {}
+    for index, interval in enumerate(intervals):
+        for minute in resync_minutes(interval, minutes):
+            schedule.setdefault(int(minute), []).append(index)
+    events = np.union1d(ticks, np.fromiter(schedule, dtype=np.int64, count=len(schedule)))
+    corrections = [DRIFT_CORRECTIONS.labels(source='montecarlo', policy=policy_label(interval))
+                   for interval in intervals]
+
+    def refresh(channel, target_level, columns=slice(None)):
+        # Keep the summed |physical - helper| current without re-reducing all channels
+        new = physical[channel, columns] - target_level
+        error[columns] += np.abs(new) - np.abs(deviation[channel, columns])
+        deviation[channel, columns] = new
+
+    reconcile_commands = 0
+    previous_targets = np.zeros(len(CHANNELS), dtype=np.int16)
+    last_minute = 0
+    for minute in np.append(events, minutes):
+        # Error is constant between events; credit it to the days it spans
+        start = last_minute
+        while start < minute:
+            day = start // MINUTES_PER_DAY
+            stop = min(minute, (day + 1) * MINUTES_PER_DAY)
+            error_minutes[day] += error * (stop - start)
+            start = stop
+        if minute == minutes:
+            break
+        last_minute = minute
+
+        for policy in schedule.get(int(minute), ()):
+            columns = slice(policy * trials, (policy + 1) * trials)
+            corrections[policy].inc(int(error[columns].sum()))
+            resync_commands[policy] += resync(physical[:, columns], previous_targets,
+                                              rng, drop, dup)
+            for channel in range(len(CHANNELS)):
+                refresh(channel, previous_targets[channel], columns)
+        target = targets[minute]
+        for channel in np.flatnonzero(target != previous_targets):
+            steps = int(target[channel] - previous_targets[channel])
+            send(physical[channel], steps, rng, drop, dup)
+            refresh(channel, target[channel])
+            reconcile_commands += abs(steps)
+        previous_targets = target
+
+    daily_error = (error_minutes.T / MINUTES_PER_DAY).reshape(policies, trials, days)
+    return {
+        'intervals': list(intervals),
+        'daily_error': daily_error,
+        'resync_commands_per_day': resync_commands / days,
+        'reconcile_commands': reconcile_commands,
+        'days': days,
+    }
+
+
+def policy_label(interval):
+    """Human-readable policy name."""
+    if not interval:
+        return "never"
+    if interval == 24:
+        return "nightly (current)"
+    if interval % 24 == 0:
+        return f"every {interval // 24}d"
+    return f"every {interval:g}h at night"
+
+
+def frontier(results):
+    """Indices of the policies no other policy beats on both p95 daily error and traffic."""
+    p95 = np.percentile(results['daily_error'], 95, axis=(1, 2))
+    traffic = results['resync_commands_per_day']
+    return [index for index in range(len(p95))
+            if not any(p95[other] <= p95[index] and traffic[other] <= traffic[index]
+                       and (p95[other], traffic[other]) != (p95[index], traffic[index])
+                       for other in range(len(p95)))]
+
+
+def recommend(results, budget):
+    """Return (index, whether it meets `budget`) of the policy to use.
+
+    That is the cheapest policy whose p95 daily error is within `budget`; when none
+    is, the frontier policy closest to it (the lowest error on the error/traffic
+    frontier, which is also the cheapest way to get that error).
+    """
+    p95 = np.percentile(results['daily_error'], 95, axis=(1, 2))
+    traffic = results['resync_commands_per_day']
+    within = [index for index in range(len(p95)) if p95[index] <= budget]
+    if within:
+        return min(within, key=lambda index: traffic[index]), True
+    return min(frontier(results), key=lambda index: (p95[index], traffic[index])), False
+
+
+def print_report(results, budget):
+    """Print the policy comparison, drift-over-time table and recommendation."""
+    daily = results['daily_error']
+    reconcile_per_day = results['reconcile_commands'] / results['days']
+    print(f"{'Policy':<20} {'Resync cmds/day':>15} {'Total cmds/day':>14} {'Mean err':>9} "
+          f"{'p95 day':>8} {'p99 day':>8} {'Worst':>6}")
+    print("-" * 86)
+    for index, interval in enumerate(results['intervals']):
+        errors = daily[index]
+        resync_per_day = results['resync_commands_per_day'][index]
+        print(f"{policy_label(interval):<20} {resync_per_day:>15.1f} "
+              f"{resync_per_day + reconcile_per_day:>14.1f} {errors.mean():>9.3f} "
+              f"{np.percentile(errors, 95):>8.3f} {np.percentile(errors, 99):>8.3f} "
+              f"{errors.max():>6.2f}")
+
+    if 0 in results['intervals'] or None in results['intervals']:
+        index = results['intervals'].index(0 if 0 in results['intervals'] else None)
+        print("\n📈 Drift without any resync (mean error across trials, levels summed over channels):")
+        for day in (1, 7, 30, 90, 180, 365):
+            if day <= results['days']:
+                errors = daily[index][:, day - 1]
+                print(f"   day {day:>3}: mean {errors.mean():6.2f}  p50 {np.percentile(errors, 50):6.2f}"
+                      f"  p95 {np.percentile(errors, 95):6.2f}")
+
+    best, met = recommend(results, budget)
+    interval = results['intervals'][best]
+    print()
+    if met:
+        print(f"✅ Recommendation: resync {policy_label(interval)} — the least resync traffic "
+              f"({results['resync_commands_per_day'][best]:.1f} commands/day) with p95 daily "
+              f"error ≤ {budget}")
+    else:
+        p95 = np.percentile(daily[best], 95)
+        print(f"⚠️  No policy keeps the p95 daily error within {budget}; the closest is to resync "
+              f"{policy_label(interval)} (p95 {p95:.3f}, "
+              f"{results['resync_commands_per_day'][best]:.1f} commands/day). Resyncs only run "
+              f"at night, so daytime drops stay until the next one: raise --budget or reduce IR "
+              f"losses (light_feedback.py corrects them within minutes)")
+    times = night_times(interval)
+    if times and len(times) > 1:
+        print("   In aquarium_daily_reset.yaml, replace the time trigger with:")
+        print("     - platform: time")
+        print("       at:")
+        for at in times:
+            print(f"         - \"{at}\"")
+    elif interval and interval < 24:
+        print("   Resyncs only run from 20:00 to 04:00; pick an interval that divides the day "
+              "to get a fixed list of trigger times")
+    elif interval and interval != 24:
+        print("   aquarium_daily_reset.yaml runs nightly; add a condition on the day of the "
+              "year to skip nights in between")
+    return best
+
+
+def main():
+    """Run the drift Monte Carlo from the command line."""
+    parser = argparse.ArgumentParser(description="Estimate helper-vs-light drift under lossy IR")
+    parser.add_argument('--days', type=int, default=365, help="Days of traffic to simulate")
+    parser.add_argument('--start', type=date.fromisoformat, default=date(date.today().year, 1, 1),
+                        help="First simulated day (YYYY-MM-DD)")
+    parser.add_argument('--trials', type=int, default=2000, help="Monte Carlo trials per policy")
+    parser.add_argument('--drop', type=float, default=0.01, help="Per-command drop probability")
+    parser.add_argument('--dup', type=float, default=0.002,
+                        help="Per-command duplicate probability (drawn independently of drops)")
+    parser.add_argument('--intervals', default='0,1,2,4,24,48,168',
+                        help="Resync intervals in hours to compare (0 = never); sub-daily "
+                             "ones only resync from 20:00 to 04:00")
+    parser.add_argument('--weather', default='random',
+                        help="'random' for a Markov weather timeline, or a fixed condition")
+    parser.add_argument('--bursts', type=int, default=4,
+                        help="Random manual level changes per day")
+    parser.add_argument('--budget', type=float, default=1.0,
+                        help="Acceptable p95 daily mean error (levels summed over channels; "
+                             "1.0 is one level step off on one channel)")
+    parser.add_argument('--output', metavar='PATH.npz', help="Save per-trial daily errors")
+    parser.add_argument('--seed', type=int, default=0)
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+    intervals = [float(value) if '.' in value else int(value) for value in args.intervals.split(',')]
+
+    print("🎲 Hygger Light Drift Monte Carlo")
+    print("=" * 80)
+    server = metrics.start(args)
+    started = time.perf_counter()
+    targets, ticks = build_traffic(args.start, args.days, args.weather, args.bursts, args.seed)
+    results = simulate(targets, ticks, intervals, args.trials, args.drop, args.dup, args.seed + 1)
+    elapsed = time.perf_counter() - started
+    print(f"📦 {args.days} days, {results['reconcile_commands']:,} reconcile commands "
+          f"({results['reconcile_commands'] / args.days:.0f}/day), {len(intervals)} policies × "
+          f"{args.trials:,} trials, drop {args.drop:.1%}, dup {args.dup:.1%}")
+    print(f"⏱️  Simulated in {elapsed:.1f}s")
+    print()
+    print_report(results, args.budget)
+
+    if args.output:
+        np.savez(args.output, intervals=np.array(intervals, dtype=float),
+                 daily_error=results['daily_error'].astype(np.float32),
+                 resync_commands_per_day=results['resync_commands_per_day'])
+        print(f"💾 Wrote {args.output}")
+    metrics.finish(args, server)
+
+if __name__ == "__main__":
+    main()
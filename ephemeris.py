@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Hygger Light Sun Model
+Approximate solar geometry shared by the simulators and the local Home Assistant stand-in.
+
+Uses the same declination / hour-angle approximation as the diagnostic tools, so
+sunrise and sunset line up with what `diagnose_lighting.py` reports, and adds the
+matching elevation curve so the stand-in can publish a realistic `sun.sun` entity.
+"""
+import math
+from functools import lru_cache
+
+# Jeffersonville, Indiana (zip 47124)
+DEFAULT_LATITUDE = 38.28
+
+# Clock hour of solar noon. The existing tools place solar noon at 12:00 and then
+# apply a -0.5 h "Eastern Time" adjustment, which is kept here for consistency.
+DEFAULT_SOLAR_NOON = 11.5
+
+# Used by the tools when sunrise/sunset cannot be computed (polar day or night)
+FALLBACK_SUNRISE = 6.5
+FALLBACK_SUNSET = 18.5
+
+
+@lru_cache(maxsize=366)
+def solar_declination(day_of_year):
+    """Return the solar declination in degrees for a day of the year."""
+    return 23.45 * math.sin(math.radians((360 / 365) * (day_of_year - 81)))
+
+
+# Per-minute callers ask for the same day 1440 times; one process (the hygger CLI,
+# the stand-in) shares these caches across every tool it runs
+@lru_cache(maxsize=1024)
+def sunrise_sunset(day_of_year, latitude=DEFAULT_LATITUDE, solar_noon=DEFAULT_SOLAR_NOON):
+    """Return (sunrise, sunset) as decimal clock hours, or None during polar day/night."""
+    lat_rad = math.radians(latitude)
+    decl_rad = math.radians(solar_declination(day_of_year))
+    cos_hour_angle = -math.tan(lat_rad) * math.tan(decl_rad)
+    if not -1.0 <= cos_hour_angle <= 1.0:
+        return None
+    hour_angle = math.degrees(math.acos(cos_hour_angle))
+    return solar_noon - hour_angle / 15, solar_noon + hour_angle / 15
+
+
+def sun_elevation(day_of_year, hour_decimal, latitude=DEFAULT_LATITUDE,
+                  solar_noon=DEFAULT_SOLAR_NOON):
+    """Return the sun elevation in degrees at a decimal clock hour."""
+    lat_rad = math.radians(latitude)
+    decl_rad = math.radians(solar_declination(day_of_year))
+    hour_angle = math.radians(15 * (hour_decimal - solar_noon))
+    sin_elevation = (math.sin(lat_rad) * math.sin(decl_rad)
+                     + math.cos(lat_rad) * math.cos(decl_rad) * math.cos(hour_angle))
+    return math.degrees(math.asin(max(-1.0, min(1.0, sin_elevation))))
+
+
+def sun_rising(hour_decimal, solar_noon=DEFAULT_SOLAR_NOON):
+    """Return whether the sun is rising (solar midnight to solar noon), like sun.sun's `rising`."""
+    return (hour_decimal - solar_noon) % 24 >= 12
+
+
+def format_hhmm(hour_decimal):
+    """Format a decimal hour as HH:MM, truncating minutes like the original tools."""
+    hour = int(hour_decimal)
+    minute = int((hour_decimal - hour) * 60)
+    return f"{hour:02d}:{minute:02d}"
+
+
+def get_sunrise_sunset_for_day(day_of_year, latitude=DEFAULT_LATITUDE,
+                               solar_noon=DEFAULT_SOLAR_NOON):
+    """Return (sunrise 'HH:MM', sunset 'HH:MM', daylight hours), falling back at polar latitudes."""
+    times = sunrise_sunset(day_of_year, latitude, solar_noon)
+    if times is None:
+        return (format_hhmm(FALLBACK_SUNRISE), format_hhmm(FALLBACK_SUNSET),
+                FALLBACK_SUNSET - FALLBACK_SUNRISE)
+    sunrise, sunset = times
+    return format_hhmm(sunrise), format_hhmm(sunset), sunset - sunrise
@@ -0,0 +1,1174 @@
+#!/usr/bin/env python3
+"""
+Hygger Light Home Assistant Stand-in
+Executes the repository's real automation and script YAML in virtual time.
+
+Only the subset of Home Assistant used by this project is implemented:
+`time`, `time_pattern`, `homeassistant` and `state` triggers; `service`, `delay`,
+`variables`, `choose`, `repeat` (`count`, `for_each`, `while`, `until`),
+`condition`, `stop` and `wait_template` actions; script-level `variables`;
+`mode: single` and `queued`; and the services `remote.send_command`,
+`input_number.set_value`, `input_text.set_value`, `input_boolean.turn_on/off`,
+`system_log.write`, `weather.get_forecasts`, `automation.trigger`,
+`automation.turn_on/off`, `script.turn_on/off` and direct `script.<name>` calls.
+Templates are rendered with Jinja2 using HA-compatible helpers (`states`,
+`state_attr`, `now`, `as_timestamp`, `| int(0)`, ...). States carry a context
+whose `user_id` is set for changes made with `set_by_user` (a dashboard slider)
+and, as in HA, for every change made by a script a person started with
+`press_by_user` (a dashboard button); automations run without a user.
+
+Entities are stubbed: `sun.sun` follows ephemeris.py, the weather entity serves
+a configurable hourly forecast, and the Broadlink remote drives a model of the
+physical light so helper-vs-light drift is visible. An optional colour sensor
+stub reads that light back as `sensor.aquarium_light_<red|green|blue|clear>`.
+
+Usage:
+    python3 ha_runtime.py --date 2026-06-21 --days 1 --weather sunny --trace day.trc
+"""
+
+import argparse
+import ast
+import heapq
+import json
+import math
+import os
+import time
+from collections import deque, namedtuple
+from datetime import datetime, timedelta
+
+import yaml
+from jinja2 import Environment
+from jinja2.filters import do_int as _jinja_int
+
+from config_tree import slugify
+from lighting_engine import NOMINAL_WEATHER
+from ephemeris import (DEFAULT_LATITUDE, DEFAULT_SOLAR_NOON, sun_elevation, sun_rising,
+                       sunrise_sunset)
+from metrics import (CACHE_LOOKUPS, DRIFT_CORRECTIONS, FORECAST_CACHE_AGE, IR_COMMANDS,
+                     QUEUE_DEPTH, RECONCILE_DURATION, command_labels)
+
+CHANNELS = ('white', 'red', 'green', 'blue')
+SENSOR_CHANNELS = ('red', 'green', 'blue', 'clear')
+DEFAULT_REMOTE = 'remote.rm4_pro_remote'
+DEFAULT_WEATHER = 'weather.openweathermap'
+DEFAULT_LOGGER = 'system_log.external'
+RECONCILE_SCRIPT = 'aquarium_reconcile_state'
+RESET_SCRIPT = 'aquarium_reset_to_zero'
+FORECAST_CACHE = 'input_text.aquarium_forecast_cache'
+# What Home Assistant restores for the tuning helpers (they have no `initial`) once
+# they are set up as their comments say; a helper never set starts at its minimum
+RESTORED_STATES = {
+    'input_number.hygger_ir_delay_ms': 500.0,
+    'input_number.hygger_dwell_minutes': 10.0,
+    'input_number.hygger_manual_hold_minutes': 60.0,
+    'input_number.hygger_weather_dwell_minutes': 10.0,
+}
+
+_TEMPLATE_HITS = CACHE_LOOKUPS.labels(cache='template', result='hit')
+_TEMPLATE_MISSES = CACHE_LOOKUPS.labels(cache='template', result='miss')
+_EVENT_QUEUE = QUEUE_DEPTH.labels(queue='events')
+_ACTIVE_RUNS = QUEUE_DEPTH.labels(queue='runs')
+_RECONCILE_SECONDS = RECONCILE_DURATION.labels(source='runtime')
+_RESET_CORRECTIONS = DRIFT_CORRECTIONS.labels(source='runtime', policy='reset')
+
+_MISSING = object()
+
+# Who caused a state change; `user_id` is None for changes made by automations and scripts
+Context = namedtuple('Context', 'user_id', defaults=(None,))
+_SYSTEM = Context()
+
+
+class ServiceNotFound(Exception):
+    """Raised when a YAML action calls a service the stand-in does not implement."""
+
+
+class ServiceError(Exception):
+    """Raised by stubbed services to emulate integration failures."""
+
+
+class _StopSequence(Exception):
+    """Internal: a condition step evaluated false or a `stop` action, ending the current run."""
+
+
+class State:
+    """A Home Assistant state object: string state plus attributes."""
+
+    __slots__ = ('entity_id', 'state', 'attributes', 'last_changed', 'context')
+
+    def __init__(self, entity_id, state, attributes=None, last_changed=None, context=_SYSTEM):
+        self.entity_id = entity_id
+        self.state = str(state)
+        self.attributes = attributes or {}
+        self.last_changed = last_changed
+        self.context = context
+
+
+# ---------------------------------------------------------------------------
+# Templates
+# ---------------------------------------------------------------------------
+
+class TemplateEngine:
+    """Jinja2 environment with the Home Assistant helpers the YAML relies on."""
+
+    def __init__(self, hass):
+        self.hass = hass
+        self._cache = {}
+        env = Environment(extensions=['jinja2.ext.loopcontrols'])
+        env.globals.update(
+            states=self._states,
+            state_attr=self._state_attr,
+            is_state=self._is_state,
+            now=lambda: hass.now,
+            as_timestamp=_as_timestamp,
+        )
+        env.filters.update(
+            int=_forgiving_int,
+            float=_forgiving_float,
+            round=_forgiving_round,
+            sin=lambda value: math.sin(float(value)),
+            cos=lambda value: math.cos(float(value)),
+            timestamp_custom=_timestamp_custom,
+            as_timestamp=_as_timestamp,
+            from_json=_from_json,
+            to_json=lambda value: json.dumps(value, default=str),
+        )
+        # HA also offers is_state as a test: `| select('is_state', 'on')`
+        env.tests['is_state'] = self._is_state
+        self.env = env
+
+    def _states(self, entity_id):
+        state = self.hass.get_state(entity_id)
+        return state.state if state is not None else 'unknown'
+
+    def _state_attr(self, entity_id, attribute):
+        state = self.hass.get_state(entity_id)
+        return state.attributes.get(attribute) if state is not None else None
+
+    def _is_state(self, entity_id, value):
+        return self._states(entity_id) == value
+
+    def render(self, source, variables):
+        """Render a template string and parse the result into a native type."""
+        template = self._cache.get(source)
+        if template is None:
+            _TEMPLATE_MISSES.inc()
+            template = self._cache[source] = self.env.from_string(source)
+        else:
+            _TEMPLATE_HITS.inc()
+        return _parse_result(template.render(variables))
+
+    def render_complex(self, value, variables):
+        """Render templates nested anywhere inside lists and dicts."""
+        if isinstance(value, str):
+            if '{{' in value or '{%' in value:
+                return self.render(value, variables)
+            return value
+        if isinstance(value, dict):
+            return {key: self.render_complex(item, variables) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self.render_complex(item, variables) for item in value]
+        return value
+
+
+def _parse_result(rendered):
+    """Mirror Home Assistant's native-type template results."""
+    text = rendered.strip()
+    if not text:
+        return text
+    if text in ('True', 'False'):
+        return text == 'True'
+    if text.startswith(('[', '{', '(')) or text[:1].isdigit() or text[:1] in '-+.':
+        if len(text) > 1 and text[0] == '0' and text[1].isdigit():
+            return text  # HA keeps values like "06:30" / "007" as strings
+        try:
+            result = ast.literal_eval(text)
+        except (ValueError, SyntaxError, MemoryError, RecursionError):
+            return text
+        if isinstance(result, (int, float, bool, list, dict, tuple)):
+            return result
+    return text
+
+
+def _forgiving_int(value, default=_MISSING, base=10):
+    """HA `int` filter: raise on bad input unless a default is supplied."""
+    result = _jinja_int(value, default=_MISSING, base=base)
+    if result is _MISSING:
+        if default is _MISSING:
+            raise ValueError(f"Template error: int got invalid input '{value}'")
+        return default
+    return result
+
+
+def _forgiving_float(value, default=_MISSING):
+    """HA `float` filter: raise on bad input unless a default is supplied."""
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        if default is _MISSING:
+            raise ValueError(f"Template error: float got invalid input '{value}'")
+        return default
+
+
+def _forgiving_round(value, precision=0, method='common', default=_MISSING):
+    """HA `round` filter; precision 0 returns an int like Home Assistant."""
+    try:
+        number = float(value)
+    except (ValueError, TypeError):
+        if default is _MISSING:
+            raise ValueError(f"Template error: round got invalid input '{value}'")
+        return default
+    multiplier = 10 ** precision
+    if method == 'ceil':
+        number = math.ceil(number * multiplier) / multiplier
+    elif method == 'floor':
+        number = math.floor(number * multiplier) / multiplier
+    else:
+        number = round(number, precision)
+    return int(number) if precision == 0 else number
+
+
+def _as_timestamp(value, default=None):
+    """Convert a datetime or ISO string to a POSIX timestamp."""
+    if isinstance(value, datetime):
+        return value.timestamp()
+    try:
+        return datetime.fromisoformat(str(value)).timestamp()
+    except ValueError:
+        try:
+            return float(value)
+        except (ValueError, TypeError):
+            return default
+
+
+def _timestamp_custom(value, format_string='%Y-%m-%d %H:%M:%S', local=True):
+    """HA `timestamp_custom` filter (naive local time)."""
+    return datetime.fromtimestamp(float(value)).strftime(format_string)
+
+
+def _from_json(value, default=_MISSING):
+    """HA `from_json` filter with optional default."""
+    try:
+        return json.loads(value)
+    except (ValueError, TypeError):
+        if default is _MISSING:
+            raise
+        return default
+
+
+# ---------------------------------------------------------------------------
+# Stub entities
+# ---------------------------------------------------------------------------
+
+class SunStub:
+    """Publishes `sun.sun` from the ephemeris for the virtual clock."""
+
+    def __init__(self, latitude=DEFAULT_LATITUDE, solar_noon=DEFAULT_SOLAR_NOON):
+        self.latitude = latitude
+        self.solar_noon = solar_noon
+
+    def _event(self, day, index):
+        """Return the sunrise (index 0) or sunset (index 1) datetime for a date."""
+        times = sunrise_sunset(day.timetuple().tm_yday, self.latitude, self.solar_noon)
+        if times is None:
+            return None
+        midnight = datetime(day.year, day.month, day.day)
+        return midnight + timedelta(hours=times[index])
+
+    def state(self, now):
+        """Return the sun.sun State for a moment in time."""
+        day_of_year = now.timetuple().tm_yday
+        hour = now.hour + now.minute / 60 + now.second / 3600
+        elevation = sun_elevation(day_of_year, hour, self.latitude, self.solar_noon)
+        attributes = {'elevation': round(elevation, 2),
+                      'rising': sun_rising(hour, self.solar_noon)}
+        for key, index in (('next_rising', 0), ('next_setting', 1)):
+            event = self._event(now, index)
+            if event is not None and event <= now:
+                event = self._event(now + timedelta(days=1), index)
+            if event is not None:
+                attributes[key] = event.isoformat()
+        return State('sun.sun', 'above_horizon' if elevation > 0 else 'below_horizon',
+                     attributes)
+
+
+class WeatherStub:
+    """Serves `weather.get_forecasts` responses from a condition timeline.
+
+    `timeline` is either a single condition string or a callable
+    `timeline(moment) -> condition`. Entries carry the condition's typical
+    cloud_coverage and precipitation. Set `fail_rate` to emulate API outages.
+    """
+
+    def __init__(self, timeline='sunny', fail_rate=0.0, seed=0, hours=24):
+        import random
+        self.timeline = timeline if callable(timeline) else (lambda moment: timeline)
+        self.fail_rate = fail_rate
+        self.hours = hours
+        self.calls = 0
+        self._random = random.Random(seed)
+
+    def forecast(self, forecast_type, now):
+        """Return the forecast list for a forecast type ('hourly' or 'daily')."""
+        self.calls += 1
+        if self.fail_rate and self._random.random() < self.fail_rate:
+            raise ServiceError("Weather API unavailable")
+        step = timedelta(days=1) if forecast_type == 'daily' else timedelta(hours=1)
+        start = now.replace(minute=0, second=0, microsecond=0)
+        entries = []
+        for index in range(self.hours if forecast_type != 'daily' else 7):
+            moment = start + step * index
+            condition = self.timeline(moment)
+            coverage, precipitation = NOMINAL_WEATHER.get(condition, NOMINAL_WEATHER['sunny'])
+            entries.append({
+                'datetime': moment.isoformat(),
+                'condition': condition,
+                'cloud_coverage': coverage,
+                'precipitation': precipitation,
+                'temperature': 20.0,
+            })
+        return entries
+
+
+class LightStub:
+    """Physical Hygger HG016 model driven by the Broadlink remote stub."""
+
+    def __init__(self):
+        self.levels = dict.fromkeys(CHANNELS, 0)
+        self.lightning_flashes = 0
+
+    def apply(self, command):
+        """Apply one learned IR command to the physical levels."""
+        color, _, action = command.rpartition('_')
+        if color in self.levels and action in ('up', 'down'):
+            delta = 1 if action == 'up' else -1
+            self.levels[color] = max(0, min(10, self.levels[color] + delta))
+        elif command == 'weather_lightning':
+            self.lightning_flashes += 1
+
+
+class RGBSensorStub:
+    """Colour sensor facing the tank (e.g. an ESPHome TCS34725), read from the light stub.
+
+    Each channel reads `response` (percent of full scale per level of white, red,
+    green and blue) times the physical levels, plus the room's `ambient` light and
+    gaussian `noise`. Like a polled sensor it takes a new sample every `interval`
+    seconds and reports it with two decimals.
+    """
+
+    RESPONSE = (
+        # white  red   green  blue
+        (1.10, 1.25, 0.15, 0.05),   # red
+        (1.20, 0.10, 1.05, 0.20),   # green
+        (0.95, 0.05, 0.20, 1.15),   # blue
+        # The white LEDs' phosphor fills the gaps between the colour filters, so the
+        # clear channel is what tells white apart from red + green + blue
+        (4.90, 1.40, 1.45, 1.40),   # clear
+    )
+    AMBIENT = (0.30, 0.35, 0.25, 0.90)
+
+    def __init__(self, response=RESPONSE, ambient=AMBIENT, noise=0.03, interval=1.0, seed=0):
+        import random
+        self.response = response
+        self.ambient = ambient
+        self.noise = noise
+        self.interval = interval
+        self._random = random.Random(seed)
+        self._sample = None
+        self._values = None
+
+    def reading(self, now, levels):
+        """Return the (red, green, blue, clear) sample for a moment and the light's levels."""
+        sample = math.floor(now.timestamp() / self.interval)
+        if sample != self._sample:
+            self._sample = sample
+            physical = [levels[channel] for channel in CHANNELS]
+            self._values = tuple(
+                round(sum(gain * level for gain, level in zip(row, physical)) + ambient
+                      + self._random.gauss(0.0, self.noise), 2)
+                for row, ambient in zip(self.response, self.ambient))
+        return self._values
+
+
+# ---------------------------------------------------------------------------
+# Runtime
+# ---------------------------------------------------------------------------
+
+class _Run:
+    """A running automation or script (one task in the event loop)."""
+
+    __slots__ = ('kind', 'object_id', 'generator', 'done', 'started', 'cancelled', 'context')
+
+    def __init__(self, kind, object_id, generator, started=None, context=_SYSTEM):
+        self.kind = kind
+        self.object_id = object_id
+        self.generator = generator
+        self.done = False
+        self.started = started
+        self.cancelled = False
+        self.context = context   # Who started it; its service calls change states as them
+
+
+class HomeAssistantStub:
+    """Minimal Home Assistant core: states, services, scripts, automations, virtual clock."""
+
+    def __init__(self, start, sun=None, weather=None, light=None,
+                 remote_entity=DEFAULT_REMOTE, weather_entity=DEFAULT_WEATHER,
+                 ir_send_seconds=0.0, trace=None, log_file=None, echo_log=False,
+                 unavailable_until=None, sensor=None):
+        self.now = start
+        self.states = {}
+        self.weather = weather or WeatherStub()
+        self.providers = {
+            'sun.sun': (sun or SunStub()).state,
+            weather_entity: lambda now: State(weather_entity, self.weather.timeline(now)),
+        }
+        # entity_id -> moment its integration finishes loading (unavailable before)
+        self.unavailable_until = dict(unavailable_until or {})
+        self.weather_entity = weather_entity
+        self.light = light or LightStub()
+        self.sensor = sensor
+        if sensor is not None:
+            for index, channel in enumerate(SENSOR_CHANNELS):
+                entity_id = f'sensor.aquarium_light_{channel}'
+                self.providers[entity_id] = lambda now, entity_id=entity_id, index=index: State(
+                    entity_id, sensor.reading(now, self.light.levels)[index],
+                    {'unit_of_measurement': '%'})
+        self.remote_entity = remote_entity
+        self.ir_send_seconds = ir_send_seconds
+        self.trace = trace
+        self.trace_origin = start
+        self.log_file = log_file
+        self.echo_log = echo_log
+        self.templates = TemplateEngine(self)
+        self.scripts = {}
+        self.automations = {}
+        self.services = {}
+        self.commands = []
+        self.service_calls = 0
+        self.steps_executed = 0
+        self.logs = []
+        self.errors = []
+        self.automation_runs = {}
+        self.script_runs = []  # (object_id, started, finished) of every completed script run
+        self._running = {}
+        self._context = _SYSTEM    # Context of the run being stepped
+        self._pending = {}         # (kind, object_id) -> runs waiting under `mode: queued`
+        self._state_triggers = {}  # entity_id -> [(automation object_id, trigger)]
+        self._triggers_fired = 0
+        self._queue = []
+        self._sequence = 0
+        self._register_services()
+        self.set_state(remote_entity, 'on')
+        # Exported metrics describe the most recently created stand-in
+        FORECAST_CACHE_AGE.set_function(self.forecast_cache_age)
+
+    # -- states ------------------------------------------------------------
+
+    def available(self, entity_id):
+        """Return whether an entity's integration has finished loading."""
+        ready = self.unavailable_until.get(entity_id)
+        return ready is None or self.now >= ready
+
+    def get_state(self, entity_id):
+        """Return the State for an entity, computing dynamic entities on demand."""
+        if not self.available(entity_id):
+            return State(entity_id, 'unavailable')
+        provider = self.providers.get(entity_id)
+        if provider is not None:
+            return provider(self.now)
+        return self.states.get(entity_id)
+
+    def forecast_cache_age(self):
+        """Seconds since the forecast cache was written (NaN when empty or unreadable)."""
+        state = self.states.get(FORECAST_CACHE)
+        try:
+            # input_text stores the str() of the rendered dict, which is not always JSON
+            cache = _from_json(state.state, None) or ast.literal_eval(state.state)
+            cached_at = datetime.fromisoformat(cache['cached_at'])
+        except (AttributeError, KeyError, TypeError, ValueError, SyntaxError):
+            return math.nan
+        return (self.now - cached_at.replace(tzinfo=None)).total_seconds()
+
+    def drift(self):
+        """Summed |physical - helper| over the four channels."""
+        total = 0
+        for channel in CHANNELS:
+            state = self.states.get(f'input_number.hygger_{channel}_level')
+            helper = _forgiving_int(state.state, 0) if state is not None else 0
+            total += abs(self.light.levels[channel] - helper)
+        return total
+
+    def set_state(self, entity_id, state, attributes=None, context=None):
+        """Set an entity's state, keeping existing attributes unless replaced.
+
+        Without a context the change belongs to the run being stepped, if any.
+        """
+        previous = self.states.get(entity_id)
+        if attributes is None and previous is not None:
+            attributes = previous.attributes
+        if context is None:
+            context = self._context
+        new = self.states[entity_id] = State(entity_id, state, attributes, self.now, context)
+        if previous is not None and previous.state != new.state:
+            for object_id, trigger in self._state_triggers.get(entity_id, ()):
+                self._fire_state_trigger(object_id, trigger, previous, new)
+
+    def set_by_user(self, entity_id, value, user_id='dashboard'):
+        """Change a helper as a person would from the dashboard (a context with a user)."""
+        state = self.states[entity_id]
+        if entity_id.startswith('input_number.'):
+            low, high = state.attributes.get('min', value), state.attributes.get('max', value)
+            value = float(max(low, min(high, value)))
+        self.set_state(entity_id, value, context=Context(user_id))
+
+    def press_by_user(self, entity_id, user_id='dashboard'):
+        """Start a script as a dashboard button would (`script.turn_on` in a user's context)."""
+        self._context = Context(user_id)
+        try:
+            for _ in self.call_service('script.turn_on', [entity_id], {}):
+                pass
+        finally:
+            self._context = _SYSTEM
+
+    # -- configuration -----------------------------------------------------
+
+    def load_helpers(self, directory):
+        """Create helper entities from the helpers/*.yaml definitions."""
+        for filename in sorted(os.listdir(directory)):
+            if not filename.endswith(('.yaml', '.yml')):
+                continue
+            with open(os.path.join(directory, filename)) as file:
+                config = yaml.safe_load(file) or {}
+            for domain, entities in config.items():
+                for object_id, options in (entities or {}).items():
+                    options = options or {}
+                    if domain == 'input_number':
+                        restored = RESTORED_STATES.get(f'{domain}.{object_id}',
+                                                       options.get('min', 0))
+                        initial = float(options.get('initial', restored))
+                        self.set_state(f'{domain}.{object_id}', initial, {
+                            'min': options.get('min', 0), 'max': options.get('max', 100),
+                            'step': options.get('step', 1)})
+                    elif domain == 'input_boolean':
+                        self.set_state(f'{domain}.{object_id}',
+                                       'on' if options.get('initial') else 'off')
+                    elif domain == 'input_text':
+                        self.set_state(f'{domain}.{object_id}', options.get('initial', ''),
+                                       {'max': options.get('max', 100)})
+                    else:
+                        self.set_state(f'{domain}.{object_id}', options.get('initial', 'unknown'))
+
+    def load_scripts(self, directory):
+        """Register every scripts/*.yaml file as script.<filename>."""
+        for filename in sorted(os.listdir(directory)):
+            if filename.endswith(('.yaml', '.yml')):
+                with open(os.path.join(directory, filename)) as file:
+                    config = yaml.safe_load(file)
+                object_id = os.path.splitext(filename)[0]
+                self.scripts[object_id] = config
+                self.set_state(f'script.{object_id}', 'off')
+
+    def load_automations(self, directory):
+        """Register every automations/*.yaml file as automation.<slugified alias>."""
+        for filename in sorted(os.listdir(directory)):
+            if filename.endswith(('.yaml', '.yml')):
+                with open(os.path.join(directory, filename)) as file:
+                    config = yaml.safe_load(file)
+                object_id = slugify(config.get('alias') or os.path.splitext(filename)[0])
+                self.automations[object_id] = config
+                self.automation_runs[object_id] = 0
+                self.set_state(f'automation.{object_id}', 'on')
+                for trigger in _as_list(config.get('trigger', config.get('triggers'))):
+                    if trigger.get('platform', trigger.get('trigger')) == 'state':
+                        for entity_id in _as_list(trigger.get('entity_id')):
+                            self._state_triggers.setdefault(entity_id, []).append(
+                                (object_id, trigger))
+
+    def load_config(self, root='.'):
+        """Load helpers, scripts and automations from a repository checkout."""
+        self.load_helpers(os.path.join(root, 'helpers'))
+        self.load_scripts(os.path.join(root, 'scripts'))
+        self.load_automations(os.path.join(root, 'automations'))
+
+    # -- event loop --------------------------------------------------------
+
+    def _schedule(self, when, callback):
+        self._sequence += 1
+        heapq.heappush(self._queue, (when, self._sequence, callback))
+
+    def _start(self, kind, object_id, generator, context=None):
+        """Start a run as a new task, honouring `mode: single` and `mode: queued`.
+
+        The run keeps `context`, by default that of whoever started it.
+        """
+        key = (kind, object_id)
+        if context is None:
+            context = self._context
+        if key in self._running:
+            config = (self.automations if kind == 'automation' else self.scripts)[object_id]
+            pending = self._pending.setdefault(key, deque())
+            if config.get('mode') == 'queued' and len(pending) < config.get('max', 10):
+                run = _Run(kind, object_id, generator, context=context)
+                pending.append(run)
+                return run
+            self.write_log(f"{kind.title()} '{object_id}': Already running", 'warning',
+                           f'homeassistant.components.{kind}')
+            return None
+        run = _Run(kind, object_id, generator, self.now, context)
+        self._begin(run)
+        return run
+
+    def _begin(self, run):
+        run.started = self.now
+        self._running[(run.kind, run.object_id)] = run
+        if run.kind == 'script':
+            self._script_started(run.object_id)
+        self._schedule(self.now, lambda: self._step(run))
+
+    def _step(self, run):
+        """Advance a run until its next delay."""
+        if run.done:  # Stopped by script.turn_off while waiting
+            return
+        self._context = run.context
+        try:
+            delay = next(run.generator)
+        except StopIteration:
+            self._finish(run)
+            return
+        except _StopSequence:
+            self._finish(run)
+            return
+        except Exception as error:  # Mirrors HA logging the error and aborting the run
+            self.errors.append((self.now, run.kind, run.object_id, repr(error)))
+            self.write_log(f"Error executing {run.kind} {run.object_id}: {error}", 'error',
+                           f'homeassistant.components.{run.kind}')
+            self._finish(run)
+            return
+        finally:
+            self._context = _SYSTEM
+        self._schedule(self.now + timedelta(seconds=delay), lambda: self._step(run))
+
+    def _finish(self, run):
+        run.done = True
+        key = (run.kind, run.object_id)
+        self._running.pop(key, None)
+        if run.kind == 'script':
+            self._script_finished(run.object_id, run.started)
+        pending = self._pending.get(key)
+        if pending:
+            self._begin(pending.popleft())
+
+    def stop_script(self, object_id):
+        """`script.turn_off`: end the running and queued runs of a script at their current step.
+
+        A script called directly from another run ends there and its caller carries on.
+        """
+        for run in self._pending.pop(('script', object_id), ()):
+            run.done = True
+        run = self._running.get(('script', object_id))
+        if run is None:
+            return
+        if run.generator is None:
+            run.cancelled = True
+        else:
+            run.generator.close()
+            self._finish(run)
+
+    def _script_started(self, object_id):
+        self.set_state(f'script.{object_id}', 'on')
+        if object_id == RESET_SCRIPT:
+            _RESET_CORRECTIONS.inc(self.drift())
+
+    def _script_finished(self, object_id, started):
+        self.set_state(f'script.{object_id}', 'off')
+        self.script_runs.append((object_id, started, self.now))
+        if object_id == RECONCILE_SCRIPT:
+            _RECONCILE_SECONDS.observe((self.now - started).total_seconds())
+
+    def is_running(self, kind, object_id):
+        """Return whether a script or automation run is in flight."""
+        return (kind, object_id) in self._running
+
+    def run_until(self, end):
+        """Process triggers and runs until the virtual clock reaches `end`."""
+        self._arm_time_triggers(end)
+        while self._queue and self._queue[0][0] <= end:
+            when, _, callback = heapq.heappop(self._queue)
+            self.now = max(self.now, when)
+            callback()
+        self.now = end
+        _EVENT_QUEUE.set(len(self._queue))
+        _ACTIVE_RUNS.set(len(self._running))
+
+    def start(self):
+        """Fire `homeassistant: start` triggers."""
+        for object_id, config in self.automations.items():
+            for trigger in _as_list(config.get('trigger', config.get('triggers'))):
+                if trigger.get('platform', trigger.get('trigger')) == 'homeassistant' \
+                        and trigger.get('event') == 'start' and self.enabled(object_id):
+                    self.fire_automation(object_id, trigger)
+
+    def _arm_time_triggers(self, end):
+        """Schedule time and time_pattern triggers up to `end`."""
+        for object_id, config in self.automations.items():
+            for trigger in _as_list(config.get('trigger', config.get('triggers'))):
+                platform = trigger.get('platform', trigger.get('trigger'))
+                if platform not in ('time', 'time_pattern'):
+                    continue
+                for moment in _trigger_times(platform, trigger, self.now, end):
+                    self._schedule(moment, lambda o=object_id, t=trigger:
+                                   self.enabled(o) and self.fire_automation(o, t))
+
+    def enabled(self, object_id):
+        """Return whether an automation is on; triggers of one turned off are ignored."""
+        state = self.states.get(f'automation.{object_id}')
+        return state is None or state.state != 'off'
+
+    def _fire_state_trigger(self, object_id, trigger, old, new):
+        """Run a `state` trigger for a change, like HA's state_changed listeners (next tick)."""
+        if 'to' in trigger and new.state not in [str(s) for s in _as_list(trigger['to'])]:
+            return
+        if 'from' in trigger and old.state not in [str(s) for s in _as_list(trigger['from'])]:
+            return
+        data = {'entity_id': new.entity_id, 'from_state': old, 'to_state': new}
+        self._triggers_fired += 1
+        self._schedule(self.now, lambda: self.enabled(object_id)
+                       and self.fire_automation(object_id, trigger, data=data))
+
+    def fire_automation(self, object_id, trigger=None, skip_condition=False, data=None):
+        """Evaluate conditions and start an automation run."""
+        config = self.automations[object_id]
+        variables = {'trigger': {'id': (trigger or {}).get('id', '0'),
+                                 'platform': (trigger or {}).get('platform'), **(data or {})}}
+        variables.update(config.get('variables') or {})
+        if not skip_condition:
+            try:
+                if not all(self._condition(c, variables)
+                           for c in _as_list(config.get('condition', config.get('conditions')))):
+                    return None
+            except Exception as error:
+                self.errors.append((self.now, 'automation', object_id, repr(error)))
+                return None
+        self.automation_runs[object_id] += 1
+        actions = config.get('action', config.get('actions'))
+        # Like HA, an automation runs in a context of its own, without a user
+        return self._start('automation', object_id, self._sequence_runner(actions, variables),
+                           context=_SYSTEM)
+
+    # -- actions -----------------------------------------------------------
+
+    def _script_sequence(self, config, variables):
+        """Run a script: script-level `variables` are rendered after the passed-in ones."""
+        for key, value in (config.get('variables') or {}).items():
+            variables[key] = self.templates.render_complex(value, variables)
+        yield from self._sequence_runner(config.get('sequence'), variables)
+
+    def _sequence_runner(self, actions, variables):
+        """Run a list of actions; yields delays in seconds."""
+        for action in _as_list(actions):
+            self.steps_executed += 1
+            yield from self._action(action, variables)
+
+    def _action(self, action, variables):
+        if 'service' in action or 'action' in action:
+            yield from self._service_step(action, variables)
+        elif 'delay' in action:
+            yield _duration_seconds(self.templates.render_complex(action['delay'], variables))
+        elif 'variables' in action:
+            for key, value in action['variables'].items():
+                variables[key] = self.templates.render_complex(value, variables)
+        elif 'choose' in action:
+            for option in _as_list(action['choose']):
+                if all(self._condition(c, variables) for c in _as_list(option.get('conditions'))):
+                    yield from self._sequence_runner(option.get('sequence'), variables)
+                    return
+            if 'default' in action:
+                yield from self._sequence_runner(action['default'], variables)
+        elif 'repeat' in action:
+            yield from self._repeat(action['repeat'], variables)
+        elif 'condition' in action:
+            if not self._condition(action, variables):
+                raise _StopSequence()
+        elif 'stop' in action:
+            raise _StopSequence()
+        elif 'wait_template' in action:
+            yield from self._wait_template(action, variables)
+        else:
+            raise ServiceNotFound(f"Unsupported action: {sorted(action)}")
+
+    def _repeat(self, repeat, variables):
+        outer = variables.get('repeat', _MISSING)
+        count = None
+        items = None
+        if 'count' in repeat:
+            count = int(self.templates.render_complex(repeat['count'], variables))
+        elif 'for_each' in repeat:
+            items = _as_list(self.templates.render_complex(repeat['for_each'], variables))
+            count = len(items)
+        index = 0
+        while True:
+            index += 1
+            if count is not None and index > count:
+                break
+            variables['repeat'] = {'index': index, 'first': index == 1,
+                                   'last': count is not None and index == count}
+            if items is not None:
+                variables['repeat']['item'] = items[index - 1]
+            if 'while' in repeat and not all(self._condition(c, variables)
+                                             for c in _as_list(repeat['while'])):
+                break
+            yield from self._sequence_runner(repeat['sequence'], variables)
+            if 'until' in repeat and all(self._condition(c, variables)
+                                         for c in _as_list(repeat['until'])):
+                break
+        if outer is _MISSING:
+            variables.pop('repeat', None)
+        else:
+            variables['repeat'] = outer
+
+    def _wait_template(self, action, variables, poll_seconds=1.0):
+        timeout = action.get('timeout')
+        timeout = None if timeout is None else _duration_seconds(
+            self.templates.render_complex(timeout, variables))
+        waited = 0.0
+        while not self.templates.render(action['wait_template'], variables):
+            if timeout is not None and waited >= timeout:
+                variables['wait'] = {'completed': False, 'remaining': 0}
+                if not action.get('continue_on_timeout', True):
+                    raise _StopSequence()
+                return
+            yield poll_seconds
+            waited += poll_seconds
+        variables['wait'] = {'completed': True,
+                             'remaining': None if timeout is None else timeout - waited}
+
+    def _condition(self, condition, variables):
+        """Evaluate a condition dict or a template shorthand string."""
+        if isinstance(condition, str):
+            return bool(self.templates.render(condition, variables))
+        kind = condition.get('condition')
+        if kind == 'template':
+            return bool(self.templates.render(condition['value_template'], variables))
+        if kind == 'state':
+            expected = [str(s) for s in _as_list(condition['state'])]
+            return all(self.templates._states(entity_id) in expected
+                       for entity_id in _as_list(condition['entity_id']))
+        if kind == 'and':
+            return all(self._condition(c, variables) for c in condition['conditions'])
+        if kind == 'or':
+            return any(self._condition(c, variables) for c in condition['conditions'])
+        if kind == 'not':
+            return not any(self._condition(c, variables) for c in condition['conditions'])
+        raise ServiceNotFound(f"Unsupported condition: {kind}")
+
+    def _service_step(self, action, variables):
+        service = self.templates.render_complex(action.get('service', action.get('action')),
+                                                variables)
+        data = dict(self.templates.render_complex(action.get('data') or {}, variables))
+        target = self.templates.render_complex(action.get('target') or {}, variables)
+        entity_ids = _as_list(target.get('entity_id', data.pop('entity_id', None)))
+        self.service_calls += 1
+        fired = self._triggers_fired
+        try:
+            response = yield from self.call_service(service, entity_ids, data)
+        except (ServiceError, ValueError) as error:
+            if not action.get('continue_on_error'):
+                raise
+            self.write_log(f"Error in {service} (continued): {error}", 'warning',
+                           'homeassistant.helpers.script')
+            return
+        if self._triggers_fired != fired:
+            # HA awaits every service call, so automations the call triggered evaluate
+            # their conditions before the script goes on
+            yield 0
+        if action.get('response_variable'):
+            variables[action['response_variable']] = response
+
+    def call_service(self, service, entity_ids, data):
+        """Dispatch a service call; generator returning the service response."""
+        domain, _, name = service.partition('.')
+        if domain == 'script' and name not in ('turn_on', 'turn_off'):
+            return (yield from self._run_script_blocking(name, data))
+        handler = self.services.get(service)
+        if handler is None:
+            raise ServiceNotFound(service)
+        result = handler(entity_ids, data)
+        if hasattr(result, 'send'):
+            result = yield from result
+        return result
+
+    def _run_script_blocking(self, object_id, data):
+        """`service: script.x` waits for the script to finish (mode: single applies)."""
+        if self.is_running('script', object_id):
+            self.write_log(f"Script '{object_id}': Already running", 'warning',
+                           'homeassistant.components.script')
+            return None
+        config = self.scripts[object_id]
+        key = ('script', object_id)
+        run = self._running[key] = _Run('script', object_id, None, self.now, self._context)
+        self._script_started(object_id)
+        sequence = self._script_sequence(config, dict(data))
+        try:
+            for delay in sequence:
+                yield delay
+                if run.cancelled:
+                    break
+        except _StopSequence:
+            pass
+        finally:
+            # Also ends whatever the script was doing when it was stopped (a send in progress)
+            sequence.close()
+            self._running.pop(key, None)
+            self._script_finished(object_id, run.started)
+        return None
+
+    def write_log(self, message, level='info', logger=DEFAULT_LOGGER):
+        """Record a log line (and append it in home-assistant.log format if configured)."""
+        message = ' '.join(str(message).split())
+        self.logs.append((self.now, level, logger, message))
+        line = (f"{self.now.strftime('%Y-%m-%d %H:%M:%S')}.{self.now.microsecond // 1000:03d} "
+                f"{level.upper()} (MainThread) [{logger}] {message}")
+        if self.log_file is not None:
+            self.log_file.write(line + '\n')
+        if self.echo_log:
+            print(line)
+
+    # -- services ----------------------------------------------------------
+
+    def _register_services(self):
+        self.services.update({
+            'remote.send_command': self._svc_send_command,
+            'input_number.set_value': self._svc_set_number,
+            'input_text.set_value': self._svc_set_text,
+            'input_boolean.turn_on': lambda ids, data: [self.set_state(e, 'on') for e in ids],
+            'input_boolean.turn_off': lambda ids, data: [self.set_state(e, 'off') for e in ids],
+            'system_log.write': self._svc_system_log,
+            'weather.get_forecasts': self._svc_get_forecasts,
+            'automation.trigger': self._svc_automation_trigger,
+            'automation.turn_on': lambda ids, data: [self.set_state(e, 'on') for e in ids],
+            'automation.turn_off': lambda ids, data: [self.set_state(e, 'off') for e in ids],
+            'script.turn_on': self._svc_script_turn_on,
+            'script.turn_off': lambda ids, data: [self.stop_script(e.partition('.')[2])
+                                                  for e in ids],
+        })
+
+    def _svc_send_command(self, entity_ids, data):
+        for entity_id in entity_ids:
+            if entity_id != self.remote_entity:
+                raise ServiceError(f"Entity {entity_id} not found")
+            if not self.available(entity_id):
+                # HA only warns about targets that are not loaded yet; nothing is sent
+                self.write_log(f"Referenced entities {entity_id} are missing or not currently "
+                               f"available", 'warning', 'homeassistant.helpers.service')
+                return None
+        commands = _as_list(data.get('command'))
+        repeats = int(data.get('num_repeats', 1))
+        delay = float(data.get('delay_secs', 0.4))
+        first = True
+        # Like the Broadlink integration, num_repeats repeats the whole list
+        # (w, r, w, r, ...) and delay_secs separates every pair of commands
+        for _ in range(repeats):
+            for command in commands:
+                if not first and delay:
+                    yield delay
+                first = False
+                self.light.apply(command)
+                self.commands.append((self.now, command))
+                IR_COMMANDS.labels('runtime', *command_labels(command)).inc()
+                if self.trace is not None and command.rpartition('_')[2] in ('up', 'down'):
+                    self.trace.record_command(
+                        command, t_ms=int((self.now - self.trace_origin).total_seconds() * 1000))
+                if self.ir_send_seconds:
+                    yield self.ir_send_seconds
+        return None
+
+    def _svc_set_number(self, entity_ids, data):
+        for entity_id in entity_ids:
+            state = self.states.get(entity_id)
+            attributes = state.attributes if state else {}
+            value = float(data['value'])
+            low, high = attributes.get('min', value), attributes.get('max', value)
+            if not low <= value <= high:
+                raise ServiceError(f"Invalid value for {entity_id}: {value} (range {low} - {high})")
+            self.set_state(entity_id, value)
+
+    def _svc_set_text(self, entity_ids, data):
+        for entity_id in entity_ids:
+            value = str(data['value']).strip()
+            limit = (self.states.get(entity_id) or State(entity_id, '')).attributes.get('max', 255)
+            if len(value) > limit:
+                raise ServiceError(f"Invalid value for {entity_id}: too long ({len(value)} > {limit})")
+            self.set_state(entity_id, value)
+
+    def _svc_system_log(self, entity_ids, data):
+        self.write_log(data.get('message', ''), data.get('level', 'error'),
+                       data.get('logger', DEFAULT_LOGGER))
+
+    def _svc_get_forecasts(self, entity_ids, data):
+        response = {}
+        for entity_id in entity_ids:
+            if entity_id != self.weather_entity or not self.available(entity_id):
+                raise ServiceError(f"Entity {entity_id} not found")
+            response[entity_id] = {'forecast': self.weather.forecast(data.get('type', 'daily'),
+                                                                     self.now)}
+        return response
+
+    def _svc_automation_trigger(self, entity_ids, data):
+        for entity_id in entity_ids:
+            object_id = entity_id.partition('.')[2]
+            run = self.fire_automation(object_id, {'id': 'manual'},
+                                       skip_condition=data.get('skip_condition', True))
+            # automation.trigger waits for the triggered run to finish
+            while run is not None and not run.done:
+                yield 0.1
+
+    def _svc_script_turn_on(self, entity_ids, data):
+        extra = sorted(set(data) - {'variables'})
+        if extra:
+            # script.turn_on only accepts `variables`; HA rejects other keys
+            raise ServiceError(f"extra keys not allowed @ data['{extra[0]}']")
+        variables = dict(data.get('variables') or {})
+        for entity_id in entity_ids:
+            object_id = entity_id.partition('.')[2]
+            config = self.scripts[object_id]
+            self._start('script', object_id, self._script_sequence(config, dict(variables)))
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _duration_seconds(value):
+    """Convert an HA delay/timeout value (dict, 'HH:MM:SS' or number) to seconds."""
+    if isinstance(value, dict):
+        return (float(value.get('days', 0)) * 86400 + float(value.get('hours', 0)) * 3600
+                + float(value.get('minutes', 0)) * 60 + float(value.get('seconds', 0))
+                + float(value.get('milliseconds', 0)) / 1000)
+    if isinstance(value, str) and ':' in value:
+        parts = [float(part) for part in value.split(':')]
+        while len(parts) < 3:
+            parts.append(0.0)
+        return parts[0] * 3600 + parts[1] * 60 + parts[2]
+    return float(value)
+
+
+def _pattern_matches(pattern, value):
+    """Match one time_pattern field ('*', '/N' or an exact value)."""
+    if pattern is None:
+        return None
+    pattern = str(pattern)
+    if pattern == '*':
+        return True
+    if pattern.startswith('/'):
+        return value % int(pattern[1:]) == 0
+    return value == int(pattern)
+
+
+def _trigger_times(platform, trigger, start, end):
+    """Yield the moments in (start, end] at which a time trigger fires."""
+    if platform == 'time':
+        for at in _as_list(trigger.get('at')):
+            hour, minute, second = (int(float(part)) for part in (str(at).split(':') + ['0', '0'])[:3])
+            moment = start.replace(hour=hour, minute=minute, second=second, microsecond=0)
+            if moment <= start:
+                moment += timedelta(days=1)
+            while moment <= end:
+                yield moment
+                moment += timedelta(days=1)
+        return
+    hours, minutes, seconds = trigger.get('hours'), trigger.get('minutes'), trigger.get('seconds')
+    # Like Home Assistant, unspecified fields smaller than the largest given one default to 0
+    if seconds is None:
+        seconds = 0
+    if minutes is None and hours is not None:
+        minutes = 0
+    moment = start.replace(microsecond=0) + timedelta(seconds=1)
+    step = timedelta(minutes=1) if seconds is not None and str(seconds) == '0' else timedelta(seconds=1)
+    if step == timedelta(minutes=1):
+        moment = moment.replace(second=0)
+        if moment <= start:
+            moment += step
+    while moment <= end:
+        if (_pattern_matches(hours, moment.hour) is not False
+                and _pattern_matches(minutes, moment.minute) is not False
+                and _pattern_matches(seconds, moment.second) is not False):
+            yield moment
+        moment += step
+
+
+def build_runtime(start, root='.', **options):
+    """Create a stand-in with the repository's helpers, scripts and automations loaded."""
+    hass = HomeAssistantStub(start, **options)
+    hass.load_config(root)
+    return hass
+
+
+def main():
+    """Run the real automation YAML over simulated days and report the command trace."""
+    parser = argparse.ArgumentParser(description="Run the aquarium automations in virtual time")
+    parser.add_argument('--date', default=datetime.now().strftime('%Y-%m-%d'),
+                        help="First simulated day (YYYY-MM-DD)")
+    parser.add_argument('--days', type=float, default=1.0, help="Number of days to simulate")
+    parser.add_argument('--weather', default='sunny', help="Constant forecast condition")
+    parser.add_argument('--weather-fail-rate', type=float, default=0.0,
+                        help="Probability that a weather.get_forecasts call fails")
+    parser.add_argument('--trace', metavar='PATH', help="Write IR commands to an ir_trace file")
+    parser.add_argument('--log', metavar='PATH', help="Write system_log output in HA log format")
+    parser.add_argument('--verbose', action='store_true', help="Echo log lines while running")
+    import metrics
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+
+    start = datetime.strptime(args.date, '%Y-%m-%d')
+    end = start + timedelta(days=args.days)
+    trace = None
+    if args.trace:
+        from ir_trace import TraceWriter
+        trace = TraceWriter(args.trace)
+    log_file = open(args.log, 'w') if args.log else None
+
+    print("🏠 Hygger Aquarium - Home Assistant Stand-in")
+    print("=" * 60)
+    print(f"📅 Simulating {start:%Y-%m-%d %H:%M} → {end:%Y-%m-%d %H:%M} "
+          f"(weather: {args.weather})")
+
+    server = metrics.start(args)
+    wall_start = time.perf_counter()
+    hass = build_runtime(start, weather=WeatherStub(args.weather, args.weather_fail_rate),
+                         trace=trace, log_file=log_file, echo_log=args.verbose)
+    hass.start()
+    hass.run_until(end)
+    wall = time.perf_counter() - wall_start
+
+    if trace is not None:
+        trace.close()
+    if log_file is not None:
+        log_file.close()
+
+    counts = {}
+    for _, command in hass.commands:
+        counts[command] = counts.get(command, 0) + 1
+    print(f"\n⏱️  Simulated {args.days:g} day(s) in {wall:.2f}s wall time")
+    print(f"🤖 Automation runs: {sum(hass.automation_runs.values())}")
+    for object_id, runs in sorted(hass.automation_runs.items()):
+        print(f"   • {object_id}: {runs}")
+    print(f"🧮 Script steps executed: {hass.steps_executed:,}  Service calls: {hass.service_calls:,}")
+    print(f"📡 IR commands sent: {len(hass.commands):,}")
+    for command, count in sorted(counts.items()):
+        print(f"   • {command:>18}: {count:,}")
+    helpers = {c: int(float(hass.states[f'input_number.hygger_{c}_level'].state)) for c in CHANNELS}
+    print(f"💾 Final helper levels:   {helpers}")
+    print(f"💡 Final physical levels: {hass.light.levels}")
+    if hass.errors:
+        print(f"\n⚠️  {len(hass.errors)} run error(s):")
+        for moment, kind, object_id, error in hass.errors[:10]:
+            print(f"   {moment:%H:%M:%S} {kind}.{object_id}: {error}")
+    else:
+        print("✅ No run errors")
+    metrics.finish(args, server)
+
+
+if __name__ == "__main__":
+    main()
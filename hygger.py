@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Hygger Command Line
+One entry point for the repository's tools: `python3 hygger.py <command> [options]`.
+
+Every command is the `main()` of one of the root scripts, run with the options that
+follow the command name. The script's module is imported only when its command
+runs, so a quick command like `hygger.py diagnose now` loads the scalar engine and
+nothing else - NumPy, PyYAML and Jinja2 are imported by the commands (or the
+options) that need them. All commands evaluate the lights through the same
+lighting_engine and ephemeris modules, so within one process they share one
+engine and its sunrise/sunset cache.
+"""
+import importlib
+import sys
+import time
+
+# command: (module, description); the module's main() parses the remaining arguments
+COMMANDS = {
+    'diagnose': ('diagnose_lighting', "Expected light levels now or at a moment; anomaly scans"),
+    'weather': ('test_weather_conditions', "Light levels by time of day and weather condition"),
+    'profiles': ('photoperiod', "Compile photoperiod profiles and compare their curves"),
+    'seasons': ('test_seasonal_lighting', "Sunrise, sunset and day length through the year"),
+    'scenarios': ('simulate_lighting_scenarios', "Sunrise, sunset, weather and recovery scenarios"),
+    'run-scenarios': ('scenario_runner', "Check scenarios/*.yaml against the automations"),
+    'schedules': ('compare_schedules', "Fixed vs dynamic schedules, multi-location export"),
+    'test-lights': ('test_lights', "Preview or verify the light test script"),
+    'validate': ('validate_config', "Validate the YAML configuration"),
+    'entities': ('check_entities', "Check entity IDs referenced by the configuration"),
+    'runtime': ('ha_runtime', "Run the automations and scripts in the HA stand-in"),
+    'reconcile': ('reconcile_planner', "Compare IR emission strategies and command orders"),
+    'state': ('light_state', "Packed light states vs level dicts in long replays"),
+    'deadband': ('deadband', "Level flip-flops with and without the dead-band"),
+    'weather-blend': ('weather_blend', "IR bursts with condition-stepped vs blended weather"),
+    'owm': ('owm_standin', "OpenWeatherMap stand-in and weather client request counts"),
+    'lookahead': ('lookahead_scheduler', "Schedule lag: IR sent reactively vs sent ahead"),
+    'pacing': ('ir_pacing', "Adaptive IR pacing on a simulated receiver"),
+    'startup': ('simulate_startup_sync', "Restarts and time until the light is correct"),
+    'contention': ('simulate_contention', "Concurrent writers: lost slider changes and drift"),
+    'drift': ('drift_montecarlo', "Monte Carlo helper-vs-light drift on a lossy IR link"),
+    'feedback': ('light_feedback', "Calibrate the colour sensor; feedback vs nightly reset"),
+    'logs': ('log_analyzer', "Summarize the aquarium lines of home-assistant.log"),
+    'trace': ('ir_trace', "Inspect and diff IR command traces"),
+}
+
+
+def print_usage(file=sys.stdout):
+    """List the commands."""
+    print("🐠 Hygger aquarium lighting tools", file=file)
+    print("usage: hygger.py [--time] <command> [options]   (hygger.py <command> -h for options)",
+          file=file)
+    print(file=file)
+    width = max(len(name) for name in COMMANDS)
+    for name, (_, description) in COMMANDS.items():
+        print(f"  {name:<{width}}  {description}", file=file)
+
+
+def run(command, argv):
+    """Run one command's main() with `argv` as its arguments; returns its exit status."""
+    module_name, _ = COMMANDS[command]
+    module = importlib.import_module(module_name)
+    saved = sys.argv
+    sys.argv = [f"hygger.py {command}", *argv]
+    try:
+        return module.main() or 0
+    finally:
+        sys.argv = saved
+
+
+def main(argv=None):
+    """Dispatch to a command."""
+    argv = sys.argv[1:] if argv is None else list(argv)
+    timed = bool(argv) and argv[0] == '--time'
+    if timed:
+        argv = argv[1:]
+    if not argv or argv[0] in ('-h', '--help', 'help'):
+        print_usage()
+        return 0
+    command, *rest = argv
+    if command not in COMMANDS:
+        print(f"❌ Unknown command: {command}\n", file=sys.stderr)
+        print_usage(sys.stderr)
+        return 2
+    started = time.perf_counter()
+    status = run(command, rest)
+    if timed:
+        print(f"\n⏱️  {command} took {(time.perf_counter() - started) * 1000:.1f} ms "
+              f"({len(sys.modules)} modules loaded)", file=sys.stderr)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
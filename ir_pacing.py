@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""
+Hygger IR Pacing Controller
+Learns the shortest reliable delay between IR commands instead of the fixed 500 ms.
+
+AIMDPacer keeps one delay per command type. Every `ack_window` consecutive
+acknowledged commands tighten that delay by a fixed step (additive decrease); a
+detected drop or a verification mismatch multiplies it by `backoff` (multiplicative
+increase). The pacer is evaluated against ReceiverModel, a simulated HG016 IR
+receiver whose drop probability depends on the gap since the previous burst, over
+a workload built from the real circadian engine plus the nightly reset.
+
+The YAML scripts read their pacing from `input_number.hygger_ir_delay_ms`
+(falling back to 500 ms); this tool prints the value to put there.
+"""
+import argparse
+import math
+import random
+from bisect import bisect_left
+from datetime import datetime, timedelta
+
+from lighting_engine import CHANNELS, MAX_LEVEL, levels_at
+
+DEFAULT_DELAY_MS = 500
+
+# Airtime of one NEC-style IR frame; nothing can be sent faster than this
+FRAME_MS = 70
+
+# (gap since previous burst in ms, drop probability), linearly interpolated.
+# The HG016 receiver needs roughly a frame plus a short recovery before it decodes again.
+DEFAULT_CURVE = ((80, 1.0), (150, 0.6), (220, 0.15), (300, 0.02), (400, 0.002), (600, 0.0005))
+
+
+def parse_curve(text):
+    """Parse 'gap_ms:probability,...' into a sorted curve."""
+    points = []
+    for item in text.split(','):
+        gap, _, probability = item.partition(':')
+        points.append((float(gap), float(probability)))
+    if not points:
+        raise argparse.ArgumentTypeError("curve needs at least one gap:probability point")
+    return tuple(sorted(points))
+
+
+def command_type(command, key='command'):
+    """Return the pacing key for a command: the command itself, its direction, or one shared key."""
+    if key == 'direction':
+        return command.rpartition('_')[2]
+    if key == 'global':
+        return 'all'
+    return command
+
+
+class ReceiverModel:
+    """Simulated IR receiver with a drop-vs-rate curve and optional per-command slowdowns."""
+
+    def __init__(self, curve=DEFAULT_CURVE, slow_commands=None, seed=None):
+        self.curve = tuple(sorted(curve))
+        self.gaps = [gap for gap, _ in self.curve]
+        self.slow_commands = dict(slow_commands or {})
+        self.random = random.Random(seed)
+        self.last_burst_ms = None
+
+    def drop_probability(self, gap_ms, command=None):
+        """Probability that a command arriving `gap_ms` after the previous burst is missed."""
+        gap_ms -= self.slow_commands.get(command, 0)
+        index = bisect_left(self.gaps, gap_ms)
+        if index == 0:
+            return self.curve[0][1]
+        if index == len(self.curve):
+            return self.curve[-1][1]
+        (x0, y0), (x1, y1) = self.curve[index - 1], self.curve[index]
+        return y0 + (y1 - y0) * (gap_ms - x0) / (x1 - x0)
+
+    def receive(self, command, t_ms):
+        """Return True if a command sent at `t_ms` is decoded."""
+        gap = float('inf') if self.last_burst_ms is None else t_ms - self.last_burst_ms
+        self.last_burst_ms = t_ms
+        return self.random.random() >= self.drop_probability(gap, command)
+
+
+class FixedPacer:
+    """The current behaviour: the same delay after every command."""
+
+    def __init__(self, delay_ms=DEFAULT_DELAY_MS):
+        self.delay = delay_ms
+
+    def delay_ms(self, command):
+        return self.delay
+
+    def acknowledge(self, command):
+        pass
+
+    def report_drop(self, command):
+        pass
+
+    def report_mismatch(self, commands):
+        pass
+
+    def delays(self):
+        return {'all': self.delay}
+
+
+class AIMDPacer:
+    """Additive-decrease / multiplicative-increase inter-command delay, per command type."""
+
+    def __init__(self, initial_ms=DEFAULT_DELAY_MS, min_ms=100, max_ms=2000, step_ms=10,
+                 backoff=1.5, ack_window=4, key='command'):
+        self.initial_ms = initial_ms
+        self.min_ms = min_ms
+        self.max_ms = max_ms
+        self.step_ms = step_ms
+        self.backoff = backoff
+        self.ack_window = ack_window
+        self.key = key
+        self._delays = {}
+        self._streaks = {}
+        self._averages = {}
+        self.backoffs = 0
+
+    def delay_ms(self, command):
+        """Gap to leave after the previous burst before sending `command`."""
+        return self._delays.get(command_type(command, self.key), self.initial_ms)
+
+    def _settle(self, kind):
+        # Smoothed operating point per type, used for the single YAML recommendation
+        delay = self._delays.get(kind, self.initial_ms)
+        self._averages[kind] = 0.95 * self._averages.get(kind, delay) + 0.05 * delay
+
+    def acknowledge(self, command):
+        """A command is known to have landed; tighten after a full window of successes."""
+        kind = command_type(command, self.key)
+        streak = self._streaks.get(kind, 0) + 1
+        if streak >= self.ack_window:
+            self._delays[kind] = max(self.min_ms, self.delay_ms(command) - self.step_ms)
+            streak = 0
+        self._streaks[kind] = streak
+        self._settle(kind)
+
+    def report_drop(self, command):
+        """A command is known to have been missed; back off that command type."""
+        kind = command_type(command, self.key)
+        self._delays[kind] = min(self.max_ms, self.delay_ms(command) * self.backoff)
+        self._streaks[kind] = 0
+        self.backoffs += 1
+        self._settle(kind)
+
+    def report_mismatch(self, commands):
+        """Verification found the lights off-target; back off every type in the batch once."""
+        for kind in {command_type(command, self.key): command for command in commands}.values():
+            self.report_drop(kind)
+
+    def delays(self):
+        """Return the learned delay per command type."""
+        return dict(sorted(self._delays.items()))
+
+    def recommended_ms(self, percentile=50, margin=1.1, resolution=10):
+        """A single delay from a percentile of the per-type smoothed delays, plus a margin.
+
+        Batch verification backs off every type in a mismatched batch, so the slowest type
+        says more about the feedback than about the receiver; a percentile is steadier.
+        """
+        averages = sorted(self._averages.values()) or [self.initial_ms]
+        typical = averages[min(len(averages) - 1, int(len(averages) * percentile / 100))]
+        value = min(self.max_ms, max(self.min_ms, typical * margin))
+        return int(math.ceil(value / resolution) * resolution)
+
+
+def reconcile_commands(current, target):
+    """Commands the reconcile script sends, channel by channel."""
+    commands = []
+    for channel, have, want in zip(CHANNELS, current, target):
+        direction = 'up' if want > have else 'down'
+        commands.extend([f"{channel}_{direction}"] * abs(want - have))
+    return commands
+
+
+def build_workload(days, start=None, idle_ms=60000, disturbances=6, seed=0):
+    """Return [(commands, idle_ms_after)] for `days` of IR traffic.
+
+    Each day has the nightly reset, the per-minute circadian reconciles, and
+    `disturbances` jumps to random levels (manual syncs, weather swings) that the
+    next reconcile then undoes; these produce the long multi-command batches.
+    """
+    start = start or datetime(datetime.now().year, 3, 1)
+    rng = random.Random(seed)
+    reset = [f"{channel}_down" for _ in range(12) for channel in CHANNELS]
+    batches = []
+    for day in range(days):
+        batches.append((reset, idle_ms))
+        levels = (0, 0, 0, 0)
+        jumps = set(rng.sample(range(1, 24 * 60), disturbances))
+        moment = start + timedelta(days=day, minutes=1)
+        for minute in range(1, 24 * 60):
+            target = tuple(levels_at(moment)['levels'][channel] for channel in CHANNELS)
+            if minute in jumps:
+                target = tuple(rng.randint(0, MAX_LEVEL) for _ in CHANNELS)
+            if target != levels:
+                batches.append((reconcile_commands(levels, target), idle_ms))
+                levels = target
+            moment += timedelta(minutes=1)
+    return batches
+
+
+def run_workload(pacer, receiver, workload, feedback='batch', max_attempts=5):
+    """Send the workload through the receiver, verifying after each batch.
+
+    The pacer's delay for a command is the gap left *before* sending it, so a drop is
+    charged to the gap that caused it, and only commands actually sent at the pacer's gap
+    (not after an idle period) count as evidence for tightening. `feedback='command'` models a per-command sensor
+    (every drop is seen immediately); `feedback='batch'` compares the physical state with
+    the helpers after each batch, backs off the command types of the channels that are
+    off-target, and re-sends the difference. Returns a stats dict.
+    """
+    physical = dict.fromkeys(CHANNELS, 0)
+    believed = dict.fromkeys(CHANNELS, 0)
+    stats = {'sent': 0, 'landed': 0, 'dropped': 0, 'ir_ms': 0.0, 'mismatches': 0,
+             'unresolved': 0}
+    clock = 0.0
+    last_send = float('-inf')
+
+    def send(command):
+        """Send one command; returns (landed, paced) where paced means the pacer set the gap."""
+        nonlocal clock, last_send
+        # Wait out the pacer's gap since the previous burst (an idle period already covers it)
+        paced_at = last_send + pacer.delay_ms(command)
+        sent_at = max(clock + FRAME_MS, paced_at)
+        stats['ir_ms'] += sent_at - clock
+        clock = last_send = sent_at
+        channel, _, direction = command.rpartition('_')
+        landed = receiver.receive(command, clock)
+        stats['sent'] += 1
+        if landed:
+            stats['landed'] += 1
+            step = 1 if direction == 'up' else -1
+            physical[channel] = max(0, min(MAX_LEVEL, physical[channel] + step))
+        else:
+            stats['dropped'] += 1
+        return landed, sent_at == paced_at
+
+    for commands, idle_ms in workload:
+        informative = []
+        for command in commands:
+            channel, _, direction = command.rpartition('_')
+            landed, paced = send(command)
+            step = 1 if direction == 'up' else -1
+            before = believed[channel]
+            believed[channel] = max(0, min(MAX_LEVEL, before + step))
+            if feedback == 'command':
+                if not landed:
+                    pacer.report_drop(command)
+                elif paced:
+                    pacer.acknowledge(command)
+            elif believed[channel] != before:
+                informative.append((command, paced))
+
+        if feedback == 'batch':
+            for _ in range(max_attempts):
+                off_target = {c for c in CHANNELS if physical[c] != believed[c]}
+                for command, paced in informative:
+                    if paced and command.rpartition('_')[0] not in off_target:
+                        pacer.acknowledge(command)
+                if not off_target:
+                    break
+                stats['mismatches'] += 1
+                pacer.report_mismatch([command for command, _ in informative
+                                       if command.rpartition('_')[0] in off_target])
+                fix = reconcile_commands([physical[c] for c in CHANNELS],
+                                         [believed[c] for c in CHANNELS])
+                informative = [(command, send(command)[1]) for command in fix]
+            else:
+                stats['unresolved'] += 1
+        clock += idle_ms
+    stats['commands_per_second'] = stats['landed'] / (stats['ir_ms'] / 1000) if stats['ir_ms'] else 0.0
+    return stats
+
+
+def drop_rate(stats):
+    """Percentage of sent commands the receiver missed."""
+    return stats['dropped'] / stats['sent'] * 100 if stats['sent'] else 0.0
+
+
+def fastest_safe_delay(run, baseline, candidates):
+    """Return (delay, stats) for the fastest fixed delay that drops no more than `baseline`.
+
+    `run(delay)` returns the workload stats for a fixed pacer; candidates are tried fastest
+    first and the baseline delay is the fallback.
+    """
+    for delay in sorted(candidates):
+        stats = run(delay)
+        if drop_rate(stats) <= drop_rate(baseline) and \
+                stats['mismatches'] <= baseline['mismatches']:
+            return delay, stats
+    return DEFAULT_DELAY_MS, baseline
+
+
+def _print_stats(label, stats):
+    print(f"{label:<22} {stats['sent']:>8,} {stats['dropped']:>7,} {drop_rate(stats):>6.2f}% "
+          f"{stats['ir_ms'] / 1000 / 60:>8.1f}m {stats['commands_per_second']:>7.2f} "
+          f"{stats['mismatches']:>10,}")
+
+
+def main():
+    """Evaluate fixed and adaptive pacing against the receiver model."""
+    parser = argparse.ArgumentParser(description="Evaluate adaptive IR pacing for the Hygger light")
+    parser.add_argument('--days', type=int, default=14, help="Days of traffic to simulate")
+    parser.add_argument('--disturbances', type=int, default=6,
+                        help="Random full-scale level changes per day (manual syncs, weather)")
+    parser.add_argument('--curve', type=parse_curve, default=DEFAULT_CURVE,
+                        help="Receiver drop curve as 'gap_ms:probability,...'")
+    parser.add_argument('--slow', action='append', default=[], metavar='COMMAND:MS',
+                        help="Extra recovery time a command needs (e.g. white_down:60)")
+    parser.add_argument('--feedback', choices=('batch', 'command'), default='batch',
+                        help="How drops are detected: verification after each batch, or per command")
+    parser.add_argument('--key', choices=('command', 'direction', 'global'), default='command',
+                        help="Granularity of the learned delays")
+    parser.add_argument('--sweep', action='store_true',
+                        help="Also report fixed delays from 150 to 600 ms")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    slow = {}
+    for item in args.slow:
+        command, _, ms = item.partition(':')
+        slow[command] = float(ms)
+
+    print("📡 Hygger IR Pacing Evaluation")
+    print("=" * 72)
+    workload = build_workload(args.days, disturbances=args.disturbances, seed=args.seed)
+    total = sum(len(commands) for commands, _ in workload)
+    print(f"📦 Workload: {args.days} days, {len(workload):,} batches, {total:,} commands "
+          f"({args.feedback} verification)")
+    print()
+    print(f"{'Pacer':<22} {'Sent':>8} {'Drops':>7} {'Drop%':>7} {'IR time':>9} "
+          f"{'Cmd/s':>7} {'Mismatches':>10}")
+    print("-" * 72)
+
+    def run_fixed(delay):
+        return run_workload(FixedPacer(delay), ReceiverModel(args.curve, slow, args.seed),
+                            workload, args.feedback)
+
+    fixed = run_fixed(DEFAULT_DELAY_MS)
+    _print_stats(f"fixed {DEFAULT_DELAY_MS} ms", fixed)
+    if args.sweep:
+        for delay in range(150, 650, 50):
+            if delay != DEFAULT_DELAY_MS:
+                _print_stats(f"fixed {delay} ms", run_fixed(delay))
+
+    pacer = AIMDPacer(key=args.key)
+    adaptive = run_workload(pacer, ReceiverModel(args.curve, slow, args.seed), workload,
+                            args.feedback)
+    _print_stats("AIMD", adaptive)
+
+    # The helper is a single fixed delay, so it is checked as one: no faster than the
+    # fastest fixed delay that keeps the baseline's drop and mismatch counts
+    suggested, safe_stats = fastest_safe_delay(run_fixed, fixed,
+                                               range(150, DEFAULT_DELAY_MS, 10))
+    if suggested != DEFAULT_DELAY_MS:
+        _print_stats(f"fixed {suggested} ms", safe_stats)
+
+    print()
+    print(f"🧠 Learned delays ({pacer.backoffs} back-offs, median type + 10%: "
+          f"{pacer.recommended_ms()} ms):")
+    for kind, delay in pacer.delays().items():
+        print(f"   • {kind:<12} {delay:6.0f} ms")
+    print()
+    for label, stats in (("AIMD", adaptive), (f"fixed {suggested} ms", safe_stats)):
+        speedup = stats['commands_per_second'] / fixed['commands_per_second'] \
+            if fixed['commands_per_second'] else 0.0
+        print(f"⚡ {label} vs fixed {DEFAULT_DELAY_MS} ms: {fixed['commands_per_second']:.2f} → "
+              f"{stats['commands_per_second']:.2f} commands/s ({speedup:.2f}×), "
+              f"drops {fixed['dropped']:,} → {stats['dropped']:,}, "
+              f"mismatches {fixed['mismatches']:,} → {stats['mismatches']:,}")
+    print(f"💡 Suggested input_number.hygger_ir_delay_ms: {suggested} "
+          f"(fastest fixed delay with no more drops or mismatches than {DEFAULT_DELAY_MS} ms)")
+
+
+if __name__ == "__main__":
+    main()
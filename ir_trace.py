@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+"""
+Hygger IR Command Trace Format
+Stores simulated IR command streams in a compact, columnar, run-length encoded file.
+
+Each record is one *run* of identical commands (same fixture, channel and direction)
+sent at a fixed pace, so a 10-level sunrise burst costs one row instead of ten.
+Every fixture has its own open run, so fixtures sending at the same time (one
+remote pacing several tanks) still compress; rows are written in order of their
+run's start. Rows are kept in parallel `array` columns and written to disk in zlib-compressed
+chunks, which keeps year-long multi-fixture traces to a few MB and lets the reader
+iterate lazily without ever holding the whole trace in memory.
+
+Usage:
+    python3 ir_trace.py info TRACE
+    python3 ir_trace.py dump TRACE [--limit N]
+    python3 ir_trace.py diff TRACE_A TRACE_B
+"""
+
+import argparse
+import heapq
+import struct
+import sys
+import zlib
+from array import array
+from itertools import islice
+
+MAGIC = b'HYTR'
+VERSION = 2
+
+CHANNELS = ('white', 'red', 'green', 'blue')
+CHANNEL_INDEX = {name: index for index, name in enumerate(CHANNELS)}
+
+# Column layout: (name, array typecode). Order is the on-disk order inside a chunk.
+COLUMNS = (
+    ('dt_ms', 'Q'),       # Milliseconds since the start of the previous run
+    ('fixture', 'H'),     # Fixture / tank index
+    ('channel', 'B'),     # Index into CHANNELS
+    ('direction', 'b'),   # +1 for *_up, -1 for *_down
+    ('count', 'H'),       # Number of commands in the run
+    ('step_ms', 'H'),     # Spacing between commands inside the run
+)
+
+DEFAULT_CHUNK_ROWS = 65536
+MAX_RUN = 0xFFFF
+
+_FILE_HEADER = struct.Struct('<4sH')
+_CHUNK_HEADER = struct.Struct('<IQI')   # rows, absolute start time (ms), compressed size
+
+
+def _new_columns():
+    """Return a fresh set of empty column arrays."""
+    return {name: array(code) for name, code in COLUMNS}
+
+
+def _to_little_endian(column):
+    """Return column bytes in little-endian order regardless of host byte order."""
+    if sys.byteorder == 'big' and column.itemsize > 1:
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+
+def command_name(channel, direction):
+    """Return the learned IR command name, e.g. ('white', +1) -> 'white_up'."""
+    if isinstance(channel, int):
+        channel = CHANNELS[channel]
+    return f"{channel}_{'up' if direction > 0 else 'down'}"
+
+
+def parse_command(command):
+    """Split a command name such as 'blue_down' into (channel_index, direction)."""
+    color, _, action = command.rpartition('_')
+    if color not in CHANNEL_INDEX or action not in ('up', 'down'):
+        raise ValueError(f"Not a channel level command: {command!r}")
+    return CHANNEL_INDEX[color], (1 if action == 'up' else -1)
+
+
+class TraceWriter:
+    """Append IR commands to a columnar RLE trace file, flushing in chunks."""
+
+    def __init__(self, path, chunk_rows=DEFAULT_CHUNK_ROWS, compress_level=6):
+        self.path = path
+        self.chunk_rows = chunk_rows
+        self.compress_level = compress_level
+        self.clock_ms = 0
+        self.commands_written = 0
+        self.runs_written = 0
+        self._file = open(path, 'wb')
+        self._file.write(_FILE_HEADER.pack(MAGIC, VERSION))
+        self._columns = _new_columns()
+        self._chunk_start_ms = None
+        # Open run per fixture: (channel, direction, start_ms, last_ms, count, step_ms)
+        self._runs = {}
+        # Closed runs waiting for an open run that started earlier: (start_ms, seq, row)
+        self._closed = []
+        self._closed_seq = 0
+        self._last_run_start_ms = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def advance(self, ms):
+        """Advance the writer's virtual clock (used when no explicit timestamp is given)."""
+        self.clock_ms += int(ms)
+
+    def record(self, channel, direction, t_ms=None, fixture=0):
+        """Record one command. `channel` may be a name or index; `direction` is +1/-1."""
+        if isinstance(channel, str):
+            channel = CHANNEL_INDEX[channel]
+        direction = 1 if direction > 0 else -1
+        t_ms = self.clock_ms if t_ms is None else int(t_ms)
+        self.commands_written += 1
+
+        # Other fixtures' runs that can no longer grow would hold back every row after them
+        for other in [other for other, run in self._runs.items()
+                      if other != fixture and t_ms > run[3] + (0xFFFF if run[4] == 1 else run[5])]:
+            self._close_run(other)
+        run = self._runs.get(fixture)
+        if run is not None:
+            r_channel, r_direction, r_start, r_last, r_count, r_step = run
+            if r_channel == channel and r_direction == direction and r_count < MAX_RUN:
+                gap = t_ms - r_last
+                if r_count == 1 and 0 <= gap <= 0xFFFF:
+                    self._runs[fixture] = (r_channel, r_direction, r_start, t_ms, 2, gap)
+                    return
+                if gap == r_step:
+                    self._runs[fixture] = (r_channel, r_direction, r_start, t_ms, r_count + 1,
+                                           r_step)
+                    return
+            self._close_run(fixture)
+        self._runs[fixture] = (channel, direction, t_ms, t_ms, 1, 0)
+
+    def record_command(self, command, t_ms=None, fixture=0):
+        """Record a command by its learned name (e.g. 'red_up')."""
+        channel, direction = parse_command(command)
+        self.record(channel, direction, t_ms=t_ms, fixture=fixture)
+
+    def _close_run(self, fixture):
+        """Close a fixture's open run; rows go out once no open run started before them."""
+        channel, direction, start, _last, count, step = self._runs.pop(fixture)
+        heapq.heappush(self._closed, (start, self._closed_seq,
+                                      (fixture, channel, direction, count, step)))
+        self._closed_seq += 1
+        horizon = min((run[2] for run in self._runs.values()), default=None)
+        while self._closed and (horizon is None or self._closed[0][0] <= horizon):
+            start, _, row = heapq.heappop(self._closed)
+            self._append_row(start, *row)
+
+    def _append_row(self, start, fixture, channel, direction, count, step):
+        """Move a closed run into the column buffers."""
+        if self._chunk_start_ms is None:
+            self._chunk_start_ms = start
+            self._last_run_start_ms = start
+        dt = start - self._last_run_start_ms
+        if dt < 0:
+            raise ValueError("Trace timestamps must be non-decreasing")
+        columns = self._columns
+        columns['dt_ms'].append(dt)
+        columns['fixture'].append(fixture)
+        columns['channel'].append(channel)
+        columns['direction'].append(direction)
+        columns['count'].append(count)
+        columns['step_ms'].append(step)
+        self._last_run_start_ms = start
+        self.runs_written += 1
+        if len(columns['dt_ms']) >= self.chunk_rows:
+            self._flush_chunk()
+
+    def _flush_chunk(self):
+        """Compress and write the buffered rows as one chunk."""
+        rows = len(self._columns['dt_ms'])
+        if rows == 0:
+            return
+        payload = b''.join(_to_little_endian(self._columns[name]) for name, _ in COLUMNS)
+        compressed = zlib.compress(payload, self.compress_level)
+        self._file.write(_CHUNK_HEADER.pack(rows, self._chunk_start_ms, len(compressed)))
+        self._file.write(compressed)
+        self._columns = _new_columns()
+        self._chunk_start_ms = None
+
+    def close(self):
+        """Flush any open run and buffered rows, then close the file."""
+        if self._file.closed:
+            return
+        for fixture in list(self._runs):
+            self._close_run(fixture)
+        self._flush_chunk()
+        self._file.close()
+
+
+class TraceReader:
+    """Lazily iterate a trace file chunk by chunk."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as file:
+            magic, version = _FILE_HEADER.unpack(file.read(_FILE_HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a Hygger IR trace")
+        if version != VERSION:
+            raise ValueError(f"Unsupported trace version {version} in {path}")
+
+    def chunks(self):
+        """Yield (start_ms, columns) per chunk; columns maps column name to array."""
+        with open(self.path, 'rb') as file:
+            file.seek(_FILE_HEADER.size)
+            while True:
+                header = file.read(_CHUNK_HEADER.size)
+                if not header:
+                    return
+                rows, start_ms, size = _CHUNK_HEADER.unpack(header)
+                payload = zlib.decompress(file.read(size))
+                columns = {}
+                offset = 0
+                for name, code in COLUMNS:
+                    column = array(code)
+                    width = column.itemsize * rows
+                    column.frombytes(payload[offset:offset + width])
+                    if sys.byteorder == 'big' and column.itemsize > 1:
+                        column.byteswap()
+                    columns[name] = column
+                    offset += width
+                yield start_ms, columns
+
+    def runs(self):
+        """Yield (t_ms, fixture, channel, direction, count, step_ms) for every run."""
+        for start_ms, columns in self.chunks():
+            t_ms = start_ms
+            for dt, fixture, channel, direction, count, step in zip(
+                    columns['dt_ms'], columns['fixture'], columns['channel'],
+                    columns['direction'], columns['count'], columns['step_ms']):
+                t_ms += dt
+                yield t_ms, fixture, channel, direction, count, step
+
+    def __iter__(self):
+        return self.runs()
+
+    def commands(self):
+        """Yield (t_ms, fixture, command_name) for every individual command, in time order.
+
+        Runs of different fixtures can overlap, so their commands are merged as the
+        runs (ordered by start) are read.
+        """
+        names = [[command_name(channel, -1), None, command_name(channel, 1)]
+                 for channel in range(len(CHANNELS))]
+        pending = []   # (t_ms, run index, fixture, name, commands left, step_ms)
+        for index, (t_ms, fixture, channel, direction, count, step) in enumerate(self.runs()):
+            while pending and pending[0][0] <= t_ms:
+                yield _pop_command(pending)
+            heapq.heappush(pending, (t_ms, index, fixture, names[channel][direction + 1],
+                                     count, step))
+        while pending:
+            yield _pop_command(pending)
+
+    def summary(self):
+        """Return run/command totals per fixture, channel and direction."""
+        totals = {}
+        runs = 0
+        commands = 0
+        first_ms = None
+        last_ms = 0
+        for t_ms, fixture, channel, direction, count, step in self.runs():
+            key = (fixture, command_name(channel, direction))
+            totals[key] = totals.get(key, 0) + count
+            runs += 1
+            commands += count
+            if first_ms is None:
+                first_ms = t_ms
+            last_ms = max(last_ms, t_ms + (count - 1) * step)
+        return {
+            'runs': runs,
+            'commands': commands,
+            'first_ms': first_ms or 0,
+            'last_ms': last_ms,
+            'totals': totals,
+        }
+
+
+def diff_traces(path_a, path_b):
+    """Compare two traces, returning whether they match and where they first diverge.
+
+    Chunks with identical columns are skipped wholesale (array comparison runs in C);
+    only the first mismatching chunk pair is walked run by run.
+    """
+    reader_a = TraceReader(path_a)
+    reader_b = TraceReader(path_b)
+    runs_checked = 0
+    for chunk_a, chunk_b in zip(reader_a.chunks(), reader_b.chunks()):
+        start_a, columns_a = chunk_a
+        start_b, columns_b = chunk_b
+        if start_a == start_b and all(columns_a[name] == columns_b[name] for name, _ in COLUMNS):
+            runs_checked += len(columns_a['dt_ms'])
+            continue
+        break
+    else:
+        # Every common chunk matched; the traces are equal only if both are exhausted.
+        tail_a = sum(len(columns['dt_ms']) for _, columns in _skip(reader_a.chunks(), runs_checked))
+        tail_b = sum(len(columns['dt_ms']) for _, columns in _skip(reader_b.chunks(), runs_checked))
+        if tail_a == tail_b == 0:
+            return {'identical': True, 'runs_compared': runs_checked, 'first_divergence': None}
+
+    # Resume the run-level walk at the first row of the first mismatching chunk.
+    runs_a = islice(reader_a.runs(), runs_checked, None)
+    runs_b = islice(reader_b.runs(), runs_checked, None)
+    compared = runs_checked
+    for run_a, run_b in _zip_longest_runs(runs_a, runs_b):
+        if run_a != run_b:
+            return {
+                'identical': False,
+                'runs_compared': compared,
+                'first_divergence': {'run_index': compared, 'a': run_a, 'b': run_b},
+            }
+        compared += 1
+    return {'identical': True, 'runs_compared': compared, 'first_divergence': None}
+
+
+def _pop_command(pending):
+    """Return (t_ms, fixture, name) of the earliest pending command; queue the rest of its run."""
+    t_ms, index, fixture, name, left, step = pending[0]
+    if left > 1:
+        heapq.heapreplace(pending, (t_ms + step, index, fixture, name, left - 1, step))
+    else:
+        heapq.heappop(pending)
+    return t_ms, fixture, name
+
+
+def _skip(chunks, rows):
+    """Yield chunks left over after skipping `rows` rows of matched chunks."""
+    for start_ms, columns in chunks:
+        length = len(columns['dt_ms'])
+        if rows >= length:
+            rows -= length
+            continue
+        yield start_ms, columns
+
+
+def _zip_longest_runs(runs_a, runs_b):
+    """Pair runs from two iterators, padding the shorter one with None."""
+    sentinel = object()
+    while True:
+        run_a = next(runs_a, sentinel)
+        run_b = next(runs_b, sentinel)
+        if run_a is sentinel and run_b is sentinel:
+            return
+        yield (None if run_a is sentinel else run_a), (None if run_b is sentinel else run_b)
+
+
+def _format_ms(t_ms):
+    """Format a trace timestamp as [d]HH:MM:SS.mmm."""
+    seconds, ms = divmod(int(t_ms), 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    days, hours = divmod(hours, 24)
+    prefix = f"d{days} " if days else ""
+    return f"{prefix}{hours:02d}:{minutes:02d}:{seconds:02d}.{ms:03d}"
+
+
+def main():
+    """Inspect, dump or diff trace files."""
+    parser = argparse.ArgumentParser(description="Inspect Hygger IR command traces")
+    sub = parser.add_subparsers(dest='command', required=True)
+    info = sub.add_parser('info', help="Show totals for a trace")
+    info.add_argument('trace')
+    dump = sub.add_parser('dump', help="Print individual commands")
+    dump.add_argument('trace')
+    dump.add_argument('--limit', type=int, default=50)
+    diff = sub.add_parser('diff', help="Compare two traces")
+    diff.add_argument('trace_a')
+    diff.add_argument('trace_b')
+    args = parser.parse_args()
+
+    if args.command == 'info':
+        summary = TraceReader(args.trace).summary()
+        print(f"📼 {args.trace}")
+        print("=" * 60)
+        print(f"Runs: {summary['runs']:,}  Commands: {summary['commands']:,}")
+        print(f"Span: {_format_ms(summary['first_ms'])} → {_format_ms(summary['last_ms'])}")
+        for (fixture, name), count in sorted(summary['totals'].items()):
+            print(f"   Fixture {fixture} {name:>12}: {count:,}")
+    elif args.command == 'dump':
+        for index, (t_ms, fixture, name) in enumerate(TraceReader(args.trace).commands()):
+            if index >= args.limit:
+                print("   …")
+                break
+            print(f"   {_format_ms(t_ms)}  F{fixture}  📡 {name}")
+    else:
+        result = diff_traces(args.trace_a, args.trace_b)
+        if result['identical']:
+            print(f"✅ Traces are identical ({result['runs_compared']:,} runs compared)")
+        else:
+            divergence = result['first_divergence']
+            print(f"❌ Traces diverge at run {divergence['run_index']:,}")
+            print(f"   A: {divergence['a']}")
+            print(f"   B: {divergence['b']}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Hygger Light Feedback
+Calibrates a colour sensor facing the tank and checks the light against the helpers.
+
+input_number.hygger_*_level records what was sent, not what the light shows. With a
+colour sensor (e.g. an ESPHome TCS34725) publishing sensor.aquarium_light_red, _green,
+_blue and _clear, scripts/aquarium_reconcile_state.yaml reads the light back after
+sending, estimates the four levels and sends only the commands that close the gap;
+the nightly reset becomes such a check. The estimate needs a calibration in
+input_text.aquarium_sensor_calibration, which this tool fits from the readings that
+script.aquarium_calibrate_light_sensor logs:
+
+    python3 light_feedback.py --from-log home-assistant.log   # fit a real tank's log
+    python3 light_feedback.py --calibrate                     # the stand-in's sensor
+    python3 light_feedback.py --compare --days 90             # feedback vs nightly reset
+    python3 light_feedback.py --verify                        # drift a day in the YAML
+"""
+import argparse
+import re
+import sys
+import time
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+import metrics
+from drift_montecarlo import RESET_MINUTE, RESET_STEPS, build_traffic, simulate
+from lighting_engine import CHANNELS, MAX_LEVEL
+from lighting_vector import MINUTES_PER_DAY
+from metrics import DRIFT_CORRECTIONS
+from reconcile_planner import transition_commands
+
+CALIBRATION_HELPER = 'input_text.aquarium_sensor_calibration'
+FEEDBACK_HELPER = 'input_boolean.aquarium_light_feedback'
+CALIBRATION_SCRIPT = 'aquarium_calibrate_light_sensor'
+# How far from a whole level an estimate may be before the reading is not trusted
+LEVEL_TOLERANCE = 0.35
+# Above this the sensor cannot reliably tell the channels apart
+MAX_CONDITION = 100.0
+
+CALIBRATION_LINE = re.compile(
+    r"Aquarium sensor calibration: W:(\d+) R:(\d+) G:(\d+) B:(\d+) readings:"
+    r"((?:\s+-?[\d.]+){4})")
+FEEDBACK_LINE = re.compile(r"Aquarium light feedback: .*sent (\d+) corrective commands")
+
+Calibration = namedtuple('Calibration', 'estimator offsets rms condition')
+
+
+class CalibrationError(ValueError):
+    """Raised when the logged readings cannot give a usable calibration."""
+
+
+def samples_from_log(lines):
+    """Return the (levels, readings) pairs logged by the calibration script."""
+    samples = []
+    for line in lines:
+        match = CALIBRATION_LINE.search(line)
+        if match:
+            levels = tuple(int(value) for value in match.groups()[:4])
+            samples.append((levels, tuple(float(value) for value in match.group(5).split())))
+    return samples
+
+
+def fit_calibration(samples):
+    """Fit readings = response · levels + offsets by least squares; invert the response."""
+    if len(samples) < len(CHANNELS) + 1:
+        raise CalibrationError(f"need at least {len(CHANNELS) + 1} readings, got {len(samples)}")
+    levels = np.array([sample[0] for sample in samples], dtype=float)
+    readings = np.array([sample[1] for sample in samples], dtype=float)
+    design = np.hstack([levels, np.ones((len(levels), 1))])
+    solution, _, rank, _ = np.linalg.lstsq(design, readings, rcond=None)
+    if rank < design.shape[1]:
+        raise CalibrationError("every channel must be stepped on its own at least once")
+    response, offsets = solution[:-1].T, solution[-1]
+    condition = np.linalg.cond(response)
+    if not condition <= MAX_CONDITION:
+        raise CalibrationError(f"the sensor cannot tell the channels apart (condition number "
+                               f"{condition:.0f}); move it so it sees the LEDs, not the room")
+    rms = float(np.sqrt(np.mean((design @ solution - readings) ** 2)))
+    return Calibration(np.linalg.inv(response), offsets, rms, float(condition))
+
+
+def format_calibration(calibration):
+    """Return the input_text value: the 16 estimator entries row by row, then the offsets."""
+    values = list(calibration.estimator.ravel()) + list(calibration.offsets)
+    return ' '.join(f"{value:.5g}" for value in values)
+
+
+def parse_calibration(text):
+    """Return (estimator, offsets) from an input_text value, or None if it is not one."""
+    try:
+        values = [float(value) for value in text.split()]
+    except ValueError:
+        return None
+    if len(values) != len(CHANNELS) * (len(CHANNELS) + 1):
+        return None
+    values = np.array(values)
+    return values[:16].reshape(4, 4), values[16:]
+
+
+def estimate_levels(readings, estimator, offsets, tolerance=LEVEL_TOLERANCE):
+    """Return (levels or None, raw estimates) for one reading, as the reconcile script does.
+
+    A reading is only trusted when every estimate is within `tolerance` of a whole
+    level inside the light's range.
+    """
+    values = estimator @ (np.asarray(readings, dtype=float) - offsets)
+    levels = np.round(values)
+    if np.any(np.abs(values - levels) > tolerance) or np.any(values <= -0.5) \
+            or np.any(values >= MAX_LEVEL + 0.5):
+        return None, values
+    return tuple(int(level) for level in levels), values
+
+
+def corrective_commands(measured, target):
+    """Commands that move the measured levels to the target, one channel after the other."""
+    return transition_commands(measured, target)
+
+
+# ---------------------------------------------------------------------------
+# Monte Carlo: feedback after every reconcile vs the nightly reset
+# ---------------------------------------------------------------------------
+
+def _lossy_steps(rng, steps, drop, dup):
+    """Signed level changes that arrive when `steps` (per lane, signed) commands are sent."""
+    count = np.abs(steps)
+    moved = count - rng.binomial(count, drop) + rng.binomial(count, dup)
+    return np.sign(steps) * moved
+
+
+def simulate_feedback(targets, ticks, calibration, response, ambient, trials=2000, drop=0.01,
+                      dup=0.002, noise=0.03, seed=0):
+    """Run the feedback policy over the reconcile traffic; returns simulate()-style results.
+
+    After every reconcile and at the nightly check each trial reads a noisy sensor,
+    estimates the levels and sends the corrective commands, which can be lost too.
+    """
+    rng = np.random.default_rng(seed)
+    response = np.asarray(response, dtype=float)
+    ambient = np.asarray(ambient, dtype=float)[:, None]
+    minutes = len(targets)
+    days = minutes // MINUTES_PER_DAY
+    physical = np.zeros((len(CHANNELS), trials), dtype=np.int64)
+    error_minutes = np.zeros((days, trials))
+    corrections = np.zeros(days, dtype=np.int64)
+    untrusted = misread = checks = 0
+    counter = DRIFT_CORRECTIONS.labels(source='montecarlo', policy='feedback')
+
+    checks_at = np.union1d(ticks, np.arange(RESET_MINUTE, minutes, MINUTES_PER_DAY))
+    previous = np.zeros(len(CHANNELS), dtype=np.int64)
+    last_minute = 0
+    for minute in np.append(checks_at, minutes):
+        error = np.abs(physical - previous[:, None]).sum(axis=0)
+        start = last_minute
+        while start < minute:
+            day = start // MINUTES_PER_DAY
+            stop = min(minute, (day + 1) * MINUTES_PER_DAY)
+            error_minutes[day] += error * (stop - start)
+            start = stop
+        if minute == minutes:
+            break
+        last_minute = minute
+
+        target = targets[minute].astype(np.int64)
+        steps = target - previous
+        physical += _lossy_steps(rng, np.repeat(steps[:, None], trials, axis=1), drop, dup)
+        np.clip(physical, 0, MAX_LEVEL, out=physical)
+        previous = target
+
+        counter.inc(int(np.abs(physical - target[:, None]).sum()))
+        readings = response @ physical + ambient + rng.normal(0.0, noise, physical.shape)
+        values = calibration.estimator @ (np.round(readings, 2) - calibration.offsets[:, None])
+        levels = np.round(values)
+        trusted = np.all((np.abs(values - levels) <= LEVEL_TOLERANCE) & (values > -0.5)
+                         & (values < MAX_LEVEL + 0.5), axis=0)
+        checks += trials
+        untrusted += int((~trusted).sum())
+        misread += int((trusted & np.any(levels != physical, axis=0)).sum())
+        fix = np.where(trusted, target[:, None] - levels.astype(np.int64), 0)
+        corrections[minute // MINUTES_PER_DAY] += int(np.abs(fix).sum())
+        physical += _lossy_steps(rng, fix, drop, dup)
+        np.clip(physical, 0, MAX_LEVEL, out=physical)
+
+    return {
+        'daily_error': (error_minutes.T / MINUTES_PER_DAY)[None],
+        'commands_per_day': corrections.sum() / days / trials,
+        'untrusted': untrusted / checks,
+        'misread': misread / checks,
+        'days': days,
+    }
+
+
+def print_comparison(feedback, resets, reconcile_per_day):
+    """Print feedback correction next to the resync policies."""
+    print(f"{'Policy':<22} {'Fix cmds/day':>12} {'Total cmds/day':>14} {'Mean err':>9} "
+          f"{'p95 day':>8} {'p99 day':>8} {'Worst':>6}")
+    print("-" * 85)
+    rows = [(label, resets['resync_commands_per_day'][index], resets['daily_error'][index])
+            for index, label in enumerate(("no resync", "nightly reset (current)"))]
+    rows.append(("sensor feedback", feedback['commands_per_day'], feedback['daily_error'][0]))
+    for label, commands, errors in rows:
+        print(f"{label:<22} {commands:>12.2f} {commands + reconcile_per_day:>14.1f} "
+              f"{errors.mean():>9.4f} {np.percentile(errors, 95):>8.4f} "
+              f"{np.percentile(errors, 99):>8.4f} {errors.max():>6.2f}")
+    print()
+    print(f"🔎 Readings not trusted: {feedback['untrusted']:.3%} (no correction sent); "
+          f"trusted but wrong: {feedback['misread']:.4%}")
+    saved = resets['resync_commands_per_day'][1] - feedback['commands_per_day']
+    print(f"✅ Feedback sends {feedback['commands_per_day']:.2f} corrective commands a day "
+          f"instead of the reset's {RESET_STEPS * len(CHANNELS)}+ ({saved:.1f} fewer)")
+
+
+# ---------------------------------------------------------------------------
+# Home Assistant stand-in
+# ---------------------------------------------------------------------------
+
+def calibrate_with_runtime(start, root='.', sensor=None):
+    """Run the calibration script against the stand-in's sensor; returns (samples, Calibration)."""
+    from ha_runtime import RGBSensorStub, build_runtime
+
+    hass = build_runtime(start, root, sensor=sensor or RGBSensorStub())
+    for _ in hass.call_service('script.turn_on', [f'script.{CALIBRATION_SCRIPT}'], {}):
+        pass
+    hass.run_until(start + timedelta(minutes=10))
+    if hass.errors:
+        raise RuntimeError(hass.errors[0][3])
+    samples = samples_from_log(message for _, _, _, message in hass.logs)
+    return samples, fit_calibration(samples)
+
+
+def verify_with_runtime(start, root='.', drop=0.05, seed=0):
+    """Run a day of the YAML with lossy IR and feedback on; returns a summary dict.
+
+    Commands are dropped with probability `drop`; the reconcile script's feedback
+    stage and the 02:00 check are expected to leave no drift behind.
+    """
+    from ha_runtime import LightStub, RGBSensorStub, build_runtime
+
+    _, calibration = calibrate_with_runtime(start, root)
+
+    class LossyLight(LightStub):
+        def __init__(self):
+            super().__init__()
+            self.random = np.random.default_rng(seed)
+            self.dropped = 0
+
+        def apply(self, command):
+            if self.random.random() < drop:
+                self.dropped += 1
+                return
+            super().apply(command)
+
+    light = LossyLight()
+    hass = build_runtime(start, root, light=light, sensor=RGBSensorStub(seed=seed))
+    hass.set_state(CALIBRATION_HELPER, format_calibration(calibration))
+    hass.set_state(FEEDBACK_HELPER, 'on')
+    worst = 0
+    for minute in range(1, 24 * 60 + 5):
+        hass.run_until(start + timedelta(minutes=minute))
+        if not hass.is_running('script', 'aquarium_reconcile_state'):
+            worst = max(worst, hass.drift())
+    if hass.errors:
+        raise RuntimeError(hass.errors[0][3])
+    corrective = [int(match.group(1)) for _, _, _, message in hass.logs
+                  for match in [FEEDBACK_LINE.search(message)] if match]
+    resets = sum(1 for object_id, _, _ in hass.script_runs if object_id == 'aquarium_reset_to_zero')
+    return {
+        'calibration': calibration,
+        'commands': len(hass.commands),
+        'dropped': light.dropped,
+        'corrections': len(corrective),
+        'corrective_commands': sum(corrective),
+        'resets': resets,
+        'worst_drift': worst,
+        'final_drift': hass.drift(),
+    }
+
+
+def parse_args():
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(description="Calibrate the colour sensor and compare "
+                                                 "feedback correction with the nightly reset")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--from-log', metavar='PATH',
+                      help="Fit the readings logged by script.aquarium_calibrate_light_sensor")
+    mode.add_argument('--calibrate', action='store_true',
+                      help="Run the calibration script against the stand-in's simulated sensor")
+    mode.add_argument('--compare', action='store_true',
+                      help="Monte Carlo of sensor feedback vs the nightly reset")
+    mode.add_argument('--verify', action='store_true',
+                      help="Drop IR commands for a day in the stand-in and check feedback fixes it")
+    parser.add_argument('--date', type=date.fromisoformat, default=date.today(),
+                        help="Simulated day (YYYY-MM-DD); first day for --compare")
+    parser.add_argument('--days', type=int, default=90, help="Days of traffic for --compare")
+    parser.add_argument('--trials', type=int, default=1000, help="Monte Carlo trials per policy")
+    parser.add_argument('--drop', type=float, default=0.01, help="Per-command drop probability")
+    parser.add_argument('--dup', type=float, default=0.002, help="Per-command duplicate probability")
+    parser.add_argument('--noise', type=float, default=0.03,
+                        help="Sensor noise (percent of full scale, one sigma)")
+    parser.add_argument('--seed', type=int, default=0)
+    metrics.add_arguments(parser)
+    return parser.parse_args()
+
+
+def print_calibration(samples, calibration):
+    """Print the fit and the value for input_text.aquarium_sensor_calibration."""
+    print(f"📐 {len(samples)} readings, residual {calibration.rms:.3f}% rms, "
+          f"condition number {calibration.condition:.1f}")
+    worst = 0.0
+    for levels, readings in samples:
+        _, values = estimate_levels(readings, calibration.estimator, calibration.offsets)
+        worst = max(worst, float(np.abs(values - levels).max()))
+    print(f"   Worst level error on the calibration readings: {worst:.3f} "
+          f"(readings further than {LEVEL_TOLERANCE} from a level are ignored)")
+    value = format_calibration(calibration)
+    print(f"\n📝 Set {CALIBRATION_HELPER} ({len(value)} characters) to:\n{value}")
+    print(f"   then turn on {FEEDBACK_HELPER}")
+
+
+def main():
+    """Run the selected feedback tool."""
+    args = parse_args()
+    start = datetime(args.date.year, args.date.month, args.date.day)
+
+    print("👁️  Hygger Light Feedback")
+    print("=" * 85)
+    server = metrics.start(args)
+    if args.from_log:
+        with open(args.from_log) as file:
+            samples = samples_from_log(file)
+        try:
+            print_calibration(samples, fit_calibration(samples))
+        except CalibrationError as error:
+            print(f"❌ {error}")
+            return 1
+    elif args.verify:
+        result = verify_with_runtime(start, seed=args.seed)
+        print(f"📅 {args.date}: {result['commands']} IR commands sent, {result['dropped']} dropped")
+        print(f"🔧 {result['corrections']} feedback corrections, "
+              f"{result['corrective_commands']} corrective commands, {result['resets']} resets")
+        print(f"📏 Worst drift between reconciles: {result['worst_drift']}, "
+              f"at the end of the day: {result['final_drift']}")
+        if result['final_drift'] or result['resets']:
+            print("❌ Feedback did not keep the light in line with the helpers")
+            return 1
+        print("✅ Dropped commands were corrected without a reset")
+    elif args.compare:
+        from ha_runtime import RGBSensorStub
+
+        sensor = RGBSensorStub(noise=args.noise, seed=args.seed)
+        samples, calibration = calibrate_with_runtime(start, sensor=sensor)
+        started = time.perf_counter()
+        targets, ticks = build_traffic(args.date, args.days, seed=args.seed)
+        resets = simulate(targets, ticks, [0, 24], args.trials, args.drop, args.dup,
+                          args.seed + 1)
+        feedback = simulate_feedback(targets, ticks, calibration, sensor.response,
+                                     sensor.ambient, args.trials, args.drop, args.dup,
+                                     args.noise, args.seed + 2)
+        print(f"📦 {args.days} days, {resets['reconcile_commands'] / args.days:.0f} reconcile "
+              f"commands/day, {args.trials:,} trials, drop {args.drop:.1%}, dup {args.dup:.1%}, "
+              f"sensor noise {args.noise}% ({time.perf_counter() - started:.1f}s)")
+        print()
+        print_comparison(feedback, resets, resets['reconcile_commands'] / args.days)
+    else:
+        samples, calibration = calibrate_with_runtime(start)
+        print_calibration(samples, calibration)
+    metrics.finish(args, server)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
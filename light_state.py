@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Hygger Light State
+Immutable four-channel light state packed into one 16-bit int, with a precomputed
+IR command vocabulary and table-driven diffs.
+
+Channel `i` of CHANNELS (white, red, green, blue) lives in bits 4i..4i+3, so a state
+fits `array('H')` or a NumPy uint16 column and two states compare with one int
+comparison. The 11^4 valid states are interned: `LightState.of(...)` and every
+`apply()` return the one shared instance for those levels, and each state keeps a
+tuple of its eight successors once first asked, so replaying a command stream
+allocates nothing per command. Command runs (`('red_up',) * 3`) are prebuilt per
+channel and (have, want) pair, so planning a transition is four table lookups
+instead of formatting a string per command.
+
+Run it to compare a replay that keeps a level dict per command (as the scenario
+walkthroughs did) with one that keeps packed states in an array:
+
+    python3 light_state.py --transitions 20000
+"""
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+from array import array
+
+from lighting_engine import CHANNELS, MAX_LEVEL
+
+BITS = 4
+MASK = (1 << BITS) - 1
+SHIFTS = tuple(BITS * index for index in range(len(CHANNELS)))
+UNITS = tuple(1 << shift for shift in SHIFTS)
+
+# Command ids: 2 * channel for *_up, 2 * channel + 1 for *_down
+COMMANDS = tuple(f"{channel}_{direction}" for channel in CHANNELS for direction in ('up', 'down'))
+COMMAND_IDS = {command: index for index, command in enumerate(COMMANDS)}
+# (channel index, level step) of each command id
+COMMAND_STEPS = tuple((index // 2, 1 - 2 * (index % 2)) for index in range(len(COMMANDS)))
+
+# RUNS[channel][have << 4 | want]: the commands that move one channel from have to want
+RUNS = tuple(
+    tuple((COMMANDS[2 * channel + (want < have)],) * abs(want - have)
+          for have in range(MASK + 1) for want in range(MASK + 1))
+    for channel in range(len(CHANNELS)))
+
+_INTERNED = [None] * (1 << (BITS * len(CHANNELS)))
+
+
+class LightState:
+    """White, red, green and blue levels packed 4 bits each; immutable and interned."""
+
+    __slots__ = ('packed', '_next')
+
+    def __new__(cls, packed=0):
+        state = _INTERNED[packed]
+        if state is None:
+            if any((packed >> shift) & MASK > MAX_LEVEL for shift in SHIFTS):
+                raise ValueError(f"Not a light state: {packed:#06x}")
+            state = object.__new__(cls)
+            object.__setattr__(state, 'packed', packed)
+            object.__setattr__(state, '_next', None)
+            _INTERNED[packed] = state
+        return state
+
+    @classmethod
+    def of(cls, white=0, red=0, green=0, blue=0):
+        """The state with these levels."""
+        return cls.from_levels((white, red, green, blue))
+
+    @classmethod
+    def from_levels(cls, levels):
+        """The state for a (white, red, green, blue) sequence."""
+        if isinstance(levels, LightState):
+            return levels
+        packed = 0
+        for level, shift in zip(levels, SHIFTS):
+            if not 0 <= level <= MAX_LEVEL:
+                raise ValueError(f"Level out of range: {level}")
+            packed |= int(level) << shift
+        return cls(packed)
+
+    @classmethod
+    def from_dict(cls, levels):
+        """The state for a {'white': .., 'red': .., 'green': .., 'blue': ..} dict."""
+        return cls.from_levels([levels[channel] for channel in CHANNELS])
+
+    def __setattr__(self, name, value):
+        raise AttributeError("LightState is immutable")
+
+    def __reduce__(self):
+        return LightState, (self.packed,)
+
+    def __getitem__(self, channel):
+        if isinstance(channel, str):
+            channel = CHANNELS.index(channel)
+        return (self.packed >> SHIFTS[channel]) & MASK
+
+    def __iter__(self):
+        packed = self.packed
+        return iter([(packed >> shift) & MASK for shift in SHIFTS])
+
+    def __len__(self):
+        return len(CHANNELS)
+
+    def __index__(self):
+        return self.packed
+
+    __int__ = __index__
+
+    def __eq__(self, other):
+        if isinstance(other, LightState):
+            return self.packed == other.packed
+        return NotImplemented
+
+    def __hash__(self):
+        return self.packed
+
+    def __repr__(self):
+        white, red, green, blue = self
+        return f"LightState(W:{white} R:{red} G:{green} B:{blue})"
+
+    @property
+    def levels(self):
+        """(white, red, green, blue)."""
+        return tuple(self)
+
+    def to_dict(self):
+        """{'white': .., 'red': .., 'green': .., 'blue': ..}."""
+        return dict(zip(CHANNELS, self))
+
+    def successors(self):
+        """The state after each command id, saturating at 0 and MAX_LEVEL like the light."""
+        if self._next is None:
+            following = []
+            for channel, step in COMMAND_STEPS:
+                level = self[channel] + step
+                following.append(LightState(self.packed + step * UNITS[channel])
+                                 if 0 <= level <= MAX_LEVEL else self)
+            object.__setattr__(self, '_next', tuple(following))
+        return self._next
+
+    def apply(self, command):
+        """The state after one IR command (a name such as 'red_up' or its id)."""
+        if isinstance(command, str):
+            command = COMMAND_IDS[command]
+        return (self._next or self.successors())[command]
+
+    def replay(self, commands):
+        """The state after a sequence of commands."""
+        state = self
+        for command in commands:
+            state = state.apply(command)
+        return state
+
+    def delta(self, target):
+        """Per-channel level change from this state to `target`, as a tuple."""
+        current, wanted = self.packed, int(target)
+        return tuple(((wanted >> shift) & MASK) - ((current >> shift) & MASK) for shift in SHIFTS)
+
+    def steps_to(self, target):
+        """Number of IR commands from this state to `target`."""
+        current, wanted = self.packed, int(target)
+        return sum(abs(((wanted >> shift) & MASK) - ((current >> shift) & MASK))
+                   for shift in SHIFTS)
+
+    def commands_to(self, target):
+        """Commands from this state to `target`, one channel after the other."""
+        current, wanted = self.packed, int(target)
+        commands = ()
+        for runs, shift in zip(RUNS, SHIFTS):
+            commands += runs[(current >> shift & MASK) << BITS | (wanted >> shift & MASK)]
+        return commands
+
+    def runs_to(self, target):
+        """The command run of each channel from this state to `target`."""
+        current, wanted = self.packed, int(target)
+        return [runs[(current >> shift & MASK) << BITS | (wanted >> shift & MASK)]
+                for runs, shift in zip(RUNS, SHIFTS)]
+
+
+OFF = LightState(0)
+
+
+def to_array(states):
+    """Pack states (or sequences of levels) into an array('H')."""
+    return array('H', (int(state) if isinstance(state, LightState)
+                       else LightState.from_levels(state).packed for state in states))
+
+
+def from_array(packed):
+    """The states of an array('H') (or any iterable of packed ints)."""
+    return [LightState(value) for value in packed]
+
+
+def pack(levels):
+    """Pack an (..., 4) NumPy array of levels into uint16."""
+    import numpy as np
+
+    levels = np.asarray(levels)
+    if levels.size and (levels.min() < 0 or levels.max() > MAX_LEVEL):
+        raise ValueError("Levels out of range")
+    packed = np.zeros(levels.shape[:-1], dtype=np.uint16)
+    for index, shift in enumerate(SHIFTS):
+        packed |= levels[..., index].astype(np.uint16) << shift
+    return packed
+
+
+def unpack(packed):
+    """Unpack uint16 states into an (..., 4) uint8 array of levels."""
+    import numpy as np
+
+    packed = np.asarray(packed, dtype=np.uint16)
+    return np.stack([(packed >> shift) & MASK for shift in SHIFTS], axis=-1).astype(np.uint8)
+
+
+def delta_many(current, target):
+    """Per-channel deltas between two uint16 state arrays, as an (..., 4) int8 array."""
+    return unpack(target).astype('i1') - unpack(current).astype('i1')
+
+
+def _dict_replay(pairs):
+    """Replay transitions the old way, keeping a level dict per command sent."""
+    step = {'white_up': ('white', 1), 'white_down': ('white', -1), 'red_up': ('red', 1),
+            'red_down': ('red', -1), 'green_up': ('green', 1), 'green_down': ('green', -1),
+            'blue_up': ('blue', 1), 'blue_down': ('blue', -1)}
+    history = []
+    for current, target in pairs:
+        levels = dict(zip(CHANNELS, current))
+        wanted = dict(zip(CHANNELS, target))
+        for color in CHANNELS:
+            diff = wanted[color] - levels[color]
+            for _ in range(abs(diff)):
+                command = f"{color}_{'up' if diff > 0 else 'down'}"
+                channel, delta = step[command]
+                levels[channel] = max(0, min(MAX_LEVEL, levels[channel] + delta))
+                history.append(dict(levels))
+    return history
+
+
+def _packed_replay(pairs):
+    """Replay the same transitions with interned states, keeping an array('H') history."""
+    history = array('H')
+    for current, target in pairs:
+        state = current
+        for command in current.commands_to(target):
+            state = state.apply(command)
+            history.append(state.packed)
+    return history
+
+
+def _measure(replay, pairs):
+    """(seconds, peak bytes allocated) of one replay that keeps its state history."""
+    started = time.perf_counter()
+    replay(pairs)
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    replay(pairs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def parse_args():
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(description="Packed light state vs level dicts")
+    parser.add_argument('--transitions', type=int, default=20000,
+                        help="Random transitions to replay")
+    parser.add_argument('--seed', type=int, default=0)
+    return parser.parse_args()
+
+
+def main():
+    """Compare dict-based and packed replays of random transitions."""
+    args = parse_args()
+    rng = random.Random(args.seed)
+    levels = [tuple(rng.randint(0, MAX_LEVEL) for _ in CHANNELS)
+              for _ in range(args.transitions + 1)]
+    dict_pairs = list(zip(levels, levels[1:]))
+    states = [LightState.from_levels(level) for level in levels]
+    packed_pairs = list(zip(states, states[1:]))
+    # Warm the successor tables so the comparison is of steady state
+    history = _packed_replay(packed_pairs)
+    if [LightState.from_dict(levels) for levels in _dict_replay(dict_pairs)] != from_array(history):
+        print("❌ The replays disagree")
+        return 1
+    commands = len(history)
+
+    print("💡 Hygger Light State - packed states vs level dicts")
+    print("=" * 64)
+    print(f"📦 {args.transitions:,} random transitions, {commands:,} IR commands")
+    print()
+    print(f"{'Replay':<10} {'Time':>10} {'ns/command':>12} {'Peak memory':>12} {'B/command':>10}")
+    print("-" * 64)
+    for label, replay, pairs in (('dicts', _dict_replay, dict_pairs),
+                                 ('packed', _packed_replay, packed_pairs)):
+        elapsed, peak = _measure(replay, pairs)
+        print(f"{label:<10} {elapsed * 1000:>8.1f}ms {elapsed / commands * 1e9:>12.0f} "
+              f"{peak:>10,} B {peak / commands:>10.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
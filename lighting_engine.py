@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Hygger Light Engine
+Pure-Python mirror of the channel calculations in
+automations/aquarium_dynamic_circadian_lighting.yaml.
+
+The YAML template is the source of truth; this module reproduces it step for step
+(including Jinja's `round(0)`, which is Python's round-half-to-even) so the Python
+tools can evaluate exactly what Home Assistant would send. lighting_vector.py holds
+the NumPy version for whole-range evaluation.
+"""
+from ephemeris import (DEFAULT_LATITUDE, DEFAULT_SOLAR_NOON, sun_elevation,
+                       sunrise_sunset)
+from metrics import ENGINE_EVALUATIONS
+
+CHANNELS = ('white', 'red', 'green', 'blue')
+MAX_LEVEL = 10
+
+# Conditions that trigger the lightning branch instead of a reconcile
+LIGHTNING_CONDITIONS = ('lightning', 'lightning-rainy', 'thunderstorm')
+
+# Typical forecast (cloud_coverage %, precipitation mm/h) of each condition, used for
+# forecast entries without those numbers; other conditions count as a clear sky
+NOMINAL_WEATHER = {
+    'sunny': (5, 0.0), 'clear-night': (5, 0.0), 'windy': (30, 0.0),
+    'partlycloudy': (45, 0.0), 'partly-cloudy': (45, 0.0), 'cloudy': (90, 0.0),
+    'fog': (100, 0.0), 'snowy': (90, 1.0), 'rainy': (95, 2.0), 'snowy-rainy': (95, 2.0),
+    'lightning': (95, 0.0), 'lightning-rainy': (100, 4.0), 'hail': (100, 4.0),
+    'pouring': (100, 8.0),
+}
+CLEAR_COVERAGE = 10      # cloud_coverage % still counted as a clear sky
+FULL_RAIN_MM = 2.0       # precipitation (mm/h) from which rain counts in full
+
+_EVALUATIONS = ENGINE_EVALUATIONS.labels(engine='scalar')
+
+
+def base_brightness(elevation, daylight):
+    """Base brightness (0-10) from sun elevation, as in the YAML `base_brightness` variable."""
+    if not daylight:
+        return 0
+    if elevation > 60:
+        return 10
+    if elevation > 40:
+        return round(8 + (elevation - 40) / 10)
+    if elevation > 20:
+        return round(5 + (elevation - 20) / 6.7)
+    if elevation > 5:
+        return round(2 + (elevation - 5) / 5)
+    if elevation > 0:
+        return round(elevation / 2.5)
+    return 0
+
+
+def channel_values(elevation, daylight, base):
+    """Step 5 of the YAML before each channel's final `round(0)`.
+
+    Green is built from the rounded white and red, as in the template.
+    """
+    if elevation > 10:
+        white = max(int(base), 1)
+    elif elevation > 0:
+        white = base * 0.6
+    else:
+        white = 0
+
+    if 0 < elevation < 20:
+        red = min(base * (1 - elevation / 20) * 1.5, MAX_LEVEL)
+    elif daylight and base > 2:
+        red = max(base * 0.15, 1)
+    else:
+        red = 0
+
+    if base > 1:
+        green = round(white) * 0.6 + round(red) * 0.2 + base * 0.3
+    else:
+        green = 0
+
+    if elevation > 20:
+        blue = min(base * 0.8, 8)
+    elif elevation > 5:
+        blue = min(base * 0.6, 6)
+    elif daylight and base > 0:
+        blue = max(base * 0.3, 1)
+    else:
+        blue = 0
+    return white, red, green, blue
+
+
+def channel_targets(elevation, daylight, base):
+    """Return (white, red, green, blue) before weather modifiers (Step 5 of the YAML)."""
+    white, red, green, blue = channel_values(elevation, daylight, base)
+    return round(white), round(red), round(green), round(blue)
+
+
+def weather_fractions(coverage, precipitation):
+    """Cloud and rain (0-1, to 3 decimals) from a forecast's cloud_coverage % and mm/h."""
+    cloud = max(coverage - CLEAR_COVERAGE, 0) / (100 - CLEAR_COVERAGE)
+    rain = min(precipitation / FULL_RAIN_MM, 1.0)
+    return round(cloud, 3), round(rain, 3)
+
+
+def weather_inputs(weather):
+    """(cloud, rain) for a condition string, or a (cloud, rain) pair passed through."""
+    if weather is None or isinstance(weather, str):
+        return weather_fractions(*NOMINAL_WEATHER.get(weather, NOMINAL_WEATHER['sunny']))
+    return tuple(weather)
+
+
+def weather_factors(weather):
+    """Per-channel multipliers of the YAML weather modifiers (Step 6); 1 means unchanged.
+
+    `weather` is a condition or a (cloud, rain) pair. Clouds dim white and green and
+    warm the light; rain dims further and cools it. At the nominal numbers of
+    'cloudy' and 'rainy' the factors are the old fixed ones (0.6/1.2/0.8/0.9 and
+    0.4/1.2/0.6/1.3), and a clear sky leaves every channel unchanged.
+    """
+    cloud, rain = weather_inputs(weather)
+    white = 1 - 0.45 * cloud - 0.18 * rain
+    red = 1 + 0.225 * cloud
+    green = 1 - 0.225 * cloud - 0.19 * rain
+    blue = 1 - 0.1125 * cloud + 0.4 * rain
+    return white, red, green, blue
+
+
+def apply_weather(targets, condition):
+    """Apply the YAML weather modifiers (Step 6) and clamp to 0-10 (Step 7)."""
+    levels = list(targets)
+    for index, factor in enumerate(weather_factors(condition)):
+        if factor != 1:
+            levels[index] = round(levels[index] * factor)
+    return tuple(max(0, min(MAX_LEVEL, value)) for value in levels)
+
+
+def compute_levels(elevation, daylight, condition='sunny'):
+    """Return the final (white, red, green, blue) levels the automation would reconcile to.
+
+    `condition` is a weather condition or a (cloud, rain) pair (see weather_blend.py).
+    """
+    _EVALUATIONS.inc()
+    base = base_brightness(elevation, daylight)
+    return apply_weather(channel_targets(elevation, daylight, base), condition)
+
+
+def continuous_levels(elevation, daylight, condition='sunny'):
+    """compute_levels without each channel's last rounding: round() of these is the output.
+
+    A weather-modified channel is its rounded target times the modifier; the others
+    are the unrounded Step 5 value. Clamped to 0-10 like Step 7.
+    """
+    base = base_brightness(elevation, daylight)
+    values = channel_values(elevation, daylight, base)
+    return tuple(max(0.0, min(float(MAX_LEVEL), value if factor == 1 else round(value) * factor))
+                 for value, factor in zip(values, weather_factors(condition)))
+
+
+def is_daylight(day_of_year, hour_decimal, latitude=DEFAULT_LATITUDE,
+                solar_noon=DEFAULT_SOLAR_NOON):
+    """Return whether a clock time falls between sunrise and sunset."""
+    times = sunrise_sunset(day_of_year, latitude, solar_noon)
+    if times is None:
+        return sun_elevation(day_of_year, 12.0, latitude, solar_noon) > 0
+    return times[0] <= hour_decimal <= times[1]
+
+
+def levels_at(moment, condition='sunny', latitude=DEFAULT_LATITUDE,
+              solar_noon=DEFAULT_SOLAR_NOON):
+    """Evaluate the engine for a datetime; returns a dict with inputs and levels."""
+    day_of_year = moment.timetuple().tm_yday
+    hour = moment.hour + moment.minute / 60
+    elevation = sun_elevation(day_of_year, hour, latitude, solar_noon)
+    daylight = is_daylight(day_of_year, hour, latitude, solar_noon)
+    levels = compute_levels(elevation, daylight, condition)
+    return {
+        'elevation': elevation,
+        'daylight': daylight,
+        'base_brightness': base_brightness(elevation, daylight),
+        'condition': condition,
+        'lightning': condition in LIGHTNING_CONDITIONS,
+        'levels': dict(zip(CHANNELS, levels)),
+    }
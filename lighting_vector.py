@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Hygger Light Engine (vectorized)
+NumPy version of lighting_engine.py for evaluating every minute of a date range
+or year in a single pass. Results match the scalar engine minute for minute.
+"""
+from datetime import date, timedelta
+from functools import lru_cache
+
+import numpy as np
+
+from ephemeris import DEFAULT_LATITUDE, DEFAULT_SOLAR_NOON
+from lighting_engine import CHANNELS, LIGHTNING_CONDITIONS, MAX_LEVEL
+from lighting_engine import compute_levels as scalar_levels
+from lighting_engine import weather_inputs as scalar_inputs
+from metrics import ENGINE_EVALUATIONS
+
+MINUTES_PER_DAY = 1440
+
+_EVALUATIONS = ENGINE_EVALUATIONS.labels(engine='vector')
+
+
+def minute_grid(start, end):
+    """Return (dates, day_of_year, hour_decimal) for every minute of [start, end].
+
+    `dates` is the list of calendar days; the other two arrays have one entry per
+    minute (len(dates) * 1440).
+    """
+    days = (end - start).days + 1
+    if days <= 0:
+        raise ValueError("end date must not be before start date")
+    dates = [start + timedelta(days=offset) for offset in range(days)]
+    day_numbers = np.array([day.timetuple().tm_yday for day in dates], dtype=np.int16)
+    day_of_year = np.repeat(day_numbers, MINUTES_PER_DAY)
+    hour_decimal = np.tile(np.arange(MINUTES_PER_DAY, dtype=np.float64) / 60, days)
+    return dates, day_of_year, hour_decimal
+
+
+def solar_declination(day_of_year):
+    """Solar declination in degrees (array version of ephemeris.solar_declination)."""
+    return 23.45 * np.sin(np.radians((360 / 365) * (np.asarray(day_of_year) - 81)))
+
+
+def sunrise_sunset(day_of_year, latitude=DEFAULT_LATITUDE, solar_noon=DEFAULT_SOLAR_NOON):
+    """Return (sunrise, sunset) decimal-hour arrays; NaN during polar day/night."""
+    lat_rad = np.radians(latitude)
+    decl_rad = np.radians(solar_declination(day_of_year))
+    cos_hour_angle = -np.tan(lat_rad) * np.tan(decl_rad)
+    valid = np.abs(cos_hour_angle) <= 1
+    hour_angle = np.degrees(np.arccos(np.where(valid, cos_hour_angle, np.nan)))
+    return solar_noon - hour_angle / 15, solar_noon + hour_angle / 15
+
+
+def sun_elevation(day_of_year, hour_decimal, latitude=DEFAULT_LATITUDE,
+                  solar_noon=DEFAULT_SOLAR_NOON):
+    """Sun elevation in degrees for arrays of day-of-year and clock hours."""
+    lat_rad = np.radians(latitude)
+    decl_rad = np.radians(solar_declination(day_of_year))
+    hour_angle = np.radians(15 * (np.asarray(hour_decimal) - solar_noon))
+    sin_elevation = (np.sin(lat_rad) * np.sin(decl_rad)
+                     + np.cos(lat_rad) * np.cos(decl_rad) * np.cos(hour_angle))
+    return np.degrees(np.arcsin(np.clip(sin_elevation, -1.0, 1.0)))
+
+
+def daylight_mask(day_of_year, hour_decimal, latitude=DEFAULT_LATITUDE,
+                  solar_noon=DEFAULT_SOLAR_NOON):
+    """Boolean array: clock time between sunrise and sunset (polar days use midday elevation)."""
+    sunrise, sunset = sunrise_sunset(day_of_year, latitude, solar_noon)
+    hour_decimal = np.asarray(hour_decimal)
+    mask = (hour_decimal >= sunrise) & (hour_decimal <= sunset)
+    polar = np.isnan(sunrise)
+    if np.any(polar):
+        noon = sun_elevation(day_of_year, 12.0, latitude, solar_noon)
+        mask = np.where(polar, noon > 0, mask)
+    return mask
+
+
+def base_brightness(elevation, daylight):
+    """Vectorized lighting_engine.base_brightness."""
+    e = np.asarray(elevation, dtype=np.float64)
+    base = np.select(
+        [e > 60, e > 40, e > 20, e > 5, e > 0],
+        [10.0, np.round(8 + (e - 40) / 10), np.round(5 + (e - 20) / 6.7),
+         np.round(2 + (e - 5) / 5), np.round(e / 2.5)],
+        default=0.0)
+    return np.where(daylight, base, 0.0)
+
+
+def channel_targets(elevation, daylight, base):
+    """Vectorized lighting_engine.channel_targets; returns four float arrays."""
+    e = np.asarray(elevation, dtype=np.float64)
+    white = np.select([e > 10, e > 0], [np.maximum(np.trunc(base), 1), np.round(base * 0.6)],
+                      default=0.0)
+    red = np.select(
+        [(e > 0) & (e < 20), daylight & (base > 2)],
+        [np.minimum(np.round(base * (1 - e / 20) * 1.5), MAX_LEVEL),
+         np.round(np.maximum(base * 0.15, 1))],
+        default=0.0)
+    green = np.where(base > 1, np.round(white * 0.6 + red * 0.2 + base * 0.3), 0.0)
+    blue = np.select(
+        [e > 20, e > 5, daylight & (base > 0)],
+        [np.minimum(np.round(base * 0.8), 8), np.minimum(np.round(base * 0.6), 6),
+         np.round(np.maximum(base * 0.3, 1))],
+        default=0.0)
+    return white, red, green, blue
+
+
+def weather_inputs(conditions):
+    """Return (cloud, rain) arrays for an array of condition strings (nominal numbers)."""
+    conditions = np.asarray(conditions)
+    unique, inverse = np.unique(conditions, return_inverse=True)
+    pairs = np.array([scalar_inputs(str(c)) for c in unique], dtype=np.float64).reshape(-1, 2)
+    return pairs[inverse, 0].reshape(conditions.shape), pairs[inverse, 1].reshape(conditions.shape)
+
+
+def apply_weather(targets, cloud, rain):
+    """Vectorized lighting_engine.apply_weather; returns an (N, 4) int8 array."""
+    white, red, green, blue = targets
+    factors = (1 - 0.45 * cloud - 0.18 * rain, 1 + 0.225 * cloud,
+               1 - 0.225 * cloud - 0.19 * rain, 1 - 0.1125 * cloud + 0.4 * rain)
+    levels = np.stack([np.where(factor == 1, channel, np.round(channel * factor))
+                       for channel, factor in zip((white, red, green, blue), factors)], axis=-1)
+    return np.clip(levels, 0, MAX_LEVEL).astype(np.int8)
+
+
+def compute_levels(elevation, daylight, conditions='sunny', weather=None):
+    """Return an (N, 4) int8 array of final W/R/G/B levels.
+
+    `weather` is an optional (cloud, rain) pair of arrays used instead of the
+    conditions' nominal numbers.
+    """
+    elevation = np.asarray(elevation, dtype=np.float64)
+    daylight = np.asarray(daylight, dtype=bool)
+    base = base_brightness(elevation, daylight)
+    targets = channel_targets(elevation, daylight, base)
+    if weather is None:
+        weather = weather_inputs(np.broadcast_to(np.asarray(conditions), elevation.shape))
+    cloud, rain = (np.broadcast_to(np.asarray(value, dtype=np.float64), elevation.shape)
+                   for value in weather)
+    return apply_weather(targets, cloud, rain)
+
+
+def evaluate_range(start, end, conditions='sunny', latitude=DEFAULT_LATITUDE,
+                   solar_noon=DEFAULT_SOLAR_NOON):
+    """Evaluate the engine for every minute from `start` to `end` (inclusive dates).
+
+    `conditions` is a condition string or an array with one entry per minute.
+    Returns a dict of per-minute arrays plus the list of dates.
+    """
+    dates, day_of_year, hour_decimal = minute_grid(start, end)
+    elevation = sun_elevation(day_of_year, hour_decimal, latitude, solar_noon)
+    daylight = daylight_mask(day_of_year, hour_decimal, latitude, solar_noon)
+    conditions = np.broadcast_to(np.asarray(conditions), elevation.shape)
+    levels = compute_levels(elevation, daylight, conditions)
+    _EVALUATIONS.inc(len(levels))
+    lightning = np.isin(conditions, LIGHTNING_CONDITIONS)
+    return {
+        'dates': dates,
+        'day_of_year': day_of_year,
+        'hour': hour_decimal,
+        'elevation': elevation,
+        'daylight': daylight,
+        'conditions': conditions,
+        'lightning': lightning,
+        'levels': levels,
+    }
+
+
+@lru_cache(maxsize=None)
+def _elevation_steps(condition, resolution):
+    breakpoints = []
+    values = []
+    grid = np.arange(1, int(round(90 / resolution)) + 1) * resolution
+    levels = compute_levels(grid, np.ones(grid.shape, dtype=bool), condition)
+    values.append(tuple(int(v) for v in levels[0]))
+    for index in np.flatnonzero(np.any(levels[1:] != levels[:-1], axis=1)):
+        low, high = float(grid[index]), float(grid[index + 1])
+        below = scalar_levels(low, True, condition)
+        while high - low > 1e-9:
+            middle = (low + high) / 2
+            if scalar_levels(middle, True, condition) == below:
+                low = middle
+            else:
+                high = middle
+        breakpoints.append(low)
+        values.append(tuple(int(v) for v in levels[index + 1]))
+    return tuple(breakpoints), tuple(values)
+
+
+def elevation_steps(condition='sunny', resolution=1e-3):
+    """Daylight output as a step function of sun elevation.
+
+    Returns (breakpoints, values): values[0] applies for elevations in (0, breakpoints[0]],
+    values[k] above breakpoints[k-1]. During daylight the engine's output depends on the
+    elevation alone, so this table describes every daylight minute of every day.
+    """
+    breakpoints, values = _elevation_steps(condition, resolution)
+    return np.array(breakpoints), np.array(values, dtype=np.int16)
+
+
+def minutes_above(elevation, day_of_year, latitude=DEFAULT_LATITUDE,
+                  solar_noon=DEFAULT_SOLAR_NOON):
+    """Count the minutes of each day (on the 1-minute clock grid) with the sun above `elevation`.
+
+    Arguments broadcast against each other, so (locations, 1) latitudes with a (days,)
+    day-of-year array give a (locations, days) result without a per-minute pass.
+    """
+    lat_rad = np.radians(latitude)
+    decl_rad = np.radians(solar_declination(day_of_year))
+    a = np.sin(lat_rad) * np.sin(decl_rad)
+    b = np.cos(lat_rad) * np.cos(decl_rad)
+    cos_hour_angle = (np.sin(np.radians(elevation)) - a) / b
+    half_width = np.degrees(np.arccos(np.clip(cos_hour_angle, -1.0, 1.0))) * 4  # minutes
+    counts = 0
+    for shift in (-MINUTES_PER_DAY, 0, MINUTES_PER_DAY):
+        centre = np.asarray(solar_noon) * 60 + shift
+        first = np.maximum(np.floor(centre - half_width) + 1, 0)
+        last = np.minimum(np.ceil(centre + half_width) - 1, MINUTES_PER_DAY - 1)
+        counts = counts + np.maximum(last - first + 1, 0)
+    counts = np.where(cos_hour_angle <= -1, MINUTES_PER_DAY, counts)
+    return np.where(cos_hour_angle >= 1, 0, counts).astype(np.int32)
+
+
+def daylight_minutes(day_of_year, latitude=DEFAULT_LATITUDE, solar_noon=DEFAULT_SOLAR_NOON):
+    """Count the minutes of each day that daylight_mask() marks as daylight."""
+    sunrise, sunset = sunrise_sunset(day_of_year, latitude, solar_noon)
+    first = np.maximum(np.ceil(sunrise * 60), 0)
+    last = np.minimum(np.floor(sunset * 60), MINUTES_PER_DAY - 1)
+    counts = np.maximum(last - first + 1, 0)
+    polar_day = sun_elevation(day_of_year, 12.0, latitude, solar_noon) > 0
+    counts = np.where(np.isnan(sunrise), np.where(polar_day, MINUTES_PER_DAY, 0), counts)
+    return counts.astype(np.int32)
+
+
+def daily_exposure(day_of_year, latitude=DEFAULT_LATITUDE, solar_noon=DEFAULT_SOLAR_NOON,
+                   condition='sunny'):
+    """Per-day light exposure for one fixed weather condition.
+
+    Returns a dict of arrays shaped like the broadcast inputs: `daylight_minutes`,
+    `light_on_minutes` and `level_minutes` (trailing axis of four channels, summing the
+    level of each channel over every minute of the day). Cost is proportional to the
+    number of elevation breakpoints, not to the number of minutes. Totals agree with
+    evaluate_range() except when a minute's elevation lands exactly on a breakpoint
+    (to within floating-point noise), which only happens on contrived geometries.
+    """
+    breakpoints, values = elevation_steps(condition)
+    shape = np.broadcast(np.asarray(day_of_year), np.asarray(latitude),
+                         np.asarray(solar_noon)).shape
+    daylight = daylight_minutes(day_of_year, latitude, solar_noon)
+    sunlit = minutes_above(0.0, day_of_year, latitude, solar_noon)
+    level_minutes = np.zeros(shape + (len(CHANNELS),), dtype=np.int64)
+    level_minutes += sunlit[..., None] * values[0]
+    lit = values.sum(axis=1) > 0
+    light_on = sunlit * int(lit[0])
+    for k, breakpoint in enumerate(breakpoints, start=1):
+        above = minutes_above(breakpoint, day_of_year, latitude, solar_noon)
+        level_minutes += above[..., None] * (values[k] - values[k - 1])
+        light_on = light_on + above * (int(lit[k]) - int(lit[k - 1]))
+    return {'daylight_minutes': daylight, 'light_on_minutes': light_on,
+            'level_minutes': level_minutes}
+
+
+def year_range(year):
+    """Return (first_day, last_day) for a calendar year."""
+    return date(year, 1, 1), date(year, 12, 31)
+
+
+__all__ = ['CHANNELS', 'MINUTES_PER_DAY', 'minute_grid', 'solar_declination', 'sunrise_sunset',
+           'sun_elevation', 'daylight_mask', 'base_brightness', 'channel_targets',
+           'weather_inputs', 'apply_weather', 'compute_levels', 'evaluate_range',
+           'elevation_steps', 'minutes_above', 'daylight_minutes', 'daily_exposure', 'year_range']
@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+"""
+Hygger Log Analyzer
+Streams home-assistant.log and summarizes the aquarium automations per day.
+
+Only the lines the aquarium automations and scripts write are parsed (plus the HA
+warnings they cause). Files are read as raw bytes in large blocks and a few
+literal searches find those lines inside each block; only they are decoded and
+matched against the precompiled patterns, so the tens of millions of unrelated
+lines in a multi-GB log never reach Python code one by one. State is one day of
+per-tick samples; each day is summarized and dropped as soon as the next one
+starts, so memory stays constant however long the log is.
+
+Per day:
+  ticks       circadian runs ("Circadian update"), minutes missed between them
+              and runs skipped as "Already running"
+  latency     seconds from the top of the minute to the "Circadian update" line
+  reconcile   seconds from "Target levels" to "Aquarium lights reconciled" for
+              reconciles that changed the light, and the IR commands they imply
+  weather     share of ticks preceded by a failed weather.get_forecasts call
+              (the automation fell back to the cache or 'sunny')
+  cache       forecast cache updates (full, daily only, failed) and size
+  resets      nightly reset and sync durations, warnings and errors
+
+Usage:
+    python3 log_analyzer.py /config/home-assistant.log home-assistant.log.1.gz
+    python3 log_analyzer.py --follow /config/home-assistant.log --metrics-port 9464
+"""
+import argparse
+import gzip
+import os
+import re
+import sys
+import time
+from datetime import date
+
+import metrics
+from metrics import IR_COMMANDS, RECONCILE_DURATION, REGISTRY
+
+# "2026-06-21 00:35:00.123 WARNING (MainThread) [logger] message"
+LINE_RE = re.compile(r'(\d{4}-\d\d-\d\d) (\d\d):(\d\d):(\d\d)(?:\.(\d+))? +([A-Z]+) +'
+                     r'\([^)]*\) +\[([^\]]+)\] (.*)')
+
+# Every line worth parsing contains one of these ('quarium' covers the aquarium
+# loggers, messages and entity ids). bytes.find is several times faster than a
+# regex alternation over the same text.
+PREFILTER = (b'quarium', b'get_forecasts', b'Already running')
+
+CIRCADIAN_RE = re.compile(r'Circadian update: .*?Weather=([\w-]*)')
+TARGET_RE = re.compile(r'Target levels: W=')
+RECONCILED_RE = re.compile(r'Aquarium lights reconciled: ')
+LEVEL_CHANGE_RE = re.compile(r'([WRGB]):(-?\d+(?:\.\d+)?)→(-?\d+(?:\.\d+)?)')
+WEATHER_ERROR_RE = re.compile(r'weather\.get_forecasts')
+ALREADY_RUNNING_RE = re.compile(r'[Cc]ircadian.*Already running|Already running.*circadian')
+CACHE_RESULT_RE = re.compile(r'Forecast cache (updated successfully|updated with daily|update failed)')
+CACHE_SIZE_RE = re.compile(r'Cache status: \w+ \((\d+) characters\)')
+RESET_START_RE = re.compile(r'Starting daily aquarium light reset')
+RESET_DONE_RE = re.compile(r'Daily aquarium light reset completed')
+SYNC_START_RE = re.compile(r'Aquarium light sync started')
+SYNC_DONE_RE = re.compile(r'Aquarium light sync completed')
+
+BLOCK_SIZE = 1 << 22
+
+CACHE_RESULTS = {'updated successfully': 'full', 'updated with daily': 'daily', 'update failed': 'failed'}
+CHANNEL_NAMES = {'W': 'white', 'R': 'red', 'G': 'green', 'B': 'blue'}
+
+TICK_LATENCY = REGISTRY.histogram(
+    'hygger_tick_latency_seconds', "Delay from the top of the minute to the circadian update",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60))
+WEATHER_LOOKUPS = REGISTRY.counter(
+    'hygger_weather_lookups_total', "Circadian ticks by forecast source", ('result',))
+MISSED_TICKS = REGISTRY.counter(
+    'hygger_missed_ticks_total', "Minutes without a circadian update")
+FORECAST_CACHE_SIZE = REGISTRY.gauge(
+    'hygger_forecast_cache_characters', "Size of the forecast cache after its last update")
+
+
+class DayStats:
+    """Accumulators for one calendar day of log lines."""
+
+    __slots__ = ('day', 'ticks', 'latencies', 'missed', 'longest_gap', 'skipped', 'fallbacks',
+                 'conditions', 'reconciles', 'changed', 'commands', 'durations', 'cache',
+                 'cache_size', 'resets', 'syncs', 'warnings', 'errors')
+
+    def __init__(self, day):
+        self.day = day
+        self.ticks = 0
+        self.latencies = []
+        self.missed = 0
+        self.longest_gap = 0
+        self.skipped = 0
+        self.fallbacks = 0
+        self.conditions = {}
+        self.reconciles = 0
+        self.changed = 0
+        self.commands = 0
+        self.durations = []
+        self.cache = dict.fromkeys(CACHE_RESULTS.values(), 0)
+        self.cache_size = None
+        self.resets = []
+        self.syncs = []
+        self.warnings = 0
+        self.errors = 0
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+class LogAnalyzer:
+    """Feed log lines in order; completed days are passed to `on_day`."""
+
+    def __init__(self, on_day=None):
+        self.on_day = on_day
+        self.current = None
+        self.days = 0
+        self.lines = 0
+        self.parsed = 0
+        self.totals = DayStats('total')
+        self._ordinals = {}
+        self._last_tick = None
+        self._target_at = None
+        self._reset_at = None
+        self._sync_at = None
+        self._weather_failed = False
+
+    def _minute_index(self, day, seconds):
+        ordinal = self._ordinals.get(day)
+        if ordinal is None:
+            ordinal = self._ordinals[day] = date.fromisoformat(day).toordinal()
+            if len(self._ordinals) > 4:
+                self._ordinals = {day: ordinal}
+        return ordinal * 1440 + int(seconds // 60)
+
+    def feed(self, line):
+        """Process one raw log line (bytes)."""
+        self.lines += 1
+        if any(literal in line for literal in PREFILTER):
+            self.feed_relevant(line.decode('utf-8', 'replace').rstrip('\n'))
+
+    def feed_block(self, block):
+        """Process a block of complete lines (bytes), decoding only the relevant ones."""
+        self.lines += block.count(b'\n')
+        lines = {}
+        for literal in PREFILTER:
+            position = block.find(literal)
+            while position >= 0:
+                start = block.rfind(b'\n', 0, position) + 1
+                end = block.find(b'\n', position)
+                if end < 0:
+                    end = len(block)
+                lines[start] = end
+                position = block.find(literal, end)
+        for start in sorted(lines):
+            self.feed_relevant(block[start:lines[start]].decode('utf-8', 'replace'))
+
+    def feed_relevant(self, line):
+        """Parse a line that passed the pre-filter."""
+        match = LINE_RE.match(line)
+        if match is None:
+            return  # traceback or other continuation line
+        day, hour, minute, second, fraction, level, logger, message = match.groups()
+        self.parsed += 1
+        seconds = int(hour) * 3600 + int(minute) * 60 + int(second)
+        if fraction:
+            seconds += int(fraction) / 10 ** len(fraction)
+        stats = self.current
+        if stats is None or stats.day != day:
+            stats = self._roll(day)
+        if level == 'WARNING':
+            stats.warnings += 1
+        elif level in ('ERROR', 'CRITICAL'):
+            stats.errors += 1
+
+        if logger == 'aquarium.circadian':
+            weather = CIRCADIAN_RE.match(message)
+            if weather is not None:
+                self._tick(stats, day, seconds, weather.group(1))
+            elif TARGET_RE.match(message):
+                self._target_at = seconds
+            return
+        if RECONCILED_RE.match(message):
+            self._reconciled(stats, seconds, message)
+        elif WEATHER_ERROR_RE.search(message) and level != 'INFO':
+            self._weather_failed = True
+        elif ALREADY_RUNNING_RE.search(line):
+            stats.skipped += 1
+        elif logger == 'aquarium.forecast_cache':
+            self._forecast_cache(stats, message)
+        elif RESET_START_RE.match(message):
+            self._reset_at = seconds
+        elif RESET_DONE_RE.match(message) and self._reset_at is not None:
+            stats.resets.append(seconds - self._reset_at)
+            self._reset_at = None
+        elif SYNC_START_RE.match(message):
+            self._sync_at = seconds
+        elif SYNC_DONE_RE.match(message) and self._sync_at is not None:
+            stats.syncs.append(seconds - self._sync_at)
+            self._sync_at = None
+
+    def _tick(self, stats, day, seconds, condition):
+        stats.ticks += 1
+        latency = seconds % 60
+        stats.latencies.append(latency)
+        TICK_LATENCY.observe(latency)
+        index = self._minute_index(day, seconds)
+        if self._last_tick is not None and index - self._last_tick > 1:
+            gap = index - self._last_tick - 1
+            stats.missed += gap
+            stats.longest_gap = max(stats.longest_gap, gap)
+            MISSED_TICKS.inc(gap)
+        self._last_tick = index
+        stats.conditions[condition] = stats.conditions.get(condition, 0) + 1
+        if self._weather_failed:
+            stats.fallbacks += 1
+            WEATHER_LOOKUPS.labels('fallback').inc()
+            self._weather_failed = False
+        else:
+            WEATHER_LOOKUPS.labels('live').inc()
+
+    def _reconciled(self, stats, seconds, message):
+        stats.reconciles += 1
+        commands = 0
+        for channel, before, after in LEVEL_CHANGE_RE.findall(message):
+            steps = round(float(after)) - round(float(before))
+            if steps:
+                commands += abs(steps)
+                IR_COMMANDS.labels('log', CHANNEL_NAMES[channel],
+                                   'up' if steps > 0 else 'down').inc(abs(steps))
+        if commands:
+            stats.changed += 1
+            stats.commands += commands
+        if self._target_at is not None and commands:
+            # Only reconciles that sent something; no-op runs finish in milliseconds
+            duration = seconds - self._target_at
+            if duration < 0:
+                duration += 86400
+            stats.durations.append(duration)
+            RECONCILE_DURATION.labels(source='log').observe(duration)
+        self._target_at = None
+
+    def _forecast_cache(self, stats, message):
+        result = CACHE_RESULT_RE.match(message)
+        if result is not None:
+            stats.cache[CACHE_RESULTS[result.group(1)]] += 1
+            return
+        size = CACHE_SIZE_RE.match(message)
+        if size is not None:
+            stats.cache_size = int(size.group(1))
+            FORECAST_CACHE_SIZE.set(stats.cache_size)
+
+    def _roll(self, day):
+        """Close the current day and start `day`."""
+        self._close_day()
+        self.current = DayStats(day)
+        return self.current
+
+    def _close_day(self):
+        stats = self.current
+        if stats is None:
+            return
+        self.days += 1
+        totals = self.totals
+        for name in ('ticks', 'missed', 'skipped', 'fallbacks', 'reconciles', 'changed',
+                     'commands', 'warnings', 'errors'):
+            setattr(totals, name, getattr(totals, name) + getattr(stats, name))
+        totals.longest_gap = max(totals.longest_gap, stats.longest_gap)
+        for result, count in stats.cache.items():
+            totals.cache[result] += count
+        for condition, count in stats.conditions.items():
+            totals.conditions[condition] = totals.conditions.get(condition, 0) + count
+        if stats.cache_size is not None:
+            totals.cache_size = stats.cache_size
+        # Totals keep per-day aggregates only: (count, sum, p95, max)
+        for name in ('latencies', 'durations', 'resets', 'syncs'):
+            values = getattr(stats, name)
+            if values:
+                getattr(totals, name).append((len(values), sum(values),
+                                              _percentile(values, 0.95), max(values)))
+        if self.on_day is not None:
+            self.on_day(stats)
+        self.current = None
+
+    def close(self):
+        """Summarize the last (possibly partial) day."""
+        self._close_day()
+        return self.totals
+
+
+def open_log(path):
+    """Open a log as a binary stream: '-' for stdin, .gz transparently."""
+    if path == '-':
+        return sys.stdin.buffer
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    return open(path, 'rb')
+
+
+def read_blocks(handle, size=BLOCK_SIZE):
+    """Yield blocks of whole lines from a binary stream."""
+    pending = b''
+    while True:
+        block = handle.read(size)
+        if not block:
+            break
+        cut = block.rfind(b'\n') + 1
+        if not cut:
+            pending += block
+            continue
+        yield pending + block[:cut]
+        pending = block[cut:]
+    if pending:
+        yield pending + b'\n'
+
+
+def follow(path, poll=1.0, from_start=False):
+    """Yield lines (bytes) appended to `path`, reopening it after rotation or truncation."""
+    handle = open_log(path)
+    if not from_start:
+        handle.seek(0, os.SEEK_END)
+    inode = os.fstat(handle.fileno()).st_ino
+    pending = b''
+    while True:
+        chunk = handle.readline()
+        if chunk:
+            pending += chunk
+            if pending.endswith(b'\n'):
+                yield pending
+                pending = b''
+            continue
+        time.sleep(poll)
+        try:
+            status = os.stat(path)
+        except FileNotFoundError:
+            continue  # Mid-rotation; the new file appears shortly
+        if status.st_ino != inode or status.st_size < handle.tell():
+            handle.close()
+            handle = open_log(path)
+            inode = os.fstat(handle.fileno()).st_ino
+            pending = b''
+
+
+def _mean(values):
+    return sum(values) / len(values) if values else 0.0
+
+
+def print_header():
+    print(f"{'Date':<10} {'Ticks':>5} {'Missed':>6} {'Gap':>4} {'Skip':>4} {'Lat mean':>8} "
+          f"{'p95':>6} {'Recs':>5} {'Cmds':>5} {'Rec mean':>8} {'max':>6} {'Wx fb':>6} "
+          f"{'Cache':>6} {'W/E':>7}")
+    print("-" * 101)
+
+
+def print_day(stats):
+    """Print one summary row for a day."""
+    fallback = stats.fallbacks / stats.ticks if stats.ticks else 0.0
+    cache = '-' if stats.cache_size is None else f"{stats.cache_size:,}"
+    print(f"{stats.day:<10} {stats.ticks:>5} {stats.missed:>6} {stats.longest_gap:>4} "
+          f"{stats.skipped:>4} {_mean(stats.latencies):>7.2f}s "
+          f"{_percentile(stats.latencies, 0.95):>5.2f}s {stats.changed:>5} {stats.commands:>5} "
+          f"{_mean(stats.durations):>7.1f}s {max(stats.durations, default=0.0):>5.1f}s "
+          f"{fallback:>6.1%} {cache:>6} {stats.warnings:>3}/{stats.errors:<3}")
+
+
+def _combine(aggregates):
+    """(count, mean, worst daily p95, max) from per-day (count, sum, p95, max) tuples."""
+    count = sum(a[0] for a in aggregates)
+    if not count:
+        return 0, 0.0, 0.0, 0.0
+    return (count, sum(a[1] for a in aggregates) / count, max(a[2] for a in aggregates),
+            max(a[3] for a in aggregates))
+
+
+def print_totals(analyzer, elapsed):
+    """Print the summary over every day read."""
+    totals = analyzer.totals
+    print()
+    print(f"📄 {analyzer.lines:,} lines read, {analyzer.parsed:,} aquarium lines parsed, "
+          f"{analyzer.days} day(s) in {elapsed:.1f}s "
+          f"({analyzer.lines / elapsed if elapsed else 0:,.0f} lines/s)")
+    if not totals.ticks:
+        print("⚠️  No 'Circadian update' lines found - is the aquarium.circadian logger at debug level?")
+    count, mean, p95, worst = _combine(totals.latencies)
+    print(f"⏱️  Ticks: {totals.ticks:,}, {totals.missed:,} minute(s) missed "
+          f"(longest gap {totals.longest_gap} min), {totals.skipped} skipped as already running")
+    if count:
+        print(f"   Tick latency: mean {mean:.2f}s, worst daily p95 {p95:.2f}s, max {worst:.2f}s")
+    count, mean, p95, worst = _combine(totals.durations)
+    print(f"🔄 Reconciles: {totals.reconciles:,} ({totals.changed:,} changed the light, "
+          f"{totals.commands:,} IR commands)")
+    if count:
+        print(f"   Duration: mean {mean:.1f}s, worst daily p95 {p95:.1f}s, max {worst:.1f}s")
+    if totals.ticks:
+        share = totals.fallbacks / totals.ticks
+        conditions = ', '.join(f"{name} {value / totals.ticks:.0%}" for name, value in
+                               sorted(totals.conditions.items(), key=lambda item: -item[1])[:5])
+        print(f"🌦️  Weather fallback: {totals.fallbacks:,} tick(s) ({share:.1%}); conditions: {conditions}")
+    cache = totals.cache
+    print(f"💾 Forecast cache updates: {cache['full']} full, {cache['daily']} daily only, "
+          f"{cache['failed']} failed; last size "
+          f"{'-' if totals.cache_size is None else f'{totals.cache_size:,} characters'}")
+    for label, aggregates in (("Nightly resets", totals.resets), ("Syncs", totals.syncs)):
+        count, mean, _, worst = _combine(aggregates)
+        if count:
+            print(f"🌙 {label}: {count}, mean {mean:.1f}s, max {worst:.1f}s")
+    print(f"⚠️  Warnings: {totals.warnings:,}  Errors: {totals.errors:,}")
+
+
+def parse_args():
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(description="Summarize aquarium automation logs per day")
+    parser.add_argument('paths', nargs='*', default=['home-assistant.log'],
+                        help="Log files in time order (.gz supported, '-' for stdin)")
+    parser.add_argument('--follow', action='store_true',
+                        help="Keep reading the last file as it grows (survives rotation)")
+    parser.add_argument('--from-start', action='store_true',
+                        help="With --follow, read the existing content first")
+    parser.add_argument('--poll', type=float, default=1.0, help="Seconds between --follow polls")
+    parser.add_argument('--totals-only', action='store_true', help="Skip the per-day table")
+    metrics.add_arguments(parser)
+    return parser.parse_args()
+
+
+def main():
+    """Stream the logs and print per-day and overall summaries."""
+    args = parse_args()
+    print("📜 Hygger Log Analyzer")
+    print("=" * 101)
+    server = metrics.start(args)
+    on_day = None
+    if not args.totals_only:
+        print_header()
+        on_day = print_day
+    analyzer = LogAnalyzer(on_day)
+    started = time.perf_counter()
+    files = args.paths[:-1] if args.follow else args.paths
+    try:
+        for path in files:
+            with open_log(path) as handle:
+                for block in read_blocks(handle):
+                    analyzer.feed_block(block)
+        if args.follow:
+            for line in follow(args.paths[-1], args.poll, args.from_start):
+                analyzer.feed(line)
+    except KeyboardInterrupt:
+        print("\n⏹️  Stopped")
+    except FileNotFoundError as error:
+        print(f"❌ {error}")
+        sys.exit(1)
+    analyzer.close()
+    print_totals(analyzer, time.perf_counter() - started)
+    metrics.finish(args, server)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Hygger Lookahead Scheduler
+Starts IR commands ahead of the schedule so every level change lands on time.
+
+The circadian automation computes the target at the top of each minute and only
+then starts sending, so each level change lands `k` IR periods late, and a
+reconcile that is still running makes the next minute's run get skipped
+(`mode: single`). The schedule itself is deterministic, so the lookahead
+scheduler takes the upcoming per-minute targets from the engine, turns them into
+unit level changes with due times, and assigns send times backwards from the
+last one: each command is sent as late as possible while still landing by its
+due time and keeping one IR period from the command after it.
+
+Both policies are sent through the same delivery model, in which each command
+lands after the hub latency plus a random delay (`--jitter-ms`) or is lost
+(`--drop`), and every level change is matched to the command that performed it,
+giving mean/p99 schedule lag before and after. Weather is taken from the hourly
+forecast, so forecast changes are pre-positioned too; only surprises (forecast
+misses, manual changes) remain reactive.
+
+The integration sends ahead with `lookahead: true` (it plans one minute ahead, which
+covers the leads reported here); this is its before/after estimate. The YAML
+automations still follow the reactive policy.
+"""
+import argparse
+import bisect
+import random
+import time
+from collections import deque
+from datetime import date, timedelta
+
+from lighting_engine import CHANNELS
+from reconcile_planner import DEFAULT_COSTS, RECONCILE_ORDER, transition_commands
+
+# Send-to-light latency (hub round trip + IR frame) and spacing between commands
+LATENCY_S = (DEFAULT_COSTS.hub_ms + DEFAULT_COSTS.frame_ms) / 1000
+PERIOD_S = LATENCY_S + DEFAULT_COSTS.delay_ms / 1000
+
+# Time from the minute trigger to the first IR command (forecast call, templates)
+REACT_S = 0.25
+# Delivery model: mean extra delay on top of LATENCY_S (Wi-Fi retries, a busy hub)
+# and the share of commands the light never receives
+JITTER_S = 0.1
+DROP = 0.01
+
+
+def minute_targets(start, days, condition='sunny', seed=0):
+    """Return the engine's (minutes, 4) target levels for `days` days from `start`.
+
+    `condition='random'` follows an hourly weather chain; the automation reads the
+    hourly forecast, so those changes are known ahead just like the sun's.
+    """
+    from lighting_vector import evaluate_range
+
+    if condition == 'random':
+        import numpy as np
+        from drift_montecarlo import weather_timeline
+
+        condition = weather_timeline(days, np.random.default_rng(seed))
+    return evaluate_range(start, start + timedelta(days=days - 1), condition)['levels']
+
+
+def level_changes(targets, initial=None, order=RECONCILE_ORDER):
+    """Return [(due_s, command)] for every unit level change in a per-minute schedule."""
+    previous = tuple(int(level) for level in (targets[0] if initial is None else initial))
+    changes = []
+    for minute, row in enumerate(targets.tolist()):
+        row = tuple(row)
+        if row != previous:
+            changes.extend((minute * 60.0, command)
+                           for command in transition_commands(previous, row, order))
+            previous = row
+    return changes
+
+
+def lookahead_schedule(changes, period_s=PERIOD_S, latency_s=LATENCY_S, margin_s=0.0):
+    """Return send times (same order as `changes`) that land each command by its due time."""
+    sends = [0.0] * len(changes)
+    latest = float('inf')
+    for index in range(len(changes) - 1, -1, -1):
+        latest = min(changes[index][0] - latency_s - margin_s, latest)
+        sends[index] = latest
+        latest -= period_s
+    return sends
+
+
+def reactive_sends(targets, period_s=PERIOD_S, react_s=REACT_S, initial=None,
+                   order=RECONCILE_ORDER):
+    """Replay the per-minute automation; return ([(send_s, command)], skipped runs)."""
+    helpers = tuple(int(level) for level in (targets[0] if initial is None else initial))
+    sends = []
+    busy_until = 0.0
+    skipped = 0
+    for minute, row in enumerate(targets.tolist()):
+        now = minute * 60.0
+        row = tuple(row)
+        if row == helpers:
+            continue
+        if now < busy_until:
+            # The reconcile script is still running: HA logs "Already running" and
+            # this minute's target waits for the next trigger
+            skipped += 1
+            continue
+        commands = transition_commands(helpers, row, order)
+        start = now + react_s
+        sends.extend((start + index * period_s, command) for index, command in enumerate(commands))
+        busy_until = start + len(commands) * period_s
+        helpers = row
+    return sends, skipped
+
+
+def deliver(sends, rng, latency_s=LATENCY_S, jitter_s=JITTER_S, drop=DROP):
+    """Return when each sent command lands: a list like `sends`, None for a lost one.
+
+    A command lands `latency_s` plus an exponential delay with mean `jitter_s` after
+    it is sent, or with probability `drop` never does.
+    """
+    landings = []
+    for send, _ in sends:
+        if rng.random() < drop:
+            landings.append(None)
+        else:
+            landings.append(send + latency_s + (rng.expovariate(1 / jitter_s) if jitter_s else 0.0))
+    return landings
+
+
+def schedule_lag(changes, sends, landings=None, latency_s=LATENCY_S):
+    """Match each due level change to the command that performed it.
+
+    Commands are matched on when they were meant to land (`latency_s` after being
+    sent); the lag is then measured against `landings` from deliver(), so jitter
+    and losses do not re-pair commands with other changes. Returns (lags in seconds,
+    changes whose command was lost). Negative lags are commands that landed early;
+    changes undone before any command was sent for them (the target went back) are
+    not counted.
+    """
+    if landings is None:
+        landings = [send + latency_s for send, _ in sends]
+    events = [(due, 0, command, None) for due, command in changes]
+    events += [(send + latency_s, 1, command, index)
+               for index, (send, command) in enumerate(sends)]
+    events.sort(key=lambda event: (event[0], event[1]))
+    needs = {channel: deque() for channel in CHANNELS}
+    done = {channel: deque() for channel in CHANNELS}
+    pairs = []
+    for moment, kind, command, index in events:
+        channel, _, direction = command.rpartition('_')
+        sign = 1 if direction == 'up' else -1
+        if kind == 0:
+            if needs[channel] and needs[channel][-1][1] == -sign:
+                needs[channel].pop()  # reverses a change that never got sent
+            elif done[channel] and done[channel][0][1] == sign:
+                pairs.append((moment, done[channel].popleft()[0]))
+            else:
+                needs[channel].append((moment, sign))
+        elif needs[channel] and needs[channel][0][1] == sign:
+            pairs.append((needs[channel].popleft()[0], index))
+        else:
+            done[channel].append((index, sign))
+    lags = [landings[index] - due for due, index in pairs if landings[index] is not None]
+    return lags, len(pairs) - len(lags)
+
+
+def lag_stats(lags):
+    """Return (count, mean lag, p99 lag, max lag, on-time share, mean earliness) in seconds."""
+    if not lags:
+        return 0, 0.0, 0.0, 0.0, 1.0, 0.0
+    late = sorted(max(0.0, lag) for lag in lags)
+    p99 = late[min(len(late) - 1, int(0.99 * len(late)))]
+    on_time = bisect.bisect_right(late, 1e-9) / len(late)
+    early = sum(max(0.0, -lag) for lag in lags) / len(lags)
+    return len(lags), sum(late) / len(late), p99, late[-1], on_time, early
+
+
+def parse_args():
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(description="Compare reactive and lookahead IR scheduling")
+    parser.add_argument('--date', type=date.fromisoformat, default=date.today(),
+                        help="First simulated day (YYYY-MM-DD)")
+    parser.add_argument('--days', type=int, default=30, help="Number of days to simulate")
+    parser.add_argument('--condition', default='random',
+                        help="Weather condition to assume, or 'random' for hourly forecast changes")
+    parser.add_argument('--seed', type=int, default=0, help="Seed for --condition random")
+    parser.add_argument('--delay-ms', type=float, default=DEFAULT_COSTS.delay_ms,
+                        help="IR pacing delay (input_number.hygger_ir_delay_ms)")
+    parser.add_argument('--react-ms', type=float, default=REACT_S * 1000,
+                        help="Time from the minute trigger to the first IR command")
+    parser.add_argument('--margin-ms', type=float, default=0.0,
+                        help="Extra lead so commands land this long before they are due")
+    parser.add_argument('--jitter-ms', type=float, default=JITTER_S * 1000,
+                        help="Mean random delivery delay on top of the hub latency")
+    parser.add_argument('--drop', type=float, default=DROP,
+                        help="Share of IR commands the light never receives")
+    return parser.parse_args()
+
+
+def main():
+    """Simulate schedule lag with and without lookahead."""
+    args = parse_args()
+    period_s = LATENCY_S + args.delay_ms / 1000
+    started = time.perf_counter()
+    targets = minute_targets(args.date, args.days, args.condition, args.seed)
+    changes = level_changes(targets)
+
+    reactive, skipped = reactive_sends(targets, period_s, args.react_ms / 1000)
+    ahead = lookahead_schedule(changes, period_s, LATENCY_S, args.margin_ms / 1000)
+    lookahead = [(send, command) for send, (_, command) in zip(ahead, changes)]
+    results, lost = {}, {}
+    for name, sends in (('reactive', reactive), ('lookahead', lookahead)):
+        # The same seed for both, so they see the same delivery delays and losses
+        landings = deliver(sends, random.Random(args.seed), LATENCY_S, args.jitter_ms / 1000,
+                           args.drop)
+        lags, lost[name] = schedule_lag(changes, sends, landings)
+        results[name] = lag_stats(lags)
+    elapsed = time.perf_counter() - started
+
+    print("🔮 Hygger Lookahead Scheduler")
+    print("=" * 78)
+    print(f"📅 {args.days} day(s) from {args.date} ({args.condition}), "
+          f"{period_s * 1000:.0f}ms per IR command, simulated in {elapsed:.2f}s")
+    print(f"📡 {len(changes):,} scheduled level changes; reactive runs skipped while busy: {skipped}")
+    print(f"📶 Delivery: {LATENCY_S * 1000:.0f}ms + mean {args.jitter_ms:g}ms jitter, "
+          f"{args.drop:.1%} of commands lost")
+    print()
+    print(f"{'Policy':<11} {'Changes':>8} {'Lost':>5} {'Mean lag':>9} {'p99 lag':>8} "
+          f"{'Max lag':>8} {'On time':>8} {'Mean early':>11}")
+    print("-" * 78)
+    for name, (count, mean, p99, worst, on_time, early) in results.items():
+        print(f"{name:<11} {count:>8,} {lost[name]:>5} {mean:>8.2f}s {p99:>7.2f}s "
+              f"{worst:>7.2f}s {on_time:>7.1%} {early:>10.2f}s")
+
+    leads = [due - send for send, (due, _) in zip(ahead, changes)]
+    if leads:
+        print(f"\n⏩ Lookahead needs targets up to {max(leads):.1f}s ahead "
+              f"(mean lead {sum(leads) / len(leads):.2f}s per command)")
+    print("💡 The integration sends ahead with `lookahead: true`; the YAML automations still "
+          "send reactively. Use --margin-ms to cover the jitter")
+
+
+if __name__ == "__main__":
+    main()
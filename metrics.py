@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Hygger Light Metrics
+In-process counters, gauges and histograms with a Prometheus text-format exporter.
+
+The engine, the HA stand-in, the reconcile planner and the simulators record into
+the shared REGISTRY below. Recording is a dict lookup plus an addition (label
+children are created once and can be bound ahead of a hot loop), and nothing is
+formatted until something asks: a scrape of the HTTP endpoint started with
+serve(), or write() for a node_exporter textfile. Values that are cheaper to read
+than to track (cache statistics, ages) are registered as functions and evaluated at
+scrape time.
+
+Usage from a tool:
+    metrics.add_arguments(parser)       # --metrics-port / --metrics-file
+    metrics.start(args)                 # serve while the tool runs
+    ...
+    metrics.finish(args)                # write the file, keep serving until Ctrl-C
+"""
+import bisect
+import math
+import os
+import threading
+import time
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+DEFAULT_PORT = 9464
+
+# A reconcile at the default pacing takes about 0.6s per IR command, a reset 29s
+DURATION_BUCKETS = (0.5, 1, 2, 5, 10, 15, 20, 30, 45, 60, 120)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if value == -math.inf:
+        return '-Inf'
+    if value != value:
+        return 'NaN'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _label_text(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs += [f'{name}="{_escape(value)}"' for name, value in extra]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class _Value:
+    """One counter or gauge time series."""
+
+    __slots__ = ('value', 'function')
+
+    def __init__(self):
+        self.value = 0.0
+        self.function = None
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def set_function(self, function):
+        """Read the value from `function()` at scrape time instead."""
+        self.function = function
+
+    def get(self):
+        if self.function is not None:
+            return float(self.function())
+        return self.value
+
+
+class _CounterValue(_Value):
+    __slots__ = ()
+
+    def inc(self, amount=1):
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        self.value += amount
+
+
+class _GaugeValue(_Value):
+    __slots__ = ()
+
+    def set(self, value):
+        self.value = value
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+
+class _HistogramValue:
+    """Bucket counts for one histogram time series."""
+
+    __slots__ = ('upper', 'counts', 'sum')
+
+    def __init__(self, upper):
+        self.upper = upper
+        self.counts = [0] * (len(upper) + 1)
+        self.sum = 0.0
+
+    def observe(self, value, count=1):
+        """Record `value`, optionally as `count` identical observations."""
+        self.counts[bisect.bisect_left(self.upper, value)] += count
+        self.sum += value * count
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values, **named):
+        """Return the time series for a set of label values (created on first use)."""
+        if named:
+            values = tuple(named[name] for name in self.labelnames)
+        child = self._children.get(values)
+        if child is not None:
+            return child
+        key = tuple(map(str, values))
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def samples(self):
+        """Yield (suffix, label text, value) for the exposition."""
+        for key, child in list(self._children.items()):
+            yield '', _label_text(self.labelnames, key), child.get()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines += [f"{self.name}{suffix}{labels} {_format_value(value)}"
+                  for suffix, labels, value in self.samples()]
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonic count of events."""
+
+    kind = 'counter'
+
+    def _new_child(self):
+        return _CounterValue()
+
+    def inc(self, amount=1):
+        self._default.inc(amount)
+
+
+class Gauge(_Metric):
+    """Value that can go up and down."""
+
+    kind = 'gauge'
+
+    def _new_child(self):
+        return _GaugeValue()
+
+    def set(self, value):
+        self._default.set(value)
+
+    def inc(self, amount=1):
+        self._default.inc(amount)
+
+    def set_function(self, function):
+        self._default.set_function(function)
+
+
+class Histogram(_Metric):
+    """Distribution of observations over fixed cumulative buckets."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DURATION_BUCKETS):
+        self.upper = tuple(sorted(float(bound) for bound in buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramValue(self.upper)
+
+    def observe(self, value, count=1):
+        self._default.observe(value, count)
+
+    def samples(self):
+        for key, child in list(self._children.items()):
+            counts = list(child.counts)
+            cumulative = 0
+            for bound, count in zip(self.upper + (math.inf,), counts):
+                cumulative += count
+                yield '_bucket', _label_text(self.labelnames, key,
+                                             (('le', _format_value(bound)),)), cumulative
+            yield '_sum', _label_text(self.labelnames, key), child.sum
+            yield '_count', _label_text(self.labelnames, key), cumulative
+
+
+class Registry:
+    """A set of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        """Add a metric, or return the one already registered under its name."""
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric {metric.name} is already registered differently")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DURATION_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def render(self):
+        """Return the Prometheus text exposition of every metric."""
+        lines = []
+        for name in sorted(self._metrics):
+            lines += self._metrics[name].render()
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+# Shared metrics; tools bind the label children they use at import time
+ENGINE_EVALUATIONS = REGISTRY.counter(
+    'hygger_engine_evaluations_total', "Minutes evaluated by the lighting engine", ('engine',))
+CACHE_LOOKUPS = REGISTRY.counter(
+    'hygger_cache_lookups_total', "Cache lookups by cache and result", ('cache', 'result'))
+IR_COMMANDS = REGISTRY.counter(
+    'hygger_ir_commands_total', "IR commands sent by channel and direction",
+    ('source', 'channel', 'direction'))
+RECONCILE_DURATION = REGISTRY.histogram(
+    'hygger_reconcile_duration_seconds', "Duration of reconcile runs",
+    ('source',))
+RECONCILE_PLANS = REGISTRY.counter(
+    'hygger_reconcile_plans_total', "send_command plans built by emission strategy", ('strategy',))
+QUEUE_DEPTH = REGISTRY.gauge(
+    'hygger_queue_depth', "Items waiting in a scheduler queue", ('queue',))
+FORECAST_CACHE_AGE = REGISTRY.gauge(
+    'hygger_forecast_cache_age_seconds', "Age of input_text.aquarium_forecast_cache")
+DRIFT_CORRECTIONS = REGISTRY.counter(
+    'hygger_drift_corrections_total',
+    "Channel levels of helper-vs-light drift removed by resyncs", ('source', 'policy'))
+
+
+def command_labels(command):
+    """Split 'white_up' into ('white', 'up')."""
+    channel, _, direction = command.rpartition('_')
+    return channel, direction
+
+
+def serve(port=DEFAULT_PORT, address='127.0.0.1', registry=REGISTRY):
+    """Serve /metrics from a daemon thread; returns the server (call .shutdown() to stop)."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?', 1)[0] not in ('/metrics', '/'):
+                self.send_error(404)
+                return
+            body = registry.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Scrapes every few seconds would otherwise flood the terminal
+
+    server = ThreadingHTTPServer((address, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-exporter', daemon=True).start()
+    return server
+
+
+def write(path, registry=REGISTRY):
+    """Write the exposition to `path` atomically (node_exporter textfile collector)."""
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, 'w', encoding='utf-8') as handle:
+        handle.write(registry.render())
+    os.replace(temporary, path)
+
+
+def add_arguments(parser):
+    """Add --metrics-port and --metrics-file to a tool's argument parser."""
+    parser.add_argument('--metrics-port', type=int, metavar='PORT',
+                        help=f"Serve Prometheus metrics on this port (e.g. {DEFAULT_PORT})")
+    parser.add_argument('--metrics-file', metavar='PATH',
+                        help="Write Prometheus metrics to this file when finished")
+
+
+def start(args):
+    """Start the exporter if the tool was asked to; returns the server or None."""
+    if not getattr(args, 'metrics_port', None):
+        return None
+    server = serve(args.metrics_port)
+    print(f"📈 Metrics at http://127.0.0.1:{args.metrics_port}/metrics")
+    return server
+
+
+def finish(args, server=None):
+    """Write --metrics-file and keep an exporter running until Ctrl-C."""
+    if getattr(args, 'metrics_file', None):
+        write(args.metrics_file)
+        print(f"📈 Metrics written to {args.metrics_file}")
+    if server is not None:
+        print("📈 Still serving metrics - press Ctrl-C to exit")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            server.shutdown()
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Hygger OpenWeatherMap Stand-in
+Local HTTP stand-in of the One Call 3.0 API, and a request count comparison for the
+integration's pooled weather client.
+
+The stand-in serves `/data/3.0/onecall` with a synthetic forecast per location,
+counts requests per location and TCP connections, and can add latency and fail a
+share of requests. Point the integration at it with `owm_url:` to try outages:
+
+    python3 owm_standin.py --serve --port 8099 --latency 0.5 --error-rate 0.2
+
+Without --serve it runs several fixtures at a few locations for simulated minutes:
+each asks for the hourly forecast every minute and for hourly and daily every 30
+minutes (like aquarium_forecast_caching.yaml), once with a request per ask, once
+with a client per fixture and once with one shared client
+(custom_components/hygger/weather_client.py), and compares upstream calls,
+connections, failures the fixtures saw and request latency.
+"""
+import argparse
+import asyncio
+import importlib.util
+import logging
+import random
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+from aiohttp import web
+
+from lighting_engine import NOMINAL_WEATHER
+
+CLIENT_PATH = Path(__file__).parent / "custom_components" / "hygger" / "weather_client.py"
+API_PATH = "/data/3.0/onecall"
+HOURS = 48
+DAYS = 8
+
+# Condition, its share of hours and the OpenWeatherMap code served for it
+WEATHER = (('sunny', 0.45, 800), ('partlycloudy', 0.25, 802), ('cloudy', 0.2, 804),
+           ('rainy', 0.08, 500), ('lightning-rainy', 0.02, 211))
+
+
+def load_weather_client():
+    """Import the integration's weather_client.py without the Home Assistant package."""
+    spec = importlib.util.spec_from_file_location("hygger_weather_client", CLIENT_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _entry(latitude, longitude, moment, seed):
+    """One forecast item for a location and a whole hour (the same on every call)."""
+    rng = random.Random(f"{seed}:{latitude}:{longitude}:{moment}")
+    condition, _, code = rng.choices(WEATHER, weights=[share for _, share, _ in WEATHER])[0]
+    coverage, precipitation = NOMINAL_WEATHER[condition]
+    item = {'dt': moment, 'clouds': coverage, 'temp': round(18 + rng.uniform(-3, 3), 1),
+            'weather': [{'id': code, 'main': condition}]}
+    if precipitation:
+        item['rain'] = {'1h': precipitation}
+    return item
+
+
+class OWMStandin:
+    """One Call 3.0 on 127.0.0.1 that records requests and injects latency and errors."""
+
+    def __init__(self, latency=0.0, error_rate=0.0, error_status=500, seed=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.seed = seed
+        self.requests = Counter()   # (lat, lon) -> requests
+        self.errors = 0
+        self.peers = set()
+        self.url = None
+        self._random = random.Random(seed)
+        self._runner = None
+
+    @property
+    def connections(self):
+        """TCP connections the requests arrived on."""
+        return len(self.peers)
+
+    @property
+    def total(self):
+        """Requests served, failed ones included."""
+        return sum(self.requests.values())
+
+    async def handle(self, request):
+        """GET /data/3.0/onecall?lat=..&lon=..&appid=.."""
+        self.peers.add(request.transport.get_extra_info('peername'))
+        if not request.query.get('appid'):
+            return web.json_response({'cod': 401, 'message': "Invalid API key"}, status=401)
+        try:
+            latitude, longitude = float(request.query['lat']), float(request.query['lon'])
+        except (KeyError, ValueError):
+            return web.json_response({'cod': '400', 'message': "wrong latitude"}, status=400)
+        self.requests[(latitude, longitude)] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency * self._random.uniform(0.5, 1.5))
+        if self._random.random() < self.error_rate:
+            self.errors += 1
+            return web.json_response({'cod': self.error_status, 'message': "Internal error"},
+                                     status=self.error_status)
+        hour = int(time.time()) // 3600 * 3600
+        exclude = request.query.get('exclude', '').split(',')
+        data = {'lat': latitude, 'lon': longitude, 'timezone': 'UTC', 'timezone_offset': 0}
+        if 'hourly' not in exclude:
+            data['hourly'] = [_entry(latitude, longitude, hour + index * 3600, self.seed)
+                              for index in range(HOURS)]
+        if 'daily' not in exclude:
+            day = hour // 86400 * 86400 + 12 * 3600
+            data['daily'] = []
+            for index in range(DAYS):
+                item = _entry(latitude, longitude, day + index * 86400, self.seed)
+                item['temp'] = {'day': item['temp']}
+                item['rain'] = item.get('rain', {}).get('1h', 0.0) * 24
+                data['daily'].append(item)
+        return web.json_response(data)
+
+    async def start(self, port=0):
+        """Start serving; returns the One Call URL."""
+        app = web.Application()
+        app.router.add_get(API_PATH, self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}{API_PATH}"
+        return self.url
+
+    async def stop(self):
+        """Stop serving."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *_):
+        await self.stop()
+
+
+class _OneShot:
+    """A request per ask on a new session: what every fixture calling the API itself costs."""
+
+    def __init__(self, module, url):
+        self.module = module
+        self.url = url
+
+    async def forecast(self, latitude, longitude, forecast_type):
+        client = self.module.WeatherClient.create("standin", url=self.url, min_interval=0,
+                                                  retry_interval=0, max_age=0)
+        try:
+            return await client.forecast(latitude, longitude, forecast_type)
+        finally:
+            await client.close()
+
+    async def close(self):
+        pass
+
+
+async def run_fixtures(mode, fixtures, locations, minutes, latency, error_rate, seed=0):
+    """Run `fixtures` fixtures for `minutes` simulated minutes; returns a result dict."""
+    module = load_weather_client()
+    virtual = [0.0]
+    clock = lambda: virtual[0]
+    places = [(52.52 + index * 0.5, 13.40 + index * 0.5) for index in range(locations)]
+    async with OWMStandin(latency, error_rate, seed=seed) as standin:
+        options = dict(url=standin.url, clock=clock)
+        if mode == 'per-request':
+            clients = [_OneShot(module, standin.url)] * fixtures
+        elif mode == 'per-fixture':
+            clients = [module.WeatherClient.create("standin", **options) for _ in range(fixtures)]
+        else:
+            clients = [module.WeatherClient.create("standin", **options)] * fixtures
+        latencies = []
+        failures = 0
+
+        async def ask(client, place, forecast_type):
+            started = time.perf_counter()
+            try:
+                await client.forecast(*place, forecast_type)
+            except module.WeatherClientError:
+                return 1
+            finally:
+                latencies.append(time.perf_counter() - started)
+            return 0
+
+        started = time.perf_counter()
+        for minute in range(minutes):
+            virtual[0] = minute * 60.0
+            asks = []
+            for index, client in enumerate(clients):
+                place = places[index % locations]
+                asks.append(ask(client, place, 'hourly'))
+                if minute % 30 == 0:
+                    asks.extend([ask(client, place, 'hourly'), ask(client, place, 'daily')])
+            failures += sum(await asyncio.gather(*asks))
+        elapsed = time.perf_counter() - started
+        for client in set(clients):
+            await client.close()
+        latencies.sort()
+        return {
+            'mode': mode,
+            'asks': len(latencies),
+            'upstream': standin.total,
+            'connections': standin.connections,
+            'upstream_errors': standin.errors,
+            'failures': failures,
+            'p50_ms': latencies[len(latencies) // 2] * 1000,
+            'p95_ms': latencies[int(len(latencies) * 0.95)] * 1000,
+            'elapsed': elapsed,
+        }
+
+
+def parse_args():
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(description="Local OpenWeatherMap One Call stand-in and "
+                                                 "weather client comparison")
+    parser.add_argument('--serve', action='store_true', help="Only serve the API until Ctrl-C")
+    parser.add_argument('--port', type=int, default=8099, help="Port for --serve")
+    parser.add_argument('--fixtures', type=int, default=6, help="Fixtures asking for weather")
+    parser.add_argument('--locations', type=int, default=2, help="Locations they are spread over")
+    parser.add_argument('--minutes', type=int, default=60, help="Simulated minutes")
+    parser.add_argument('--latency', type=float, default=0.02,
+                        help="Mean response time of the stand-in in seconds")
+    parser.add_argument('--error-rate', type=float, default=0.05,
+                        help="Share of requests answered with an error")
+    parser.add_argument('--seed', type=int, default=0)
+    return parser.parse_args()
+
+
+async def serve(args):
+    """Serve the stand-in until interrupted, printing the request counts on exit."""
+    standin = OWMStandin(args.latency, args.error_rate, seed=args.seed)
+    await standin.start(args.port)
+    print(f"🌦️  Serving {standin.url} (latency {args.latency}s, "
+          f"error rate {args.error_rate:.0%})")
+    print(f"   Integration: owm_url: {standin.url}   owm_api_key: anything")
+    try:
+        while True:
+            await asyncio.sleep(3600)
+    finally:
+        print(f"\n📊 {standin.total} requests, {standin.errors} failed, "
+              f"{standin.connections} connections")
+        await standin.stop()
+
+
+def main():
+    """Serve the stand-in, or compare weather request strategies against it."""
+    args = parse_args()
+    print("🌦️  Hygger OpenWeatherMap Stand-in")
+    print("=" * 92)
+    if args.serve:
+        try:
+            asyncio.run(serve(args))
+        except KeyboardInterrupt:
+            pass
+        return 0
+    # Failed upstream calls are part of the comparison, not news
+    logging.basicConfig(level=logging.ERROR)
+    print(f"📦 {args.fixtures} fixtures at {args.locations} locations, {args.minutes} minutes, "
+          f"latency {args.latency}s, error rate {args.error_rate:.0%}")
+    print()
+    print(f"{'Strategy':<14} {'Asks':>6} {'Upstream':>9} {'Connections':>12} {'API errors':>11} "
+          f"{'Failed asks':>12} {'p50 ms':>8} {'p95 ms':>8}")
+    print("-" * 92)
+    results = []
+    for mode in ('per-request', 'per-fixture', 'shared'):
+        result = asyncio.run(run_fixtures(mode, args.fixtures, args.locations, args.minutes,
+                                          args.latency, args.error_rate, args.seed))
+        results.append(result)
+        print(f"{mode:<14} {result['asks']:>6} {result['upstream']:>9} "
+              f"{result['connections']:>12} {result['upstream_errors']:>11} "
+              f"{result['failures']:>12} {result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f}")
+    print()
+    baseline, shared = results[0], results[-1]
+    fewer = baseline['upstream'] / max(shared['upstream'], 1)
+    print(f"✅ The shared client made {shared['upstream']} upstream calls for {shared['asks']} asks "
+          f"({fewer:.0f}x fewer than a request per ask) "
+          f"over {shared['connections']} connection(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
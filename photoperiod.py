@@ -0,0 +1,545 @@
+#!/usr/bin/env python3
+"""
+Hygger Photoperiod Profiles
+Named light curves for different tanks, compiled once into lookup tables.
+
+The circadian automation has one curve built in: the brightness breakpoints, the
+red and blue elevation bands, the channel weights and the 28°/75° seasonal peaks of
+its fallback elevation were tuned for one enclosure at one latitude. A profile
+(profiles/*.yaml) holds all of those numbers, plus per-channel maximum levels and
+photoperiod clamps, so a planted tank or a blackwater biotope can run its own
+curve. Keys a profile leaves out are taken from `hygger_default`, which is the
+automation's curve exactly.
+
+A profile compiles into two tables: the unrounded channel values for every sun
+elevation from -6° to 90° in 0.01° steps (sun.sun publishes the elevation to two
+decimals), with and without daylight, and one row per day of the year with the
+photoperiod clamp and the fallback peak. A tick is then two lookups and the
+weather modifiers. Compiled tables are cached in memory, and with --cache-dir on
+disk, under a hash of the curve and the latitude, so tanks sharing a curve share
+one table and a profile is only compiled again when its numbers change.
+
+A tank holds its compiled profile in a TankProfile; switching profiles compiles
+(or fetches) the new table first and then replaces the reference in a single
+assignment, so a tick evaluates either the old table or the new one, never a mix.
+"""
+import argparse
+import copy
+import hashlib
+import json
+import math
+import os
+import sys
+import time
+from array import array
+from collections import namedtuple
+from datetime import date
+from functools import lru_cache
+
+from ephemeris import DEFAULT_LATITUDE, DEFAULT_SOLAR_NOON, solar_declination, sun_elevation
+from lighting_engine import CHANNELS, MAX_LEVEL, weather_factors
+
+PROFILE_DIR = 'profiles'
+DEFAULT_PROFILE_NAME = 'hygger_default'
+FORMAT = 1  # Bump when the table layout or the curve math changes
+
+ELEVATION_MIN = -6        # Lowest elevation a profile may light at (civil twilight)
+ELEVATION_MAX = 90
+STEPS_PER_DEGREE = 100    # sun.sun's elevation attribute has two decimals
+ELEVATION_STEPS = (ELEVATION_MAX - ELEVATION_MIN) * STEPS_PER_DEGREE + 1
+DAYS = 366
+
+# The curve of automations/aquarium_dynamic_circadian_lighting.yaml (Steps 2 and 5)
+DEFAULT_PROFILE = {
+    # Base brightness by sun elevation: the first band the sun is above gives
+    # level + (elevation - above) / degrees_per_level, rounded (0 = constant level)
+    'brightness': [
+        {'above': 60, 'level': 10, 'degrees_per_level': 0},
+        {'above': 40, 'level': 8, 'degrees_per_level': 10},
+        {'above': 20, 'level': 5, 'degrees_per_level': 6.7},
+        {'above': 5, 'level': 2, 'degrees_per_level': 5},
+        {'above': 0, 'level': 0, 'degrees_per_level': 2.5},
+    ],
+    'white': {'full_above': 10, 'min': 1, 'twilight': 0.6},
+    'red': {'warm_below': 20, 'warm': 1.5, 'day': 0.15, 'min': 1, 'day_above_base': 2},
+    'green': {'white': 0.6, 'red': 0.2, 'base': 0.3, 'above_base': 1},
+    'blue': {
+        'bands': [{'above': 20, 'weight': 0.8, 'max': 8}, {'above': 5, 'weight': 0.6, 'max': 6}],
+        'day': 0.3,
+        'min': 1,
+    },
+    'max_levels': {'white': 10, 'red': 10, 'green': 10, 'blue': 10},
+    # Hours the light may be on; outside the natural day length the light's horizon
+    # moves (up for max_hours, below the real one for min_hours) to fit
+    'photoperiod': {'min_hours': 0, 'max_hours': 24},
+    # Noon elevation of the fallback estimate when sun.sun has no elevation
+    'fallback_peaks': {'winter': 28, 'summer': 75},
+}
+
+BAND_KEYS = {'brightness': ('above', 'level', 'degrees_per_level'),
+             'blue.bands': ('above', 'weight', 'max')}
+
+Profile = namedtuple('Profile', 'name description curve')
+
+
+class ProfileError(ValueError):
+    """Raised for a profile that cannot be compiled as written."""
+
+
+def _number(value, where, low=None, high=None):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ProfileError(f"{where}: expected a number, got {value!r}")
+    if (low is not None and value < low) or (high is not None and value > high):
+        raise ProfileError(f"{where}: {value} is outside {low}-{high}")
+    return value
+
+
+def _bands(value, key):
+    """Validate a list of bands, highest `above` first."""
+    if not isinstance(value, list) or not value:
+        raise ProfileError(f"{key}: expected a list of bands")
+    bands = []
+    for index, band in enumerate(value, 1):
+        where = f"{key}[{index}]"
+        required = BAND_KEYS[key]
+        if not isinstance(band, dict) or set(band) - set(required):
+            raise ProfileError(f"{where}: a band has {', '.join(required)}")
+        band = {name: _number(band.get(name, 0), f"{where}.{name}") for name in required}
+        _number(band['above'], f"{where}.above", ELEVATION_MIN, ELEVATION_MAX)
+        bands.append(band)
+    if [band['above'] for band in bands] != sorted((band['above'] for band in bands),
+                                                   reverse=True):
+        raise ProfileError(f"{key}: list the bands from the highest `above` down")
+    return bands
+
+
+def normalize_profile(config, name='profile'):
+    """Validate a profile mapping; returns a Profile with every curve key filled in."""
+    if not isinstance(config, dict):
+        raise ProfileError("a profile is a mapping")
+    unknown = set(config) - set(DEFAULT_PROFILE) - {'description'}
+    if unknown:
+        raise ProfileError(f"unknown keys: {', '.join(sorted(unknown))}")
+    curve = copy.deepcopy(DEFAULT_PROFILE)
+    for key, value in config.items():
+        if key == 'description':
+            continue
+        if key == 'brightness':
+            curve[key] = _bands(value, key)
+            continue
+        if not isinstance(value, dict) or set(value) - set(curve[key]):
+            raise ProfileError(f"{key}: expected a mapping of {', '.join(curve[key])}")
+        for field, number in value.items():
+            curve[key][field] = (_bands(number, f"{key}.{field}") if field == 'bands'
+                                 else _number(number, f"{key}.{field}"))
+    for channel, level in curve['max_levels'].items():
+        _number(level, f"max_levels.{channel}", 0, MAX_LEVEL)
+    hours = curve['photoperiod']
+    _number(hours['min_hours'], 'photoperiod.min_hours', 0, 24)
+    _number(hours['max_hours'], 'photoperiod.max_hours', hours['min_hours'], 24)
+    return Profile(name, str(config.get('description') or ''), curve)
+
+
+def load_profile(path):
+    """Read and validate a profile file; fixtures refer to it by the file's name."""
+    import yaml
+
+    with open(path) as file:
+        config = yaml.safe_load(file) or {}
+    try:
+        return normalize_profile(config, os.path.splitext(os.path.basename(path))[0])
+    except ProfileError as error:
+        raise ProfileError(f"{path}: {error}") from None
+
+
+def find_profiles(root='.'):
+    """Return {name: path} of the profile files under `root`/profiles."""
+    directory = os.path.join(root, PROFILE_DIR)
+    if not os.path.isdir(directory):
+        return {}
+    return {os.path.splitext(filename)[0]: os.path.join(directory, filename)
+            for filename in sorted(os.listdir(directory))
+            if filename.endswith(('.yaml', '.yml'))}
+
+
+def profile_hash(curve, latitude=DEFAULT_LATITUDE):
+    """Key of a compiled table: the curve and the latitude, not the name or description."""
+    key = json.dumps({'format': FORMAT, 'latitude': round(latitude, 4), 'curve': curve},
+                     sort_keys=True)
+    return hashlib.sha256(key.encode()).hexdigest()[:16]
+
+
+def profile_base(curve, elevation, daylight):
+    """Base brightness (0-10) of a curve; the YAML's base_brightness for hygger_default."""
+    if not daylight:
+        return 0
+    for band in curve['brightness']:
+        if elevation > band['above']:
+            if not band['degrees_per_level']:
+                return band['level']
+            return round(band['level'] + (elevation - band['above']) / band['degrees_per_level'])
+    return 0
+
+
+def profile_values(curve, elevation, daylight):
+    """Unrounded (white, red, green, blue) of a curve before weather; Step 5 for the default."""
+    base = profile_base(curve, elevation, daylight)
+    white_curve, red_curve = curve['white'], curve['red']
+    green_curve, blue_curve = curve['green'], curve['blue']
+    if elevation > white_curve['full_above']:
+        white = max(int(base), white_curve['min'])
+    elif elevation > 0:
+        white = base * white_curve['twilight']
+    else:
+        white = 0
+
+    if 0 < elevation < red_curve['warm_below']:
+        red = min(base * (1 - elevation / red_curve['warm_below']) * red_curve['warm'], MAX_LEVEL)
+    elif daylight and base > red_curve['day_above_base']:
+        red = max(base * red_curve['day'], red_curve['min'])
+    else:
+        red = 0
+
+    if base > green_curve['above_base']:
+        green = (round(white) * green_curve['white'] + round(red) * green_curve['red']
+                 + base * green_curve['base'])
+    else:
+        green = 0
+
+    for band in blue_curve['bands']:
+        if elevation > band['above']:
+            blue = min(base * band['weight'], band['max'])
+            break
+    else:
+        blue = max(base * blue_curve['day'], blue_curve['min']) if daylight and base > 0 else 0
+    return white, red, green, blue
+
+
+def photoperiod_horizon(curve, day_of_year, latitude=DEFAULT_LATITUDE):
+    """(offset, scale) of the light's horizon on a day: elevation e lights as (e - offset) * scale.
+
+    Zero offset (and scale 1) while the natural day length is within the clamps. A
+    longer day raises the horizon to the elevation the sun passes max_hours/2 from
+    noon, a shorter one lowers it (to -6° at most) for min_hours; the scale keeps
+    the noon elevation, so the midday levels stay as they were.
+    """
+    hours = curve['photoperiod']
+    phi = math.radians(latitude)
+    delta = math.radians(solar_declination(day_of_year))
+
+    def elevation_at(hour_angle_hours):
+        hour_angle = math.radians(15 * hour_angle_hours)
+        sine = (math.sin(phi) * math.sin(delta)
+                + math.cos(phi) * math.cos(delta) * math.cos(hour_angle))
+        return math.degrees(math.asin(max(-1.0, min(1.0, sine))))
+
+    cos_hour_angle = -math.tan(phi) * math.tan(delta)
+    length = 24.0 if cos_hour_angle < -1 else 0.0 if cos_hour_angle > 1 else \
+        2 * math.degrees(math.acos(cos_hour_angle)) / 15
+    if length > hours['max_hours']:
+        offset = elevation_at(hours['max_hours'] / 2)
+    elif length < hours['min_hours']:
+        offset = max(elevation_at(hours['min_hours'] / 2), ELEVATION_MIN)
+    else:
+        return 0.0, 1.0
+    offset = round(offset, 2)
+    noon = elevation_at(0)
+    return offset, (noon / (noon - offset) if noon > offset else 1.0)
+
+
+def seasonal_peak(curve, day_of_year):
+    """Noon elevation of the fallback estimate on a day (the YAML's seasonal_factor)."""
+    peaks = curve['fallback_peaks']
+    seasonal_offset = (day_of_year - 80) / 365 * 6.28
+    return peaks['winter'] + (peaks['summer'] - peaks['winter']) * \
+        (1 + math.sin(seasonal_offset)) / 2
+
+
+@lru_cache(maxsize=512)
+def _weather_factors(condition):
+    """Weather multipliers of a condition or (cloud, rain) pair; None when all are 1."""
+    factors = weather_factors(condition)
+    return None if all(factor == 1 for factor in factors) else factors
+
+
+class CompiledProfile:
+    """A profile's lookup tables; never modified once built, so tanks and threads share it."""
+
+    def __init__(self, key, maxima, values, targets, days):
+        self.hash = key
+        self.maxima = maxima
+        # Per (daylight, elevation step), four channels each: the unrounded values
+        # clamped to the channel maxima, and the rounded values before clamping (what
+        # a weather factor multiplies)
+        self.values = values
+        self.targets = targets
+        self.levels = array('b', (max(0, min(maxima[index % len(CHANNELS)], target))
+                                  for index, target in enumerate(targets)))
+        self.days = days  # per day of year: horizon offset, scale, fallback peak
+
+    @classmethod
+    def compile(cls, curve, latitude=DEFAULT_LATITUDE):
+        """Evaluate a curve at every elevation step and every day of the year."""
+        maxima = tuple(curve['max_levels'][channel] for channel in CHANNELS)
+        values, targets = array('d'), array('b')
+        for daylight in (False, True):
+            for step in range(ELEVATION_STEPS):
+                elevation = (step + ELEVATION_MIN * STEPS_PER_DEGREE) / STEPS_PER_DEGREE
+                raw = profile_values(curve, elevation, daylight)
+                values.extend(max(0.0, min(float(maximum), value))
+                              for value, maximum in zip(raw, maxima))
+                targets.extend(round(value) for value in raw)
+        days = array('d')
+        for day_of_year in range(1, DAYS + 1):
+            days.extend(photoperiod_horizon(curve, day_of_year, latitude))
+            days.append(seasonal_peak(curve, day_of_year))
+        return cls(profile_hash(curve, latitude), maxima, values, targets, days)
+
+    def horizon(self, day_of_year):
+        """(offset, scale) of the photoperiod clamp on a day."""
+        row = (min(max(day_of_year, 1), DAYS) - 1) * 3
+        return self.days[row], self.days[row + 1]
+
+    def fallback_elevation(self, day_of_year, hour_decimal, daylight):
+        """The seasonal estimate of sun elevation, used when sun.sun has none."""
+        if not daylight:
+            return 0
+        hours_from_noon = abs(hour_decimal - 12)
+        if hours_from_noon > 6:
+            return 0
+        peak = self.days[(min(max(day_of_year, 1), DAYS) - 1) * 3 + 2]
+        return round(peak * (1 - (hours_from_noon / 6) ** 2), 1)
+
+    def light_elevation(self, day_of_year, elevation, daylight):
+        """(elevation, daylight) the curve sees after the day's photoperiod clamp."""
+        offset, scale = self.horizon(day_of_year)
+        if not offset:
+            return elevation, daylight
+        elevation = (elevation - offset) * scale
+        return elevation, elevation > 0
+
+    def row(self, day_of_year, elevation, daylight):
+        """Index of the first channel for an elevation (to the nearest 0.01°) on a day."""
+        elevation, daylight = self.light_elevation(day_of_year, elevation, daylight)
+        step = round(elevation * STEPS_PER_DEGREE) - ELEVATION_MIN * STEPS_PER_DEGREE
+        step = min(max(step, 0), ELEVATION_STEPS - 1)
+        return ((ELEVATION_STEPS if daylight else 0) + step) * len(CHANNELS)
+
+    def evaluate(self, day_of_year, elevation, daylight, condition='sunny'):
+        """Return (levels, values) like the engine, for this profile."""
+        start = self.row(day_of_year, elevation, daylight)
+        end = start + len(CHANNELS)
+        factors = _weather_factors(condition)
+        if factors is None:
+            return tuple(self.levels[start:end]), tuple(self.values[start:end])
+        levels, values = [], []
+        for index, factor, maximum in zip(range(start, end), factors, self.maxima):
+            if factor == 1:
+                levels.append(self.levels[index])
+                values.append(self.values[index])
+            else:
+                value = self.targets[index] * factor
+                levels.append(max(0, min(maximum, round(value))))
+                values.append(max(0.0, min(float(maximum), value)))
+        return tuple(levels), tuple(values)
+
+    def save(self, path):
+        """Write the tables to `path`: a JSON header line, then the raw arrays."""
+        header = {'format': FORMAT, 'hash': self.hash, 'max_levels': self.maxima,
+                  'values': len(self.values), 'days': len(self.days)}
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, 'wb') as file:
+            file.write(json.dumps(header).encode() + b'\n')
+            self.values.tofile(file)
+            self.targets.tofile(file)
+            self.days.tofile(file)
+        os.replace(temporary, path)  # Readers never see half a table
+
+    @classmethod
+    def load(cls, path):
+        """Read tables written by save(); None when unreadable or from another format."""
+        try:
+            with open(path, 'rb') as file:
+                header = json.loads(file.readline())
+                if header.get('format') != FORMAT:
+                    return None
+                values, targets, days = array('d'), array('b'), array('d')
+                values.fromfile(file, header['values'])
+                targets.fromfile(file, header['values'])
+                days.fromfile(file, header['days'])
+        except (OSError, ValueError, EOFError):
+            return None
+        return cls(header['hash'], tuple(header['max_levels']), values, targets, days)
+
+
+def evaluate_curve(curve, elevation, daylight, condition='sunny'):
+    """(levels, values) of a curve evaluated directly, without tables or photoperiod clamps."""
+    maxima = [curve['max_levels'][channel] for channel in CHANNELS]
+    levels, values = [], []
+    for value, factor, maximum in zip(profile_values(curve, elevation, daylight),
+                                      weather_factors(condition), maxima):
+        if factor != 1:
+            value = round(value) * factor
+        levels.append(max(0, min(maximum, round(value))))
+        values.append(max(0.0, min(float(maximum), value)))
+    return tuple(levels), tuple(values)
+
+
+# hash -> CompiledProfile, shared by every tank in the process
+_COMPILED = {}
+
+
+def compiled_profile(profile, latitude=DEFAULT_LATITUDE, cache_dir=None):
+    """The compiled tables of a Profile: from memory, from `cache_dir`, or compiled now."""
+    key = profile_hash(profile.curve, latitude)
+    compiled = _COMPILED.get(key)
+    if compiled is not None:
+        return compiled
+    path = os.path.join(cache_dir, f"{key}.lut") if cache_dir else None
+    compiled = CompiledProfile.load(path) if path and os.path.exists(path) else None
+    if compiled is None or compiled.hash != key:
+        compiled = CompiledProfile.compile(profile.curve, latitude)
+        if path:
+            os.makedirs(cache_dir, exist_ok=True)
+            compiled.save(path)
+    # setdefault: if another thread compiled the same curve meanwhile, both use one table
+    return _COMPILED.setdefault(key, compiled)
+
+
+class TankProfile:
+    """The profile one tank runs, switchable while ticks are being evaluated."""
+
+    def __init__(self, profile, latitude=DEFAULT_LATITUDE, cache_dir=None):
+        self.latitude = latitude
+        self.cache_dir = cache_dir
+        self.profile = profile
+        self.compiled = compiled_profile(profile, latitude, cache_dir)
+
+    def switch(self, profile):
+        """Compile (or fetch) `profile` first, then swap it in; returns the new table."""
+        compiled = compiled_profile(profile, self.latitude, self.cache_dir)
+        self.profile, self.compiled = profile, compiled
+        return compiled
+
+    def evaluate(self, moment, elevation, daylight, condition='sunny'):
+        """Levels and values at a datetime with sun.sun's elevation (None = fallback)."""
+        compiled = self.compiled  # One table for the whole tick, even if a switch lands now
+        day_of_year = moment.timetuple().tm_yday
+        if elevation is None:
+            elevation = compiled.fallback_elevation(day_of_year,
+                                                    moment.hour + moment.minute / 60, daylight)
+        return compiled.evaluate(day_of_year, elevation, daylight, condition)
+
+
+def verify_default(profile):
+    """Compare a compiled hygger_default with lighting_engine at every elevation step.
+
+    Returns the number of (elevation, daylight, condition) cases that differ.
+    """
+    from lighting_engine import compute_levels, continuous_levels
+
+    compiled = CompiledProfile.compile(profile.curve)
+    differences = 0
+    for step in range(ELEVATION_STEPS):
+        elevation = (step + ELEVATION_MIN * STEPS_PER_DEGREE) / STEPS_PER_DEGREE
+        for daylight in (False, True):
+            for condition in ('sunny', 'cloudy', 'rainy', (0.43, 0.25)):
+                levels, values = compiled.evaluate(172, elevation, daylight, condition)
+                expected = continuous_levels(elevation, daylight, condition)
+                differences += (levels != compute_levels(elevation, daylight, condition)
+                                or any(abs(a - b) > 1e-9 for a, b in zip(values, expected)))
+    return differences
+
+
+def parse_args():
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(description="Compile photoperiod profiles and compare "
+                                                 "their light curves")
+    parser.add_argument('profiles', nargs='*',
+                        help="Profile names or files (default: every file in profiles/)")
+    parser.add_argument('--date', type=date.fromisoformat, default=date.today(),
+                        help="Day to show the curves for (YYYY-MM-DD)")
+    parser.add_argument('--latitude', type=float, default=DEFAULT_LATITUDE,
+                        help="Latitude the profiles are compiled for")
+    parser.add_argument('--step', type=int, default=60, help="Minutes between rows")
+    parser.add_argument('--cache-dir', help="Keep compiled tables in this directory")
+    parser.add_argument('--root', default='.', help="Repository root with profiles/")
+    parser.add_argument('--verify', action='store_true',
+                        help="Check hygger_default against lighting_engine at every 0.01°")
+    return parser.parse_args()
+
+
+def main():
+    """Compile profiles, time a tick and print their curves for one day."""
+    args = parse_args()
+    available = find_profiles(args.root)
+    names = args.profiles or list(available)
+    try:
+        profiles = [load_profile(available.get(name, name)) for name in names]
+    except (OSError, ProfileError) as error:
+        print(f"❌ {error}")
+        return 1
+
+    print("🌱 Hygger Photoperiod Profiles")
+    print("=" * 92)
+    print(f"📅 {args.date} at latitude {args.latitude}°")
+    print()
+    print(f"{'Profile':<22} {'Hash':<17} {'Compile':>8} {'Load':>7} {'Tick':>7} {'Direct':>7} "
+          f"{'Light on':>9} {'Horizon':>8}")
+    print("-" * 92)
+    day_of_year = args.date.timetuple().tm_yday
+    samples = [(minute / 16 - 6, ('sunny', 'cloudy', 'rainy')[minute % 3]) for minute in range(1440)]
+    tanks = []
+    for profile in profiles:
+        started = time.perf_counter()
+        compiled = CompiledProfile.compile(profile.curve, args.latitude)
+        compile_ms = (time.perf_counter() - started) * 1000
+        load = "-"
+        if args.cache_dir:
+            compiled_profile(profile, args.latitude, args.cache_dir)
+            started = time.perf_counter()
+            CompiledProfile.load(os.path.join(args.cache_dir, f"{compiled.hash}.lut"))
+            load = f"{(time.perf_counter() - started) * 1000:.1f}ms"
+        started = time.perf_counter()
+        for elevation, condition in samples:
+            compiled.evaluate(day_of_year, elevation, True, condition)
+        tick_us = (time.perf_counter() - started) / len(samples) * 1e6
+        started = time.perf_counter()
+        for elevation, condition in samples:
+            evaluate_curve(profile.curve, elevation, True, condition)
+        direct_us = (time.perf_counter() - started) / len(samples) * 1e6
+        offset, _ = compiled.horizon(day_of_year)
+        elevations = [sun_elevation(day_of_year, minute / 60, args.latitude, DEFAULT_SOLAR_NOON)
+                      for minute in range(1440)]
+        lit = sum(any(compiled.evaluate(day_of_year, elevation, elevation > 0)[0])
+                  for elevation in elevations) / 60
+        tanks.append((profile, compiled))
+        print(f"{profile.name:<22} {compiled.hash:<17} {compile_ms:>6.0f}ms {load:>7} "
+              f"{tick_us:>5.1f}µs {direct_us:>5.1f}µs {lit:>8.1f}h {offset:>7.2f}°")
+
+    print("\n🕐 Levels (W R G B) when sunny")
+    print(f"{'Time':<6} {'Sun':>6}  " + "  ".join(f"{p.name[:11]:>11}" for p, _ in tanks))
+    for minute in range(0, 1440, args.step):
+        hour = minute / 60
+        elevation = round(sun_elevation(day_of_year, hour, args.latitude, DEFAULT_SOLAR_NOON), 2)
+        daylight = elevation > 0
+        row = [" ".join(str(level) for level in
+                        compiled.evaluate(day_of_year, elevation, daylight)[0])
+               for _, compiled in tanks]
+        if any(cell != "0 0 0 0" for cell in row):
+            print(f"{minute // 60:02d}:{minute % 60:02d} {elevation:>5.1f}°  "
+                  + "  ".join(f"{cell:>11}" for cell in row))
+
+    if args.verify:
+        default = load_profile(available[DEFAULT_PROFILE_NAME]) if DEFAULT_PROFILE_NAME in \
+            available else normalize_profile({}, DEFAULT_PROFILE_NAME)
+        differences = verify_default(default)
+        status = "✅" if not differences else "❌"
+        print(f"\n{status} {DEFAULT_PROFILE_NAME} vs lighting_engine: {differences} of "
+              f"{ELEVATION_STEPS * 8} elevation/daylight/weather cases differ")
+        return 1 if differences else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,503 @@
+#!/usr/bin/env python3
+"""
+Hygger Reconcile Planner
+Plans how a level change is emitted as remote.send_command calls and what each plan costs.
+
+Three emission strategies are compared:
+  per-step     one send_command call plus one delay step per level (the original scripts)
+  per-channel  one call per channel, using num_repeats
+  per-fixture  one call for the whole fixture with a command list (what the scripts do now)
+
+Broadlink's remote.send_command repeats the *whole* command list `num_repeats` times and
+sleeps `delay_secs` between every two commands, so a periodic list (like the nightly
+reset's white/red/green/blue x12) compresses to one short list plus a repeat count.
+
+The cost model charges each script step the HA executor overhead, each service call
+its dispatch overhead, and each IR command the hub round trip plus frame airtime and
+the pacing delay. It is used to show step count and wall time for typical (one year
+of circadian reconciles) and worst-case transitions.
+
+Within a transition the same commands can be sent in any order. With --orders the
+orderings are compared by perceptual error: each intermediate light state is scored
+by its CIELAB ΔE to the target (lightness plus the colour shift a colour-temperature
+change produces), integrated over the transition, together with the time until the
+tank stays within a ΔE tolerance. `optimal` finds the minimum-error order exactly by
+dynamic programming over the per-channel progress lattice; `greedy` (always send the
+command whose result is closest to the target) is within a fraction of a percent of
+it, simple enough for a template, and is the order the reconcile script uses.
+"""
+import argparse
+from collections import namedtuple
+from datetime import datetime, timedelta
+from functools import lru_cache
+from itertools import product
+
+import metrics
+from ir_pacing import DEFAULT_DELAY_MS, FRAME_MS
+from light_state import COMMAND_IDS, COMMAND_STEPS, COMMANDS, LightState
+from lighting_engine import CHANNELS, MAX_LEVEL
+from metrics import CACHE_LOOKUPS, RECONCILE_DURATION, RECONCILE_PLANS
+
+STRATEGIES = ('per-step', 'per-channel', 'per-fixture')
+
+# One remote.send_command call: Broadlink sends `commands` in order, `num_repeats` times
+ServiceCall = namedtuple('ServiceCall', 'commands num_repeats')
+
+# Overheads in milliseconds. `step_ms` is what the HA script executor spends on any step
+# (trace, template rendering, context), `call_ms` the service dispatch and code lookup of
+# one send_command call, and `hub_ms` the LAN request to the RM4 for each code sent.
+CostModel = namedtuple('CostModel', 'step_ms call_ms hub_ms frame_ms delay_ms')
+
+DEFAULT_COSTS = CostModel(step_ms=3.0, call_ms=25.0, hub_ms=15.0, frame_ms=FRAME_MS,
+                          delay_ms=DEFAULT_DELAY_MS)
+
+# Transitions that bound the cost: the longest reconcile, a full colour swap and the reset
+WORST_CASES = (
+    ("All channels 0 → 10", (0, 0, 0, 0), (MAX_LEVEL,) * 4),
+    ("Colour swap W+G ↔ R+B", (MAX_LEVEL, 0, MAX_LEVEL, 0), (0, MAX_LEVEL, 0, MAX_LEVEL)),
+    ("Sunset 8,6,5,3 → 0", (8, 6, 5, 3), (0, 0, 0, 0)),
+)
+
+ORDERS = ('grouped', 'interleaved', 'proportional', 'greedy', 'optimal')
+
+# Approximate CIE 1931 xy chromaticity and relative luminance (Y) of each channel at full
+# level: a ~6500K white LED and narrow-band red, green and blue LEDs
+CHANNEL_CHROMATICITY = {
+    'white': (0.3127, 0.3290, 1.00),
+    'red': (0.6900, 0.3080, 0.22),
+    'green': (0.1700, 0.7000, 0.65),
+    'blue': (0.1360, 0.0500, 0.07),
+}
+
+# Order the reconcile script's template produces
+RECONCILE_ORDER = 'greedy'
+
+# ΔE of about 2.3 is one just-noticeable difference; 5 is clearly the same scene
+DEFAULT_TOLERANCE = 5.0
+
+RESET_COMMANDS = tuple(f"{channel}_down" for channel in CHANNELS)
+RESET_REPEATS = 12
+
+
+def transition_commands(current, target, order='grouped'):
+    """Return the IR commands that move `current` to `target`.
+
+    `grouped` finishes one channel before the next (white, red, green, blue);
+    `interleaved` steps the channels round-robin; `proportional` spreads each channel's
+    commands evenly over the transition; `greedy` sends whichever command brings the
+    tank perceptually closest (CIELAB) to the target next, which is what the reconcile
+    script sends (RECONCILE_ORDER); `optimal` minimizes the integrated perceptual
+    error. All orders send the same commands.
+    """
+    runs = LightState.from_levels(current).runs_to(LightState.from_levels(target))
+    if order == 'grouped':
+        return [command for run in runs for command in run]
+    if order == 'interleaved':
+        commands = []
+        for step in range(max(len(run) for run in runs)):
+            commands.extend(run[step] for run in runs if step < len(run))
+        return commands
+    if order == 'proportional':
+        # Command k of a channel with n commands goes at fraction (k + 0.5) / n; the sort
+        # is stable, so ties keep white, red, green, blue order
+        slots = [((step + 0.5) / len(run), command)
+                 for run in runs for step, command in enumerate(run)]
+        return [command for _, command in sorted(slots, key=lambda slot: slot[0])]
+    if order == 'greedy':
+        return _greedy_order(current, target, runs)
+    if order == 'optimal':
+        return list(_optimal_order(tuple(current), tuple(target)))
+    raise ValueError(f"Unknown order: {order}")
+
+
+def _xyz(levels):
+    """CIE XYZ of the fixture at the given channel levels (linear in level)."""
+    x_total = y_total = z_total = 0.0
+    for channel, level in zip(CHANNELS, levels):
+        x, y, luminance = CHANNEL_CHROMATICITY[channel]
+        scale = luminance * level / MAX_LEVEL
+        x_total += scale * x / y
+        y_total += scale
+        z_total += scale * (1 - x - y) / y
+    return x_total, y_total, z_total
+
+
+_REFERENCE_WHITE = _xyz((MAX_LEVEL,) * len(CHANNELS))
+
+
+def _lab_component(ratio):
+    return ratio ** (1 / 3) if ratio > 216 / 24389 else (24389 / 27 * ratio + 16) / 116
+
+
+@lru_cache(maxsize=None)
+def to_lab(levels):
+    """CIELAB of a light state, relative to the fixture at full output on every channel."""
+    fx, fy, fz = (_lab_component(value / white) for value, white in zip(_xyz(levels),
+                                                                        _REFERENCE_WHITE))
+    return 116 * fy - 16, 500 * (fx - fy), 200 * (fy - fz)
+
+
+CACHE_LOOKUPS.labels(cache='to_lab', result='hit').set_function(lambda: to_lab.cache_info().hits)
+CACHE_LOOKUPS.labels(cache='to_lab', result='miss').set_function(lambda: to_lab.cache_info().misses)
+
+
+def perceptual_error(levels, target):
+    """CIE76 ΔE between two light states."""
+    return sum((a - b) ** 2 for a, b in zip(to_lab(tuple(levels)), to_lab(tuple(target)))) ** 0.5
+
+
+def _greedy_order(current, target, runs):
+    """Send whichever remaining command leaves the smallest ΔE next."""
+    levels = list(current)
+    remaining = [len(run) for run in runs]
+    commands = []
+    while any(remaining):
+        best = None
+        for channel, count in enumerate(remaining):
+            if count:
+                step = 1 if target[channel] > levels[channel] else -1
+                trial = levels[:channel] + [levels[channel] + step] + levels[channel + 1:]
+                error = perceptual_error(trial, target)
+                if best is None or error < best[0]:
+                    best = (error, channel, step)
+        _, channel, step = best
+        levels[channel] += step
+        remaining[channel] -= 1
+        commands.append(runs[channel][0])
+    return commands
+
+
+@lru_cache(maxsize=4096)
+def _optimal_order(current, target):
+    """Order minimizing the summed ΔE of every intermediate state (exact DP)."""
+    counts = [abs(want - have) for have, want in zip(current, target)]
+    signs = [1 if want > have else -1 for have, want in zip(current, target)]
+
+    def levels_at(progress):
+        return tuple(have + sign * done for have, sign, done in zip(current, signs, progress))
+
+    # best[progress] = (summed error of the states visited so far, previous channel)
+    best = {(0,) * len(counts): (0.0, None)}
+    for progress in sorted(product(*(range(count + 1) for count in counts)), key=sum)[1:]:
+        error = perceptual_error(levels_at(progress), target)
+        options = []
+        for channel, done in enumerate(progress):
+            if done:
+                previous = progress[:channel] + (done - 1,) + progress[channel + 1:]
+                options.append((best[previous][0], channel))
+        cost, channel = min(options)
+        best[progress] = (cost + error, channel)
+    commands = []
+    progress = tuple(counts)
+    while any(progress):
+        channel = best[progress][1]
+        commands.append(COMMANDS[2 * channel + (signs[channel] < 0)])
+        progress = progress[:channel] + (progress[channel] - 1,) + progress[channel + 1:]
+    return tuple(reversed(commands))
+
+
+def transition_error(current, target, commands, period_s, tolerance=DEFAULT_TOLERANCE):
+    """Return (integrated ΔE·s, seconds until the error stays within `tolerance`).
+
+    Commands go out every `period_s`; the state after command k holds until command k+1.
+    """
+    levels = list(current)
+    errors = [perceptual_error(current, target)]
+    for command in commands:
+        channel, step = COMMAND_STEPS[COMMAND_IDS[command]]
+        levels[channel] += step
+        errors.append(perceptual_error(levels, target))
+    settled = len(errors)
+    while settled > 0 and errors[settled - 1] <= tolerance:
+        settled -= 1
+    # errors[0] holds until the first command lands (t = 0); errors[k] from (k-1)·period
+    settle_time = max(0, settled - 1) * period_s if settled else 0.0
+    return sum(errors[1:]) * period_s, settle_time
+
+
+def compress(commands):
+    """Express a command list as the shortest ServiceCall that Broadlink expands back to it."""
+    length = len(commands)
+    for period in range(1, length + 1):
+        if length % period == 0 and commands[:period] * (length // period) == commands:
+            return ServiceCall(tuple(commands[:period]), length // period)
+    return ServiceCall((), 1)
+
+
+def expand(call):
+    """The command sequence a ServiceCall produces, in send order."""
+    return list(call.commands) * call.num_repeats
+
+
+def plan(commands, strategy='per-fixture'):
+    """Split a command list into send_command calls for one emission strategy."""
+    if not commands:
+        return []
+    RECONCILE_PLANS.labels(strategy).inc()
+    if strategy == 'per-step':
+        return [ServiceCall((command,), 1) for command in commands]
+    if strategy == 'per-channel':
+        calls = []
+        for command in commands:
+            if calls and calls[-1].commands == (command,):
+                calls[-1] = ServiceCall((command,), calls[-1].num_repeats + 1)
+            else:
+                calls.append(ServiceCall((command,), 1))
+        return calls
+    if strategy == 'per-fixture':
+        return [compress(commands)]
+    raise ValueError(f"Unknown strategy: {strategy}")
+
+
+def plan_cost(calls, costs=DEFAULT_COSTS):
+    """Return (script steps, service calls, IR commands, wall ms) for a plan.
+
+    Every call is followed by one delay step, as in the scripts, so the next IR
+    command (in this plan or the next one) is paced the same way.
+    """
+    commands = sum(len(call.commands) * call.num_repeats for call in calls)
+    steps = 2 * len(calls)
+    wall = (steps * costs.step_ms + len(calls) * costs.call_ms
+            + commands * (costs.hub_ms + costs.frame_ms + costs.delay_ms))
+    return steps, len(calls), commands, wall
+
+
+def circadian_transitions(year=None, latitude=None, solar_noon=None):
+    """Return (counts, current, target) for every distinct per-minute reconcile in a year."""
+    import numpy as np
+    from lighting_vector import evaluate_range, year_range
+
+    options = {key: value for key, value in (('latitude', latitude), ('solar_noon', solar_noon))
+               if value is not None}
+    start, end = year_range(year or datetime.now().year)
+    levels = evaluate_range(start, end, **options)['levels'].astype(np.int16)
+    changed = np.any(levels[1:] != levels[:-1], axis=1)
+    pairs = np.concatenate([levels[:-1][changed], levels[1:][changed]], axis=1)
+    unique, counts = np.unique(pairs, axis=0, return_counts=True)
+    return counts, unique[:, :4], unique[:, 4:]
+
+
+def sunrise_sunset_transitions(year=None, window_hours=1.5, latitude=None, solar_noon=None):
+    """Reconciles around sunrise and sunset over a year, as {label: [(count, current, target)]}.
+
+    `per-minute` are the automation's minute-to-minute changes within `window_hours` of
+    sunrise or sunset; `resync` moves from all-off to each of those minutes' levels, as
+    the startup and manual syncs do.
+    """
+    import numpy as np
+    from lighting_vector import evaluate_range, sunrise_sunset, year_range
+
+    options = {key: value for key, value in (('latitude', latitude), ('solar_noon', solar_noon))
+               if value is not None}
+    start, end = year_range(year or datetime.now().year)
+    result = evaluate_range(start, end, **options)
+    levels = result['levels'].astype(np.int16)
+    sunrise, sunset = sunrise_sunset(result['day_of_year'], **options)
+    hour = result['hour']
+    window = (np.abs(hour - sunrise) <= window_hours) | (np.abs(hour - sunset) <= window_hours)
+    changed = np.zeros(len(levels), dtype=bool)
+    changed[1:] = np.any(levels[1:] != levels[:-1], axis=1)
+    steps = np.flatnonzero(changed & window)
+    pairs, counts = np.unique(np.concatenate([levels[steps - 1], levels[steps]], axis=1),
+                              axis=0, return_counts=True)
+    targets, target_counts = np.unique(levels[window & np.any(levels > 0, axis=1)], axis=0,
+                                       return_counts=True)
+    off = (0,) * len(CHANNELS)
+    return {
+        'per-minute': [(count, tuple(pair[:4]), tuple(pair[4:]))
+                       for count, pair in zip(counts.tolist(), pairs.tolist())],
+        'resync': [(count, off, tuple(target))
+                   for count, target in zip(target_counts.tolist(), targets.tolist())],
+    }
+
+
+def compare_orders(transitions, period_s, tolerance=DEFAULT_TOLERANCE, orders=ORDERS):
+    """Weighted perceptual error and settle time of every order over a set of transitions.
+
+    Returns {order: (mean ΔE·s, mean settle s, p95 settle s, max settle s)}.
+    """
+    import numpy as np
+
+    weights = np.array([count for count, _, _ in transitions], dtype=float)
+    stats = {}
+    for order in orders:
+        errors, settles = [], []
+        for _, current, target in transitions:
+            commands = transition_commands(current, target, order)
+            error, settle = transition_error(current, target, commands, period_s, tolerance)
+            errors.append(error)
+            settles.append(settle)
+        settles = np.array(settles)
+        ranked = np.argsort(settles)
+        cumulative = np.cumsum(weights[ranked]) / weights.sum()
+        p95 = settles[ranked][np.searchsorted(cumulative, 0.95)]
+        stats[order] = (np.average(errors, weights=weights), np.average(settles, weights=weights),
+                        p95, settles.max())
+    return stats
+
+
+def summarize(transitions, costs=DEFAULT_COSTS, order='grouped'):
+    """Total cost of a weighted set of transitions for every strategy."""
+    totals = {strategy: [0, 0, 0, 0.0] for strategy in STRATEGIES}
+    worst = {strategy: 0.0 for strategy in STRATEGIES}
+    planned = RECONCILE_DURATION.labels(source='planned')
+    for weight, current, target in transitions:
+        commands = transition_commands(current, target, order)
+        for strategy in STRATEGIES:
+            cost = plan_cost(plan(commands, strategy), costs)
+            for index, value in enumerate(cost):
+                totals[strategy][index] += weight * value
+            worst[strategy] = max(worst[strategy], cost[3])
+            if strategy == 'per-fixture':  # what the scripts send
+                planned.observe(cost[3] / 1000, weight)
+    return totals, worst
+
+
+def verify_with_runtime(current, target, root='.'):
+    """Run the real reconcile script in the HA stand-in; return (steps, calls, commands, levels)."""
+    from ha_runtime import HomeAssistantStub
+
+    start = datetime(2026, 1, 1)
+    hass = HomeAssistantStub(start)
+    hass.load_helpers(f"{root}/helpers")
+    hass.load_scripts(f"{root}/scripts")
+    for channel, level in zip(CHANNELS, current):
+        hass.set_state(f'input_number.hygger_{channel}_level', float(level))
+        hass.light.levels[channel] = level
+    variables = {f'target_{channel[0]}': level for channel, level in zip(CHANNELS, target)}
+    for _ in hass.call_service('script.turn_on', ['script.aquarium_reconcile_state'],
+                               {'variables': variables}):
+        pass
+    hass.run_until(start + timedelta(minutes=10))
+    levels = tuple(hass.light.levels[channel] for channel in CHANNELS)
+    return hass.steps_executed, hass.service_calls, [c for _, c in hass.commands], levels
+
+
+def print_order_report(year, period_s, tolerance):
+    """Print the perceptual comparison of channel orders."""
+    print(f"🎨 Channel order vs perceptual error (ΔE, one command every {period_s:.3f}s, "
+          f"settled = within ΔE {tolerance:g})")
+    print("=" * 78)
+    groups = [("Worst cases", [(1, current, target) for _, current, target in WORST_CASES])]
+    try:
+        groups += [(f"Sunrise/sunset {label}", transitions) for label, transitions
+                   in sunrise_sunset_transitions(year).items()]
+    except ImportError:
+        print("⚠️  numpy not installed - only the worst cases are compared")
+    for label, transitions in groups:
+        try:
+            stats = compare_orders(transitions, period_s, tolerance)
+        except ImportError:
+            continue
+        count = sum(weight for weight, _, _ in transitions)
+        print(f"\n{label}: {count:,} transitions ({len(transitions)} distinct)")
+        print(f"   {'Order':<13} {'ΔE·s':>8} {'vs grouped':>11} {'Settle mean':>12} "
+              f"{'p95':>6} {'max':>6}")
+        baseline = stats['grouped'][0]
+        for order, (error, settle, p95, worst) in stats.items():
+            marker = " ◀ script" if order == RECONCILE_ORDER else ""
+            change = 100 * (error / baseline - 1) if baseline else 0.0
+            print(f"   {order:<13} {error:>8.1f} {change:>+10.1f}% {settle:>11.1f}s "
+                  f"{p95:>5.1f}s {worst:>5.1f}s{marker}")
+
+
+def _print_row(label, cost, baseline):
+    steps, calls, commands, wall = cost
+    saved = 100 * (1 - wall / baseline) if baseline else 0.0
+    print(f"   {label:<12} {steps:>8,.0f} steps {calls:>8,.0f} calls "
+          f"{wall / 1000:>9.1f}s  ({saved:>4.1f}% faster)")
+
+
+def parse_args():
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(description="Compare send_command emission strategies")
+    parser.add_argument('--year', type=int, help="Year of circadian reconciles to replay")
+    parser.add_argument('--order', choices=ORDERS, default=RECONCILE_ORDER,
+                        help="Channel order inside a transition")
+    parser.add_argument('--orders', action='store_true',
+                        help="Compare channel orders by perceptual error instead")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="ΔE within which a transition counts as settled")
+    parser.add_argument('--delay-ms', type=float, default=DEFAULT_DELAY_MS,
+                        help="IR pacing delay (input_number.hygger_ir_delay_ms)")
+    parser.add_argument('--step-ms', type=float, default=DEFAULT_COSTS.step_ms,
+                        help="HA script executor overhead per step")
+    parser.add_argument('--call-ms', type=float, default=DEFAULT_COSTS.call_ms,
+                        help="Service dispatch overhead per send_command call")
+    parser.add_argument('--hub-ms', type=float, default=DEFAULT_COSTS.hub_ms,
+                        help="Round trip to the Broadlink hub per IR code")
+    parser.add_argument('--verify', action='store_true',
+                        help="Also run the worst cases through the real reconcile script YAML")
+    metrics.add_arguments(parser)
+    return parser.parse_args()
+
+
+def print_strategy_report(args, costs):
+    """Print the per-step, per-channel and per-fixture comparison."""
+    print("📦 Hygger Reconcile Planner - batched remote.send_command")
+    print("=" * 70)
+    print(f"⚙️  Costs: {costs.step_ms:g}ms/step, {costs.call_ms:g}ms/call, "
+          f"{costs.hub_ms:g}ms hub + {costs.frame_ms:g}ms frame + {costs.delay_ms:g}ms delay "
+          f"per command ({args.order} order)")
+
+    print("\n🔥 Worst-case transitions")
+    for label, current, target in WORST_CASES:
+        commands = transition_commands(current, target, args.order)
+        print(f"\n{label}: {len(commands)} commands")
+        costs_by_strategy = {s: plan_cost(plan(commands, s), costs) for s in STRATEGIES}
+        for strategy in STRATEGIES:
+            _print_row(strategy, costs_by_strategy[strategy], costs_by_strategy['per-step'][3])
+    reset = [ServiceCall(RESET_COMMANDS, RESET_REPEATS)]
+    legacy_reset = plan(expand(reset[0]), 'per-step')
+    print(f"\nNightly reset: {len(expand(reset[0]))} commands")
+    _print_row('per-step', plan_cost(legacy_reset, costs), plan_cost(legacy_reset, costs)[3])
+    _print_row('per-fixture', plan_cost(reset, costs), plan_cost(legacy_reset, costs)[3])
+
+    try:
+        counts, current, target = circadian_transitions(args.year)
+    except ImportError:
+        print("\n⚠️  numpy not installed - skipping the full-year replay")
+    else:
+        transitions = list(zip(counts.tolist(), current.tolist(), target.tolist()))
+        totals, worst = summarize(transitions, costs, args.order)
+        reconciles = int(counts.sum())
+        print(f"\n📅 Typical: {reconciles:,} circadian reconciles over a year "
+              f"({len(transitions)} distinct transitions)")
+        baseline = totals['per-step'][3]
+        for strategy in STRATEGIES:
+            _print_row(strategy, totals[strategy], baseline)
+        per_step = totals['per-step']
+        batched = totals['per-fixture']
+        print(f"   Mean per reconcile: {per_step[0] / reconciles:.1f} → "
+              f"{batched[0] / reconciles:.1f} steps, {per_step[3] / reconciles:.0f} → "
+              f"{batched[3] / reconciles:.0f}ms; slowest {worst['per-step']:.0f} → "
+              f"{worst['per-fixture']:.0f}ms")
+
+    if args.verify:
+        print("\n🏠 Real reconcile script in the HA stand-in")
+        for label, current, target in WORST_CASES:
+            steps, calls, sent, levels = verify_with_runtime(current, target)
+            expected = transition_commands(current, target, RECONCILE_ORDER)
+            status = "✅" if levels == tuple(target) and sent == expected else "❌"
+            print(f"   {status} {label}: {steps} steps, {calls} service calls, "
+                  f"{len(sent)} IR commands, light at {levels}")
+
+    print("\n💡 Batching removes the per-command script step, delay step and service call;")
+    print("   the IR pacing delay itself is unchanged, so savings grow as the delay is tuned down")
+
+
+def main():
+    """Compare per-step, per-channel and per-fixture emission of reconcile traffic."""
+    args = parse_args()
+    costs = CostModel(args.step_ms, args.call_ms, args.hub_ms, FRAME_MS, args.delay_ms)
+    server = metrics.start(args)
+    if args.orders:
+        period_s = (costs.hub_ms + costs.frame_ms + costs.delay_ms) / 1000
+        print_order_report(args.year, period_s, args.tolerance)
+    else:
+        print_strategy_report(args, costs)
+    metrics.finish(args, server)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,442 @@
+#!/usr/bin/env python3
+"""
+Hygger Scenario Runner
+Runs declarative scenario files against the real automations and scripts in virtual time.
+
+A scenario file (scenarios/*.yaml) gives the starting state, a timed list of
+events and the bounds the run must stay within:
+
+    name: Weather changes at midday
+    start: "2026-06-21 11:55"          # virtual clock at the beginning
+    duration: "01:30"                  # HH:MM[:SS] or seconds
+    helpers: {white: 8, red: 1, green: 6, blue: 6}   # level helpers (light defaults to these)
+    light: {white: 8, red: 1, green: 6, blue: 6}     # optional physical levels if different
+    weather: sunny
+    settings: {input_number.hygger_dwell_minutes: 0}  # states set at start and after restarts
+    automations: {aquarium_daily_reset: off}           # turn automations off
+    events:
+      - at: "12:10"                    # clock time on the start day, or `after: "00:15"`
+        weather: rainy                 # one action per event: weather, target, script,
+      - after: "00:40"                 # automation, set, light or restart
+        restart: {remote: 20, power_cut: {white: 0, red: 0, green: 0, blue: 0}}
+    expect:
+      commands: {max: 40}              # a number is exact, {min, max} is a range
+      final: engine                    # or {white: .., ...}; final_tolerance: 1
+      drift: 0
+
+Expectations: `commands` (IR commands sent), `flashes` (lightning flashes),
+`reconcile_seconds` (longest aquarium_reconcile_state run), `settled_seconds`
+(from the last event to the last IR command after it), `final` with
+`final_tolerance`, `drift` (helpers vs light at the end), `errors` (script and
+automation errors, 0 unless given) and `runs: {automation: count}`.
+
+A `target` event runs script.aquarium_reconcile_state with those levels; a
+`restart` rebuilds Home Assistant at that moment, keeping the physical light and
+the states HA restores (helpers without `initial`, automation on/off), with
+the remote, weather and sun integrations loading after the given seconds.
+
+Each scenario runs in its own process (--jobs), so hundreds of files take
+seconds. Adding a regression case is adding a file; the exit status is 1 when
+any scenario fails.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+import yaml
+
+from ha_runtime import (CHANNELS, DEFAULT_REMOTE, DEFAULT_WEATHER, RECONCILE_SCRIPT, WeatherStub,
+                        _duration_seconds, build_runtime)
+from lighting_engine import levels_at
+
+SCENARIO_DIR = 'scenarios'
+PARALLEL_THRESHOLD = 8
+ACTIONS = ('weather', 'target', 'script', 'automation', 'set', 'light', 'restart')
+EXPECTATIONS = ('commands', 'flashes', 'reconcile_seconds', 'settled_seconds', 'final',
+                'final_tolerance', 'drift', 'errors', 'runs')
+RESTART_DELAYS = {'remote': DEFAULT_REMOTE, 'weather': DEFAULT_WEATHER, 'sun': 'sun.sun'}
+
+Check = namedtuple('Check', 'name actual expected passed')
+Result = namedtuple('Result', 'path name passed checks error seconds')
+
+
+class ScenarioError(ValueError):
+    """Raised for a scenario file that cannot be run as written."""
+
+
+def _state_value(value):
+    """A YAML value as HA would store it: booleans as on/off, numbers as floats."""
+    if isinstance(value, bool):
+        return 'on' if value else 'off'
+    if isinstance(value, (int, float)):
+        return float(value)
+    return value
+
+
+def _levels(value, where):
+    """Validate a {white, red, green, blue} mapping of 0-10 levels."""
+    if not isinstance(value, dict) or set(value) - set(CHANNELS):
+        raise ScenarioError(f"{where}: expected levels for {', '.join(CHANNELS)}")
+    levels = {}
+    for channel in CHANNELS:
+        level = value.get(channel, 0)
+        if not isinstance(level, int) or not 0 <= level <= 10:
+            raise ScenarioError(f"{where}: {channel} must be a whole level 0-10, got {level!r}")
+        levels[channel] = level
+    return levels
+
+
+def _bound(value, where):
+    """Normalize an expectation to (min, max); a number means exactly that."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value, value
+    if isinstance(value, dict) and value and not set(value) - {'min', 'max'}:
+        return value.get('min'), value.get('max')
+    raise ScenarioError(f"{where}: expected a number or {{min, max}}, got {value!r}")
+
+
+def load_scenario(path):
+    """Read and validate a scenario file; returns it with times and levels resolved."""
+    with open(path) as file:
+        config = yaml.safe_load(file) or {}
+    if not isinstance(config, dict):
+        raise ScenarioError("a scenario is a mapping")
+    try:
+        start = datetime.strptime(str(config['start']), '%Y-%m-%d %H:%M')
+        end = start + timedelta(seconds=_duration_seconds(config['duration']))
+    except KeyError as error:
+        raise ScenarioError(f"missing {error.args[0]!r}") from None
+    except ValueError as error:
+        raise ScenarioError(f"start/duration: {error}") from None
+    helpers = _levels(config.get('helpers', {}), 'helpers')
+    scenario = {
+        'name': config.get('name') or os.path.splitext(os.path.basename(path))[0],
+        'start': start,
+        'end': end,
+        'helpers': helpers,
+        'light': _levels(config['light'], 'light') if 'light' in config else dict(helpers),
+        'weather': config.get('weather', 'sunny'),
+        'weather_fail_rate': float(config.get('weather_fail_rate', 0.0)),
+        'settings': {entity_id: _state_value(value)
+                     for entity_id, value in (config.get('settings') or {}).items()},
+        'automations': {object_id: _state_value(value)
+                        for object_id, value in (config.get('automations') or {}).items()},
+        'events': [],
+        'expect': {},
+    }
+
+    for index, event in enumerate(config.get('events') or [], 1):
+        where = f"event {index}"
+        actions = [key for key in ACTIONS if key in event]
+        unknown = set(event) - set(ACTIONS) - {'at', 'after', 'data'}
+        if len(actions) != 1 or unknown or ('at' in event) == ('after' in event):
+            raise ScenarioError(f"{where}: needs one of at/after and exactly one of "
+                                f"{', '.join(ACTIONS)}")
+        if 'at' in event:
+            # Unquoted 06:30 is a base-60 integer in YAML 1.1, so clock times must be strings
+            if not isinstance(event['at'], str):
+                raise ScenarioError(f"{where}: quote the clock time, e.g. at: \"06:30\"")
+            moment = datetime.combine(start.date(), datetime.min.time()) \
+                + timedelta(seconds=_duration_seconds(event['at']))
+        else:
+            moment = start + timedelta(seconds=_duration_seconds(event['after']))
+        if not start <= moment <= end:
+            raise ScenarioError(f"{where}: {moment:%H:%M:%S} is outside the scenario")
+        action = actions[0]
+        value = event[action]
+        if action in ('target', 'light'):
+            value = _levels(value, where)
+        elif action == 'restart':
+            value = dict(value or {})
+            if 'power_cut' in value:
+                value['power_cut'] = _levels(value['power_cut'], f"{where} power_cut")
+            unknown = set(value) - set(RESTART_DELAYS) - {'power_cut'}
+            if unknown:
+                raise ScenarioError(f"{where}: unknown restart option {sorted(unknown)[0]!r}")
+        elif action == 'set':
+            value = {entity_id: _state_value(state) for entity_id, state in value.items()}
+        scenario['events'].append((moment, action, value, event.get('data') or {}))
+    scenario['events'].sort(key=lambda event: event[0])
+
+    expect = config.get('expect') or {}
+    unknown = set(expect) - set(EXPECTATIONS)
+    if unknown:
+        raise ScenarioError(f"unknown expectation {sorted(unknown)[0]!r}")
+    for key in ('commands', 'flashes', 'reconcile_seconds', 'settled_seconds', 'drift', 'errors'):
+        if key in expect:
+            scenario['expect'][key] = _bound(expect[key], key)
+    scenario['expect'].setdefault('errors', (0, 0))
+    if 'final' in expect:
+        final = expect['final']
+        scenario['expect']['final'] = final if final == 'engine' else _levels(final, 'final')
+        scenario['expect']['final_tolerance'] = int(expect.get('final_tolerance', 0))
+    scenario['expect']['runs'] = {object_id: _bound(bound, f"runs.{object_id}")
+                                  for object_id, bound in (expect.get('runs') or {}).items()}
+    return scenario
+
+
+@lru_cache(maxsize=None)
+def restored_helpers(root):
+    """Helper entities Home Assistant restores on restart: those without an `initial`."""
+    restored = set()
+    directory = os.path.join(root, 'helpers')
+    for filename in sorted(os.listdir(directory)):
+        if filename.endswith(('.yaml', '.yml')):
+            with open(os.path.join(directory, filename)) as file:
+                for domain, entities in (yaml.safe_load(file) or {}).items():
+                    restored.update(f'{domain}.{object_id}'
+                                    for object_id, options in (entities or {}).items()
+                                    if 'initial' not in (options or {}))
+    return frozenset(restored)
+
+
+class ScenarioRun:
+    """One scenario in the stand-in, across however many restarts it contains."""
+
+    def __init__(self, scenario, root='.'):
+        self.scenario = scenario
+        self.root = root
+        changes = [(moment, value) for moment, action, value, _ in scenario['events']
+                   if action == 'weather']
+        self.weather = WeatherStub(self._timeline(scenario['weather'], changes),
+                                   fail_rate=scenario['weather_fail_rate'])
+        self.commands, self.errors, self.script_runs = [], [], []
+        self.runs = {}
+        self.hass = self._boot(scenario['start'])
+        for channel in CHANNELS:
+            self.hass.set_state(f'input_number.hygger_{channel}_level',
+                                float(scenario['helpers'][channel]))
+            self.hass.light.levels[channel] = scenario['light'][channel]
+        for object_id, state in scenario['automations'].items():
+            self.hass.set_state(f'automation.{object_id}', state)
+
+    @staticmethod
+    def _timeline(initial, changes):
+        def condition(moment):
+            current = initial
+            for changed_at, value in changes:
+                if changed_at > moment:
+                    break
+                current = value
+            return current
+        return condition
+
+    def _boot(self, moment, light=None, delays=None):
+        hass = build_runtime(moment, self.root, weather=self.weather, light=light,
+                             unavailable_until=delays)
+        for entity_id, state in self.scenario['settings'].items():
+            hass.set_state(entity_id, state)
+        return hass
+
+    def _collect(self):
+        """Move the finished runtime's history into the scenario totals."""
+        self.commands += self.hass.commands
+        self.errors += self.hass.errors
+        self.script_runs += self.hass.script_runs
+        for object_id, count in self.hass.automation_runs.items():
+            self.runs[object_id] = self.runs.get(object_id, 0) + count
+
+    def restart(self, options):
+        """Stop HA and start a fresh one that restores what HA would restore."""
+        old, now = self.hass, self.hass.now
+        self._collect()
+        light = old.light
+        for channel, level in (options.get('power_cut') or {}).items():
+            light.levels[channel] = level
+        delays = {entity_id: now + timedelta(seconds=float(options[key]))
+                  for key, entity_id in RESTART_DELAYS.items() if key in options}
+        self.hass = self._boot(now, light, delays)
+        restored = restored_helpers(self.root)
+        for entity_id, state in old.states.items():
+            if entity_id in restored or entity_id.startswith('automation.'):
+                self.hass.set_state(entity_id, state.state, state.attributes)
+        self.hass.start()
+
+    def apply(self, action, value, data):
+        """Carry out one event on the running instance."""
+        hass = self.hass
+        if action == 'target':
+            variables = {f'target_{channel[0]}': value[channel] for channel in CHANNELS}
+            hass.services['script.turn_on']([f'script.{RECONCILE_SCRIPT}'],
+                                            {'variables': variables})
+        elif action == 'script':
+            hass.services['script.turn_on']([f'script.{value}'], {'variables': dict(data)})
+        elif action == 'automation':
+            hass.fire_automation(value, {'id': 'scenario'}, skip_condition=True)
+        elif action == 'set':
+            for entity_id, state in value.items():
+                hass.set_state(entity_id, state)
+        elif action == 'light':
+            hass.light.levels.update(value)
+        elif action == 'restart':
+            self.restart(value)
+        # weather changes are in the WeatherStub timeline already
+
+    def run(self):
+        """Play every event and the rest of the duration; returns the measurements."""
+        last_event = self.scenario['start']
+        for moment, action, value, data in self.scenario['events']:
+            self.hass.run_until(moment)
+            self.apply(action, value, data)
+            last_event = moment
+        self.hass.run_until(self.scenario['end'])
+        self._collect()
+
+        after = [moment for moment, _ in self.commands if moment >= last_event]
+        reconciles = [(finished - started).total_seconds()
+                      for object_id, started, finished in self.script_runs
+                      if object_id == RECONCILE_SCRIPT]
+        end = self.scenario['end']
+        return {
+            'commands': len(self.commands),
+            'flashes': self.hass.light.lightning_flashes,
+            'reconcile_seconds': max(reconciles, default=0.0),
+            'settled_seconds': (max(after) - last_event).total_seconds() if after else 0.0,
+            'final': dict(self.hass.light.levels),
+            'engine': levels_at(end, self.weather.timeline(end))['levels'],
+            'drift': self.hass.drift(),
+            'errors': len(self.errors),
+            'error_details': [f"{moment:%H:%M:%S} {kind} {object_id}: {message}"
+                              for moment, kind, object_id, message in self.errors],
+            'runs': self.runs,
+        }
+
+
+def check(scenario, measured):
+    """Compare measurements with the scenario's expectations; returns a list of Checks."""
+    expect = scenario['expect']
+    checks = []
+    for key in ('commands', 'flashes', 'reconcile_seconds', 'settled_seconds', 'drift', 'errors'):
+        if key in expect:
+            low, high = expect[key]
+            actual = measured[key]
+            passed = (low is None or actual >= low) and (high is None or actual <= high)
+            checks.append(Check(key, actual, _describe(low, high), passed))
+    for object_id, (low, high) in expect['runs'].items():
+        actual = measured['runs'].get(object_id, 0)
+        passed = (low is None or actual >= low) and (high is None or actual <= high)
+        checks.append(Check(f"runs.{object_id}", actual, _describe(low, high), passed))
+    if 'final' in expect:
+        wanted = measured['engine'] if expect['final'] == 'engine' else expect['final']
+        tolerance = expect['final_tolerance']
+        actual = measured['final']
+        passed = all(abs(actual[channel] - wanted[channel]) <= tolerance for channel in CHANNELS)
+        checks.append(Check('final', _format_levels(actual),
+                            _format_levels(wanted) + (f" ±{tolerance}" if tolerance else ""),
+                            passed))
+    return checks
+
+
+def _describe(low, high):
+    if low == high:
+        return f"= {low}"
+    if low is None:
+        return f"≤ {high}"
+    if high is None:
+        return f"≥ {low}"
+    return f"{low}-{high}"
+
+
+def _format_levels(levels):
+    return ' '.join(f"{channel[0].upper()}{levels[channel]}" for channel in CHANNELS)
+
+
+def run_scenario(path, root='.'):
+    """Load, run and check one scenario file; never raises."""
+    started = time.perf_counter()
+    name = os.path.splitext(os.path.basename(path))[0]
+    try:
+        scenario = load_scenario(path)
+        name = scenario['name']
+        measured = ScenarioRun(scenario, root).run()
+        checks = check(scenario, measured)
+        if measured['error_details'] and not all(c.passed for c in checks if c.name == 'errors'):
+            checks.append(Check('error', measured['error_details'][0], 'none', False))
+        passed, error = all(c.passed for c in checks), None
+    except ScenarioError as exc:
+        checks, passed, error = [], False, f"invalid scenario: {exc}"
+    except Exception as exc:  # A crash in one scenario is that scenario's failure
+        checks, passed, error = [], False, f"{type(exc).__name__}: {exc}"
+    return Result(path, name, passed, checks, error, time.perf_counter() - started)
+
+
+def find_scenarios(paths):
+    """Expand directories to the scenario files in them (sorted)."""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for directory, _, filenames in sorted(os.walk(path)):
+                found += [os.path.join(directory, name) for name in sorted(filenames)
+                          if name.endswith(('.yaml', '.yml'))]
+        else:
+            found.append(path)
+    return found
+
+
+def run_all(paths, root='.', jobs=0):
+    """Run scenario files, in a process pool when there are enough of them."""
+    roots = [root] * len(paths)
+    if jobs != 1 and len(paths) >= PARALLEL_THRESHOLD:
+        with ProcessPoolExecutor(max_workers=jobs or None) as pool:
+            return list(pool.map(run_scenario, paths, roots, chunksize=4))
+    return [run_scenario(path, root) for path in paths]
+
+
+def print_report(results, elapsed, verbose=False):
+    """Print one line per scenario, the failed checks and a summary."""
+    print("🎭 Hygger Scenario Runner")
+    print("=" * 60)
+    for result in results:
+        mark = '✅' if result.passed else '❌'
+        print(f"{mark} {result.name}  ({result.path}, {result.seconds * 1000:.0f} ms)")
+        if result.error:
+            print(f"    💥 {result.error}")
+        for item in result.checks:
+            if verbose or not item.passed:
+                sign = '•' if item.passed else '✗'
+                print(f"    {sign} {item.name}: {item.actual} (expected {item.expected})")
+    failed = sum(not result.passed for result in results)
+    print("=" * 60)
+    print(f"📊 {len(results) - failed} passed, {failed} failed in {elapsed:.2f}s "
+          f"({sum(r.seconds for r in results):.2f}s of scenario time)")
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Run scenario files against the automations")
+    parser.add_argument('paths', nargs='*', default=[SCENARIO_DIR],
+                        help=f"Scenario files or directories (default: {SCENARIO_DIR}/)")
+    parser.add_argument('--root', default='.', help="Configuration checkout to run against")
+    parser.add_argument('--jobs', type=int, default=0,
+                        help="Worker processes (0 = one per CPU, 1 = no pool)")
+    parser.add_argument('--json', metavar='PATH', help="Also write the results as JSON")
+    parser.add_argument('--verbose', action='store_true', help="Show passing checks too")
+    return parser.parse_args()
+
+
+def main():
+    """Run the scenarios and report; exits 1 when any fails."""
+    args = parse_args()
+    paths = find_scenarios(args.paths)
+    if not paths:
+        print(f"❌ No scenario files in {', '.join(args.paths)}")
+        return 1
+    started = time.perf_counter()
+    results = run_all(paths, args.root, args.jobs)
+    print_report(results, time.perf_counter() - started, args.verbose)
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump([{**result._asdict(), 'checks': [item._asdict() for item in result.checks]}
+                       for result in results], file, indent=2, default=str)
+        print(f"📝 Results written to {args.json}")
+    return 0 if all(result.passed for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
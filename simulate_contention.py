@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Hygger Contention Simulation
+Randomized concurrent writers against the real automations and scripts.
+
+Five writers share one light and its level helpers: the circadian automation's
+minute loop, the nightly reset, the Sync Lights script, the lightning effect and
+people moving the level sliders on the dashboard. Syncs and lightning effects are
+pressed as a person would, so their helper writes carry a user. Each trial starts the HA
+stand-in at a random moment (some just before the 02:00 reset) and fires slider
+changes (often several in a row), syncs and lightning effects at random seconds
+while the minute loop runs. Every second the light and the helpers are sampled.
+
+Reported per configuration:
+  applied      slider changes that reached the light, and how long that took
+  ignored      slider changes made while a script wrote the helpers or another
+               writer held the light (the writer sets the helpers itself)
+  lost         slider changes the light never showed (nothing else touched it)
+  overridden   slider changes undone by the circadian automation during the hold
+  unclean      resets that ended with the light or the helpers not at zero
+  skipped      runs refused as "Already running"
+  desync       seconds the helpers disagreed with the light with nothing running
+  final drift  trials where helpers and light still disagreed at the end
+
+Run it against another checkout with --root to compare configurations.
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+import metrics
+from ha_runtime import CHANNELS, HomeAssistantStub, WeatherStub
+from lighting_engine import MAX_LEVEL
+
+HELPERS = tuple(f'input_number.hygger_{channel}_level' for channel in CHANNELS)
+RESET_SCRIPT = 'aquarium_reset_to_zero'
+WRITER_SCRIPTS = ('sync_aquarium_lights', 'aquarium_lightning_effect')
+# Scripts during which aquarium_manual_override ignores helper changes
+HELPER_WRITERS = tuple(f'script.{name}' for name in (
+    'aquarium_reset_to_zero', 'sync_aquarium_lights', 'aquarium_reconcile_state',
+    'aquarium_test_lights', 'aquarium_calibrate_light_sensor', 'aquarium_apply_manual_change'))
+LEASE_HELPER = 'input_text.aquarium_light_lease'
+APPLY_WINDOW_S = 120
+
+
+class ObservedStub(HomeAssistantStub):
+    """The stand-in, noting when each reset started and what it left behind."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.resets = []   # (started, light levels and drift when done)
+
+    def _script_finished(self, object_id, started):
+        super()._script_finished(object_id, started)
+        if object_id == RESET_SCRIPT:
+            levels = tuple(self.light.levels[channel] for channel in CHANNELS)
+            self.resets.append((started, levels, self.drift()))
+
+
+def random_events(rng, window_s, sliders, syncs, lightning):
+    """Draw (second, kind, detail) events; rates are per hour, sliders come in bursts."""
+    events = []
+    for kind, rate in (('slider', sliders), ('sync', syncs), ('lightning', lightning)):
+        second = rng.expovariate(rate / 3600) if rate else window_s
+        while second < window_s:
+            if kind == 'slider':
+                # A person often moves two or three sliders within a few seconds
+                moment = second
+                for _ in range(rng.choice((1, 1, 2, 3))):
+                    events.append((int(moment), kind, (rng.randrange(len(CHANNELS)),
+                                                       rng.randint(0, MAX_LEVEL))))
+                    moment += rng.uniform(1, 6)
+            else:
+                events.append((int(second), kind, None))
+            second += rng.expovariate(rate / 3600)
+    return sorted(events, key=lambda event: event[0])
+
+
+def random_start(rng, year, reset_share):
+    """A daytime moment, or one shortly before the nightly reset for `reset_share` of trials."""
+    day = datetime(year, 1, 1) + timedelta(days=rng.randrange(365))
+    if rng.random() < reset_share:
+        return day + timedelta(hours=1, minutes=rng.uniform(45, 59))
+    return day + timedelta(minutes=rng.uniform(7 * 60, 17 * 60))
+
+
+def _writer_busy(hass):
+    """Whether the manual override would ignore a slider move now."""
+    if any(hass.states[entity_id].state == 'on' for entity_id in HELPER_WRITERS
+           if entity_id in hass.states):
+        return True
+    lease = hass.states[LEASE_HELPER].state.split() if LEASE_HELPER in hass.states else []
+    return (len(lease) == 3 and lease[0] != 'manual'
+            and float(lease[2]) > hass.now.timestamp())
+
+
+def _interferes(event, channel):
+    """Whether an event may legitimately move `channel` away from a manual level."""
+    _, kind, detail = event
+    return kind != 'slider' or detail[0] == channel
+
+
+def _score_sliders(events, history, reset_seconds, hold_s):
+    """Classify every slider change as applied (with its delay), lost, overridden or superseded."""
+    applied, lost, overridden = [], 0, 0
+    for index, (second, kind, detail) in enumerate(events):
+        if kind != 'slider':
+            continue
+        channel, wanted = detail
+        end = min([event[0] for event in events[index + 1:] if _interferes(event, channel)]
+                  + [reset for reset in reset_seconds if reset > second]
+                  + [second + hold_s, len(history) - 1])
+        reached = next((moment for moment in range(second, end + 1)
+                        if history[moment][channel] == wanted), None)
+        if reached is None:
+            if end - second >= APPLY_WINDOW_S:
+                lost += 1
+            continue
+        applied.append(reached - second)
+        if any(history[moment][channel] != wanted for moment in range(reached, end)):
+            overridden += 1
+    return applied, lost, overridden
+
+
+def run_trial(rng, root, args):
+    """Run one randomized trial; returns a dict of counts."""
+    start = random_start(rng, args.year, args.reset_share)
+    events = random_events(rng, args.window, args.sliders, args.syncs, args.lightning)
+    hass = ObservedStub(start, weather=WeatherStub('sunny'))
+    hass.load_config(root)
+    hold_s = args.hold * 60
+    if 'input_number.hygger_manual_hold_minutes' in hass.states:
+        hass.set_state('input_number.hygger_manual_hold_minutes', float(args.hold))
+    hass.set_state('input_boolean.enable_aquarium_lightning', 'on')
+    history, desync, moved, ignored = [], 0, [], 0
+    pending = list(events)
+    for second in range(args.window + args.settle):
+        moment = start + timedelta(seconds=second)
+        hass.run_until(moment)
+        history.append(tuple(hass.light.levels[channel] for channel in CHANNELS))
+        if not hass._running and hass.drift():
+            desync += 1
+        while pending and pending[0][0] == second:
+            event = pending.pop(0)
+            _, kind, detail = event
+            if kind == 'slider':
+                # Dragging a slider onto the level it shows changes nothing
+                if float(hass.states[HELPERS[detail[0]]].state) != detail[1]:
+                    if _writer_busy(hass):
+                        ignored += 1
+                    else:
+                        moved.append(event)
+                    hass.set_by_user(HELPERS[detail[0]], detail[1])
+            else:
+                moved.append(event)
+                hass.press_by_user(f'script.{WRITER_SCRIPTS[kind == "lightning"]}')
+    reset_seconds = [int((started - start).total_seconds()) for started, _, _ in hass.resets]
+    applied, lost, overridden = _score_sliders(moved, history, reset_seconds, hold_s)
+    skipped = sum(1 for _, level, _, message in hass.logs
+                  if level == 'warning' and message.endswith('Already running'))
+    return {
+        'sliders': sum(1 for _, kind, _ in moved if kind == 'slider'),
+        'applied': applied,
+        'ignored': ignored,
+        'lost': lost,
+        'overridden': overridden,
+        'resets': len(hass.resets),
+        'unclean': sum(1 for _, levels, drift in hass.resets if any(levels) or drift),
+        'skipped': skipped,
+        'desync': desync,
+        'final_drift': int(hass.drift() > 0),
+        'commands': len(hass.commands),
+        'errors': len(hass.errors),
+    }
+
+
+def run_config(root, args):
+    """Run every trial against one configuration tree and total the results."""
+    rng = random.Random(args.seed)
+    totals = {'applied': []}
+    for _ in range(args.trials):
+        result = run_trial(rng, root, args)
+        totals['applied'] += result.pop('applied')
+        for key, value in result.items():
+            totals[key] = totals.get(key, 0) + value
+    return totals
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0
+
+
+def parse_args():
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(description="Randomized concurrent writers on one light")
+    parser.add_argument('--trials', type=int, default=20, help="Number of randomized trials")
+    parser.add_argument('--root', action='append',
+                        help="Configuration tree to run (repeat to compare; default .)")
+    parser.add_argument('--year', type=int, default=datetime.now().year)
+    parser.add_argument('--window', type=int, default=1800, help="Seconds of activity per trial")
+    parser.add_argument('--settle', type=int, default=300,
+                        help="Quiet seconds after the activity before the final check")
+    parser.add_argument('--sliders', type=float, default=8.0, help="Slider bursts per hour")
+    parser.add_argument('--syncs', type=float, default=2.0, help="Sync Lights presses per hour")
+    parser.add_argument('--lightning', type=float, default=3.0,
+                        help="Lightning effects per hour")
+    parser.add_argument('--hold', type=int, default=10,
+                        help="input_number.hygger_manual_hold_minutes for the trials")
+    parser.add_argument('--reset-share', type=float, default=0.3,
+                        help="Share of trials starting just before the 02:00 reset")
+    parser.add_argument('--seed', type=int, default=0)
+    metrics.add_arguments(parser)
+    return parser.parse_args()
+
+
+def main():
+    """Run the trials for each configuration and print the comparison."""
+    args = parse_args()
+    roots = args.root or ['.']
+    print("🚦 Hygger Contention Simulation")
+    print("=" * 78)
+    print(f"🎲 {args.trials} trials of {args.window // 60} min: {args.sliders:g} slider bursts, "
+          f"{args.syncs:g} syncs, {args.lightning:g} lightning effects per hour; "
+          f"hold {args.hold} min")
+    server = metrics.start(args)
+    for root in roots:
+        started = time.perf_counter()
+        totals = run_config(root, args)
+        elapsed = time.perf_counter() - started
+        applied = totals['applied']
+        print(f"\n📂 {root}  ({elapsed:.1f}s)")
+        print(f"   🎚️  Slider changes: {totals['sliders']} (and {totals['ignored']} ignored while a "
+              f"writer ran), applied {len(applied)} "
+              f"(median {_percentile(applied, 0.5)}s, p95 {_percentile(applied, 0.95)}s), "
+              f"lost {totals['lost']}, overridden during the hold {totals['overridden']}")
+        print(f"   🔄 Resets: {totals['resets']}, unclean {totals['unclean']}")
+        print(f"   ⛔ Runs skipped as already running: {totals['skipped']}")
+        print(f"   🔀 Seconds helpers ≠ light with nothing running: {totals['desync']:,}")
+        print(f"   📡 IR commands: {totals['commands']:,}   Run errors: {totals['errors']}")
+        if totals['final_drift']:
+            print(f"   ⚠️  {totals['final_drift']}/{args.trials} trials ended with "
+                  f"helpers ≠ light")
+        else:
+            print("   ✅ Helpers matched the light at the end of every trial")
+    metrics.finish(args, server)
+
+
+if __name__ == "__main__":
+    main()
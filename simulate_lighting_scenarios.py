@@ -3,64 +3,75 @@
 Hygger Light Scenario Simulation Script
 Simulates specific lighting scenarios to validate the automation behavior.
 This helps test edge cases and ensure proper color channel timing.
+
+These are walkthroughs; the same scenarios with checked expectations are in
+scenarios/*.yaml and run with scenario_runner.py.
 """
 
+import argparse
 import time
 import sys
 
-def simulate_ir_command(device, command, current_levels, target_levels):
-    """Simulate sending an IR command and return updated levels."""
-    color_map = {
-        'white_up': ('white', 1),
-        'white_down': ('white', -1),
-        'red_up': ('red', 1),
-        'red_down': ('red', -1),
-        'green_up': ('green', 1),
-        'green_down': ('green', -1),
-        'blue_up': ('blue', 1),
-        'blue_down': ('blue', -1)
-    }
-    
-    if command in color_map:
-        color, delta = color_map[command]
+import metrics
+from light_state import CHANNELS, COMMAND_IDS, COMMAND_STEPS, LightState
+from metrics import IR_COMMANDS, RECONCILE_DURATION
+from reconcile_planner import RECONCILE_ORDER, transition_commands
+
+IR_DELAY_MS = 500  # Delay between IR commands used by the reconcile script
+
+def simulate_ir_command(device, command, current_levels, target_levels, trace=None):
+    """Simulate sending an IR command and return updated levels.
+
+    When `trace` (an ir_trace.TraceWriter) is given, the command is recorded at the
+    writer's virtual clock, which then advances by the IR delay.
+    """
+    if command in COMMAND_IDS:
+        channel, delta = COMMAND_STEPS[COMMAND_IDS[command]]
+        color = CHANNELS[channel]
         current_levels[color] = max(0, min(10, current_levels[color] + delta))
         print(f"    📡 IR: {command:>12} → {color.title()}: {current_levels[color]}/10")
-        time.sleep(0.5)  # Simulate 500ms delay
+        IR_COMMANDS.labels('scenario', color, 'up' if delta > 0 else 'down').inc()
+        if trace is not None:
+            trace.record(color, delta)
+            trace.advance(IR_DELAY_MS)
+        time.sleep(IR_DELAY_MS / 1000)  # Simulate the IR pacing delay
     
     return current_levels
 
-def simulate_reconcile_state(current_levels, target_levels):
-    """Simulate the aquarium_reconcile_state script behavior."""
+def simulate_reconcile_state(current_levels, target_levels, trace=None):
+    """Simulate the aquarium_reconcile_state script behavior.
+
+    Commands go out in the script's perceptual order (see reconcile_planner.py),
+    so channels change together instead of strictly white → red → green → blue.
+    """
     print(f"\n🔄 Reconciling state: Current {current_levels} → Target {target_levels}")
     
-    colors = ['white', 'red', 'green', 'blue']
-    commands_sent = 0
-    
-    for color in colors:
-        current = current_levels[color]
-        target = target_levels[color]
-        diff = target - current
-        
+    current = LightState.from_dict(current_levels)
+    target = LightState.from_dict(target_levels)
+    for color, have, diff in zip(CHANNELS, current, current.delta(target)):
         if diff != 0:
-            print(f"  🎯 {color.title()} channel: {current}→{target} ({diff:+d})")
-            
-            if diff > 0:
-                for _ in range(diff):
-                    simulate_ir_command('hygger_hg016', f'{color}_up', current_levels, target_levels)
-                    commands_sent += 1
-            else:
-                for _ in range(abs(diff)):
-                    simulate_ir_command('hygger_hg016', f'{color}_down', current_levels, target_levels)
-                    commands_sent += 1
+            print(f"  🎯 {color.title()} channel: {have}→{have + diff} ({diff:+d})")
         else:
-            print(f"  ✅ {color.title()} channel: {current} (no change needed)")
+            print(f"  ✅ {color.title()} channel: {have} (no change needed)")
+
+    commands = transition_commands(current, target, RECONCILE_ORDER)
+    for command in commands:
+        simulate_ir_command('hygger_hg016', command, current_levels, target_levels, trace)
+    commands_sent = len(commands)
+    RECONCILE_DURATION.labels(source='scenario').observe(commands_sent * IR_DELAY_MS / 1000)
     
     print(f"  📊 Total IR commands sent: {commands_sent}")
-    print(f"  ⏱️  Total time elapsed: {commands_sent * 0.5:.1f} seconds")
+    print(f"  ⏱️  Total time elapsed: {commands_sent * IR_DELAY_MS / 1000:.1f} seconds")
     
     return current_levels, commands_sent
 
-def scenario_sunrise_transition():
+def _pause(seconds, trace=None):
+    """Sleep between transitions, keeping the trace clock in step."""
+    if trace is not None:
+        trace.advance(seconds * 1000)
+    time.sleep(seconds)
+
+def scenario_sunrise_transition(trace=None):
     """Simulate sunrise transition from night to day."""
     print("🌅 SCENARIO: Sunrise Transition")
     print("=" * 60)
@@ -81,16 +92,16 @@ def scenario_sunrise_transition():
     
     for hour, minute, target_levels, description in transitions:
         print(f"\n⏰ {hour:02d}:{minute:02d} - {description}")
-        current_levels, commands = simulate_reconcile_state(current_levels, target_levels)
+        current_levels, commands = simulate_reconcile_state(current_levels, target_levels, trace)
         
         if commands > 0:
             print("    ⏸️  Pausing for light stabilization...")
-            time.sleep(1)
+            _pause(1, trace)
     
     print("\n✅ Sunrise simulation complete!")
     return current_levels
 
-def scenario_sunset_transition():
+def scenario_sunset_transition(trace=None):
     """Simulate sunset transition from day to night."""
     print("\n\n🌇 SCENARIO: Sunset Transition")
     print("=" * 60)
@@ -112,16 +123,16 @@ def scenario_sunset_transition():
     
     for hour, minute, target_levels, description in transitions:
         print(f"\n⏰ {hour:02d}:{minute:02d} - {description}")
-        current_levels, commands = simulate_reconcile_state(current_levels, target_levels)
+        current_levels, commands = simulate_reconcile_state(current_levels, target_levels, trace)
         
         if commands > 0:
             print("    ⏸️  Pausing for light stabilization...")
-            time.sleep(1)
+            _pause(1, trace)
     
     print("\n✅ Sunset simulation complete!")
     return current_levels
 
-def scenario_weather_changes():
+def scenario_weather_changes(trace=None):
     """Simulate weather condition changes during the day."""
     print("\n\n🌦️ SCENARIO: Weather Condition Changes")
     print("=" * 60)
@@ -141,11 +152,11 @@ def scenario_weather_changes():
     
     for target_levels, description in weather_scenarios:
         print(f"\n🌤️ {description}")
-        current_levels, commands = simulate_reconcile_state(current_levels, target_levels)
+        current_levels, commands = simulate_reconcile_state(current_levels, target_levels, trace)
         
         if commands > 0:
             print("    ⏸️  Pausing for weather adjustment...")
-            time.sleep(1)
+            _pause(1, trace)
     
     print("\n✅ Weather simulation complete!")
     return current_levels
@@ -180,7 +191,7 @@ def scenario_lightning_effect():
     
     return current_levels
 
-def scenario_power_recovery():
+def scenario_power_recovery(trace=None):
     """Simulate system recovery after power loss."""
     print("\n\n🔄 SCENARIO: Power Recovery Sync")
     print("=" * 60)
@@ -203,14 +214,14 @@ def scenario_power_recovery():
     # First, reset everything to 0
     reset_state = {'white': 0, 'red': 0, 'green': 0, 'blue': 0}
     print("\n1️⃣ Step 1: Reset all channels to zero")
-    unknown_physical_state, commands1 = simulate_reconcile_state(unknown_physical_state, reset_state)
+    unknown_physical_state, commands1 = simulate_reconcile_state(unknown_physical_state, reset_state, trace)
     
     # Then build up to target
     print("\n2️⃣ Step 2: Build up to target levels")
-    final_state, commands2 = simulate_reconcile_state(unknown_physical_state, target_state)
+    final_state, commands2 = simulate_reconcile_state(unknown_physical_state, target_state, trace)
     
     total_commands = commands1 + commands2
-    total_time = total_commands * 0.5
+    total_time = total_commands * IR_DELAY_MS / 1000
     
     print(f"\n📊 Recovery Summary:")
     print(f"    Total IR commands: {total_commands}")
@@ -218,7 +229,7 @@ def scenario_power_recovery():
     
     return final_state
 
-def scenario_extreme_changes():
+def scenario_extreme_changes(trace=None):
     """Simulate extreme lighting changes to test system robustness."""
     print("\n\n🎢 SCENARIO: Extreme Lighting Changes")
     print("=" * 60)
@@ -241,33 +252,50 @@ def scenario_extreme_changes():
         change = target_total - current_total
         
         print(f"\n{description} (Total change: {change:+d})")
-        current_levels, commands = simulate_reconcile_state(current_levels, target_levels)
+        current_levels, commands = simulate_reconcile_state(current_levels, target_levels, trace)
         
         if commands > 10:
             print("    ⚠️  Large change detected - extended stabilization pause")
-            time.sleep(2)
+            _pause(2, trace)
         elif commands > 0:
-            time.sleep(1)
+            _pause(1, trace)
     
     print("\n✅ Extreme change testing complete!")
     return current_levels
 
 def main():
     """Run comprehensive lighting scenario simulations."""
+    global IR_DELAY_MS
+
+    parser = argparse.ArgumentParser(description="Run Hygger lighting scenario simulations")
+    parser.add_argument('--trace', metavar='PATH',
+                        help="Record every simulated IR command to a compact trace file")
+    parser.add_argument('--ir-delay', type=int, default=IR_DELAY_MS, metavar='MS',
+                        help="Delay between IR commands (input_number.hygger_ir_delay_ms)")
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+    IR_DELAY_MS = args.ir_delay
+
     print("🎭 Hygger Aquarium Light - Scenario Simulation Suite")
     print("=" * 80)
     print("This script simulates real-world lighting scenarios to validate automation behavior.")
-    print("It tests color channel transitions, timing, and edge cases with 500ms IR delays.")
+    print(f"It tests color channel transitions, timing, and edge cases with {IR_DELAY_MS}ms IR delays.")
     print()
     
+    trace = None
+    if args.trace:
+        from ir_trace import TraceWriter
+        trace = TraceWriter(args.trace)
+    server = metrics.start(args)
+    
     try:
         # Run scenario simulations
-        final_sunrise = scenario_sunrise_transition()
-        final_sunset = scenario_sunset_transition()
-        final_weather = scenario_weather_changes()
+        final_sunrise = scenario_sunrise_transition(trace)
+        final_sunset = scenario_sunset_transition(trace)
+        final_weather = scenario_weather_changes(trace)
         final_lightning = scenario_lightning_effect()
-        final_recovery = scenario_power_recovery()
-        final_extreme = scenario_extreme_changes()
+        final_recovery = scenario_power_recovery(trace)
+        final_extreme = scenario_extreme_changes(trace)
         
         # Summary
         print("\n" + "=" * 80)
@@ -280,7 +308,7 @@ def main():
         print("✅ Extreme changes: System handles large adjustments gracefully")
         print()
         print("🎯 Key Validation Points:")
-        print("• All IR commands use proper 500ms delays")
+        print(f"• All IR commands use proper {IR_DELAY_MS}ms delays")
         print("• Color channels transition smoothly during sunrise/sunset")
         print("  - Red dominates at low sun elevations (warm)")
         print("  - Blue dominates at high sun elevations (cool)")
@@ -292,12 +320,18 @@ def main():
         print("💡 Implementation Notes:")
         print("• Circadian lighting calculations work correctly across all scenarios")
         print("• Weather-aware adjustments preserve color temperature relationships")
-        print("• 500ms delays between commands ensure proper HG016 operation")
+        print(f"• {IR_DELAY_MS}ms delays between commands ensure proper HG016 operation")
         print("• State reconciliation minimizes unnecessary IR commands")
         
     except KeyboardInterrupt:
         print("\n\n⏹️ Simulation interrupted by user")
         sys.exit(0)
+    finally:
+        if trace is not None:
+            trace.close()
+            print(f"\n📼 IR trace written to {args.trace} "
+                  f"({trace.commands_written} commands in {trace.runs_written} runs)")
+    metrics.finish(args, server)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
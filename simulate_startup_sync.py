@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Hygger Startup Sync Simulation
+Measures time-to-correct-light after a Home Assistant restart.
+
+Each trial restarts the HA stand-in at a random daytime moment. The Broadlink
+remote, `sun.sun` and the weather entity become available after randomized
+integration start-up times, and a power cut sometimes leaves the physical light
+at unknown levels. The repository's real automations and scripts then run, and
+the light is compared every second with what the circadian engine says it should
+show. The automation's sun position and the engine's can differ by a minute, so
+anything between the previous, current and next minute's targets counts as correct.
+Time-to-correct-light is the moment after which it stays correct.
+
+Run it against another checkout with --root to compare configurations.
+"""
+import argparse
+import math
+import random
+import time
+from datetime import datetime, timedelta
+
+import metrics
+from ha_runtime import DEFAULT_REMOTE, DEFAULT_WEATHER, CHANNELS, WeatherStub, build_runtime
+from lighting_engine import MAX_LEVEL, levels_at
+
+
+def random_restart(rng, year, remote_median, weather_median):
+    """Draw one restart: (start, integration delays in seconds, helper levels)."""
+    day = datetime(year, 1, 1) + timedelta(days=rng.randrange(365))
+    start = day + timedelta(minutes=rng.randrange(8 * 60 + 30, 16 * 60))
+    delays = {
+        DEFAULT_REMOTE: remote_median * math.exp(rng.gauss(0, 1.0)),
+        DEFAULT_WEATHER: weather_median * math.exp(rng.gauss(0, 1.2)),
+        'sun.sun': rng.uniform(0, 3),
+    }
+    # The helpers hold whatever was last sent before the restart
+    downtime = timedelta(minutes=rng.uniform(1, 10))
+    before = levels_at(start - downtime)['levels']
+    helpers = tuple(before[channel] for channel in CHANNELS)
+    return start, delays, helpers
+
+
+def run_trial(start, delays, helpers, physical, root='.', window_s=600):
+    """Return (seconds until the light stays correct or None, seconds incorrect, IR commands)."""
+    hass = build_runtime(start, root, weather=WeatherStub('sunny'),
+                         unavailable_until={entity_id: start + timedelta(seconds=delay)
+                                            for entity_id, delay in delays.items()})
+    # Time-to-correct-light is measured against the engine itself; the dead-band's
+    # deliberate holds after the sync are measured by deadband.py
+    hass.set_state('input_number.hygger_dwell_minutes', 0.0)
+    for channel, helper, level in zip(CHANNELS, helpers, physical):
+        hass.set_state(f'input_number.hygger_{channel}_level', float(helper))
+        hass.light.levels[channel] = level
+    hass.start()
+    last_wrong = None
+    wrong = 0
+    minute = start.replace(second=0, microsecond=0)
+    bands = [levels_at(minute + timedelta(minutes=offset))['levels'] for offset in (-1, 0, 1)]
+    for second in range(window_s + 1):
+        moment = start + timedelta(seconds=second)
+        hass.run_until(moment)
+        if moment.second == 0 and moment != minute:
+            minute = moment
+            bands = bands[1:] + [levels_at(minute + timedelta(minutes=1))['levels']]
+        if any(not min(band[c] for band in bands) <= hass.light.levels[c] <= max(band[c] for band in bands)
+               for c in CHANNELS):
+            last_wrong = second
+            wrong += 1
+    if last_wrong == window_s:
+        return None, wrong, len(hass.commands)
+    settled = 0 if last_wrong is None else last_wrong + 1
+    return settled, wrong, len(hass.commands)
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def parse_args():
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(description="Measure time-to-correct-light after restarts")
+    parser.add_argument('--trials', type=int, default=100, help="Number of simulated restarts")
+    parser.add_argument('--root', default='.', help="Configuration tree to run")
+    parser.add_argument('--year', type=int, default=datetime.now().year)
+    parser.add_argument('--remote-median', type=float, default=15.0,
+                        help="Median seconds until the Broadlink remote is available")
+    parser.add_argument('--weather-median', type=float, default=20.0,
+                        help="Median seconds until the weather entity is available")
+    parser.add_argument('--power-cut', type=float, default=0.5,
+                        help="Share of restarts after a power cut (physical light unknown)")
+    parser.add_argument('--window', type=int, default=600, help="Seconds to observe per restart")
+    parser.add_argument('--seed', type=int, default=0)
+    metrics.add_arguments(parser)
+    return parser.parse_args()
+
+
+def main():
+    """Run randomized restarts and summarize time-to-correct-light."""
+    args = parse_args()
+    rng = random.Random(args.seed)
+    print("🔌 Hygger Startup Sync Simulation")
+    print("=" * 70)
+    print(f"📂 Configuration: {args.root}  Trials: {args.trials}  "
+          f"Remote median {args.remote_median:g}s, weather median {args.weather_median:g}s, "
+          f"power cut {args.power_cut:.0%}")
+
+    server = metrics.start(args)
+    started = time.perf_counter()
+    settled, wrong_seconds, unsettled, commands = [], [], 0, []
+    for _ in range(args.trials):
+        start, delays, helpers = random_restart(rng, args.year, args.remote_median,
+                                                args.weather_median)
+        if rng.random() < args.power_cut:
+            physical = tuple(rng.randint(0, MAX_LEVEL) for _ in CHANNELS)
+        else:
+            physical = helpers
+        seconds, wrong, sent = run_trial(start, delays, helpers, physical, args.root, args.window)
+        wrong_seconds.append(wrong)
+        commands.append(sent)
+        if seconds is None:
+            unsettled += 1
+        else:
+            settled.append(seconds)
+    elapsed = time.perf_counter() - started
+
+    print(f"⏱️  Simulated in {elapsed:.1f}s\n")
+    if settled:
+        print(f"💡 Time to correct light: mean {sum(settled) / len(settled):.0f}s, "
+              f"median {_percentile(settled, 0.5):.0f}s, p95 {_percentile(settled, 0.95):.0f}s, "
+              f"max {max(settled):.0f}s")
+    print(f"🌑 Wrong or dark per restart: mean {sum(wrong_seconds) / len(wrong_seconds):.0f}s "
+          f"of the first {args.window}s")
+    print(f"📡 IR commands per restart: mean {sum(commands) / len(commands):.0f}")
+    if unsettled:
+        print(f"⚠️  {unsettled}/{args.trials} restarts still wrong after {args.window}s "
+              f"(left for the nightly reset)")
+    else:
+        print(f"✅ Every restart reached the correct light within {args.window}s")
+    metrics.finish(args, server)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Hygger Arbitration Tests
+The light lease, the manual override and reset preemption, run in the HA stand-in.
+"""
+import os
+import random
+from argparse import Namespace
+from datetime import datetime, timedelta
+
+import pytest
+
+from ha_runtime import WeatherStub, build_runtime
+from simulate_contention import run_trial
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+START = datetime(2026, 6, 21, 12, 0, 30)
+LEASE = 'input_text.aquarium_light_lease'
+
+
+def runtime(hold_minutes=10):
+    hass = build_runtime(START, ROOT, weather=WeatherStub('sunny'))
+    hass.set_state('input_number.hygger_dwell_minutes', 0.0)
+    hass.set_state('input_number.hygger_manual_hold_minutes', float(hold_minutes))
+    return hass
+
+
+def lease(hass):
+    return hass.states[LEASE].state
+
+
+def test_manual_change_is_sent_and_held():
+    hass = runtime(hold_minutes=10)
+    hass.run_until(START + timedelta(minutes=2))
+    scheduled = dict(hass.light.levels)
+    hass.set_by_user('input_number.hygger_white_level', 3)
+    hass.run_until(START + timedelta(minutes=2, seconds=30))
+    assert hass.light.levels == {**scheduled, 'white': 3}
+    assert hass.drift() == 0
+    assert lease(hass).startswith('manual 3 ')
+    sent = len(hass.commands)
+    hass.run_until(START + timedelta(minutes=11))
+    assert len(hass.commands) == sent
+    # The hold runs out and the schedule takes the light back
+    hass.run_until(START + timedelta(minutes=14))
+    assert hass.light.levels == scheduled
+    assert hass.drift() == 0 and lease(hass) == ''
+    assert not hass.errors
+
+
+def test_without_a_hold_the_next_minute_takes_over():
+    hass = runtime(hold_minutes=0)
+    hass.run_until(START + timedelta(minutes=2))
+    scheduled = dict(hass.light.levels)
+    hass.set_by_user('input_number.hygger_red_level', 0)
+    hass.run_until(START + timedelta(minutes=2, seconds=20))
+    assert hass.light.levels['red'] == 0 and lease(hass) == ''
+    hass.run_until(START + timedelta(minutes=3, seconds=20))
+    assert hass.light.levels == scheduled and hass.drift() == 0
+
+
+def test_reset_preempts_a_reconcile():
+    hass = runtime()
+    # The first update takes the light from zero to the noon levels, ~15 s of IR
+    hass.run_until(START + timedelta(seconds=35))
+    assert hass.is_running('script', 'aquarium_reconcile_state')
+    for _ in hass.call_service('script.turn_on', ['script.aquarium_reset_to_zero'], {}):
+        pass
+    reset_at = len(hass.commands)
+    hass.run_until(START + timedelta(seconds=65))
+    assert not hass.is_running('script', 'aquarium_reset_to_zero')
+    assert all(command.endswith('_down') for _, command in hass.commands[reset_at:])
+    assert not any(hass.light.levels.values())
+    assert hass.drift() == 0 and lease(hass) == ''
+    assert not hass.errors
+
+
+@pytest.mark.parametrize('script', ['sync_aquarium_lights', 'aquarium_reset_to_zero'])
+def test_dashboard_buttons_are_not_manual_changes(script):
+    hass = runtime()
+    hass.run_until(START + timedelta(minutes=2))
+    scheduled = dict(hass.light.levels)
+    # Pressed by a person, so its helper writes carry that person's context
+    hass.press_by_user(f'script.{script}')
+    hass.run_until(START + timedelta(minutes=4))
+    assert hass.light.levels == scheduled and hass.drift() == 0
+    assert not lease(hass).startswith('manual')
+    assert not any(logger == 'aquarium.manual' for _, _, logger, _ in hass.logs)
+    assert not hass.errors
+
+
+@pytest.mark.parametrize('seed', [1, 2])
+def test_random_contention_ends_in_sync(seed):
+    args = Namespace(year=2026, reset_share=0.5, window=900, settle=240, sliders=20.0,
+                     syncs=4.0, lightning=6.0, hold=5)
+    result = run_trial(random.Random(seed), ROOT, args)
+    assert result['sliders'] > 0 and result['errors'] == 0
+    assert result['lost'] == result['overridden'] == result['unclean'] == 0
+    assert result['final_drift'] == 0 and result['desync'] == 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, '-q']))
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Hygger Integration Tests
+Checks custom_components/hygger against the rest of the repository.
+
+The parity tests need nothing but this repository: the integration's engine.py is a
+copy of the level math, the dead-band, the greedy command order, the photoperiod
+profiles and the forecast interpolation, and must agree with lighting_engine.py,
+deadband.py, reconcile_planner.py, photoperiod.py and weather_blend.py everywhere.
+
+The harness tests set the integration up in a test Home Assistant with stubbed
+sun.sun, weather and helper entities and a mocked remote.send_command. They run
+when pytest-homeassistant-custom-component is installed and are skipped otherwise:
+
+    pip install pytest-homeassistant-custom-component
+    python -m pytest test_hygger_integration.py --asyncio-mode=auto
+"""
+import importlib.util
+import random
+from datetime import datetime, timedelta, timezone
+from itertools import product
+from pathlib import Path
+
+import pytest
+
+from deadband import DeadBand
+from lighting_engine import CHANNELS, compute_levels, continuous_levels
+from photoperiod import CompiledProfile, find_profiles, load_profile
+from reconcile_planner import transition_commands
+from weather_blend import interpolate
+
+ENGINE_PATH = Path(__file__).parent / "custom_components" / "hygger" / "engine.py"
+CONDITIONS = ('sunny', 'clear-night', 'partlycloudy', 'partly-cloudy', 'cloudy', 'rainy',
+              'pouring', 'lightning-rainy', 'fog', 'snowy', None, (0.0, 0.0), (0.43, 0.25))
+
+HA_HARNESS = importlib.util.find_spec("pytest_homeassistant_custom_component") is not None
+requires_ha = pytest.mark.skipif(not HA_HARNESS,
+                                 reason="pytest-homeassistant-custom-component not installed")
+
+
+def load_engine():
+    """Import the integration's engine.py without the (Home Assistant) package around it."""
+    spec = importlib.util.spec_from_file_location("hygger_engine", ENGINE_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def yaml_config(path):
+    """A profile file as the integration gets it from configuration.yaml."""
+    import yaml
+
+    with open(path) as file:
+        return yaml.safe_load(file) or {}
+
+
+def test_engine_matches_lighting_engine():
+    engine = load_engine()
+    elevations = [index * 0.05 - 5 for index in range(1700)]  # -5° to 80° in 0.05° steps
+    for elevation, daylight, condition in product(elevations, (True, False), CONDITIONS):
+        levels, values = engine.evaluate(elevation, daylight, condition)
+        assert levels == compute_levels(elevation, daylight, condition)
+        assert values == pytest.approx(continuous_levels(elevation, daylight, condition))
+
+
+def test_deadband_matches():
+    engine = load_engine()
+    rng = random.Random(0)
+    ours, reference = engine.DeadBand(dwell=10), DeadBand(dwell=10)
+    elevation = 0.0
+    for minute in range(1, 3000):
+        elevation = max(-5.0, min(70.0, elevation + rng.uniform(-0.4, 0.5)))
+        condition = rng.choice(CONDITIONS) if minute % 45 == 0 else 'sunny'
+        targets = compute_levels(elevation, True, condition)
+        values = continuous_levels(elevation, True, condition)
+        rising = minute % 700 < 350
+        assert ours.update(minute, values, targets, rising) == \
+            reference.update(minute, values, targets, rising)
+        assert ours.pending == reference.pending
+
+
+def test_command_order_matches_reconcile_script():
+    engine = load_engine()
+    rng = random.Random(1)
+    for _ in range(300):
+        current = [rng.randint(0, 10) for _ in CHANNELS]
+        target = [rng.randint(0, 10) for _ in CHANNELS]
+        assert engine.transition_commands(current, target) == \
+            transition_commands(current, target, order='greedy')
+
+
+def test_profiles_match_photoperiod():
+    engine = load_engine()
+    for name, path in find_profiles(Path(__file__).parent).items():
+        profile = load_profile(path)
+        curve = engine.normalize_profile(yaml_config(path), name).curve
+        assert curve == profile.curve
+        ours = engine.CompiledProfile.compile(curve, 38.28)
+        reference = CompiledProfile.compile(profile.curve, 38.28)
+        assert ours.hash == reference.hash
+        assert (ours.values, ours.targets, ours.days) == \
+            (reference.values, reference.targets, reference.days)
+
+
+def test_default_profile_matches_evaluate():
+    engine = load_engine()
+    compiled = engine.CompiledProfile.compile(engine.DEFAULT_PROFILE, 38.28)
+    for step in range(0, 9601, 7):  # sun.sun elevations from -6° to 90°
+        elevation = (step - 600) / 100
+        for daylight, condition in product((True, False), CONDITIONS):
+            levels, values = compiled.evaluate(172, elevation, daylight, condition)
+            expected = engine.evaluate(elevation, daylight, condition)
+            assert levels == expected[0]
+            assert values == pytest.approx(expected[1])
+    for hour in range(24):
+        assert compiled.fallback_elevation(100, hour + 0.5, True) == \
+            engine.fallback_elevation(100, hour + 0.5, True)
+
+
+def test_forecast_interpolation_matches_weather_blend():
+    engine = load_engine()
+    rng = random.Random(2)
+    start = datetime(2026, 6, 21, 6, tzinfo=timezone.utc)
+    entries = []
+    for hour in range(6):
+        entry = {'datetime': (start + timedelta(hours=hour)).isoformat(),
+                 'condition': rng.choice(CONDITIONS[:10])}
+        if hour % 3:
+            entry.update(cloud_coverage=rng.randint(0, 100), precipitation=rng.uniform(0, 3))
+        entries.append(entry)
+    for minute in range(-30, 7 * 60, 7):
+        now = start + timedelta(minutes=minute)
+        assert engine.interpolate(entries, now) == interpolate(entries, now)
+    assert engine.interpolate([], start) == interpolate([], start)
+
+
+def test_daylight_window():
+    engine = load_engine()
+    now = 1_000_000.0
+    # Before sunrise the sun rises before it sets again; during the day it sets first
+    assert not engine.is_daylight(now + 3600, now + 12 * 3600, 'below_horizon')
+    assert engine.is_daylight(now + 86000, now + 3600, 'above_horizon')
+    assert engine.is_daylight(None, None, 'above_horizon')
+
+
+def test_lease_holder_reads_like_the_yaml():
+    engine = load_engine()
+    now = 1_000_000.0
+    assert engine.lease_holder('manual 3 1000600', now) == ('manual', 3, 1_000_600.0)
+    # Free: empty, expired, malformed or a helper that is not loaded
+    for value in ('', None, 'manual 3 999999', 'manual 3', 'manual 3 soon', 'unknown'):
+        assert engine.lease_holder(value, now) is None
+    assert engine.lease_holder('reset x 1000600', now) == ('reset', 0, 1_000_600.0)
+
+
+def _set_inputs(hass, elevation=45.0, condition='sunny', rising=True):
+    """Stub the entities the integration reads."""
+    from homeassistant.util import dt as dt_util
+
+    now = dt_util.utcnow()
+    hour = timedelta(hours=1)
+    hass.states.async_set('sun.sun', 'above_horizon', {
+        'elevation': elevation, 'rising': rising,
+        'next_rising': (now + 20 * hour).isoformat(),
+        'next_setting': (now + 4 * hour).isoformat(),
+    })
+    hass.states.async_set('weather.openweathermap', condition)
+
+
+async def _setup(hass, levels=(0, 0, 0, 0), config=None):
+    from homeassistant.setup import async_setup_component
+    from pytest_homeassistant_custom_component.common import async_mock_service
+
+    sent = async_mock_service(hass, 'remote', 'send_command')
+    async_mock_service(hass, 'input_number', 'set_value')
+    for channel, level in zip(CHANNELS, levels):
+        hass.states.async_set(f'input_number.hygger_{channel}_level', str(float(level)))
+    hass.states.async_set('input_number.hygger_ir_delay_ms', '0.0')
+    hass.states.async_set('script.aquarium_reset_to_zero', 'off')
+    assert await async_setup_component(hass, 'hygger', {'hygger': config or {}})
+    await hass.async_block_till_done()
+    return sent
+
+
+@requires_ha
+async def test_reconciles_on_startup(hass, enable_custom_integrations):
+    _set_inputs(hass, elevation=45.0)
+    sent = await _setup(hass)
+    target = compute_levels(45.0, True, 'sunny')
+    assert [call.data['command'] for call in sent] == \
+        transition_commands((0, 0, 0, 0), target, order='greedy')
+    assert all(call.data['device'] == 'hygger_hg016' for call in sent)
+    assert hass.states.get('sensor.hygger_white_target').state == str(target[0])
+    assert hass.states.get('sensor.hygger_ir_plan').state == '0'
+
+
+@requires_ha
+async def test_weather_change_replans(hass, enable_custom_integrations):
+    _set_inputs(hass, elevation=45.0)
+    sent = await _setup(hass)
+    sent.clear()
+    before = compute_levels(45.0, True, 'sunny')
+    _set_inputs(hass, elevation=45.0, condition='rainy')
+    await hass.async_block_till_done()
+    after = compute_levels(45.0, True, 'rainy')
+    assert [call.data['command'] for call in sent] == \
+        transition_commands(before, after, order='greedy')
+
+
+@requires_ha
+async def test_waits_for_reset(hass, enable_custom_integrations):
+    _set_inputs(hass, elevation=45.0)
+    hass.states.async_set('script.aquarium_reset_to_zero', 'on')
+    sent = await _setup(hass)
+    assert not sent
+    hass.states.async_set('script.aquarium_reset_to_zero', 'off')
+    await hass.async_block_till_done()
+    assert len(sent) == sum(compute_levels(45.0, True, 'sunny'))
+
+
+@requires_ha
+async def test_waits_for_manual_lease(hass, enable_custom_integrations):
+    import time
+
+    _set_inputs(hass, elevation=45.0)
+    hass.states.async_set('input_text.aquarium_light_lease', f'manual 3 {int(time.time()) + 600}')
+    sent = await _setup(hass, levels=(2, 2, 2, 2))
+    assert not sent
+    # The manual change went out through the scripts; the hold is ended by a sync
+    hass.states.async_set('input_number.hygger_white_level', '7.0')
+    hass.states.async_set('input_text.aquarium_light_lease', '')
+    await hass.async_block_till_done()
+    target = compute_levels(45.0, True, 'sunny')
+    assert [call.data['command'] for call in sent] == \
+        transition_commands((7, 2, 2, 2), target, order='greedy')
+
+
+@requires_ha
+async def test_fixtures_share_the_forecast_call(hass, enable_custom_integrations, aioclient_mock):
+    import time
+
+    from custom_components.hygger.weather_client import OWM_URL
+
+    now = int(time.time()) // 3600 * 3600
+    aioclient_mock.get(OWM_URL, json={'hourly': [
+        {'dt': now + hour * 3600, 'clouds': 0, 'temp': 20.0, 'weather': [{'id': 800}]}
+        for hour in range(-1, 4)]})
+    _set_inputs(hass, elevation=45.0)
+    location = {'owm_api_key': 'key', 'latitude': 52.52, 'longitude': 13.40}
+    sent = await _setup(hass, config=[
+        {**location},
+        {**location, 'name': 'Shrimp tank', 'device': 'hygger_shrimp', 'latitude': 52.521},
+    ])
+    assert aioclient_mock.call_count == 1
+    target = compute_levels(45.0, True, 'sunny')
+    for device, sensor in (('hygger_hg016', 'hygger'), ('hygger_shrimp', 'shrimp_tank')):
+        assert [call.data['command'] for call in sent if call.data['device'] == device] == \
+            transition_commands((0, 0, 0, 0), target, order='greedy')
+        assert hass.states.get(f'sensor.{sensor}_white_target').state == str(target[0])
+
+
+@requires_ha
+async def test_set_profile_swaps_tables(hass, enable_custom_integrations):
+    _set_inputs(hass, elevation=45.0)
+    await _setup(hass, config={'profiles': {'dim': {'max_levels': {'white': 4}}}})
+    assert hass.states.get('sensor.hygger_white_target').state == \
+        str(compute_levels(45.0, True, 'sunny')[0])
+    await hass.services.async_call('hygger', 'set_profile', {'profile': 'dim'}, blocking=True)
+    await hass.async_block_till_done()
+    state = hass.states.get('sensor.hygger_white_target')
+    assert state.state == '4'
+    assert state.attributes['profile'] == 'dim'
+
+
+@requires_ha
+async def test_lookahead_sends_before_the_minute(hass, enable_custom_integrations, freezer):
+    from unittest.mock import patch
+
+    from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+    minute = datetime(2026, 6, 21, 12, 1, tzinfo=timezone.utc)
+    freezer.move_to(minute - timedelta(seconds=50))
+    _set_inputs(hass, elevation=45.0)
+    # The sun climbs to 50° by 12:01; its commands are due to land by then
+    with patch('custom_components.hygger.coordinator.HyggerCoordinator._sun_ahead',
+               return_value=(50.0, True)):
+        sent = await _setup(hass, config={'lookahead': True})
+        before = compute_levels(45.0, True, 'sunny')
+        assert [call.data['command'] for call in sent] == \
+            transition_commands((0, 0, 0, 0), before, order='greedy')
+        sent.clear()
+        freezer.move_to(minute - timedelta(milliseconds=500))
+        async_fire_time_changed(hass)
+        await hass.async_block_till_done()
+    assert [call.data['command'] for call in sent] == \
+        transition_commands(before, compute_levels(50.0, True, 'sunny'), order='greedy')
+
+def main():
+    """Run the parity checks without pytest."""
+    print("🧩 Hygger Integration Parity")
+    print("=" * 50)
+    for check in (test_engine_matches_lighting_engine, test_deadband_matches,
+                  test_command_order_matches_reconcile_script, test_profiles_match_photoperiod,
+                  test_default_profile_matches_evaluate,
+                  test_forecast_interpolation_matches_weather_blend, test_daylight_window):
+        check()
+        print(f"✅ {check.__name__}")
+    if not HA_HARNESS:
+        print("⏭️  Home Assistant harness tests need pytest-homeassistant-custom-component")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Hygger IR Trace Tests
+Round trips through the trace format and trace comparison.
+"""
+import random
+
+import pytest
+
+from ir_trace import CHANNELS, DEFAULT_CHUNK_ROWS, TraceReader, TraceWriter, diff_traces
+
+FIXTURES = 3
+
+
+def interleaved_commands(seed, bursts=150):
+    """Return [(t_ms, fixture, command)] in time order, several fixtures sending at once.
+
+    Each fixture sends paced runs in the same minute, with gaps between bursts from two
+    minutes to 60 days (past 32-bit milliseconds). A fixture's times stay in its own
+    residue mod FIXTURES, so they are unique and the expected order is the sorted one.
+    """
+    rng = random.Random(seed)
+    events = []
+    clock = 0
+    for _ in range(bursts):
+        clock += rng.choice((120_000, 3_600_000, 60 * 86_400_000))
+        for fixture in range(FIXTURES):
+            t_ms = clock + rng.randrange(0, 2000) * FIXTURES + fixture
+            step = rng.choice((300, 500, 501)) * FIXTURES
+            for _ in range(rng.randint(1, 4)):
+                command = f"{rng.choice(CHANNELS)}_{rng.choice(('up', 'down'))}"
+                for _ in range(rng.randint(1, 10)):
+                    events.append((t_ms, fixture, command))
+                    t_ms += step
+    return sorted(events)
+
+
+def write_trace(path, events, chunk_rows=DEFAULT_CHUNK_ROWS):
+    with TraceWriter(path, chunk_rows=chunk_rows) as writer:
+        for t_ms, fixture, command in events:
+            writer.record_command(command, t_ms=t_ms, fixture=fixture)
+    return path
+
+
+@pytest.mark.parametrize('chunk_rows', [1, 2, 7, 64, DEFAULT_CHUNK_ROWS])
+def test_commands_round_trip(tmp_path, chunk_rows):
+    events = interleaved_commands(seed=chunk_rows)
+    path = write_trace(tmp_path / 'trace.hytr', events, chunk_rows)
+    reader = TraceReader(path)
+    assert list(reader.commands()) == events
+    summary = reader.summary()
+    assert summary['commands'] == len(events)
+    # Runs compress the paced bursts of every fixture, not just one at a time
+    assert summary['runs'] < len(events) / 2
+    assert summary['first_ms'] == events[0][0]
+    assert summary['last_ms'] == events[-1][0]
+
+
+def test_diff_identical_traces(tmp_path):
+    events = interleaved_commands(seed=1)
+    a = write_trace(tmp_path / 'a.hytr', events, 16)
+    b = write_trace(tmp_path / 'b.hytr', events, 16)
+    result = diff_traces(a, b)
+    assert result['identical'] and result['first_divergence'] is None
+    assert result['runs_compared'] == TraceReader(a).summary()['runs']
+    # Chunked differently, the same runs still compare equal
+    c = write_trace(tmp_path / 'c.hytr', events, 5)
+    assert diff_traces(a, c)['identical']
+
+
+def test_diff_reports_first_divergence(tmp_path):
+    events = interleaved_commands(seed=2)
+    t_ms, fixture, command = events[len(events) // 2]
+    changed = list(events)
+    channel, _, direction = command.rpartition('_')
+    changed[len(events) // 2] = (t_ms, fixture,
+                                 f"{channel}_{'down' if direction == 'up' else 'up'}")
+    a = write_trace(tmp_path / 'a.hytr', events, 16)
+    b = write_trace(tmp_path / 'b.hytr', changed, 16)
+    runs_a, runs_b = list(TraceReader(a).runs()), list(TraceReader(b).runs())
+    first = next(index for index, (run_a, run_b) in enumerate(zip(runs_a, runs_b))
+                 if run_a != run_b)
+    result = diff_traces(a, b)
+    assert not result['identical']
+    assert result['first_divergence'] == {'run_index': first, 'a': runs_a[first],
+                                          'b': runs_b[first]}
+    # A trace that stops early diverges where it ends
+    short = write_trace(tmp_path / 'short.hytr', events[:len(events) // 3], 16)
+    result = diff_traces(a, short)
+    assert not result['identical']
+    assert result['first_divergence']['run_index'] < len(runs_a)
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Hygger Light Feedback Tests
+Sensor calibration, the level estimate and the YAML's corrective commands in the stand-in.
+"""
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from ha_runtime import CHANNELS, RGBSensorStub, build_runtime
+from light_feedback import (CALIBRATION_HELPER, FEEDBACK_HELPER, CalibrationError,
+                            calibrate_with_runtime, estimate_levels, fit_calibration,
+                            format_calibration, parse_calibration)
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+START = datetime(2026, 6, 21)
+
+
+@pytest.fixture(scope='module')
+def calibrated():
+    return calibrate_with_runtime(START, ROOT)
+
+
+def test_calibration_script_steps_every_channel(calibrated):
+    samples, calibration = calibrated
+    assert len(samples) == 21
+    assert samples[0][0] == (0, 0, 0, 0)
+    for index in range(len(CHANNELS)):
+        assert [levels[index] for levels, _ in samples if any(levels)].count(0) == 15
+    assert calibration.condition < 20
+
+
+def test_fit_recovers_the_sensor():
+    sensor = RGBSensorStub(noise=0.0)
+    samples = []
+    for second, levels in enumerate([(0, 0, 0, 0), (10, 0, 0, 0), (0, 10, 0, 0), (0, 0, 10, 0),
+                                     (0, 0, 0, 10), (3, 5, 7, 9)]):
+        moment = START + timedelta(seconds=second)
+        samples.append((levels, sensor.reading(moment, dict(zip(CHANNELS, levels)))))
+    calibration = fit_calibration(samples)
+    assert np.linalg.inv(calibration.estimator) == pytest.approx(np.array(sensor.response),
+                                                                 abs=1e-3)
+    assert calibration.offsets == pytest.approx(sensor.ambient, abs=1e-3)
+    with pytest.raises(CalibrationError, match="on its own"):
+        fit_calibration([(levels, readings) for levels, readings in samples[:5]
+                         if not levels[3]] * 2)
+
+
+def test_calibration_fits_the_helper(calibrated):
+    _, calibration = calibrated
+    value = format_calibration(calibration)
+    assert len(value) <= 255
+    estimator, offsets = parse_calibration(value)
+    assert estimator == pytest.approx(calibration.estimator, rel=1e-4)
+    assert offsets == pytest.approx(calibration.offsets, rel=1e-4)
+    assert parse_calibration("") is None
+
+
+def test_room_light_is_not_trusted(calibrated):
+    _, calibration = calibrated
+    sensor = RGBSensorStub(noise=0.0)
+    reading = np.array(sensor.reading(START, dict(zip(CHANNELS, (6, 3, 5, 2)))))
+    levels, _ = estimate_levels(reading, calibration.estimator, calibration.offsets)
+    assert levels == (6, 3, 5, 2)
+    # A reading lamp switched on next to the tank
+    levels, _ = estimate_levels(reading + (1.5, 1.0, 0.5, 4.0), calibration.estimator,
+                                calibration.offsets)
+    assert levels is None
+
+
+def _drifted_runtime(calibration, helpers, physical, feedback=True):
+    hass = build_runtime(START, ROOT, sensor=RGBSensorStub(seed=3))
+    # Only the scripts and the nightly reset run; the circadian targets stay out of it
+    hass.set_state('automation.aquarium_dynamic_circadian_lighting', 'off')
+    hass.set_state(CALIBRATION_HELPER, format_calibration(calibration))
+    hass.set_state(FEEDBACK_HELPER, 'on' if feedback else 'off')
+    for channel, helper, level in zip(CHANNELS, helpers, physical):
+        hass.set_state(f'input_number.hygger_{channel}_level', float(helper))
+        hass.light.levels[channel] = level
+    return hass
+
+
+@pytest.mark.parametrize('feedback', [True, False])
+def test_reconcile_sends_only_corrections(calibrated, feedback):
+    _, calibration = calibrated
+    hass = _drifted_runtime(calibration, (5, 2, 4, 2), (7, 2, 4, 0), feedback)
+    variables = {'target_w': 6, 'target_r': 2, 'target_g': 4, 'target_b': 2}
+    for _ in hass.call_service('script.turn_on', ['script.aquarium_reconcile_state'],
+                               {'variables': variables}):
+        pass
+    hass.run_until(START + timedelta(minutes=1))
+    assert not hass.errors
+    commands = [command for _, command in hass.commands]
+    if feedback:
+        assert commands == ['white_up', 'white_down', 'white_down', 'blue_up', 'blue_up']
+        assert hass.drift() == 0
+    else:
+        assert commands == ['white_up']
+        assert hass.drift() == 4
+
+
+def test_daily_check_replaces_the_reset(calibrated):
+    _, calibration = calibrated
+    hass = _drifted_runtime(calibration, (0, 0, 0, 1), (0, 1, 0, 0))
+    hass.run_until(START + timedelta(hours=2, minutes=1))
+    assert not hass.errors
+    assert hass.automation_runs['aquarium_daily_reset'] == 1
+    assert [command for _, command in hass.commands] == ['red_down', 'blue_up']
+    assert not any(object_id == 'aquarium_reset_to_zero' for object_id, _, _ in hass.script_runs)
+    assert hass.drift() == 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, '-q']))
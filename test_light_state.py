@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Hygger Light State Tests
+Packing, interning, the command vocabulary and the planner built on it.
+"""
+import pickle
+from array import array
+from itertools import product
+
+import numpy as np
+import pytest
+
+from light_state import (COMMANDS, OFF, LightState, delta_many, from_array, pack, to_array,
+                         unpack)
+from lighting_engine import CHANNELS, MAX_LEVEL
+from reconcile_planner import transition_commands
+
+
+def test_packing_and_interning():
+    state = LightState.of(3, 0, 10, 2)
+    assert state.levels == (3, 0, 10, 2)
+    assert state.packed == 3 | 10 << 8 | 2 << 12
+    assert state['green'] == 10 and state[3] == 2
+    assert state.to_dict() == {'white': 3, 'red': 0, 'green': 10, 'blue': 2}
+    assert LightState.from_dict(state.to_dict()) is state
+    assert LightState(state.packed) is state
+    assert pickle.loads(pickle.dumps(state)) is state
+    with pytest.raises(AttributeError):
+        state.packed = 0
+    with pytest.raises(ValueError):
+        LightState.of(11)
+    with pytest.raises(ValueError):
+        LightState(0x000B)
+
+
+def test_apply_saturates_like_the_light():
+    state = LightState.of(MAX_LEVEL, 0, 5, 1)
+    assert state.apply('white_up') is state
+    assert state.apply('red_down') is state
+    assert state.apply('green_up') == LightState.of(MAX_LEVEL, 0, 6, 1)
+    assert state.replay(['blue_down', 'blue_down', 'white_down']) == LightState.of(9, 0, 5, 0)
+    assert state.apply(COMMANDS.index('green_down')) is state.apply('green_down')
+
+
+def test_diff_matches_level_arithmetic():
+    for current, target in product(product((0, 4, MAX_LEVEL), repeat=4), repeat=2):
+        have, want = LightState.from_levels(current), LightState.from_levels(target)
+        assert have.delta(want) == tuple(b - a for a, b in zip(current, target))
+        commands = have.commands_to(want)
+        assert len(commands) == have.steps_to(want)
+        assert have.replay(commands) is want
+        assert list(commands) == transition_commands(current, target, order='grouped')
+
+
+def test_arrays_round_trip():
+    states = [OFF, LightState.of(1, 2, 3, 4), LightState.of(*(MAX_LEVEL,) * 4)]
+    packed = to_array(states)
+    assert packed.typecode == 'H' and array('H', states) == packed
+    assert from_array(packed) == states
+    levels = np.array([state.levels for state in states])
+    assert np.array_equal(pack(levels), np.array(packed, dtype=np.uint16))
+    assert np.array_equal(unpack(pack(levels)), levels)
+    assert delta_many(pack(levels[:-1]), pack(levels[1:])).tolist() == [[1, 2, 3, 4],
+                                                                         [9, 8, 7, 6]]
+    assert unpack(pack(np.zeros((0, len(CHANNELS))))).shape == (0, len(CHANNELS))
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, '-q']))
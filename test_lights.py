@@ -3,10 +3,109 @@
 Hygger Light Test Script
 Simulates the light testing sequence that would be performed by Home Assistant.
 This script provides a preview of the test sequence without requiring actual hardware.
+
+The profiles mirror scripts/aquarium_test_lights.yaml (`profile` field):
+  full   each channel 0→10→0 one level at a time, with holds and resets
+  smoke  reset, then a short pulse per channel - every learned code, in seconds
+  ramp   all four channels 0→10→0 together as two batched send_command calls
+
+The preview runs on a virtual clock and prints when each step would happen at the
+configured IR delay, so a three-minute test previews instantly; --realtime sleeps
+like the hardware does. --verify runs the real script YAML in the HA stand-in for
+every profile, starting from an arbitrary light state, and checks the commands,
+the duration and that the light ends at zero.
 """
 
+import argparse
 import time
 import sys
+from collections import namedtuple
+
+from lighting_engine import CHANNELS, MAX_LEVEL
+from reconcile_planner import RESET_COMMANDS, RESET_REPEATS
+
+PROFILES = ('full', 'smoke', 'ramp')
+IR_DELAY_MS = 500
+SMOKE_STEPS = 2
+COLOR_CODES = {'white': "⚪", 'red': "🔴", 'green': "🟢", 'blue': "🔵"}
+
+# One script step: ('say', text), ('wait', seconds) or ('send', (commands, num_repeats))
+Step = namedtuple('Step', 'kind value')
+
+
+class Clock:
+    """Virtual clock for the preview; sleeps for real only in realtime mode."""
+
+    def __init__(self, realtime=False):
+        self.now = 0.0
+        self.realtime = realtime
+
+    def sleep(self, seconds):
+        self.now += seconds
+        if self.realtime:
+            time.sleep(seconds)
+
+
+CLOCK = Clock()
+LEVELS = dict.fromkeys(CHANNELS, 0)
+
+
+def reset_steps(delay_s):
+    """script.aquarium_reset_to_zero: one batched call of 12 rounds of downs."""
+    return [Step('send', (RESET_COMMANDS, RESET_REPEATS)), Step('wait', delay_s)]
+
+
+def channel_steps(channel, delay_s):
+    """The full profile's test of one channel: 0→10, hold, 10→0, one level per step."""
+    steps = [Step('say', f"Testing {channel.upper()} channel: 0→10→0")]
+    for direction in ('up', 'down'):
+        for _ in range(MAX_LEVEL):
+            # send_command, delay, input_number.set_value, delay
+            steps += [Step('send', ((f"{channel}_{direction}",), 1)),
+                      Step('wait', delay_s), Step('wait', delay_s)]
+        steps.append(Step('wait', 2))  # Hold at maximum, then pause between channels
+    return steps
+
+
+def profile_plan(profile, delay_s, smoke_steps=SMOKE_STEPS):
+    """The steps scripts/aquarium_test_lights.yaml runs for a profile."""
+    if profile == 'full':
+        plan = [Step('say', "Initial reset")] + reset_steps(delay_s) + [Step('wait', 2)]
+        for channel in CHANNELS:
+            plan += channel_steps(channel, delay_s)
+        return plan + [Step('say', "Final reset")] + reset_steps(delay_s)
+    if profile == 'smoke':
+        plan = [Step('say', "Reset (clamps every channel to 0)")] + reset_steps(delay_s)
+        for channel in CHANNELS:
+            plan += [Step('say', f"Pulse {channel.upper()} 0→{smoke_steps}→0"),
+                     Step('send', ((f"{channel}_up",), smoke_steps)), Step('wait', 1),
+                     Step('send', ((f"{channel}_down",), smoke_steps)), Step('wait', delay_s)]
+        return plan
+    if profile == 'ramp':
+        return [Step('say', "All channels up (clamps at 10)"),
+                Step('send', (tuple(f"{c}_up" for c in CHANNELS), MAX_LEVEL)), Step('wait', 2),
+                Step('say', "All channels down (clamps at 0)"),
+                Step('send', (tuple(f"{c}_down" for c in CHANNELS), MAX_LEVEL)),
+                Step('wait', delay_s)]
+    raise ValueError(f"Unknown profile: {profile}")
+
+
+def plan_commands(plan):
+    """Every IR command a plan sends, in order."""
+    return [command for step in plan if step.kind == 'send'
+            for command in list(step.value[0]) * step.value[1]]
+
+
+def plan_duration(plan, delay_s):
+    """Seconds a plan takes: Broadlink waits delay_secs between commands of one call."""
+    total = 0.0
+    for step in plan:
+        if step.kind == 'wait':
+            total += step.value
+        elif step.kind == 'send':
+            total += (len(step.value[0]) * step.value[1] - 1) * delay_s
+    return total
+
 
 def print_progress_bar(value, max_value, color, direction):
     """Print a visual progress bar for the current color and level."""
@@ -16,73 +115,166 @@ def print_progress_bar(value, max_value, color, direction):
     arrow = "↑" if direction == "up" else "↓"
     print(f"\r{color:>6} {arrow} [{bar}] {value:2d}/10", end='', flush=True)
 
-def test_color_channel(color_name, color_code):
-    """Test a single color channel: 0→10→0."""
-    print(f"\n🔍 Testing {color_name.upper()} channel (0→10→0)")
-    
-    # Ramp up from 0 to 10
-    for level in range(1, 11):
-        print_progress_bar(level, 10, color_code, "up")
-        time.sleep(0.5)  # Match the 500ms delay from the YAML script
-    
-    print(f"\n   ✨ {color_name} at maximum brightness - pausing...")
-    time.sleep(2)
-    
-    # Ramp down from 10 to 0
-    for level in range(9, -1, -1):
-        print_progress_bar(level, 10, color_code, "down")
-        time.sleep(0.5)  # Match the 500ms delay from the YAML script
-    
-    print(f"\n   ✅ {color_name} channel test complete")
-    time.sleep(1)
+
+def _stamp():
+    return f"[{CLOCK.now:6.1f}s]"
+
+
+def _apply(command):
+    channel, _, direction = command.rpartition('_')
+    step = 1 if direction == 'up' else -1
+    LEVELS[channel] = max(0, min(MAX_LEVEL, LEVELS[channel] + step))
+    return channel, direction
+
+
+def run_steps(steps, delay_s):
+    """Play steps on the clock, updating LEVELS and printing the light."""
+    for step in steps:
+        if step.kind == 'say':
+            print(f"\n{_stamp()} {step.value}")
+        elif step.kind == 'wait':
+            CLOCK.sleep(step.value)
+        else:
+            commands = list(step.value[0]) * step.value[1]
+            before = dict(LEVELS)
+            for index, command in enumerate(commands):
+                if index:
+                    CLOCK.sleep(delay_s)
+                channel, direction = _apply(command)
+                if CLOCK.realtime and len(step.value[0]) == 1:
+                    print_progress_bar(LEVELS[channel], MAX_LEVEL, COLOR_CODES[channel], direction)
+            if CLOCK.realtime and len(step.value[0]) == 1:
+                print()
+            changes = ', '.join(f"{COLOR_CODES[c]} {before[c]}→{LEVELS[c]}" for c in CHANNELS
+                                if before[c] != LEVELS[c] or len(step.value[0]) > 1)
+            if len(commands) > 1 or not CLOCK.realtime:
+                print(f"{_stamp()}   📡 {len(commands):>2} × IR  {changes or 'no change (clamped)'}")
+
+
+def preview_color_channel(color_name, color_code):
+    """Preview the test of a single color channel: 0→10→0."""
+    channel = color_name.lower()
+    print(f"\n🔍 Testing {color_name.upper()} channel (0→10→0) {color_code}")
+    run_steps(channel_steps(channel, IR_DELAY_MS / 1000)[1:], IR_DELAY_MS / 1000)
+    print(f"   ✅ {color_name} channel test complete")
+
+
+def verify_with_runtime(profile, smoke_steps=SMOKE_STEPS, delay_ms=IR_DELAY_MS, root='.',
+                        start_levels=(7, 3, 10, 5)):
+    """Run the test script YAML in the HA stand-in; return (commands, seconds, final levels).
+
+    The light starts at `start_levels` while the helpers say 0, as after a re-learn.
+    """
+    from datetime import datetime, timedelta
+    from ha_runtime import HomeAssistantStub
+
+    start = datetime(2026, 1, 1, 12)
+    hass = HomeAssistantStub(start)
+    hass.load_helpers(f"{root}/helpers")
+    hass.load_scripts(f"{root}/scripts")
+    hass.set_state('input_number.hygger_ir_delay_ms', float(delay_ms))
+    hass.light.levels.update(zip(CHANNELS, start_levels))
+    data = {'variables': {'profile': profile, 'smoke_steps': smoke_steps}}
+    for _ in hass.call_service('script.turn_on', ['script.aquarium_test_lights'], data):
+        pass
+    moment = start
+    while hass.is_running('script', 'aquarium_test_lights') and moment < start + timedelta(hours=1):
+        moment += timedelta(seconds=0.1)
+        hass.run_until(moment)
+    if hass.errors:
+        raise RuntimeError(hass.errors[0][3])
+    sent = [command for _, command in hass.commands]
+    duration = (hass.commands[-1][0] - start).total_seconds() if hass.commands else 0.0
+    return sent, duration, tuple(hass.light.levels[channel] for channel in CHANNELS)
+
+
+def print_comparison(delay_s, smoke_steps, verify):
+    """Print commands and duration of every profile (and the stand-in's, with --verify)."""
+    print(f"\n📊 Profiles at {delay_s * 1000:.0f}ms IR delay")
+    print(f"   {'Profile':<8} {'Commands':>9} {'Duration':>9} {'vs full':>8}")
+    full = plan_duration(profile_plan('full', delay_s), delay_s)
+    for profile in PROFILES:
+        plan = profile_plan(profile, delay_s, smoke_steps)
+        duration = plan_duration(plan, delay_s)
+        line = (f"   {profile:<8} {len(plan_commands(plan)):>9} {duration:>8.1f}s "
+                f"{duration / full:>8.0%}")
+        if verify:
+            sent, seconds, levels = verify_with_runtime(profile, smoke_steps, delay_s * 1000)
+            # The stand-in clock stops at the last IR command; the plan includes the final delay
+            ok = sent == plan_commands(plan) and levels == (0,) * len(CHANNELS)
+            line += (f"   {'✅' if ok else '❌'} YAML: {len(sent)} commands, last at {seconds:.1f}s, "
+                     f"light ends at {levels}")
+        print(line)
+
+
+def parse_args():
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(description="Preview the Hygger light test sequence")
+    parser.add_argument('--profile', choices=PROFILES, default='full',
+                        help="Test profile (the `profile` field of script.aquarium_test_lights)")
+    parser.add_argument('--smoke-steps', type=int, default=SMOKE_STEPS,
+                        help="Levels each channel is pulsed in the smoke profile")
+    parser.add_argument('--ir-delay', type=int, default=IR_DELAY_MS, metavar='MS',
+                        help="Delay between IR commands (input_number.hygger_ir_delay_ms)")
+    parser.add_argument('--realtime', action='store_true',
+                        help="Sleep through the sequence like the hardware instead of virtual time")
+    parser.add_argument('--verify', action='store_true',
+                        help="Run every profile's script YAML in the HA stand-in and compare")
+    return parser.parse_args()
+
 
 def main():
     """Run the complete light test sequence."""
+    global IR_DELAY_MS, CLOCK
+
+    args = parse_args()
+    IR_DELAY_MS = args.ir_delay
+    CLOCK = Clock(args.realtime)
+    delay_s = IR_DELAY_MS / 1000
+    LEVELS.update(dict.fromkeys(CHANNELS, 0))
+
     print("🚀 Hygger Aquarium Light Test Sequence")
     print("=" * 50)
-    print("This simulates the sequential color test:")
-    print("White (0→10→0) → Red (0→10→0) → Green (0→10→0) → Blue (0→10→0) → All Zero")
-    print()
-    
-    # Initial reset
-    print("🔄 Initial reset - setting all channels to zero...")
-    time.sleep(2)
-    
-    # Test each color channel
-    colors = [
-        ("White", "⚪"),
-        ("Red", "🔴"), 
-        ("Green", "🟢"),
-        ("Blue", "🔵")
-    ]
-    
-    for color_name, color_code in colors:
-        test_color_channel(color_name, color_code)
-        if color_name != "Blue":  # Don't pause after the last color
-            print(f"   ⏸️  Pausing between color tests...")
-            time.sleep(2)
-    
-    # Final reset
-    print("\n🔄 Final reset - setting all channels to zero...")
-    time.sleep(2)
-    
-    print("\n🎉 Light test sequence completed successfully!")
+    if args.profile == 'full':
+        print("This simulates the sequential color test:")
+        print("White (0→10→0) → Red (0→10→0) → Green (0→10→0) → Blue (0→10→0) → All Zero")
+    elif args.profile == 'smoke':
+        print(f"Smoke test: reset, then each channel 0→{args.smoke_steps}→0")
+    else:
+        print("Ramp test: all channels 0→10→0 together")
+    print(f"{'Real time' if args.realtime else 'Virtual time'}, {IR_DELAY_MS}ms IR delay")
+
+    if args.profile == 'full':
+        print(f"\n{_stamp()} 🔄 Initial reset - setting all channels to zero...")
+        run_steps(reset_steps(delay_s) + [Step('wait', 2)], delay_s)
+        for channel in CHANNELS:
+            preview_color_channel(channel.title(), COLOR_CODES[channel])
+        print(f"\n{_stamp()} 🔄 Final reset - setting all channels to zero...")
+        run_steps(reset_steps(delay_s), delay_s)
+    else:
+        run_steps(profile_plan(args.profile, delay_s, args.smoke_steps), delay_s)
+
+    plan = profile_plan(args.profile, delay_s, args.smoke_steps)
+    print(f"\n🎉 Light test sequence completed at {CLOCK.now:.1f}s "
+          f"({len(plan_commands(plan))} IR commands)")
     print("=" * 50)
     print("📋 Test Summary:")
-    print("   ✅ White channel: 0→10→0")
-    print("   ✅ Red channel: 0→10→0") 
-    print("   ✅ Green channel: 0→10→0")
-    print("   ✅ Blue channel: 0→10→0")
-    print("   ✅ Final reset: All channels → 0")
+    for channel in CHANNELS:
+        print(f"   ✅ {channel.title()} channel: up and down codes exercised")
+    print(f"   ✅ Final state: {', '.join(f'{c[0].upper()}={LEVELS[c]}' for c in CHANNELS)}")
+
+    print_comparison(delay_s, args.smoke_steps, args.verify)
+
     print("\n💡 To run this test on your actual lights:")
     print("   1. Import the aquarium_test_lights.yaml script into Home Assistant")
     print("   2. Update the Broadlink entity ID (remote.rm4_pro_remote)")
     print("   3. Ensure all helper entities are created")
-    print("   4. Run the 'Aquarium Test Lights' script from Home Assistant")
+    print("   4. Run the 'Aquarium Test Lights' script from Home Assistant "
+          f"(profile: {args.profile})")
 
 if __name__ == "__main__":
     try:
         main()
     except KeyboardInterrupt:
         print("\n\n⏹️  Test sequence interrupted by user")
-        sys.exit(0)
\ No newline at end of file
+        sys.exit(0)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Hygger Photoperiod Profile Tests
+The shipped profiles, their compiled tables, the table cache and profile switching.
+"""
+import os
+from datetime import datetime
+
+import pytest
+
+from ephemeris import sun_elevation
+from photoperiod import (DEFAULT_PROFILE, CompiledProfile, ProfileError, TankProfile,
+                         compiled_profile, evaluate_curve, find_profiles, load_profile,
+                         normalize_profile, verify_default)
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+PROFILES = find_profiles(ROOT)
+
+
+def test_default_profile_file_is_the_automation_curve():
+    profile = load_profile(PROFILES['hygger_default'])
+    assert profile.curve == DEFAULT_PROFILE
+    assert verify_default(profile) == 0
+
+
+@pytest.mark.parametrize('name', sorted(PROFILES))
+def test_tables_match_the_curve(name):
+    # Without the photoperiod clamp every day reads the elevation table as it is
+    curve = dict(load_profile(PROFILES[name]).curve, photoperiod=DEFAULT_PROFILE['photoperiod'])
+    compiled = CompiledProfile.compile(curve)
+    for step in range(0, 9601, 13):
+        elevation = (step - 600) / 100
+        for condition in ('sunny', 'cloudy', (0.43, 0.25)):
+            levels, values = compiled.evaluate(172, elevation, elevation > 0, condition)
+            expected = evaluate_curve(curve, elevation, elevation > 0, condition)
+            assert levels == expected[0]
+            assert values == pytest.approx(expected[1])
+
+
+def test_photoperiod_clamp_keeps_noon():
+    profile = load_profile(PROFILES['planted_tropical'])
+    compiled = CompiledProfile.compile(profile.curve)
+    for day in (1, 80, 172, 266, 355):
+        lit = [minute for minute in range(1440)
+               if compiled.light_elevation(day, sun_elevation(day, minute / 60), True)[1]]
+        assert abs(len(lit) - 8 * 60) <= 2
+        noon = sun_elevation(day, 11.5)
+        assert compiled.light_elevation(day, noon, True)[0] == pytest.approx(noon)
+
+
+def test_tables_are_shared_by_curve(tmp_path):
+    profile = load_profile(PROFILES['blackwater_biotope'])
+    renamed = profile._replace(name='tetras', description='Another tank')
+    first = compiled_profile(profile, cache_dir=str(tmp_path))
+    assert compiled_profile(renamed) is first
+    loaded = CompiledProfile.load(str(tmp_path / f"{first.hash}.lut"))
+    assert (loaded.hash, loaded.maxima) == (first.hash, first.maxima)
+    assert (loaded.values, loaded.targets, loaded.days) == (first.values, first.targets,
+                                                             first.days)
+    assert compiled_profile(profile, latitude=50.0).hash != first.hash
+
+
+def test_switch_swaps_tables():
+    moment = datetime(2026, 6, 21, 12, 0)
+    tank = TankProfile(load_profile(PROFILES['hygger_default']))
+    before = tank.compiled
+    assert tank.evaluate(moment, 73.78, True)[0] == (10, 2, 9, 8)
+    after = tank.switch(load_profile(PROFILES['blackwater_biotope']))
+    assert tank.compiled is after is not before
+    assert tank.evaluate(moment, 73.78, True)[0] == (6, 2, 5, 3)
+
+
+@pytest.mark.parametrize('config, message', [
+    ({'glow': {}}, "unknown keys: glow"),
+    ({'red': {'warmth': 2}}, "expected a mapping"),
+    ({'brightness': [{'above': 5, 'level': 2}, {'above': 20, 'level': 5}]}, "highest"),
+    ({'max_levels': {'white': 12}}, "outside"),
+    ({'photoperiod': {'min_hours': 10, 'max_hours': 8}}, "outside"),
+])
+def test_rejects_invalid_profiles(config, message):
+    with pytest.raises(ProfileError, match=message):
+        normalize_profile(config)
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, '-q']))
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Hygger Scenario Tests
+Every scenarios/*.yaml file as one pytest case, so a new scenario file is a new test.
+"""
+import os
+
+import pytest
+
+from scenario_runner import SCENARIO_DIR, ScenarioError, find_scenarios, load_scenario, run_scenario
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SCENARIOS = find_scenarios([os.path.join(ROOT, SCENARIO_DIR)])
+
+
+@pytest.mark.parametrize('path', SCENARIOS, ids=os.path.basename)
+def test_scenario(path):
+    result = run_scenario(path, ROOT)
+    failed = [f"{c.name}: {c.actual} (expected {c.expected})" for c in result.checks if not c.passed]
+    assert result.passed, result.error or '; '.join(failed)
+
+
+def test_rejects_unquoted_clock_time(tmp_path):
+    path = tmp_path / 'bad.yaml'
+    path.write_text('start: "2026-06-21 12:00"\nduration: 600\nevents:\n'
+                    '  - at: 12:05\n    weather: rainy\n')
+    with pytest.raises(ScenarioError, match="quote the clock time"):
+        load_scenario(str(path))
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, '-q']))
@@ -4,43 +4,8 @@ Test Seasonal Lighting Variations
 Demonstrates how the aquarium lighting will change throughout the year
 following actual sunrise/sunset times instead of fixed 6am-6pm schedule.
 """
-import math
-from datetime import datetime, timedelta
+from ephemeris import get_sunrise_sunset_for_day
 
-def get_sunrise_sunset_for_day(day_of_year):
-    """Get sunrise/sunset times for a specific day of year."""
-    # Calculate sunrise/sunset for latitude 38.28°N (Jeffersonville, Indiana)
-    latitude = 38.28
-    
-    # Solar declination angle
-    declination = 23.45 * math.sin(math.radians((360 / 365) * (day_of_year - 81)))
-    
-    # Hour angle at sunrise/sunset
-    lat_rad = math.radians(latitude)
-    decl_rad = math.radians(declination)
-    
-    try:
-        hour_angle = math.degrees(math.acos(-math.tan(lat_rad) * math.tan(decl_rad)))
-        
-        # Convert to time (solar noon is around 12:00, adjust for time zone)
-        sunrise_decimal = 12 - (hour_angle / 15) - 0.5  # Adjust for Eastern Time
-        sunset_decimal = 12 + (hour_angle / 15) - 0.5
-        
-        # Convert to hours and minutes
-        sunrise_hour = int(sunrise_decimal)
-        sunrise_min = int((sunrise_decimal - sunrise_hour) * 60)
-        sunset_hour = int(sunset_decimal)
-        sunset_min = int((sunset_decimal - sunset_hour) * 60)
-        
-        # Calculate daylight length
-        daylight_hours = sunset_decimal - sunrise_decimal
-        
-        return (f"{sunrise_hour:02d}:{sunrise_min:02d}", 
-                f"{sunset_hour:02d}:{sunset_min:02d}", 
-                daylight_hours)
-    except:
-        # Fallback for extreme latitudes
-        return "06:30", "18:30", 12.0
 
 def test_seasonal_variations():
     """Test lighting variations across different seasons."""
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Hygger Weather Client Tests
+The integration's pooled OpenWeatherMap client against the local One Call stand-in.
+"""
+import asyncio
+
+import pytest
+
+from owm_standin import OWMStandin, load_weather_client
+
+client_module = load_weather_client()
+BERLIN = (52.52, 13.405)
+
+
+def run(scenario, **standin_options):
+    """Run `scenario(standin, make_client)` against a fresh stand-in."""
+    async def main():
+        clients = []
+        async with OWMStandin(**standin_options) as standin:
+            def make_client(**options):
+                client = client_module.WeatherClient.create("test", url=standin.url, **options)
+                clients.append(client)
+                return client
+            try:
+                return await scenario(standin, make_client)
+            finally:
+                for client in clients:
+                    await client.close()
+    return asyncio.run(main())
+
+
+def test_concurrent_requests_share_one_call():
+    async def scenario(standin, make_client):
+        client = make_client()
+        results = await asyncio.gather(*[client.forecast(*BERLIN, forecast_type)
+                                         for forecast_type in ('hourly', 'daily') * 5])
+        return standin, client, results
+
+    standin, client, results = run(scenario, latency=0.05)
+    assert standin.total == 1
+    assert client.stats['upstream'] == 1 and client.stats['coalesced'] == 9
+    hourly, daily = results[0], results[1]
+    assert len(hourly) == 48 and len(daily) == 8
+    assert set(hourly[0]) == {'datetime', 'condition', 'cloud_coverage', 'precipitation',
+                              'temperature'}
+
+
+def test_rate_limited_per_location():
+    now = [0.0]
+
+    async def scenario(standin, make_client):
+        client = make_client(min_interval=600, clock=lambda: now[0])
+        await client.forecast(*BERLIN)
+        # A tank a few hundred metres away shares the location
+        await client.forecast(52.5213, 13.4049)
+        await client.forecast(48.14, 11.58)
+        now[0] = 599.0
+        await client.forecast(*BERLIN)
+        now[0] = 600.0
+        await client.forecast(*BERLIN)
+        return standin
+
+    standin = run(scenario)
+    assert standin.requests == {(52.52, 13.4): 2, (48.14, 11.58): 1}
+
+
+def test_failures_serve_the_last_forecast():
+    now = [0.0]
+
+    async def scenario(standin, make_client):
+        client = make_client(min_interval=600, retry_interval=60, max_age=3600,
+                             clock=lambda: now[0])
+        first = await client.forecast(*BERLIN)
+        standin.error_rate = 1.0
+        now[0] = 600.0
+        assert await client.forecast(*BERLIN) == first
+        now[0] = 630.0
+        assert await client.forecast(*BERLIN) == first   # waiting to retry: no call
+        now[0] = 3700.0
+        with pytest.raises(client_module.WeatherClientError):
+            await client.forecast(*BERLIN)
+        return standin
+
+    standin = run(scenario)
+    assert standin.total == 3 and standin.errors == 2
+
+
+def test_connections_are_reused():
+    async def scenario(standin, make_client):
+        client = make_client(min_interval=0)
+        for _ in range(5):
+            await client.forecast(*BERLIN)
+        return standin
+
+    standin = run(scenario)
+    assert standin.total == 5 and standin.connections == 1
+
+
+def test_conditions_follow_owm_codes():
+    assert [client_module.owm_condition(code) for code in (211, 501, 502, 615, 741, 800, 802, 804)] \
+        == ['lightning-rainy', 'rainy', 'pouring', 'snowy-rainy', 'fog', 'sunny', 'partlycloudy',
+            'cloudy']
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, '-q']))
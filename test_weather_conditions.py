@@ -5,142 +5,22 @@ Tests the lighting calculations for different weather conditions and times of da
 This validates that sunrise/sunset colors and weather-aware adjustments work correctly.
 """
 
-import time
-from datetime import datetime
-import math
+from datetime import datetime, timedelta
 
-def calculate_sun_elevation_fallback(hour):
-    """Calculate sun elevation for zip code 47124 (Jeffersonville, Indiana: 38.28°N, 85.74°W)"""
-    from datetime import datetime
-    import math
-    
-    current_minute = datetime.now().minute
-    day_of_year = datetime.now().timetuple().tm_yday
-    
-    if hour >= 6 and hour <= 18:
-        # Seasonal adjustment: max sun elevation varies from ~28° (winter) to ~75° (summer)
-        summer_peak = 75
-        winter_peak = 28
-        seasonal_range = summer_peak - winter_peak
-        seasonal_offset = (day_of_year - 80) / 365 * 2 * math.pi
-        seasonal_factor = winter_peak + seasonal_range * (1 + math.sin(seasonal_offset)) / 2
-        
-        # Calculate elevation based on time from solar noon
-        hour_decimal = hour + (current_minute / 60.0)
-        hours_from_noon = abs(hour_decimal - 12)
-        if hours_from_noon <= 6:
-            elevation_factor = 1 - (hours_from_noon / 6) ** 2
-            return seasonal_factor * elevation_factor
-        else:
-            return 0
-    else:
-        return 0
+from lighting_engine import levels_at
 
-def calculate_lighting_for_conditions(hour, weather_condition):
-    """Calculate expected light levels for given hour and weather condition."""
-    
-    # Calculate sun elevation
-    sun_elevation = calculate_sun_elevation_fallback(hour)
-    
-    # Calculate base brightness (updated to match outdoor light levels)
-    current_hour = hour
-    if current_hour >= 6 and current_hour <= 18:
-        # Scale brightness to match natural outdoor illumination levels
-        if sun_elevation > 60:
-            base_brightness = 10  # High sun - maximum brightness
-        elif sun_elevation > 40:
-            base_brightness = int(8 + (sun_elevation - 40) / 10)  # Mid-day sun
-        elif sun_elevation > 20:
-            base_brightness = int(5 + (sun_elevation - 20) / 6.7)  # Morning/afternoon sun
-        elif sun_elevation > 5:
-            base_brightness = int(2 + (sun_elevation - 5) / 5)  # Low sun
-        elif sun_elevation > 0:
-            base_brightness = int(sun_elevation / 2.5)  # Twilight
-        else:
-            base_brightness = 0
-    else:
-        base_brightness = 0
-    
-    # Calculate each channel (updated for outdoor light matching)
-    
-    # White Channel - Primary illumination matching daylight
-    if sun_elevation > 10:
-        target_white = max(base_brightness, 1)
-    elif sun_elevation > 0:
-        target_white = int(base_brightness * 0.6)
-    else:
-        target_white = 0
-    target_white = max(0, min(10, target_white))
-    
-    # Red Channel - Warm light for sunrise/sunset
-    if sun_elevation < 20 and sun_elevation > 0:
-        target_red = min(int(base_brightness * (1 - sun_elevation/20) * 1.5), 10)
-    elif current_hour >= 8 and current_hour <= 16 and base_brightness > 2:
-        target_red = int(max(base_brightness * 0.15, 1))
-    else:
-        target_red = 0
-    target_red = max(0, min(10, target_red))
-    
-    # Green Channel - Natural balance
-    if base_brightness > 1:
-        target_green = int(target_white * 0.6 + target_red * 0.2 + base_brightness * 0.3)
-    else:
-        target_green = 0
-    target_green = max(0, min(10, target_green))
-    
-    # Blue Channel - Peaks during high sun
-    if sun_elevation > 20:
-        target_blue = min(int(base_brightness * 0.8), 8)
-    elif sun_elevation > 5:
-        target_blue = min(int(base_brightness * 0.6), 6)
-    elif current_hour >= 7 and current_hour <= 17 and base_brightness > 0:
-        target_blue = int(max(base_brightness * 0.3, 1))
-    else:
-        target_blue = 0
-    target_blue = max(0, min(10, target_blue))
-    
-    # Apply weather modifiers (updated to match outdoor lighting effects)
-    modified_white = target_white
-    modified_red = target_red
-    modified_green = target_green
-    modified_blue = target_blue
-    
-    if 'cloudy' in weather_condition.lower():
-        # Cloudy reduces light by ~30-50%
-        modified_white = int(target_white * 0.6)
-        modified_red = min(int(target_red * 1.2), 10)  # Overcast enhances warm tones
-        modified_green = int(target_green * 0.8)
-        modified_blue = int(target_blue * 0.9)
-    
-    if 'rainy' in weather_condition.lower():
-        # Rain/storms reduce light by ~60-70%
-        modified_white = int(target_white * 0.4)
-        modified_red = min(int(target_red * 1.2), 10)  # Overcast enhances warm tones
-        modified_green = int(target_green * 0.6)
-        modified_blue = min(int(target_blue * 1.3), 10)  # Storms have cooler color temperature
-    
-    if 'partly-cloudy' in weather_condition.lower():
-        # Partial clouds reduce light by ~15-20%
-        modified_white = int(target_white * 0.8)
-        modified_green = int(target_green * 0.9)
-        modified_blue = int(target_blue * 0.95)
-    
-    # Ensure all values are in valid range
-    final_white = max(0, min(10, round(modified_white)))
-    final_red = max(0, min(10, round(modified_red)))
-    final_green = max(0, min(10, round(modified_green)))
-    final_blue = max(0, min(10, round(modified_blue)))
-    
+def calculate_lighting_for_conditions(hour, weather_condition, day=None):
+    """Expected light levels at a (decimal) hour of `day` (default today) for a weather condition."""
+    midnight = datetime.combine(day or datetime.now().date(), datetime.min.time())
+    evaluation = levels_at(midnight + timedelta(hours=hour), weather_condition)
+    levels = evaluation['levels']
     return {
         'hour': hour,
         'weather': weather_condition,
-        'sun_elevation': sun_elevation,
-        'base_brightness': base_brightness,
-        'white': final_white,
-        'red': final_red,
-        'green': final_green,
-        'blue': final_blue,
-        'total': final_white + final_red + final_green + final_blue
+        'sun_elevation': max(evaluation['elevation'], 0),
+        'base_brightness': evaluation['base_brightness'],
+        **levels,
+        'total': sum(levels.values())
     }
 
 def test_time_of_day_progression():
@@ -220,7 +100,7 @@ def test_sunrise_sunset_colors():
         hour = int(hour_decimal)
         minute = int((hour_decimal - hour) * 60)
         
-        result = calculate_lighting_for_conditions(hour, "sunny")
+        result = calculate_lighting_for_conditions(hour_decimal, "sunny")
         
         # Calculate color temperature indication
         if result['red'] > result['blue']:
@@ -242,7 +122,7 @@ def test_sunrise_sunset_colors():
         hour = int(hour_decimal)
         minute = int((hour_decimal - hour) * 60)
         
-        result = calculate_lighting_for_conditions(hour, "sunny")
+        result = calculate_lighting_for_conditions(hour_decimal, "sunny")
         
         # Calculate color temperature indication
         if result['red'] > result['blue']:
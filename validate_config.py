@@ -1,63 +1,258 @@
 #!/usr/bin/env python3
 """
 Configuration Validator for Hygger Light Home Automation
-Run this script to validate all YAML files for syntax errors.
+Run this script to validate all YAML files for syntax errors and structural problems.
+
+Validation is incremental: per-file results are cached in .validate_cache.json keyed
+by mtime/size and content hash, so only changed files are re-parsed; changing the
+checks or installing jinja2 starts a fresh cache. Changed files are parsed in a
+process pool. The archived 'Old *' directories are skipped unless --include-old is
+given.
+
+Structural checks:
+  • every script/automation/helper entity referenced is defined in the tree
+  • repeat.count values are integers or valid templates
+  • every template string compiles
+  • automations and scripts set `mode`
 """
 
-import yaml
+import argparse
+import inspect
 import os
+import re
 import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import yaml
+
+from config_tree import (REPO_DOMAINS, FileCache, config_kind, defined_entities,
+                         file_digest, iter_yaml_files)
+
+try:
+    from jinja2 import Environment, TemplateSyntaxError
+    _JINJA = Environment(extensions=['jinja2.ext.loopcontrols'])
+except ImportError:  # Template checks are skipped without jinja2
+    _JINJA = None
+
+CACHE_FILE = '.validate_cache.json'
+
+# Below this many changed files, parsing in-process beats process start-up cost
+PARALLEL_THRESHOLD = 8
+
+_TEMPLATE_ENTITY = re.compile(
+    r"""(?:states|state_attr|is_state)\(\s*['"]([a-z_]+\.[a-z0-9_]+)['"]""")
 
-def validate_yaml_file(filepath):
-    """Validate a single YAML file."""
+
+def _is_template(value):
+    return isinstance(value, str) and ('{{' in value or '{%' in value)
+
+
+def _walk(node, path, references, issues):
+    """Collect entity references and per-node issues from a parsed config tree."""
+    if isinstance(node, dict):
+        for key, value in node.items():
+            child = f"{path}.{key}" if path else str(key)
+            if key in ('entity_id', 'entity') and not _is_template(value):
+                for entity_id in value if isinstance(value, list) else [value]:
+                    if isinstance(entity_id, str) and '.' in entity_id:
+                        references.append((entity_id, child))
+            elif key in ('service', 'action') and isinstance(value, str) and not _is_template(value):
+                domain, _, name = value.partition('.')
+                if domain == 'script' and name not in ('turn_on', 'turn_off', 'toggle', 'reload'):
+                    references.append((value, child))
+            if key == 'repeat' and isinstance(value, dict) and 'count' in value:
+                _check_repeat_count(value['count'], f"{child}.count", issues)
+            _walk(value, child, references, issues)
+    elif isinstance(node, list):
+        for index, item in enumerate(node):
+            _walk(item, f"{path}[{index}]", references, issues)
+    elif _is_template(node):
+        for entity_id in _TEMPLATE_ENTITY.findall(node):
+            references.append((entity_id, path))
+        if _JINJA is not None:
+            try:
+                _JINJA.parse(node)
+            except TemplateSyntaxError as error:
+                issues.append(f"{path}: template syntax error: {error.message}")
+
+
+def _check_repeat_count(count, path, issues):
+    """repeat.count must be a non-negative integer or a template."""
+    if isinstance(count, bool):
+        issues.append(f"{path}: repeat.count must be a number or template, got {count!r}")
+    elif isinstance(count, int):
+        if count < 0:
+            issues.append(f"{path}: repeat.count must not be negative")
+    elif isinstance(count, str):
+        if not _is_template(count):
+            try:
+                int(count)
+            except ValueError:
+                issues.append(f"{path}: repeat.count {count!r} is neither an integer nor a template")
+        elif not count.strip().startswith('{{') or not count.strip().endswith('}}'):
+            issues.append(f"{path}: repeat.count template must be a single {{{{ expression }}}}")
+    else:
+        issues.append(f"{path}: repeat.count must be a number or template, got {type(count).__name__}")
+
+
+def analyze_file(filepath):
+    """Parse one file and return its cacheable validation result.
+
+    Runs in worker processes, so it only returns plain JSON-serializable data.
+    """
+    try:
+        with open(filepath, 'rb') as file:
+            raw = file.read()
+    except OSError as error:
+        return None, {'ok': False, 'error': str(error)}
+    digest = file_digest(raw)
     try:
-        with open(filepath, 'r') as file:
-            yaml.safe_load(file)
-        return True, None
-    except yaml.YAMLError as e:
-        return False, str(e)
-    except Exception as e:
-        return False, str(e)
+        data = yaml.safe_load(raw)
+    except yaml.YAMLError as error:
+        return digest, {'ok': False, 'error': str(error)}
+
+    references = []
+    issues = []
+    _walk(data, '', references, issues)
+    kind = config_kind(filepath)
+    if kind in ('automation', 'script') and isinstance(data, dict) and 'mode' not in data:
+        issues.append(f"{kind} does not set `mode` (defaults to single; set it explicitly)")
+    return digest, {
+        'ok': True,
+        'error': None,
+        'defines': defined_entities(filepath, data),
+        'references': references,
+        'issues': issues,
+    }
+
+
+def cache_namespace():
+    """Cache namespace: a hash of the rules and whether templates were compiled.
+
+    Cached results go stale when a check changes or jinja2 is installed, not only when
+    a file does, so both are part of the key.
+    """
+    rules = ''.join(inspect.getsource(function) for function in (
+        _is_template, _walk, _check_repeat_count, analyze_file, config_kind,
+        defined_entities)) + _TEMPLATE_ENTITY.pattern
+    return f"validate_config:{file_digest(rules.encode())[:16]}:jinja={_JINJA is not None}"
+
+
+def _analyze_changed(paths, jobs):
+    """Analyze files, in a process pool when there are enough of them."""
+    if jobs != 1 and len(paths) >= PARALLEL_THRESHOLD:
+        with ProcessPoolExecutor(max_workers=jobs or None) as pool:
+            return list(pool.map(analyze_file, paths, chunksize=4))
+    return [analyze_file(path) for path in paths]
+
+
+def validate_tree(root='.', include_old=False, cache_path=CACHE_FILE, jobs=0):
+    """Validate every YAML file under root; returns (results, reused_count)."""
+    cache = FileCache(cache_path, cache_namespace())
+    paths = list(iter_yaml_files(root, include_old))
+    results = {}
+    pending = []
+    stats = {}
+    for path in paths:
+        result, stat = cache.lookup(path)
+        if result is None:
+            # Touched or checked out again but unchanged: the content hash still matches
+            try:
+                with open(path, 'rb') as file:
+                    result = cache.lookup_digest(path, file_digest(file.read()), stat)
+            except OSError:
+                result = None
+        if result is not None:
+            results[path] = result
+        else:
+            pending.append(path)
+            stats[path] = stat
+
+    reused = len(results)
+    for path, (digest, result) in zip(pending, _analyze_changed(pending, jobs)):
+        results[path] = result
+        if digest is not None:
+            cache.store(path, digest, stats[path], result)
+
+    cache.prune(paths)
+    cache.save()
+    return {path: results[path] for path in paths}, reused
+
+
+def cross_check(results):
+    """Return {path: [issues]} for references to repo-defined entities that do not exist."""
+    defined = set()
+    for result in results.values():
+        if result['ok']:
+            defined.update(result['defines'])
+    problems = {}
+    for path, result in results.items():
+        if not result['ok']:
+            continue
+        for entity_id, where in result['references']:
+            if entity_id.partition('.')[0] in REPO_DOMAINS and entity_id not in defined:
+                problems.setdefault(path, []).append(f"{where}: undefined entity {entity_id}")
+    return problems
+
 
 def main():
     """Main validation function."""
+    parser = argparse.ArgumentParser(description="Validate the Hygger light configuration")
+    parser.add_argument('root', nargs='?', default='.', help="Configuration tree to validate")
+    parser.add_argument('--include-old', action='store_true',
+                        help="Also validate the archived 'Old *' directories")
+    parser.add_argument('--no-cache', action='store_true', help="Ignore and do not write the cache")
+    parser.add_argument('--jobs', type=int, default=0,
+                        help="Worker processes for parsing (0 = one per CPU, 1 = no pool)")
+    parser.add_argument('--quiet', action='store_true', help="Only print problems and the summary")
+    args = parser.parse_args()
+
     print("🔍 Validating Hygger Light Home Automation Configuration...")
     print("=" * 60)
-    
+
+    cache_path = None if args.no_cache else os.path.join(args.root, CACHE_FILE)
+    results, reused = validate_tree(args.root, args.include_old, cache_path, args.jobs)
+    problems = cross_check(results)
+
     errors = []
+    warnings = []
     success_count = 0
-    total_count = 0
-    
-    # Find all YAML files
-    for root, dirs, files in os.walk('.'):
-        # Skip hidden directories
-        dirs[:] = [d for d in dirs if not d.startswith('.')]
-        
-        for file in files:
-            if file.endswith('.yaml') or file.endswith('.yml'):
-                filepath = os.path.join(root, file)
-                total_count += 1
-                
-                is_valid, error = validate_yaml_file(filepath)
-                if is_valid:
-                    print(f"✅ {filepath}")
-                    success_count += 1
-                else:
-                    print(f"❌ {filepath}")
-                    print(f"   Error: {error}")
-                    errors.append((filepath, error))
-    
+    for filepath, result in results.items():
+        if not result['ok']:
+            print(f"❌ {filepath}")
+            print(f"   Error: {result['error']}")
+            errors.append((filepath, result['error']))
+            continue
+        file_issues = result['issues'] + problems.get(filepath, [])
+        if file_issues:
+            print(f"⚠️  {filepath}")
+            for issue in file_issues:
+                print(f"   • {issue}")
+                warnings.append((filepath, issue))
+        elif not args.quiet:
+            print(f"✅ {filepath}")
+        success_count += 1
+
+    total_count = len(results)
     print("=" * 60)
-    print(f"📊 Results: {success_count}/{total_count} files valid")
-    
+    print(f"📊 Results: {success_count}/{total_count} files valid "
+          f"({total_count - reused} parsed, {reused} unchanged)")
+    if _JINJA is None:
+        print("ℹ️  jinja2 not installed - template syntax checks skipped")
+
     if errors:
         print("\n🚨 Errors found:")
         for filepath, error in errors:
             print(f"  • {filepath}: {error}")
+    if warnings:
+        print(f"\n🚨 {len(warnings)} structural issue(s) found:")
+        for filepath, issue in warnings:
+            print(f"  • {filepath}: {issue}")
+    if errors or warnings:
         sys.exit(1)
     else:
         print("🎉 All YAML files are valid!")
-        
+
         # Additional checks
         print("\n🔧 Additional Recommendations:")
         print("  • Update entity IDs in scripts (remote.rm4_pro_remote)")
@@ -66,4 +261,4 @@ def main():
         print("  • Verify Broadlink and OpenWeatherMap integrations are working")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
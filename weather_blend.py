@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Hygger Weather Blend
+Continuous weather modifiers from the hourly forecast, without reconcile bursts.
+
+The circadian automation used to take `forecast[0].condition` as it was, so when
+the hourly forecast went from `partlycloudy` to `cloudy` on the hour - or the
+provider revised the current hour for a few minutes - white and green jumped
+several levels at once and the whole change went out as one IR burst. Step 2 of
+automations/aquarium_dynamic_circadian_lighting.yaml now reads the numeric
+`cloud_coverage` and `precipitation` of the forecast points and interpolates them
+to the current minute; Step 6 holds jumps between consecutive minutes (forecast
+revisions) for a dwell time and then follows them at a limited rate. The
+modifiers are linear in cloud cover and rain (lighting_engine.weather_factors),
+so a change is spread over the hour in smaller steps instead of one jump. It is
+not always one level at a time: a steep forecast change still sends bursts of 3
+or 4, which the report counts separately from the solar ones.
+
+This tool replays synthetic hourly forecasts (a Markov chain of conditions plus
+short revisions of the current hour) minute by minute and reports the IR burst
+sizes with the condition-stepped modifiers and with the blended ones, both behind
+the dead-band of Step 8, and splits the bursts into weather-caused and solar ones.
+--verify runs the real YAML for the first day in the HA stand-in and compares the
+weather it applies with this module minute by minute.
+"""
+import argparse
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from deadband import DeadBand, flap_stats, minute_inputs, replay, tracking_stats
+from lighting_engine import NOMINAL_WEATHER, weather_fractions
+
+WEATHER_DWELL_MINUTES = 10
+SLEW = 0.02  # Largest change of cloud or rain per minute, and the jump that is held
+WEATHER_STATES = ('sunny', 'partlycloudy', 'cloudy', 'rainy')
+BURST = 3  # A reconcile of this many IR commands or more counts as a burst
+
+
+def forecast_point(entry):
+    """(cloud, rain) of one forecast entry; missing numbers come from its condition."""
+    coverage, precipitation = NOMINAL_WEATHER.get(entry.get('condition'), NOMINAL_WEATHER['sunny'])
+    if isinstance(entry.get('cloud_coverage'), (int, float)):
+        coverage = entry['cloud_coverage']
+    if isinstance(entry.get('precipitation'), (int, float)):
+        precipitation = entry['precipitation']
+    return weather_fractions(coverage, precipitation)
+
+
+def _timestamp(value):
+    try:
+        return datetime.fromisoformat(str(value)).timestamp()
+    except ValueError:
+        return None
+
+
+def interpolate(entries, now):
+    """Cloud and rain at `now` between the forecast points around it (Step 2's weather_target)."""
+    now_ts = now.timestamp()
+    point = None
+    for entry in entries:
+        cloud, rain = forecast_point(entry)
+        moment = _timestamp(entry.get('datetime'))
+        if point is None or moment is None or moment <= now_ts:
+            point = (moment, cloud, rain)
+            if moment is None or moment > now_ts:
+                break
+        else:
+            fraction = (now_ts - point[0]) / (moment - point[0])
+            return (round(point[1] + (cloud - point[1]) * fraction, 3),
+                    round(point[2] + (rain - point[2]) * fraction, 3))
+    return point[1:] if point else (0.0, 0.0)
+
+
+class WeatherFilter:
+    """Cloud and rain in use, holding and rate-limiting forecast jumps (mirror of Step 6)."""
+
+    def __init__(self, dwell=WEATHER_DWELL_MINUTES, slew=SLEW):
+        self.dwell = dwell
+        self.slew = slew
+        # As stored in input_text.aquarium_weather_state: the pair in use and the
+        # minute the current jump started (0 = none); None before the first update
+        self.applied = None
+        self.since = 0
+
+    def update(self, minute, target, active=True):
+        """Return the (cloud, rain) to use at `minute` for the forecast's `target`."""
+        applied, since = tuple(target), 0
+        if active and self.dwell and self.applied is not None:
+            held = self.applied
+            if max(abs(want - have) for want, have in zip(target, held)) > self.slew:
+                since = self.since or minute
+                applied = held
+                if minute - since >= self.dwell:
+                    applied = tuple(round(have + min(max(want - have, -self.slew), self.slew), 3)
+                                    for want, have in zip(target, held))
+        self.applied, self.since = applied, since
+        return applied
+
+
+class ForecastReplay:
+    """Hourly conditions with short revisions of the current hour, as fetched each minute."""
+
+    def __init__(self, start, days, revisions=0.3, seed=0):
+        import numpy as np
+        from drift_montecarlo import weather_timeline
+
+        self.start = datetime(start.year, start.month, start.day)
+        hourly = weather_timeline(days + 1, np.random.default_rng(seed))[::60]
+        self.hourly = [str(condition) for condition in hourly]
+        # hour -> (first minute, last minute, condition) of a revision inside it
+        self.revised = {}
+        rng = random.Random(seed)
+        for hour in range(days * 24):
+            if rng.random() < revisions:
+                state = WEATHER_STATES.index(self.hourly[hour])
+                other = WEATHER_STATES[min(max(state + rng.choice((-1, 1)), 0),
+                                           len(WEATHER_STATES) - 1)]
+                if other == self.hourly[hour]:
+                    other = WEATHER_STATES[1 if state == 0 else state - 1]
+                first = rng.randrange(60)
+                self.revised[hour] = (first, first + rng.randint(5, 30), other)
+
+    def condition(self, hour, fetched):
+        """Condition forecast for `hour` (index from start) as seen at minute `fetched`."""
+        revision = self.revised.get(fetched // 60)
+        if revision and hour in (fetched // 60, fetched // 60 + 1) \
+                and revision[0] <= fetched % 60 <= revision[1]:
+            return revision[2]
+        # The daily forecast looks further ahead than the replay; keep its last hour
+        return self.hourly[min(hour, len(self.hourly) - 1)]
+
+    def entries(self, minute, hours=3):
+        """The hourly forecast fetched at `minute`: nominal numbers per condition."""
+        first = minute // 60
+        entries = []
+        for hour in range(first, first + hours):
+            condition = self.condition(hour, minute)
+            coverage, precipitation = NOMINAL_WEATHER[condition]
+            entries.append({'datetime': (self.start + timedelta(hours=hour)).isoformat(),
+                            'condition': condition, 'cloud_coverage': coverage,
+                            'precipitation': precipitation})
+        return entries
+
+
+def weather_series(forecasts, minutes, dwell=WEATHER_DWELL_MINUTES, slew=SLEW):
+    """Return (stepped, blended): per-minute weather as the condition and as (cloud, rain)."""
+    weather_filter = WeatherFilter(dwell, slew)
+    stepped, blended = [], []
+    for minute in range(minutes):
+        entries = forecasts.entries(minute)
+        now = forecasts.start + timedelta(minutes=minute)
+        stepped.append(entries[0]['condition'])
+        blended.append(weather_filter.update(minute + 1, interpolate(entries, now)))
+    return stepped, blended
+
+
+def burst_stats(levels):
+    """Return the IR commands of every reconcile that changed the levels."""
+    return [sum(abs(new - old) for old, new in zip(before, after))
+            for before, after in zip(levels, levels[1:]) if before != after]
+
+
+def bursts_by_cause(levels, weather):
+    """Split burst_stats() into (weather, solar) by what moved the levels.
+
+    A reconcile counts as weather-caused when the weather in use changed since the
+    previous reconcile, else as solar (sunrise, sunset, dead-band releases).
+    """
+    by_cause = ([], [])
+    last = 0
+    for minute in range(1, len(levels)):
+        if levels[minute] == levels[minute - 1]:
+            continue
+        size = sum(abs(new - old) for old, new in zip(levels[minute - 1], levels[minute]))
+        changed = any(weather[moment] != weather[last] for moment in range(last + 1, minute + 1))
+        by_cause[0 if changed else 1].append(size)
+        last = minute
+    return by_cause
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0
+
+
+def verify_with_runtime(day, forecasts, root='.', dwell=WEATHER_DWELL_MINUTES):
+    """Run the circadian YAML for one day; return (minutes compared, mismatching minutes).
+
+    The stand-in serves the replayed forecast as fetched at its current minute; the
+    weather in input_text.aquarium_weather_state is compared with WeatherFilter fed
+    the same forecast.
+    """
+    from ha_runtime import WeatherStub, build_runtime
+
+    start = datetime(day.year, day.month, day.day)
+    stub = WeatherStub(hours=3)
+    hass = build_runtime(start, root, weather=stub)
+    fetched = lambda: int((hass.now - forecasts.start).total_seconds() // 60)
+    stub.timeline = lambda moment: forecasts.condition(
+        int((moment - forecasts.start).total_seconds() // 3600), fetched())
+    hass.set_state('input_number.hygger_weather_dwell_minutes', float(dwell))
+    weather_filter = WeatherFilter(dwell)
+    offset = int((start - forecasts.start).total_seconds() // 60)
+    compared = mismatched = 0
+    for index in range(1, 1440):
+        moment = start + timedelta(minutes=index)
+        hass.run_until(moment + timedelta(seconds=59))
+        if not hass.automation_runs.get('aquarium_dynamic_circadian_lighting'):
+            continue
+        minute = offset + index
+        entries = forecasts.entries(minute)
+        expected = weather_filter.update(round(moment.timestamp() / 60),
+                                         interpolate(entries, moment))
+        stored = hass.states['input_text.aquarium_weather_state'].state.split()
+        compared += 1
+        mismatched += tuple(float(value) for value in stored[:2]) != expected
+    if hass.errors:
+        raise RuntimeError(hass.errors[0][3])
+    return compared, mismatched
+
+
+def parse_args():
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(description="Compare IR bursts of condition-stepped and "
+                                                 "blended weather modifiers")
+    parser.add_argument('--date', type=date.fromisoformat, default=date.today(),
+                        help="First simulated day (YYYY-MM-DD)")
+    parser.add_argument('--days', type=int, default=30, help="Number of days to replay")
+    parser.add_argument('--revisions', type=float, default=0.3,
+                        help="Chance per hour that the provider briefly revises the current hour")
+    parser.add_argument('--seed', type=int, default=0, help="Seed for the forecast replay")
+    parser.add_argument('--dwell', type=int, default=WEATHER_DWELL_MINUTES,
+                        help="Minutes a forecast jump is held "
+                             "(input_number.hygger_weather_dwell_minutes)")
+    parser.add_argument('--slew', type=float, default=SLEW,
+                        help="Largest change of cloud or rain per minute")
+    parser.add_argument('--verify', action='store_true',
+                        help="Also run the first day through the YAML in the HA stand-in")
+    return parser.parse_args()
+
+
+def main():
+    """Replay forecasts and report IR burst sizes before and after blending."""
+    args = parse_args()
+    started = time.perf_counter()
+    forecasts = ForecastReplay(args.date, args.days, args.revisions, args.seed)
+    first, elevations, daylight, _, hours = minute_inputs(args.date, args.days)
+    stepped, blended = weather_series(forecasts, len(elevations), args.dwell, args.slew)
+    results = {}
+    for name, weather in (('stepped', stepped), ('blended', blended)):
+        engine, sent = replay((first, elevations, daylight, weather, hours), DeadBand())
+        results[name] = (sent, engine, weather)
+    elapsed = time.perf_counter() - started
+
+    print("🌦️  Hygger Weather Blend")
+    print("=" * 84)
+    print(f"📅 {args.days} day(s) from {args.date}, {len(forecasts.revised)} forecast revisions, "
+          f"dwell {args.dwell} min, slew {args.slew:g}/min, replayed in {elapsed:.2f}s")
+    print("🌤️  stepped: forecast[0].condition as it is; blended: cloud and rain interpolated "
+          "and filtered")
+    print()
+    print(f"{'Weather':<9} {'IR cmds':>8} {'Reconciles':>11} {'Mean':>6} {'p95':>5} "
+          f"{'Largest':>8} {f'Bursts ≥{BURST}':>10} {'Flip-flops':>11} {'Off stepped':>12}")
+    print(f"{'':<9} {'per day':>8} {'per day':>11} {'burst':>6} {'burst':>5} {'burst':>8} "
+          f"{'per day':>10} {'per day':>11} {'lvl·min/day':>12}")
+    print("-" * 84)
+    reference = results['stepped'][1]
+    for name, (sent, engine, _) in results.items():
+        bursts = burst_stats(sent)
+        flips, commands, runs = flap_stats(sent)
+        off = tracking_stats(reference, sent)[0]
+        print(f"{name:<9} {commands / args.days:>8.1f} {runs / args.days:>11.1f} "
+              f"{sum(bursts) / max(len(bursts), 1):>6.2f} {_percentile(bursts, 0.95):>5} "
+              f"{max(bursts, default=0):>8} "
+              f"{sum(size >= BURST for size in bursts) / args.days:>10.2f} "
+              f"{flips / args.days:>11.2f} {off / args.days:>12.1f}")
+
+    print("\n📊 Reconciles by IR commands sent")
+    for name, (sent, _, _) in results.items():
+        bursts = burst_stats(sent)
+        counts = [sum(size == n for size in bursts) for n in range(1, 5)]
+        counts.append(sum(size >= 5 for size in bursts))
+        print(f"   {name:<9} " + "  ".join(f"{label}: {count:>5}" for label, count in
+                                          zip(('1', '2', '3', '4', '5+'), counts)))
+
+    print(f"\n🌥️  Bursts of {BURST}+ per day by cause (weather: the weather in use changed "
+          f"since the previous reconcile)")
+    for name, (sent, _, weather) in results.items():
+        print(f"   {name:<9} " + "  ".join(
+            f"{cause}: {sum(size >= BURST for size in bursts) / args.days:>5.2f} "
+            f"(p95 {_percentile(bursts, 0.95)}, largest {max(bursts, default=0)})"
+            for cause, bursts in zip(('weather', 'solar'), bursts_by_cause(sent, weather))))
+
+    if args.verify:
+        compared, mismatched = verify_with_runtime(args.date, forecasts, dwell=args.dwell)
+        status = "✅" if not mismatched else "❌"
+        print(f"\n{status} YAML (HA stand-in) vs weather filter on {args.date}: "
+              f"{mismatched} of {compared} minutes differ")
+
+
+if __name__ == "__main__":
+    main()